@@ -1,23 +1,41 @@
 #Arp_Scanner.py
-from scapy.all import srp, Ether, ARP, conf
-import socket
+from scapy.all import Ether, ARP, conf
 from . import Constants
+from .Packet_Engine import PacketEngine, l2_socket_factory
+from .Rtt_Estimator import RttEstimator
+from .Probe_Scheduler import ProbeScheduler
+from .Rate_Controller import RateController
+from .Scan_Metrics import ProbeMetrics, shared_metrics
+from .Logging_Config import event
 import logging
 
+logger = logging.getLogger(__name__)
+
 class ArpScanner:
     '''
     ARP Scanner class to perform network scans using ARP packets.
     '''
-    def __init__(self, ip_range, stop):
+    def __init__(self, ip_range, stop, rate=float(Constants.DEFAULT_RATE), rtt=None, rate_controller=None, metrics=None, retries=Constants.PROBE_RETRIES):
         '''
         Initializes the ARP scanner.
 
         Args:
-            ip_range (list): The range of IP addresses to scan.
+            ip_range (TargetRange): The IP addresses to scan.
             stop (function): A function that returns True if the scanning process should be stopped.
-
+            rate (float): Number of ARP requests sent per second.
+            rtt (RttEstimator): Estimator that is fed with the RTT of every reply and sets the time to
+                wait for replies after the last request. A new one with the default template if None.
+            rate_controller (RateController): Adapts the send rate to the measured loss. Shared by the
+                engines of a scan. A fixed rate of rate packets per second if None.
+            metrics (MetricsRegistry): Registry the probe counters and RTTs are written into. shared_metrics if None.
+            retries (int): Maximum number of times an unanswered request is sent again (see ProbeScheduler).
         '''
         self.ip_range = ip_range
+        self.rate = rate
+        self.rtt = rtt or RttEstimator()
+        self.rate_controller = rate_controller or RateController(max_rate=rate, min_rate=rate, rtt=self.rtt)
+        self.metrics = metrics or shared_metrics
+        self.retries = retries
 
         self.stop = stop
 
@@ -28,38 +46,72 @@ class ArpScanner:
         Returns:
             list: A list of dictionaries, each containing information about a detected host.
         '''
-        logging.info('ARP scan started.')
+        return list(self.arp_scanner_stream())
+
+    def arp_scanner_stream(self):
+        '''
+        Executes an ARP scan over the specified IP range, yielding hosts as their replies arrive.
+
+        All requests are sent as one paced stream and the replies are collected asynchronously, so
+        the scan ends one timeout after the last request. The timeout adapts to the RTTs measured
+        so far, so on a LAN it shrinks to the floor of the timing template. Unanswered requests are
+        sent again, where requests are being lost (see ProbeScheduler).
+
+        Yields:
+            dict: Information about a detected host.
+        '''
+        logger.info('ARP scan started.', extra=event('scan_started', engine='arp'))
         conf.verb = 0   # Suppress Scapy output to stdout
-        host_list = []
 
-        for ip in self.ip_range:
+        seen = set()
+        probe_metrics = ProbeMetrics(self.metrics, engine='arp')
+        scheduler = ProbeScheduler(timeout=self.rtt.timeout, retries=self.retries, rate_controller=self.rate_controller, metrics=probe_metrics)
+
+        def match(packet):
+            '''Returns (ip, mac) for ARP replies from a scanned address, None for anything else.'''
+            if not packet.haslayer(ARP) or packet[ARP].op != 2:    # 2 = is-at
+                return None
+
+            ip_address = packet[ARP].psrc
+            if ip_address in seen:
+                probe_metrics.duplicates.inc()
+                return None
+            if ip_address not in self.ip_range:
+                return None
+            seen.add(ip_address)
+
+            probe_metrics.replies.inc()
+            answer = scheduler.answered(ip_address)
+            # The reply to a request sent again may answer any of its copies, so only the others give an RTT (Karn's algorithm)
+            if answer is not None and not answer[0]:
+                rtt = answer[1]
+                self.rtt.observe(ip_address, rtt)
+                self.rate_controller.replied(ip_address, rtt)
+                probe_metrics.rtt.observe(rtt)
+            return ip_address, packet[ARP].hwsrc
+
+        def arp_packets():
+            '''Constructs the ARP requests lazily so that large ranges are never held in memory.'''
+            for ip in self.ip_range:
+                packet = Ether(dst='ff:ff:ff:ff:ff:ff') / ARP(pdst=ip)
+                scheduler.sent(ip, packet)
+                self.rate_controller.sent(ip)
+                probe_metrics.sent.inc()
+                yield packet
+
+        engine = PacketEngine(socket_factory=l2_socket_factory(self.ip_range), rate=self.rate_controller.rate, timeout=self.rtt.timeout, stop=self.stop, scheduler=scheduler)
+        for ip_address, mac_address in engine.stream(arp_packets(), match):
             if self.stop():
                 break
 
-            # Construct and send an ARP packet
-            arp_packet = Ether(dst='ff:ff:ff:ff:ff:ff') / ARP(pdst=ip)
-            answered, unanswered = srp(arp_packet, timeout=2, verbose=False)
-        
-            for unanswered, received in answered:
-                if self.stop():
-                    break
-                
-                ip_address = received.psrc
-
-                try:
-                    # Attempt to resolve hostname
-                    hostname = socket.gethostbyaddr(ip_address)[0]
-                except socket.herror:
-                    hostname = Constants.UNKNOWN_HOST# Use placeholder if resolution fails
-
-                 # Compile device info and add to list
-                device_info = {
-                    Constants.TABLE_COLOUM_IP: ip_address, 
-                    Constants.TABLE_COLOUM_MAC: received.hwsrc, 
-                    Constants.TABLE_COLOUM_HOST: hostname    # Ports are not scanned here
-                    }
-                device_info[Constants.TABLE_COLOUM_PORT] = []
-                host_list.append(device_info)
-
-        logging.info('ARP scan completed.')
-        return host_list
\ No newline at end of file
+            # Compile device info and hand it out
+            device_info = {
+                Constants.TABLE_COLOUM_IP: ip_address,
+                Constants.TABLE_COLOUM_MAC: mac_address,
+                Constants.TABLE_COLOUM_HOST: Constants.UNKNOWN_HOST,    # Resolved later by the DNS enrichment stage
+                Constants.TABLE_COLOUM_PORT: []    # Ports are not scanned here
+            }
+            yield device_info
+
+        probe_metrics.finish()
+        logger.info('ARP scan completed.', extra=event('scan_completed', engine='arp', sent=probe_metrics.sent.value, replies=probe_metrics.replies.value))
@@ -0,0 +1,265 @@
+#Connect_Scanner.py
+import asyncio
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from . import Constants
+from .Scan_Metrics import ProbeMetrics, shared_metrics
+from .Logging_Config import RateLimitedLog, event
+from .Stop_Signal import on_stop
+import logging
+
+try:
+    import resource
+except ImportError:    # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+# Running out of sockets fails every connection attempt that follows, so it is logged at a bounded rate
+socket_failure_log = RateLimitedLog(logger, logging.WARNING)
+
+class ConnectScanner:
+    '''
+    Port Scanner class that uses plain TCP connect() calls, so it needs no raw-socket privileges.
+
+    Connections are made with non-blocking sockets on an asyncio event loop. The number of sockets
+    open at the same time is bounded globally, per host, and by the file descriptors still available
+    to the process, so the scan never fails with EMFILE.
+    '''
+    # File descriptors left free for the rest of the application (GUI, log files, ...)
+    FD_RESERVE = 64
+
+    def __init__(self, start_port, end_port, ip_range, stop, timeout=Constants.CONNECT_TIMEOUT,
+                 max_connections=Constants.CONNECT_MAX_CONNECTIONS, max_host_connections=Constants.CONNECT_MAX_HOST_CONNECTIONS, ports=None, metrics=None):
+        '''
+        Initializes the connect scanner.
+
+        Args:
+            start_port (int): The starting port number for the scan.
+            end_port (int): The ending port number for the scan.
+            ip_range (TargetRange): The IP addresses to scan.
+            stop (function): A function that returns True if the scanning process should be stopped.
+            timeout (float): Time to wait for each connection attempt, in seconds.
+            max_connections (int): Maximum number of connection attempts in flight.
+            max_host_connections (int): Maximum number of connection attempts in flight to a single host.
+            ports (function): Returns the ports to try on a host, given its IP address, or None for
+                the whole range from start_port to end_port (e.g., see DeltaScan). The range if None.
+            metrics (MetricsRegistry): Registry the connection attempts and their RTTs are written into. shared_metrics if None.
+        '''
+        self.start_port = start_port
+        self.end_port = end_port
+        self.ip_range = ip_range
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_host_connections = max_host_connections
+        self.ports = ports
+        self.metrics = metrics or shared_metrics
+        self.probe_metrics = None    # Set by _scan
+
+        self.stop = stop
+
+    def connect_scanner(self):
+        '''
+        Executes a connect scan of the port range on every address of the IP range.
+
+        Returns:
+            list: A list of dictionaries, each containing information about a host that answered
+                (with an accepted or a refused connection) and its open ports.
+        '''
+        return list(self.connect_scanner_stream())
+
+    def connect_scanner_stream(self):
+        '''
+        Executes a connect scan, yielding each host that answered once all of its ports have been tried.
+
+        The event loop runs on a thread of its own and hands the hosts over through a queue.
+
+        Yields:
+            dict: Information about a host and its open ports.
+        '''
+        logger.info('Connect scan started.', extra=event('scan_started', engine='connect'))
+
+        results = queue.Queue()
+        loop_thread = threading.Thread(target=self._run_event_loop, args=(results,), daemon=True)
+        loop_thread.start()
+
+        for host_info in iter(results.get, None):
+            yield host_info
+
+        loop_thread.join()
+        logger.info('Connect scan completed.', extra=event('scan_completed', engine='connect'))
+
+    def connection_limit(self):
+        '''
+        Returns the number of connection attempts that may be in flight at once.
+
+        This is max_connections, lowered if needed to the file descriptors the process can still open.
+        '''
+        if resource is None:
+            return self.max_connections
+
+        soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft_limit == resource.RLIM_INFINITY:
+            return self.max_connections
+        try:
+            open_fds = len(os.listdir('/proc/self/fd'))
+        except OSError:
+            open_fds = self.FD_RESERVE
+        return max(1, min(self.max_connections, soft_limit - open_fds - self.FD_RESERVE))
+
+    def _run_event_loop(self, results):
+        '''Runs the scan on a new event loop, then puts None on the results queue to mark the end.'''
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._scan(results))
+        finally:
+            loop.close()
+            results.put(None)
+
+    async def _scan(self, results):
+        '''Runs the connection workers until every (host, port) pair has been tried.'''
+        remaining = {}    # ip -> number of ports not done yet
+        open_ports = {}    # ip -> open ports, for the hosts that answered
+        in_flight = {}    # ip -> number of connection attempts in flight to the host
+        active = []    # [ip, ports iterator, number of ports not handed out yet] of the hosts being tried, in range order
+        hosts = iter(self.ip_range)
+        # Notified whenever a connection attempt ends, so a worker waiting for a host below its limit tries again
+        slot_freed = asyncio.Condition()
+
+        def next_pair():
+            '''
+            Returns the next (host, port) pair to try, or None if every host being tried is at its connection limit
+            and the range is exhausted. Hosts are tried in range order, so that they complete one after the other,
+            but a host at its limit is passed over for the next one instead of holding a worker back.
+            '''
+            for entry in active:
+                ip, ports, untried = entry
+                if in_flight[ip] < self.max_host_connections:
+                    return take(entry)
+
+            for ip in hosts:
+                ports = self.ports(ip) if self.ports is not None else None
+                if ports is None:
+                    ports = range(self.start_port, self.end_port + 1)
+                if not ports:
+                    continue
+                remaining[ip] = len(ports)
+                in_flight[ip] = 0
+                entry = [ip, iter(ports), len(ports)]
+                active.append(entry)
+                return take(entry)
+            return None
+
+        def take(entry):
+            '''Hands out the next port of a host of active, and drops the host from active once every port has been.'''
+            ip, ports, untried = entry
+            entry[2] = untried - 1
+            if untried == 1:
+                active.remove(entry)
+            return ip, next(ports)
+
+        self.probe_metrics = ProbeMetrics(self.metrics, engine='connect')
+
+        async def worker():
+            while not self.stop():
+                pair = next_pair()
+                if pair is None:
+                    if not active:
+                        # Every pair has been handed out: wake the other waiting workers up, so that they end too
+                        async with slot_freed:
+                            slot_freed.notify_all()
+                        break
+                    async with slot_freed:
+                        await slot_freed.wait()
+                    continue
+
+                ip, port = pair
+                in_flight[ip] += 1
+                try:
+                    is_open = await self._probe(ip, port)
+                finally:
+                    in_flight[ip] -= 1
+                    async with slot_freed:
+                        slot_freed.notify()
+
+                if is_open is not None:
+                    host_ports = open_ports.setdefault(ip, set())
+                    if is_open:
+                        host_ports.add(port)
+
+                remaining[ip] -= 1
+                if remaining[ip] == 0:
+                    # Every port of the host has been tried
+                    del remaining[ip]
+                    del in_flight[ip]
+                    if ip in open_ports:
+                        results.put(self._host_info(ip, open_ports.pop(ip)))
+
+        limit = self.connection_limit()
+        logger.debug(f'Connect scan running with {limit} concurrent connections.')
+        # A stop request cancels the connection attempts in flight instead of waiting for their timeout
+        loop = asyncio.get_running_loop()
+        workers = asyncio.gather(*(worker() for _ in range(limit)))
+        unregister = on_stop(self.stop, lambda: loop.call_soon_threadsafe(workers.cancel))
+        try:
+            await workers
+        except asyncio.CancelledError:
+            pass
+        finally:
+            unregister()
+
+        # Hand out the hosts that answered before the scan was stopped
+        for ip in list(open_ports):
+            results.put(self._host_info(ip, open_ports.pop(ip)))
+
+    def _host_info(self, ip, open_ports):
+        '''Compiles host and port information.'''
+        return {
+            Constants.TABLE_COLOUM_IP: ip,
+            Constants.TABLE_COLOUM_MAC: '',    # MAC address is not available here
+            Constants.TABLE_COLOUM_HOST: Constants.UNKNOWN_HOST,    # Resolved later by the DNS enrichment stage
+            Constants.TABLE_COLOUM_PORT: sorted(open_ports)
+        }
+
+    async def _probe(self, ip, port):
+        '''
+        Tries to connect to ip:port.
+
+        Returns:
+            bool: True if the connection was accepted, False if it was refused (the host is up),
+                or None if there was no answer.
+        '''
+        loop = asyncio.get_running_loop()
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        except OSError as e:
+            socket_failure_log.log('Could not open a socket for %s:%s: %s', ip, port, e)
+            return None
+
+        probe_metrics = self.probe_metrics
+        probe_metrics.sent.inc()
+        started = time.monotonic()
+        try:
+            sock.setblocking(False)
+            # Close with a RST instead of lingering in TIME_WAIT
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), self.timeout)
+            probe_metrics.replies.inc()
+            probe_metrics.rtt.observe(time.monotonic() - started)
+            return True
+        except ConnectionRefusedError:
+            probe_metrics.replies.inc()
+            probe_metrics.rtt.observe(time.monotonic() - started)
+            return False
+        except asyncio.TimeoutError:
+            probe_metrics.timeouts.inc()
+            return None
+        except OSError:
+            probe_metrics.timeouts.inc()    # E.g., the host is unreachable
+            return None
+        finally:
+            sock.close()
@@ -7,40 +7,62 @@ WINDOW_TITLE = 'Network Scanner'
 SCAN_TYPE = 'Scan Type:'
 SCAN_TYPE_ARP = 'ARP scan'
 SCAN_TYPE_PING = 'Ping sweep'
+SCAN_TYPE_PING_FAST = 'Ping sweep (fast)'
 SCAN_TYPE_PORT = 'Port scan'
+SCAN_TYPE_CONNECT = 'Port scan (connect)'
 
 ### Labels
 START_IP = 'Start IP (e.g., 192.168.1.0):    *Enter only the start IP to scan a single IP.'
 END_IP = 'End IP (e.g., 192.168.1.10):'
 PREFIX = 'Subnet Prefix (e.g., 24):'
 TIMEOUT = 'Timeout (s):'
+TIMING = 'Timing template:'
 TTL = 'TTL (s):'
 INTERVAL = 'Interval (s):'
 PACKET_SIZE = 'Packet Size (bytes):'
 START_PORT = 'Start Port#:'
 END_PORT = 'End Port#:'
+RATE = 'Rate (packets/s):'
+DELTA = 'Delta rescan (probe what is likely to have changed, show only the differences)'
+DETECT_SERVICES = 'Detect services (banner, HTTP, TLS, SSH and SMTP probes of the open ports)'
+INCLUDE = 'Include (addresses, CIDRs, ranges or @file, comma-separated):'
+EXCLUDE = 'Exclude (e.g., 192.168.1.1, 10.0.0.0/24, 10.1.0.1-10.1.0.50, @exclude.txt):'
+PORTS = 'Ports (e.g., 22,80,8000-8100,top:100; overrides Start/End Port#). top:N is ranked by frequency up to N={ranked}, by port number past that:'
 
 ### Button Labels
 START_SCAN_BUTTON = 'Start Scan'
 ABORT_SCAN_BUTTON = 'Abort Scan'
 EXPORT_DATA_BUTTON = 'Export Data'
+HISTORY_BUTTON = 'History'
 
 ### Status Messages
 SCAN_IN_PROGRESS = 'Scan in Progress...'
+SCAN_ABORTING = 'Aborting scan...'
 SCAN_ABORTED = 'Scan aborted'
 SCAN_COMPLETED = 'Scan completed'
+SCAN_COMPLETED_DELTA = 'Scan completed: {added} added, {removed} removed, {changed} changed'
+EXPORT_IN_PROGRESS = 'Exporting... {written} / {total} hosts'
+EXPORT_COMPLETED = 'Exported {written} hosts to {filename}'
+METRICS_STATUS = ('Probes: {sent} sent, {replies} replies, {duplicates} duplicates, {retries} retries, {timeouts} timed out | '
+                  'RTT p50 {rtt_p50:.1f} ms, p99 {rtt_p99:.1f} ms | DNS: {dns_lookups} lookups, {dns_cache_hits} cached | '
+                  '{hosts} hosts in {batches} batches')
 
 ### Table Coloums
 TABLE_COLOUM_IP = 'IP Address'
 TABLE_COLOUM_MAC = 'MAC Address'
 TABLE_COLOUM_HOST = 'Host Name'
 TABLE_COLOUM_PORT = 'Open Port Number'
+TABLE_COLOUM_LAST_SEEN = 'Last Seen'
+TABLE_COLOUM_CHANGE = 'Change'
+TABLE_COLOUM_DETAILS = 'Details'
+TABLE_COLOUM_SERVICE = 'Services'
 
 ### Default Inputs
 DEFAULT_TIMEOUT = '4'
 DEFAULT_TTL = '128'
 DEFAULT_INTERVAL = '1'
 DEFAULT_PACKET_SIZE = '32'
+DEFAULT_RATE = '200'
 
 ## UserInput_Handler.py
 ### Dictionary keys
@@ -54,6 +76,10 @@ KEY_INTERVAL = 'interval'
 KEY_PACKET_SIZE = 'packet_size'
 KEY_START_PORT = 'start_port'
 KEY_END_PORT = 'end_port'
+KEY_RATE = 'rate'
+KEY_INCLUDE = 'include'
+KEY_EXCLUDE = 'exclude'
+KEY_PORTS = 'ports'
 
 ### Validation messages
 MSG_START_IP_LESS_THAN_END_IP = 'Start IP must be less than End IP.'
@@ -73,14 +99,233 @@ MSG_START_PORT_RANGE = 'Start port number must be between 1 and 65535.'
 MSG_END_PORT_RANGE = 'End port number must be between 1 and 65535.'
 MSG_END_PORT_LESS_THAN_START_PORT = 'End port number cannot be less than start port number.'
 MSG_INVALID_PORT_NUMBER = 'Invalid input for port number. Please enter a numeric value between 1 and 65535.'
+MSG_NO_TCP_PORTS = 'The port specification has no TCP ports to scan (UDP ports are not scanned).'
+MSG_INVALID_PORT_SPEC = 'Invalid port specification "{entry}". Use ports, ranges and top:N, comma-separated (e.g., 22,80,8000-8100,top:100,u:53).'
+MSG_RATE_RANGE = 'Rate must be between 1 and 100000 packets per second.'
+MSG_RATE_RANGE2 = 'Invalid input for rate. Please enter a numeric value between 1 and 100000 packets per second.'
+MSG_UNKNOWN_SCAN_TYPE = 'Unknown scan type.'
+MSG_UNKNOWN_TIMING = 'Unknown timing template.'
+MSG_INVALID_TARGET_SPEC = 'Invalid include/exclude entry. Enter addresses, CIDR blocks (10.0.0.0/24), ranges (10.0.0.1-10.0.0.50) or @file.'
+MSG_INVALID_TARGET_FILE = 'Could not read the include/exclude file.'
+MSG_NO_TARGETS = 'No addresses left to scan after the exclusions.'
+MSG_DELTA_NEEDS_HISTORY = 'A delta rescan needs the scan history.'
+MSG_SCAN_NEEDS_PRIVILEGES = 'This scan type needs raw-socket privileges. Run as root (administrator), or use Port scan (connect).'
+MSG_SCAN_FAILED = 'The scan failed: {error}'
 
 ### Constants for result keys
 KEY_IP_RANGE = 'ip_range'
+KEY_PORT_SPEC = 'port_spec'
+### Set on an early copy of a host dictionary that a later, complete one of the same host replaces (see PortScanner)
+KEY_PARTIAL = 'partial'
 
 ## Logging_Config.py
 ### Log File Name
 LOG_FILE_NAME = 'NetworkScanner.log'
+### The log file rotates when it reaches this size (bytes), keeping this many old files
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+### Log format: time - log level - logger - message
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+### Levels of the loggers, by logger name ('' is the root logger); Scapy only reports warnings
+LOG_LEVELS = {'': 'INFO', 'NetworkScanner': 'DEBUG', 'scapy': 'WARNING', 'asyncio': 'WARNING'}
+### A rate-limited call site logs at most LOG_RATE_BURST messages per LOG_RATE_INTERVAL seconds
+LOG_RATE_BURST = 10
+LOG_RATE_INTERVAL = 1.0
 
 ## Arp_Scanner.py / Ping_Sweepeer.py / Port_Scanner.py
 ### Unknown host
-UNKNOWN_HOST = 'Unknown'
\ No newline at end of file
+UNKNOWN_HOST = 'Unknown'
+
+## Port_Scanner.py
+### A host with open ports is reported early, as a partial result, once this many of its ports (the most frequently open ones) are done
+PORT_EARLY_REPORT_PORTS = 100
+
+## Connect_Scanner.py
+### Time to wait for each connection attempt (s)
+CONNECT_TIMEOUT = 1
+### Maximum number of connection attempts in flight, globally and per host
+CONNECT_MAX_CONNECTIONS = 1024
+CONNECT_MAX_HOST_CONNECTIONS = 256
+
+## Dns_Resolver.py
+### Maximum number of reverse lookups running at the same time
+DNS_MAX_WORKERS = 32
+### Time a reverse lookup may run before it is abandoned, and the pool may go without starting or finishing one before the queued ones are (s)
+DNS_DEADLINE = 2
+### Maximum number of reverse lookups queued or running; further addresses wait for room
+DNS_MAX_PENDING = 4096
+### How often (in seconds) a resolve call checks the deadlines of its lookups
+DNS_POLL_INTERVAL = 0.05
+### Time resolved / unresolved addresses stay cached (s)
+DNS_POSITIVE_TTL = 3600
+DNS_NEGATIVE_TTL = 300
+### Maximum number of cached addresses
+DNS_CACHE_SIZE = 65536
+
+## Service_Detector.py
+### Maximum number of ports probed at the same time, globally and per host
+SERVICE_MAX_CONNECTIONS = 256
+SERVICE_MAX_HOST_CONNECTIONS = 8
+### Time to wait for a connection or a TLS handshake (s)
+SERVICE_CONNECT_TIMEOUT = 2
+### Time to wait for a banner sent by the server first (s)
+SERVICE_BANNER_WAIT = 1
+### Time to wait for the answer to a probe (s)
+SERVICE_READ_TIMEOUT = 2
+### Time after which the detection of one port is abandoned (s)
+SERVICE_DEADLINE = 8
+### Time identified / unidentified services stay memoized (s)
+SERVICE_POSITIVE_TTL = 3600
+SERVICE_NEGATIVE_TTL = 300
+### Maximum number of memoized (ip, port) pairs
+SERVICE_CACHE_SIZE = 65536
+### Ports that usually speak TLS, probed with a ClientHello first
+SERVICE_TLS_PORTS = frozenset({443, 465, 636, 853, 993, 995, 4443, 8443, 9443, 10443})
+### Maximum length of a banner in the results
+SERVICE_BANNER_LENGTH = 80
+
+## Result_Batcher.py
+### A batch of results is emitted when it holds this many records...
+BATCH_MAX_RECORDS = 256
+### ...or when its oldest record has waited this long (s)
+BATCH_MAX_DELAY = 0.1
+
+## Host_Pipeline.py
+### Maximum number of discovered hosts waiting to be port scanned
+PIPELINE_QUEUE_SIZE = 1024
+
+## Rtt_Estimator.py
+### Timing templates: (initial timeout, timeout floor, timeout ceiling) in seconds
+TIMING_TEMPLATES = {
+    'paranoid': (5.0, 1.0, 10.0),
+    'sneaky': (3.0, 0.5, 10.0),
+    'polite': (2.0, 0.3, 10.0),
+    'normal': (1.0, 0.1, 10.0),
+    'aggressive': (0.5, 0.1, 1.25),
+    'insane': (0.25, 0.05, 0.3)
+}
+DEFAULT_TIMING = 'normal'
+### Hosts in the same subnet of this prefix length share an RTT estimate
+RTT_SUBNET_PREFIX = 24
+
+## Rate_Controller.py
+### Rate the controller never backs off below (packets/s)
+RATE_MIN = 10
+### Minimum length (s) of an evaluation window, and number of probes it needs unless that takes longer than RATE_EPOCH at the current rate
+RATE_EPOCH = 0.1
+RATE_MIN_SAMPLES = 200
+### Fall of the reply ratio below its smoothed value that counts as loss
+RATE_LOSS_THRESHOLD = 0.1
+### Rate multiplier on loss, and rate step per window without loss (fraction of the entered rate)
+RATE_DECREASE = 0.5
+RATE_INCREASE = 0.02
+### Gains of the smoothed reply ratio and of the drop estimate
+RATE_BASELINE_GAIN = 0.25
+RATE_DROP_GAIN = 0.25
+
+## Timer_Wheel.py
+### Length of a tick (s), number of slots per level (a power of two) and number of levels of the timer wheel
+TIMER_WHEEL_TICK = 0.005
+TIMER_WHEEL_SLOTS = 64
+TIMER_WHEEL_LEVELS = 4
+
+## Probe_Scheduler.py
+### Number of times an unanswered probe is sent again
+PROBE_RETRIES = 2
+### The timeout of a probe is multiplied by this for every retransmission
+PROBE_BACKOFF = 1.5
+### Until loss is evident, one unanswered probe in this many is sent again to detect it
+PROBE_RETRY_SAMPLE = 16
+### Drop estimate of the rate controller from which loss is evident
+PROBE_RETRY_MIN_LOSS = 0.01
+### Once this many probes have been sent again, they keep being sent only if this share of them is answered
+PROBE_RETRY_MIN_SAMPLES = 400
+PROBE_RETRY_MIN_YIELD = 0.005
+
+## Ping_Sweeper.py
+### Number of addresses the classic ping sweep sends to per sr() call
+PING_SWEEP_CHUNK_SIZE = 256
+
+## Scan_History.py
+### Database file of the scan history
+HISTORY_DB_FILE = 'NetworkScanner.db'
+### Time to wait for a lock held by another connection (s)
+HISTORY_BUSY_TIMEOUT = 10
+### Maximum number of rows returned by a history query
+HISTORY_QUERY_LIMIT = 10000
+### Status of a scan
+HISTORY_STATUS_RUNNING = 'running'
+HISTORY_STATUS_COMPLETED = 'completed'
+HISTORY_STATUS_ABORTED = 'aborted'
+HISTORY_STATUS_FAILED = 'failed'
+
+## History_Pane.py
+### Window title and labels
+HISTORY_WINDOW_TITLE = 'Scan History'
+HISTORY_IP = 'IP:'
+HISTORY_MAC = 'MAC:'
+HISTORY_PORT = 'Open Port#:'
+HISTORY_DAYS = 'Last (days):'
+HISTORY_SEARCH_BUTTON = 'Search'
+HISTORY_RESULT_COUNT = '{count} hosts found.'
+HISTORY_INVALID_QUERY = 'Invalid query. Enter a valid IP, port number (1-65535) and number of days.'
+
+## Delta_Scan.py
+### Runs over which the sampled address space and port range are covered once (one slice per run)
+DELTA_ROTATIONS = 10
+### Hosts seen within this many days are probed in every run
+DELTA_HISTORY_DAYS = 7
+### Seed of the shuffled order the address space is sampled in, the same for every run
+DELTA_SEED = 0x5EED
+### Kinds of differences
+DELTA_ADDED = 'added'
+DELTA_REMOVED = 'removed'
+DELTA_CHANGED = 'changed'
+
+## Result_Writers.py
+### Number of hosts written per batch (and Parquet row group) by an export
+EXPORT_CHUNK_ROWS = 10000
+### Error messages
+MSG_UNKNOWN_EXPORT_FORMAT = 'Unknown export format of {path}. Use .csv, .ndjson, .jsonl (optionally with .gz), .parquet or .arrow.'
+MSG_EXPORT_NEEDS_PYARROW = 'Parquet and Arrow exports need the pyarrow package (pip install pyarrow).'
+
+## Export_Data.py
+### File dialog
+EXPORT_DIALOG_TITLE = 'Export Data'
+### File type filters of the export dialog, and their formats (Parquet and Arrow are offered only if pyarrow is installed)
+EXPORT_FILTERS = {
+    'CSV Files (*.csv)': 'csv',
+    'Compressed CSV Files (*.csv.gz)': 'csv.gz',
+    'NDJSON Files (*.ndjson *.jsonl)': 'ndjson',
+    'Compressed NDJSON Files (*.ndjson.gz *.jsonl.gz)': 'ndjson.gz',
+    'Parquet Files (*.parquet)': 'parquet',
+    'Arrow IPC Files (*.arrow)': 'arrow',
+}
+
+## Host_Record.py
+### Maximum number of distinct port sets whose arrays are shared between host records
+HOST_RECORD_SHARED_PORT_SETS = 4096
+
+## Scan_Metrics.py
+### Prefix of the metric names in the Prometheus text format
+METRICS_PREFIX = 'networkscanner_'
+### File the metrics of a GUI scan are written to at scan end (JSON)
+METRICS_FILE = 'NetworkScanner.metrics.json'
+### How often the metrics shown in the GUI are refreshed (ms)
+METRICS_REFRESH_INTERVAL = 500
+### Metric names; counters are labelled with the engine, the phase durations with the phase
+METRIC_PROBES_SENT = 'probes_sent_total'
+METRIC_REPLIES = 'replies_total'
+METRIC_DUPLICATES = 'duplicate_replies_total'
+METRIC_RETRIES = 'probe_retries_total'
+METRIC_TIMEOUTS = 'probe_timeouts_total'
+METRIC_RTT = 'rtt_seconds'
+METRIC_PHASE_DURATION = 'phase_duration_seconds'
+METRIC_DNS_LOOKUPS = 'dns_lookups_total'
+METRIC_DNS_CACHE_HITS = 'dns_cache_hits_total'
+METRIC_DNS_FAILURES = 'dns_failures_total'
+METRIC_RESULT_BATCHES = 'result_batches_total'
+METRIC_RESULT_HOSTS = 'result_hosts_total'
+### Upper bounds of the histogram buckets (s)
+METRIC_RTT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5)
+METRIC_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800)
\ No newline at end of file
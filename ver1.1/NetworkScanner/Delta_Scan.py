@@ -0,0 +1,150 @@
+#Delta_Scan.py
+from .Interval_Set import IntervalSet, ip_to_int
+from .Target_Range import TargetRange
+from .Host_Record import HostRecord, port_array, union_ports
+from . import Constants
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Scan types whose results include open ports
+PORT_SCAN_TYPES = [Constants.SCAN_TYPE_PORT, Constants.SCAN_TYPE_CONNECT]
+
+class DeltaScan:
+    '''
+    Rescans a target range with the results of the previous scans as a prior, and reports what changed.
+
+    The scan runs in two phases:
+    - The hosts seen by a recent scan (within days) are probed first. For port scans, only their
+      known-open ports are confirmed, plus a rotating 1/rotations slice of the scanned ports, so that
+      newly opened ports are still found within rotations runs.
+    - The rest of the range, where nothing answered recently, is sampled: each run probes a
+      different 1/rotations slice of its shuffled order (with all the scanned ports), so the whole
+      range is still covered every rotations runs.
+    A repeat scan therefore costs roughly 1/rotations of a full one. The rotation counts the previous
+    completed scans of the same kind whose targets covered the range, so scans of other ranges, and
+    aborted or failed ones, which may not have probed their slice, do not move it.
+    Without any such scan, the whole range is scanned.
+
+    Phases run in this process; the workers option of ScanRunner does not apply.
+    '''
+    def __init__(self, runner_args, history, stop, rotations=Constants.DELTA_ROTATIONS, days=Constants.DELTA_HISTORY_DAYS, metrics=None):
+        '''
+        Loads the prior from the history and plans the phases.
+
+        Args:
+            runner_args (dict): Keyword arguments of the ScanRunner of the whole scan, without stop (see ScanRunner.runner_args).
+            history (ScanHistory): History the previous results are read from.
+            stop (function): A function that returns True if the scanning process should be stopped.
+            rotations (int): Number of runs over which the sampled address space and ports are covered once.
+            days (float): Hosts seen within this many days are probed in every run.
+            metrics (MetricsRegistry): Registry the phases write their metrics into. shared_metrics if None.
+        '''
+        self.runner_args = runner_args
+        self.metrics = metrics
+        self.rotations = rotations
+        self.stop = stop
+
+        scan_type = runner_args[Constants.KEY_CURRENT_SCAN_TYPE]
+        ip_range = runner_args[Constants.KEY_IP_RANGE]
+        self.port_scan = scan_type in PORT_SCAN_TYPES
+        scan_types = PORT_SCAN_TYPES if self.port_scan else None
+
+        previous_scans = history.count_scans(scan_types, ip_range)
+        # ip -> HostRecord of the hosts seen recently
+        self.prior = {ip: HostRecord.from_host_info(host_info) for ip, host_info in history.latest_hosts(days, scan_types).items() if ip in ip_range}
+        self.rotation = previous_scans % rotations
+
+        if previous_scans == 0:
+            # Nothing to compare with: scan everything, as a full scan would
+            self.live = TargetRange([])
+            self.sample = TargetRange(ip_range.blocks)
+            self.port_slice = None
+        else:
+            live = IntervalSet((record.ip, record.ip) for record in self.prior.values())
+            dead = IntervalSet(ip_range.blocks).difference(live)
+            self.live = TargetRange.from_interval_set(live)
+            self.sample = TargetRange.from_interval_set(dead).shuffled(Constants.DELTA_SEED).shard(self.rotation, rotations)
+            port_spec = runner_args[Constants.KEY_PORT_SPEC]
+            self.port_slice = port_array(port_spec.tcp[self.rotation::rotations]) if self.port_scan else None
+
+        logger.info(f'Delta scan: {len(self.live)} known hosts, {len(self.sample)} of {len(ip_range) - len(self.live)} other addresses sampled (rotation {self.rotation}).')
+
+    def ports(self, ip):
+        '''Returns the ports to probe on ip: the known-open ports and this run's slice for a known host, None (all of the port specification) for others.'''
+        record = self.prior.get(ip)
+        if record is None or self.port_slice is None:
+            return None
+        return union_ports(record.ports, self.port_slice)
+
+    def stats(self):
+        '''
+        Returns the number of addresses and, for port scans, of (address, port) probes planned for this run.
+        The ports of the hosts a SYN port scan newly discovers in the sampled phase are not counted.
+        '''
+        stats = {'addresses': len(self.live) + len(self.sample)}
+        if self.port_scan:
+            stats['port_probes'] = sum(len(self.ports(ip) or ()) for ip in self.prior)
+            if self.runner_args[Constants.KEY_CURRENT_SCAN_TYPE] == Constants.SCAN_TYPE_CONNECT:
+                stats['port_probes'] += len(self.sample) * len(self.runner_args[Constants.KEY_PORT_SPEC])
+        return stats
+
+    def scan_stream(self):
+        '''
+        Runs the known hosts phase, then the sampled phase.
+
+        Yields:
+            dict: Information about a detected host, as soon as it is found.
+        '''
+        from .Scan_Runner import ScanRunner
+
+        # The RTTs and send rate learned from the known hosts carry over to the sampled phase
+        rtt = rate_controller = None
+        for ip_range in (self.live, self.sample):
+            if self.stop():
+                break
+            if len(ip_range) == 0:
+                continue
+            runner = ScanRunner(stop=self.stop, ports=self.ports, rtt=rtt, rate_controller=rate_controller, metrics=self.metrics,
+                                **dict(self.runner_args, **{Constants.KEY_IP_RANGE: ip_range}))
+            yield from runner.scan_stream()
+            rtt, rate_controller = runner.rtt, runner.rate_controller
+
+    def diff(self, host_list, complete=True):
+        '''
+        Compares the hosts found by this run with the prior.
+
+        Args:
+            host_list (list): Host dictionaries found by this run.
+            complete (bool): False if the run was stopped early; hosts that were not found are then not reported as removed.
+
+        Returns:
+            list: A host dictionary for every added, removed or changed host, with a Constants.TABLE_COLOUM_CHANGE
+                entry (one of the Constants.DELTA_* values) and a Constants.TABLE_COLOUM_DETAILS summary.
+        '''
+        found = {host_info[Constants.TABLE_COLOUM_IP]: host_info for host_info in host_list}
+        changes = []
+        for ip, host_info in found.items():
+            previous = self.prior.get(ip)
+            if previous is None:
+                changes.append(dict(host_info, **{Constants.TABLE_COLOUM_CHANGE: Constants.DELTA_ADDED, Constants.TABLE_COLOUM_DETAILS: ''}))
+                continue
+
+            details = []
+            record = HostRecord.from_host_info(host_info)
+            if record.mac != HostRecord.NO_MAC and previous.mac != HostRecord.NO_MAC and record.mac != previous.mac:
+                details.append(f'MAC {previous.mac_text()} -> {record.mac_text()}')
+            if self.port_scan:
+                # Every known-open port was probed again, so a missing one is closed
+                details += [f'+{port}' for port in (record - previous).ports]
+                details += [f'-{port}' for port in (previous - record).ports]
+            if details:
+                changes.append(dict(host_info, **{Constants.TABLE_COLOUM_CHANGE: Constants.DELTA_CHANGED, Constants.TABLE_COLOUM_DETAILS: ' '.join(details)}))
+
+        if complete:
+            for ip, previous in self.prior.items():
+                if ip not in found:
+                    changes.append(dict(previous.to_host_info(), **{Constants.TABLE_COLOUM_CHANGE: Constants.DELTA_REMOVED, Constants.TABLE_COLOUM_DETAILS: ''}))
+
+        changes.sort(key=lambda host_info: ip_to_int(host_info[Constants.TABLE_COLOUM_IP]))
+        return changes
@@ -0,0 +1,192 @@
+#Dns_Resolver.py
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import socket
+import threading
+import time
+from . import Constants
+from .Scan_Metrics import shared_metrics
+from .Stop_Signal import on_stop
+
+class DnsResolver:
+    '''
+    Reverse-DNS resolver that looks up many addresses concurrently.
+
+    Lookups run on a bounded thread pool, behind a bounded queue. Each one is abandoned (reported as
+    unknown) once it has run for deadline seconds, counted from when a worker starts it, so a large
+    batch is resolved in full however long it queues. A lookup stuck in the system resolver keeps its
+    worker, though: once no lookup has started or finished for deadline seconds (every worker is
+    stuck on an unresponsive name server), the queued ones are abandoned too, so a dead resolver
+    never stalls a scan. Answers, including failures, are kept in an LRU cache with a TTL, so
+    repeated scans of the same subnet don't resolve known hosts again.
+    '''
+    def __init__(self, max_workers=Constants.DNS_MAX_WORKERS, deadline=Constants.DNS_DEADLINE, positive_ttl=Constants.DNS_POSITIVE_TTL,
+                 negative_ttl=Constants.DNS_NEGATIVE_TTL, cache_size=Constants.DNS_CACHE_SIZE, max_pending=Constants.DNS_MAX_PENDING, metrics=None):
+        '''
+        Initializes the resolver.
+
+        Args:
+            max_workers (int): Maximum number of lookups running at the same time.
+            deadline (float): Time a lookup may run, and the pool may go without progress, in seconds.
+            positive_ttl (float): Time a resolved hostname stays cached, in seconds.
+            negative_ttl (float): Time a failed lookup stays cached, in seconds.
+            cache_size (int): Maximum number of cached addresses. The least recently used are evicted first.
+            max_pending (int): Maximum number of lookups queued or running. Further addresses wait for room.
+            metrics (MetricsRegistry): Registry the lookups, cache hits and failures are counted in. shared_metrics if None.
+        '''
+        self.deadline = deadline
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.cache_size = cache_size
+        self.max_pending = max_pending
+
+        metrics = metrics or shared_metrics
+        self._lookups = metrics.counter(Constants.METRIC_DNS_LOOKUPS)
+        self._cache_hits = metrics.counter(Constants.METRIC_DNS_CACHE_HITS)
+        self._failures = metrics.counter(Constants.METRIC_DNS_FAILURES)
+
+        self._cache = OrderedDict()    # ip -> (hostname or None, expiry time)
+        self._pending = {}    # ip -> future of a lookup queued or running
+        self._started = {}    # ip -> time its running lookup started
+        self._progress = time.monotonic()    # Time a lookup last started or finished
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dns')
+
+    def resolve(self, ip_addresses, stop=None):
+        '''
+        Resolves the hostnames of the given addresses.
+
+        Args:
+            ip_addresses (iterable): IP addresses as strings.
+            stop (function): Once it returns True, only cached names are returned, and the lookups
+                that have not started are cancelled. A StopSignal also ends the wait for the running
+                ones at once, leaving them unknown.
+
+        Returns:
+            dict: Maps every address to its hostname, or to Constants.UNKNOWN_HOST if the lookup
+                failed or was abandoned.
+        '''
+        hostnames = {}
+        futures = {}    # ip -> future of its lookup, None until there is room for it in the queue
+        # After a stop request, only the names already known are filled in
+        stopped = stop is not None and stop()
+
+        with self._lock:
+            now = time.monotonic()
+            for ip in ip_addresses:
+                cached = self._cache.get(ip)
+                if cached is not None and cached[1] > now:
+                    self._cache.move_to_end(ip)
+                    hostnames[ip] = cached[0] or Constants.UNKNOWN_HOST
+                    self._cache_hits.inc()
+                elif stopped:
+                    hostnames[ip] = Constants.UNKNOWN_HOST
+                elif ip not in futures:
+                    futures[ip] = self._pending.get(ip)
+
+        if futures:
+            # Abandoned lookups keep going and will fill the cache for later scans
+            self._wait(futures, stop)
+
+            if stop is not None and stop():
+                # Lookups queued behind the running ones would only delay the exit of the process
+                with self._lock:
+                    for ip, future in futures.items():
+                        if future is not None and future.cancel():
+                            self._pending.pop(ip, None)
+
+        for ip, future in futures.items():
+            hostname = future.result() if future is not None and future.done() and not future.cancelled() else None
+            hostnames[ip] = hostname or Constants.UNKNOWN_HOST
+            if hostname is None:
+                self._failures.inc()
+
+        return hostnames
+
+    def resolve_hosts(self, host_list, stop=None):
+        '''
+        Fills in the host name of every host dictionary in host_list (see resolve for stop).
+
+        Returns:
+            list: host_list, updated in place.
+        '''
+        hostnames = self.resolve((host_info[Constants.TABLE_COLOUM_IP] for host_info in host_list), stop)
+        for host_info in host_list:
+            host_info[Constants.TABLE_COLOUM_HOST] = hostnames[host_info[Constants.TABLE_COLOUM_IP]]
+        return host_list
+
+    def clear(self):
+        '''Empties the cache.'''
+        with self._lock:
+            self._cache.clear()
+
+    def _wait(self, futures, stop):
+        '''
+        Submits the lookups of futures that are None as the queue has room for them, and waits until
+        every lookup has finished or is abandoned, or stop returns True.
+        '''
+        unfinished = len(futures)
+        waiting = [ip for ip, future in futures.items() if future is None]
+        # Set once every lookup has finished, and whenever one finishes while others wait for room in the queue
+        changed = threading.Event()
+        done_lock = threading.Lock()
+
+        def lookup_done(future):
+            nonlocal unfinished
+            with done_lock:
+                unfinished -= 1
+                if waiting or not unfinished:
+                    changed.set()
+
+        for future in futures.values():
+            if future is not None:
+                future.add_done_callback(lookup_done)
+        waited_since = time.monotonic()
+        unregister = on_stop(stop, changed.set)
+        try:
+            while not (stop is not None and stop()):
+                changed.clear()
+                with self._lock:
+                    while waiting and len(self._pending) < self.max_pending:
+                        ip = waiting.pop()
+                        future = futures[ip] = self._pending.get(ip) or self._submit(ip)
+                        future.add_done_callback(lookup_done)
+                    now = time.monotonic()
+                    if now - max(self._progress, waited_since) >= self.deadline:
+                        break    # Every worker is stuck: the queued lookups would not start in time
+                    # A lookup is abandoned once it has run for the deadline
+                    if not waiting and all(future.done() or now - self._started.get(ip, now) >= self.deadline for ip, future in futures.items()):
+                        break
+                changed.wait(Constants.DNS_POLL_INTERVAL)
+        finally:
+            unregister()
+
+    def _submit(self, ip):
+        '''Starts a lookup on the thread pool. Must be called with the lock held.'''
+        future = self._executor.submit(self._lookup, ip)
+        self._lookups.inc()
+        self._pending[ip] = future
+        return future
+
+    def _lookup(self, ip):
+        '''Runs on the thread pool: resolves ip and caches the answer.'''
+        with self._lock:
+            self._started[ip] = self._progress = time.monotonic()
+        try:
+            hostname = socket.gethostbyaddr(ip)[0]
+        except OSError:
+            hostname = None    # No PTR record, or the resolver failed
+
+        ttl = self.positive_ttl if hostname else self.negative_ttl
+        with self._lock:
+            self._pending.pop(ip, None)
+            del self._started[ip]
+            self._progress = time.monotonic()
+            self._cache[ip] = (hostname, time.monotonic() + ttl)
+            self._cache.move_to_end(ip)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return hostname
+
+# Resolver shared by all scans, so that its cache survives from one scan to the next
+shared_resolver = DnsResolver()
@@ -1,57 +1,85 @@
-#select_format.py
+#Export_Data.py
 from PyQt5.QtWidgets import QFileDialog
-import csv
-import json
+from PyQt5.QtCore import QThread, pyqtSignal
+from .Result_Writers import export_hosts, export_format, columnar_available
+from . import Constants
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ExportThread(QThread):
+    '''
+    Streams a snapshot of the scan results to a file in a background thread, so that large
+    exports do not freeze the GUI. Hosts are written in chunks of Constants.EXPORT_CHUNK_ROWS.
+    '''
+    progress_signal = pyqtSignal(int, int)    # Emit (hosts written, total) after every chunk
+    finished_signal = pyqtSignal(int, str)    # Emit (hosts written, filename) when the export is done
+    error_signal = pyqtSignal(str)            # Emit error messages
+
+    def __init__(self, hosts, total, filename, format, headers):
+        '''
+        Args:
+            hosts (iterable): Host dictionaries to export, e.g. ResultTableModel.hosts().
+            total (int): Number of hosts.
+            filename (str): Path of the file to write.
+            format (str): Export format (see Result_Writers.open_writer).
+            headers (list): Columns to write, in order.
+        '''
+        super(ExportThread, self).__init__()
+        self.hosts = hosts
+        self.total = total
+        self.filename = filename
+        self.format = format
+        self.headers = headers
+
+    def run(self):
+        '''Writes the hosts to the file.'''
+        try:
+            written = export_hosts(self.hosts, self.filename, self.format, headers=self.headers, total=self.total, progress=self.progress_signal.emit)
+        except (OSError, ValueError) as e:
+            logger.error(f'Export to {self.filename} failed: {e}')
+            self.error_signal.emit(str(e))
+            return
+        logger.info(f'Exported {written} hosts to {self.filename}.')
+        self.finished_signal.emit(written, self.filename)
 
 class ExportData:
     '''Handles data export functionality for the application.'''
 
-    def __init__(self):
-        '''Initializes the ExportData class.'''
-        pass   # No initialization needed for now
+    def __init__(self, gui_manager=None):
+        '''Initializes the ExportData class with the GUI manager that reports the progress of exports.'''
+        self.gui_manager = gui_manager
+        self.export_thread = None
 
-    def trigger_export(self, table_widget):
+    def trigger_export(self, result_model):
         '''Initiates the export process by asking the user to select a file format.'''
-        self.select_format(table_widget)
+        self.select_format(result_model)
 
-    def select_format(self, table_widget):
-        '''Displays a dialog for the user to select the export file format and filename.'''
+    def select_format(self, result_model):
+        '''Displays a dialog for the user to select the export file format and filename, then starts the export.'''
+        if self.export_thread is not None and self.export_thread.isRunning():
+            return    # One export at a time
+
+        filters = [name for name, format in Constants.EXPORT_FILTERS.items() if format not in ('parquet', 'arrow') or columnar_available()]
         # Opens a file dialog to choose the format and filename for the export
-        filename, filetype = QFileDialog.getSaveFileName(None, 'Export Data', '', 'CSV Files (*.csv);;JSON Files (*.json)')
-        
+        filename, filetype = QFileDialog.getSaveFileName(None, Constants.EXPORT_DIALOG_TITLE, '', ';;'.join(filters))
+
         if filename:    # If a filename was selected
-            if filetype == 'CSV Files (*.csv)':
-                self.export_to_csv(table_widget, filename)    # Export to CSV
-                
-            elif filetype == 'JSON Files (*.json)':
-                self.export_to_json(table_widget, filename)    # Export to JSON
-
-    def export_to_csv(self, table_widget, filename):
-        '''Exports the data in the table widget to a CSV file.'''
-        with open(filename, mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            # Write the headers
-            headers = [table_widget.horizontalHeaderItem(i).text() for i in range(table_widget.columnCount())]
-            writer.writerow(headers)
-
-            # Write the row data
-            for row in range(table_widget.rowCount()):
-                row_data = [table_widget.item(row, col).text() if table_widget.item(row, col) else '' for col in range(table_widget.columnCount())]
-                writer.writerow(row_data)
-
-    def export_to_json(self, table_widget, filename):
-        '''Exports the data in the table widget to a JSON file.'''
-        data = []    # List to hold all rows' data
-        headers = [table_widget.horizontalHeaderItem(i).text() for i in range(table_widget.columnCount())]
-
-        # Iterate over each row to construct a dict of cell data
-        for row in range(table_widget.rowCount()):
-            row_data = {}
-            for col in range(table_widget.columnCount()):
-                item = table_widget.item(row, col)
-                row_data[headers[col]] = item.text() if item else ''
-            data.append(row_data)
-        
-        # Write the JSON data to file
-        with open(filename, 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=4)
+            format = Constants.EXPORT_FILTERS.get(filetype, 'csv')
+            try:
+                format = export_format(filename)    # An extension typed by the user wins over the selected filter
+            except ValueError:
+                filename += '.' + format    # Add the extension of the selected filter
+            self.start_export(result_model, filename, format)
+
+    def start_export(self, result_model, filename, format):
+        '''Starts exporting the rows of result_model to filename in a background thread.'''
+        # Rows appended by a running scan after this point are not exported
+        total = result_model.rowCount()
+        self.export_thread = ExportThread(result_model.hosts(), total, filename, format, result_model.headers)
+        if self.gui_manager is not None:
+            self.export_thread.progress_signal.connect(self.gui_manager.on_export_progress)
+            self.export_thread.finished_signal.connect(self.gui_manager.on_export_completed)
+            self.export_thread.error_signal.connect(self.gui_manager.on_export_failed)
+            self.gui_manager.on_export_progress(0, total)
+        self.export_thread.start()
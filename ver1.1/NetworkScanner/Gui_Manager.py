@@ -1,27 +1,45 @@
 # Gui_Manager.py
-from PyQt5.QtWidgets import QTableWidgetItem
 from . import Constants
+from .Scan_Metrics import shared_metrics
 import logging
 
+logger = logging.getLogger(__name__)
+
 class GuiManager:
     '''Manages the GUI components and interactions for the network scanner application.'''
 
     def __init__(self, init_gui):
         '''Initializes the GUI manager with a reference to the main GUI class.'''
         self.init_gui = init_gui
+        self.gui_update_duration = shared_metrics.histogram(Constants.METRIC_PHASE_DURATION, phase='gui_update')
 
     def UpdateUI(self):
         '''Updates the UI elements based on the selected scan type.'''
         self.init_gui.hide_all_optinoal_inputs()
-        if self.init_gui.scan_type_combo.currentText() == Constants.SCAN_TYPE_PING:
+        if self.init_gui.scan_type_combo.currentText() == Constants.SCAN_TYPE_ARP:
+            self.show_ARPscan_inputs()
+        elif self.init_gui.scan_type_combo.currentText() == Constants.SCAN_TYPE_PING:
             self.show_PINGsweep_inputs()
+        elif self.init_gui.scan_type_combo.currentText() == Constants.SCAN_TYPE_PING_FAST:
+            self.show_fast_PINGsweep_inputs()
         elif self.init_gui.scan_type_combo.currentText() == Constants.SCAN_TYPE_PORT:
             self.show_PORTscan_inputs()
+        elif self.init_gui.scan_type_combo.currentText() == Constants.SCAN_TYPE_CONNECT:
+            self.show_CONNECTscan_inputs()
+
+    def show_ARPscan_inputs(self):
+        '''Displays input fields relevant to ARP scans.'''
+        self.init_gui.timing_label.show()
+        self.init_gui.timing_combo.show()
+        self.init_gui.rate_label.show()
+        self.init_gui.rate_input.show()
 
     def show_PINGsweep_inputs(self):
         '''Displays input fields relevant to ping sweep scans.'''
         self.init_gui.timeout_label.show()
         self.init_gui.timeout_input.show()
+        self.init_gui.timing_label.show()
+        self.init_gui.timing_combo.show()
         self.init_gui.ttl_label.show()
         self.init_gui.ttl_input.show()
         self.init_gui.interval_label.show()
@@ -29,12 +47,42 @@ class GuiManager:
         self.init_gui.packet_size_label.show()
         self.init_gui.packet_size_input.show()
 
+    def show_fast_PINGsweep_inputs(self):
+        '''Displays input fields relevant to fast ping sweeps, which are paced by rate instead of interval.'''
+        self.init_gui.timeout_label.show()
+        self.init_gui.timeout_input.show()
+        self.init_gui.timing_label.show()
+        self.init_gui.timing_combo.show()
+        self.init_gui.ttl_label.show()
+        self.init_gui.ttl_input.show()
+        self.init_gui.packet_size_label.show()
+        self.init_gui.packet_size_input.show()
+        self.init_gui.rate_label.show()
+        self.init_gui.rate_input.show()
+
     def show_PORTscan_inputs(self):
         '''Displays input fields relevant to port scans.'''
+        self.init_gui.timing_label.show()
+        self.init_gui.timing_combo.show()
         self.init_gui.start_port_label.show()
         self.init_gui.start_port_input.show()
         self.init_gui.end_port_label.show()
         self.init_gui.end_port_input.show()
+        self.init_gui.ports_label.show()
+        self.init_gui.ports_input.show()
+        self.init_gui.services_checkbox.show()
+        self.init_gui.rate_label.show()
+        self.init_gui.rate_input.show()
+
+    def show_CONNECTscan_inputs(self):
+        '''Displays input fields relevant to connect scans.'''
+        self.init_gui.start_port_label.show()
+        self.init_gui.start_port_input.show()
+        self.init_gui.end_port_label.show()
+        self.init_gui.end_port_input.show()
+        self.init_gui.ports_label.show()
+        self.init_gui.ports_input.show()
+        self.init_gui.services_checkbox.show()
 
     def collect_inputs(self):
         '''Collects and returns inputs from the GUI.'''
@@ -49,6 +97,10 @@ class GuiManager:
             Constants.KEY_PACKET_SIZE: self.init_gui.packet_size_input.text(),
             Constants.KEY_START_PORT: self.init_gui.start_port_input.text(),
             Constants.KEY_END_PORT: self.init_gui.end_port_input.text(),
+            Constants.KEY_PORTS: self.init_gui.ports_input.text(),
+            Constants.KEY_RATE: self.init_gui.rate_input.text(),
+            Constants.KEY_INCLUDE: self.init_gui.include_input.text(),
+            Constants.KEY_EXCLUDE: self.init_gui.exclude_input.text(),
         }
         return inputs
 
@@ -63,17 +115,37 @@ class GuiManager:
         self.update_status_label(Constants.SCAN_IN_PROGRESS)
         self.init_gui.scan_button.setEnabled(False)
         self.init_gui.abort_button.setEnabled(True)
+        self.init_gui.metrics_timer.start()
 
     def update_result_table(self, scan_results):
-        '''Updates the result table with scan results.'''
-        for device_info in scan_results:
-            row_position = self.init_gui.result_table.rowCount()
-            self.init_gui.result_table.insertRow(row_position)
-            self.init_gui.result_table.setItem(row_position, 0, QTableWidgetItem(device_info.get(Constants.TABLE_COLOUM_IP)))
-            self.init_gui.result_table.setItem(row_position, 1, QTableWidgetItem(device_info.get(Constants.TABLE_COLOUM_MAC)))
-            self.init_gui.result_table.setItem(row_position, 2, QTableWidgetItem(device_info.get(Constants.TABLE_COLOUM_HOST)))
-            open_ports = ', '.join(map(str, device_info.get(Constants.TABLE_COLOUM_PORT, [])))
-            self.init_gui.result_table.setItem(row_position, 3, QTableWidgetItem(open_ports))
+        '''Appends a batch of scan results to the result table with one bulk model insert.'''
+        with self.gui_update_duration.time():
+            self.init_gui.result_model.append_hosts(scan_results)
+
+    def update_metrics_label(self):
+        '''Shows a summary of the metrics of the running scan (see Scan_Metrics) below the status label.'''
+        self.init_gui.metrics_label.setText(Constants.METRICS_STATUS.format(
+            sent=shared_metrics.total(Constants.METRIC_PROBES_SENT),
+            replies=shared_metrics.total(Constants.METRIC_REPLIES),
+            duplicates=shared_metrics.total(Constants.METRIC_DUPLICATES),
+            retries=shared_metrics.total(Constants.METRIC_RETRIES),
+            timeouts=shared_metrics.total(Constants.METRIC_TIMEOUTS),
+            rtt_p50=shared_metrics.quantile(Constants.METRIC_RTT, 0.5) * 1000,
+            rtt_p99=shared_metrics.quantile(Constants.METRIC_RTT, 0.99) * 1000,
+            dns_lookups=shared_metrics.total(Constants.METRIC_DNS_LOOKUPS),
+            dns_cache_hits=shared_metrics.total(Constants.METRIC_DNS_CACHE_HITS),
+            hosts=shared_metrics.total(Constants.METRIC_RESULT_HOSTS),
+            batches=shared_metrics.total(Constants.METRIC_RESULT_BATCHES)))
+
+    def stop_metrics_updates(self):
+        '''Stops refreshing the metrics at the end of a scan, and shows their final values.'''
+        self.init_gui.metrics_timer.stop()
+        self.update_metrics_label()
+
+    def on_scan_aborting(self):
+        '''Handles actions when an abort has been requested, until the scan thread has finished.'''
+        self.update_status_label(Constants.SCAN_ABORTING)
+        self.init_gui.abort_button.setEnabled(False)
 
     def on_scan_aborted(self):
         '''Handles actions when a scan is aborted.'''
@@ -82,13 +154,13 @@ class GuiManager:
         self.init_gui.scan_button.setEnabled(True)
         self.init_gui.abort_button.setEnabled(False)
 
-    def on_scan_completed(self):
-        '''Handles actions when a scan is completed.'''
+    def on_scan_completed(self, delta_summary=None):
+        '''Handles actions when a scan is completed. A delta scan reports the number of added, removed and changed hosts.'''
         self.init_gui.status_label.setStyleSheet('QLabel { color : green; }')
-        self.update_status_label(Constants.SCAN_COMPLETED)
+        self.update_status_label(Constants.SCAN_COMPLETED_DELTA.format(**delta_summary) if delta_summary else Constants.SCAN_COMPLETED)
         self.init_gui.scan_button.setEnabled(True)
         self.init_gui.abort_button.setEnabled(False)
-        logging.info('Scan completed successfully.')
+        logger.info('Scan completed successfully.')
 
     def handle_error(self, error_message):
         '''Displays an error message in the status label.'''
@@ -97,7 +169,26 @@ class GuiManager:
         self.init_gui.scan_button.setEnabled(True)
         self.init_gui.abort_button.setEnabled(False)
     
+    def on_export_progress(self, written, total):
+        '''Shows the progress of a running export in the status label.'''
+        self.init_gui.export_button.setEnabled(False)
+        self.init_gui.status_label.setStyleSheet('QLabel { color : black; }')
+        self.update_status_label(Constants.EXPORT_IN_PROGRESS.format(written=written, total=total))
+
+    def on_export_completed(self, written, filename):
+        '''Handles actions when an export is completed.'''
+        self.init_gui.export_button.setEnabled(True)
+        self.init_gui.status_label.setStyleSheet('QLabel { color : green; }')
+        self.update_status_label(Constants.EXPORT_COMPLETED.format(written=written, filename=filename))
+
+    def on_export_failed(self, error_message):
+        '''Displays an export error in the status label.'''
+        self.init_gui.export_button.setEnabled(True)
+        self.init_gui.status_label.setStyleSheet('QLabel { color : red; }')
+        self.update_status_label(error_message)
+
     def reset_scan_result(self):
         '''Resets the scan result table and clears the status label.'''
-        self.init_gui.result_table.setRowCount(0)
-        self.init_gui.status_label.clear()
\ No newline at end of file
+        self.init_gui.result_model.clear()
+        self.init_gui.status_label.clear()
+        self.init_gui.metrics_label.clear()
\ No newline at end of file
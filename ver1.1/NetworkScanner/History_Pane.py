@@ -0,0 +1,103 @@
+#History_Pane.py
+from PyQt5.QtWidgets import QWidget, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QVBoxLayout, QHBoxLayout
+from array import array
+import sqlite3
+import time
+from .Result_Model import ResultTableModel
+from .Scan_History import ScanHistory
+from . import Constants
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HistoryTableModel(ResultTableModel):
+    '''Result table model with a column for the time each host was last seen.'''
+    HEADERS = ResultTableModel.HEADERS + [Constants.TABLE_COLOUM_LAST_SEEN]
+
+    def _reset_columns(self):
+        super()._reset_columns()
+        self._last_seen = array('d')
+
+    def append_hosts(self, host_list):
+        self._last_seen.extend(host_info.get(Constants.TABLE_COLOUM_LAST_SEEN, 0.0) for host_info in host_list)
+        super().append_hosts(host_list)
+
+    def cell_text(self, row, column):
+        if column == len(ResultTableModel.HEADERS):
+            return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._last_seen[row]))
+        return super().cell_text(row, column)
+
+class HistoryPane(QWidget):
+    '''
+    Window that queries the scan history, e.g. for the hosts that had port 3389 open in the last 30 days.
+
+    Every field is optional; the filled-in fields are combined. The database is opened for each
+    search, so the pane always sees the scans recorded since it was opened.
+    '''
+    def __init__(self, path=Constants.HISTORY_DB_FILE):
+        super().__init__()
+        self.path = path
+        self.setWindowTitle(Constants.HISTORY_WINDOW_TITLE)
+        self.resize(700, 500)
+
+        Vlayout1 = QVBoxLayout()
+        Hlayout1 = QHBoxLayout()
+
+        self.ip_input = self.add_field(Hlayout1, Constants.HISTORY_IP, 120)
+        self.mac_input = self.add_field(Hlayout1, Constants.HISTORY_MAC, 130)
+        self.port_input = self.add_field(Hlayout1, Constants.HISTORY_PORT, 60)
+        self.days_input = self.add_field(Hlayout1, Constants.HISTORY_DAYS, 50)
+
+        self.search_button = QPushButton(Constants.HISTORY_SEARCH_BUTTON)
+        self.search_button.setFixedWidth(80)
+        self.search_button.clicked.connect(self.search)
+        Hlayout1.addWidget(self.search_button)
+        Hlayout1.addStretch()
+        Vlayout1.addLayout(Hlayout1)
+
+        self.status_label = QLabel()
+        Vlayout1.addWidget(self.status_label)
+
+        self.result_model = HistoryTableModel(self)
+        self.result_table = QTableView()
+        self.result_table.setModel(self.result_model)
+        self.result_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.result_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.result_table.verticalHeader().setDefaultSectionSize(20)
+        self.result_table.horizontalHeader().setStretchLastSection(True)
+        Vlayout1.addWidget(self.result_table)
+
+        self.setLayout(Vlayout1)
+
+    def add_field(self, layout, label, width):
+        '''Adds a labelled input field to layout and returns the field.'''
+        field = QLineEdit()
+        field.setFixedWidth(width)
+        layout.addWidget(QLabel(label))
+        layout.addWidget(field)
+        return field
+
+    def search(self):
+        '''Runs the query described by the input fields and shows the matching hosts.'''
+        try:
+            port = int(self.port_input.text()) if self.port_input.text().strip() else None
+            days = float(self.days_input.text()) if self.days_input.text().strip() else None
+            if (port is not None and not 1 <= port <= 65535) or (days is not None and days <= 0):
+                raise ValueError(Constants.HISTORY_INVALID_QUERY)
+
+            history = ScanHistory(self.path)
+            try:
+                host_list = history.query(ip=self.ip_input.text().strip(), mac=self.mac_input.text().strip(), port=port, days=days)
+            finally:
+                history.close()
+        except (ValueError, OSError):
+            self.status_label.setText(Constants.HISTORY_INVALID_QUERY)
+            return
+        except sqlite3.Error as e:
+            logger.warning(f'Scan history query failed: {e}')
+            self.status_label.setText(str(e))
+            return
+
+        self.result_model.clear()
+        self.result_model.append_hosts(host_list)
+        self.status_label.setText(Constants.HISTORY_RESULT_COUNT.format(count=len(host_list)))
@@ -0,0 +1,108 @@
+#Host_Pipeline.py
+import queue
+import threading
+from . import Constants
+from .Logging_Config import event
+from .Stop_Signal import StopSignal
+import logging
+
+logger = logging.getLogger(__name__)
+
+class HostPipeline:
+    '''
+    Producer/consumer pipeline that hands hosts from a discovery stage to the next scan stage
+    as soon as they are found.
+
+    The discovery stage runs on a producer thread and puts every live host into a bounded queue,
+    which the consumer (e.g., PortScanner) iterates lazily. Discovery and probing therefore
+    overlap, and a full queue blocks the producer until the consumer catches up.
+    '''
+    # How often (in seconds) blocked queue operations wake up to check a stop function that is not a StopSignal
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, discover, stop, max_queued=Constants.PIPELINE_QUEUE_SIZE):
+        '''
+        Initializes the pipeline.
+
+        Args:
+            discover (function): Called on the producer thread with a stop function, returns an
+                iterable of host dictionaries (e.g., a ping sweep stream).
+            stop (function): A function that returns True if the scanning process should be stopped.
+            max_queued (int): Maximum number of discovered hosts waiting for the consumer.
+        '''
+        self.discover = discover
+        self.max_queued = max_queued
+
+        self.stop = stop
+
+    def __iter__(self):
+        '''
+        Starts the discovery stage and yields the hosts it finds.
+
+        Yields:
+            dict: Information about a live host, in discovery order.
+
+        Raises:
+            Exception: Any error raised by the discovery stage, once the hosts queued before it are consumed.
+        '''
+        hosts = queue.Queue(maxsize=self.max_queued)
+        # Set when the consumer is done or the scan is stopped; the discovery stage stops with it
+        stopped = StopSignal(parent=self.stop)
+        errors = []
+        done = object()    # Queued by the producer after the last host
+        wakeup = object()    # Queued by a stop request, to wake the consumer up
+
+        def wake_consumer():
+            try:
+                hosts.put_nowait(wakeup)
+            except queue.Full:
+                pass    # The consumer does not wait on a full queue
+
+        def put(item):
+            '''Queues item, waiting for free space. Returns False if the pipeline was stopped meanwhile.'''
+            while not stopped():
+                try:
+                    hosts.put(item, timeout=self.POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            '''Runs on the producer thread: feeds the discovered hosts into the queue.'''
+            discovered = 0
+            try:
+                for host_info in self.discover(stopped):
+                    if not put(host_info):
+                        break
+                    discovered += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                logger.info(f'Host discovery finished: {discovered} hosts handed to the next stage.', extra=event('discovery_finished', hosts=discovered))
+                put(done)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        stopped.add_callback(wake_consumer)
+
+        try:
+            while not stopped():
+                try:
+                    host_info = hosts.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if host_info is done:
+                    break
+                if host_info is not wakeup:
+                    yield host_info
+        finally:
+            stopped.set()
+            # Free the queue, so that a producer waiting for space sees the stop at once
+            while not hosts.empty():
+                hosts.get_nowait()
+            producer.join()
+            stopped.close()
+
+        if errors:
+            raise errors[0]
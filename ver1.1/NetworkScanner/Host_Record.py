@@ -0,0 +1,130 @@
+#Host_Record.py
+from array import array
+import bisect
+import socket
+import sys
+from . import Constants
+
+class HostRecord:
+    '''
+    Compact record of one host, for code that keeps many hosts in memory (e.g., merging the port
+    shards of a scan, or the prior of a delta scan).
+
+    The IPv4 address is packed into an integer, the MAC address into 6 bytes (all zeros if not
+    available), the host name is interned, and the open ports are a sorted array('H') of unique
+    ports. A 65536-bit bitmap would make set operations O(1) words but cost 8 KiB per host, while
+    scanned hosts typically have a handful of open ports, so the sorted array is used; arrays of
+    the same port set are shared between records (see port_array).
+
+    Host dictionaries (keyed by the Constants.TABLE_COLOUM_* names) stay the display and export
+    shape; convert with from_host_info and to_host_info. The ports array of a record is shared
+    between records and must not be modified in place.
+    '''
+    __slots__ = ('ip', 'mac', 'hostname', 'ports')
+
+    NO_MAC = bytes(6)    # All-zero MAC address stands for "not available"
+    NO_PORTS = array('H')    # Shared by every record without open ports
+
+    def __init__(self, ip, mac=NO_MAC, hostname='', ports=NO_PORTS):
+        '''
+        Args:
+            ip (int): IPv4 address as an integer.
+            mac (bytes): MAC address as 6 bytes, NO_MAC if not available.
+            hostname (str): Host name, '' if not resolved.
+            ports (array): Open ports as a sorted array('H') without duplicates (see port_array).
+        '''
+        self.ip = ip
+        self.mac = mac
+        self.hostname = hostname
+        self.ports = ports
+
+    @classmethod
+    def from_host_info(cls, host_info):
+        '''Returns the record of a host dictionary, as produced by the scanners.'''
+        mac = host_info.get(Constants.TABLE_COLOUM_MAC)
+        return cls(int.from_bytes(socket.inet_aton(host_info[Constants.TABLE_COLOUM_IP]), 'big'),
+                   bytes.fromhex(mac.replace(':', '')) if mac else cls.NO_MAC,
+                   sys.intern(host_info.get(Constants.TABLE_COLOUM_HOST) or ''),
+                   port_array(host_info.get(Constants.TABLE_COLOUM_PORT)))
+
+    def to_host_info(self):
+        '''Returns the record as a host dictionary, the shape used for display, export and the history.'''
+        return {
+            Constants.TABLE_COLOUM_IP: self.ip_text(),
+            Constants.TABLE_COLOUM_MAC: self.mac_text(),
+            Constants.TABLE_COLOUM_HOST: self.hostname,
+            Constants.TABLE_COLOUM_PORT: self.ports.tolist()
+        }
+
+    def ip_text(self):
+        '''Returns the IP address as a dotted-quad string.'''
+        return socket.inet_ntoa(self.ip.to_bytes(4, 'big'))
+
+    def mac_text(self):
+        '''Returns the MAC address as a colon-separated string, or '' if it is not available.'''
+        return '' if self.mac == self.NO_MAC else ':'.join(f'{byte:02x}' for byte in self.mac)
+
+    def union(self, other):
+        '''
+        Returns the record of this host with the open ports of other (the same host, e.g. found by
+        another port shard or another scan) added, and its MAC address and host name if this one lacks them.
+        '''
+        return HostRecord(self.ip, self.mac if self.mac != self.NO_MAC else other.mac, self.hostname or other.hostname,
+                          union_ports(self.ports, other.ports))
+
+    def intersection(self, other):
+        '''Returns the record of this host with only the open ports that other has as well.'''
+        if not self.ports or not other.ports:
+            ports = self.NO_PORTS
+        else:
+            ports = port_array(set(self.ports).intersection(other.ports))
+        return HostRecord(self.ip, self.mac, self.hostname, ports)
+
+    def difference(self, other):
+        '''Returns the record of this host with only the open ports that other does not have.'''
+        if not self.ports or not other.ports:
+            return self
+        return HostRecord(self.ip, self.mac, self.hostname, port_array(set(self.ports).difference(other.ports)))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def __contains__(self, port):
+        '''Returns True if port is open (binary search).'''
+        index = bisect.bisect_left(self.ports, port)
+        return index < len(self.ports) and self.ports[index] == port
+
+    def __eq__(self, other):
+        if not isinstance(other, HostRecord):
+            return NotImplemented
+        return (self.ip, self.mac, self.hostname, self.ports) == (other.ip, other.mac, other.hostname, other.ports)
+
+    __hash__ = None    # Mutable
+
+    def __repr__(self):
+        return f'HostRecord({self.ip_text()!r}, mac={self.mac_text()!r}, hostname={self.hostname!r}, ports={self.ports.tolist()})'
+
+# Port sets seen so far -> their shared array. Most hosts of a network have one of a few port sets
+# (e.g., 22, 80 and 443), so these are shared instead of allocating an array for every host.
+_port_arrays = {}
+
+def port_array(ports):
+    '''Returns ports (any iterable of port numbers, or None) as a sorted array('H') without duplicates.'''
+    if not ports:
+        return HostRecord.NO_PORTS
+    key = tuple(sorted(set(ports)))
+    shared = _port_arrays.get(key)
+    if shared is None:
+        shared = array('H', key)
+        if len(_port_arrays) < Constants.HOST_RECORD_SHARED_PORT_SETS:
+            _port_arrays[key] = shared
+    return shared
+
+def union_ports(ports, other):
+    '''Returns the union of two sorted port arrays, reusing one of them when the other adds nothing.'''
+    if not other or ports == other:
+        return ports
+    if not ports:
+        return other
+    return port_array(set(ports).union(other))
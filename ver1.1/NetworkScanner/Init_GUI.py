@@ -1,14 +1,19 @@
 #Init_GUI.py
 # Import PyQt5 modules for building the application's GUI
-from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QComboBox, QVBoxLayout, QLineEdit, QPushButton, QTableWidget, QWidget, QHBoxLayout
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QComboBox, QVBoxLayout, QLineEdit, QPushButton, QTableView, QHeaderView, QWidget, QHBoxLayout, QCheckBox
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 from .Process_Manager import ProcessManager
 from .Gui_Manager import GuiManager
 from .Export_Data import ExportData
+from .Result_Model import ResultTableModel
+from .History_Pane import HistoryPane
+from .Port_Frequency import TCP_PORT_FREQUENCY
 from . import Constants
 import logging
 
+logger = logging.getLogger(__name__)
+
 class InitGUI(QMainWindow):
     '''
     This class initializes the main GUI window of the application,
@@ -16,11 +21,12 @@ class InitGUI(QMainWindow):
     '''
     def __init__(self):
         super().__init__()
-        logging.info('Application initialization started.')
+        logger.info('Application initialization started.')
         # Initialize components responsible for managing GUI, processes, and data export
         self.gui_manager = GuiManager(self)
         self.process_manager = ProcessManager(self, self.gui_manager)
-        self.export_data = ExportData()
+        self.export_data = ExportData(self.gui_manager)
+        self.history_pane = None
         self.InitUI()
 
     def InitUI(self):
@@ -40,7 +46,7 @@ class InitGUI(QMainWindow):
         self.scan_type_label = QLabel(Constants.SCAN_TYPE_ARP)
         self.scan_type_combo = QComboBox()
         self.scan_type_combo.setFixedWidth(150)
-        self.scan_type_combo.addItems([Constants.SCAN_TYPE_ARP, Constants.SCAN_TYPE_PING, Constants.SCAN_TYPE_PORT])
+        self.scan_type_combo.addItems([Constants.SCAN_TYPE_ARP, Constants.SCAN_TYPE_PING, Constants.SCAN_TYPE_PING_FAST, Constants.SCAN_TYPE_PORT, Constants.SCAN_TYPE_CONNECT])
         self.scan_type_combo.currentIndexChanged.connect(self.gui_manager.UpdateUI)
         Vlayout1.addWidget(self.scan_type_label)
         Vlayout1.addWidget(self.scan_type_combo)
@@ -66,6 +72,18 @@ class InitGUI(QMainWindow):
         Vlayout1.addWidget(self.prefix_label)
         Vlayout1.addWidget(self.prefix_input)
 
+        self.include_label = QLabel(Constants.INCLUDE)
+        self.include_input = QLineEdit()
+        self.include_input.setFixedWidth(400)
+        Vlayout1.addWidget(self.include_label)
+        Vlayout1.addWidget(self.include_input)
+
+        self.exclude_label = QLabel(Constants.EXCLUDE)
+        self.exclude_input = QLineEdit()
+        self.exclude_input.setFixedWidth(400)
+        Vlayout1.addWidget(self.exclude_label)
+        Vlayout1.addWidget(self.exclude_input)
+
         ## Ping sweep variables
         self.timeout_label = QLabel(Constants.TIMEOUT)
         self.timeout_input = QLineEdit()
@@ -76,6 +94,14 @@ class InitGUI(QMainWindow):
         Vlayout1.addWidget(self.timeout_label)
         Vlayout1.addWidget(self.timeout_input)
 
+        self.timing_label = QLabel(Constants.TIMING)
+        self.timing_combo = QComboBox()
+        self.timing_combo.addItems(list(Constants.TIMING_TEMPLATES))
+        self.timing_combo.setCurrentText(Constants.DEFAULT_TIMING)
+        self.timing_combo.setFixedWidth(150)
+        Vlayout1.addWidget(self.timing_label)
+        Vlayout1.addWidget(self.timing_combo)
+
         self.ttl_label = QLabel(Constants.TTL)
         self.ttl_input = QLineEdit()
         default_ttl = Constants.DEFAULT_TTL
@@ -117,6 +143,27 @@ class InitGUI(QMainWindow):
         Vlayout1.addWidget(self.end_port_label)
         Vlayout1.addWidget(self.end_port_input)
 
+        self.ports_label = QLabel(Constants.PORTS.format(ranked=len(TCP_PORT_FREQUENCY)))
+        self.ports_input = QLineEdit()
+        self.ports_input.setFixedWidth(400)
+        Vlayout1.addWidget(self.ports_label)
+        Vlayout1.addWidget(self.ports_input)
+
+        self.rate_label = QLabel(Constants.RATE)
+        self.rate_input = QLineEdit()
+        default_rate = Constants.DEFAULT_RATE
+        self.rate_input.setText(default_rate)
+        self.rate_input.setMaxLength(6)
+        self.rate_input.setFixedWidth(150)
+        Vlayout1.addWidget(self.rate_label)
+        Vlayout1.addWidget(self.rate_input)
+
+        self.delta_checkbox = QCheckBox(Constants.DELTA)
+        Vlayout1.addWidget(self.delta_checkbox)
+
+        self.services_checkbox = QCheckBox(Constants.DETECT_SERVICES)
+        Vlayout1.addWidget(self.services_checkbox)
+
         ##Start scan/Abort scan button
         ###Start scan button
         self.scan_button = QPushButton(Constants.START_SCAN_BUTTON)
@@ -143,32 +190,57 @@ class InitGUI(QMainWindow):
         font.setPointSize(14)
         self.status_label.setFont(font)
 
+        ##metrics label, refreshed while a scan runs
+        self.metrics_label = QLabel()
+        self.metrics_label.setAlignment(Qt.AlignLeft)
+        self.metrics_label.setWordWrap(True)
+        Vlayout1.addWidget(self.metrics_label)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(Constants.METRICS_REFRESH_INTERVAL)
+        self.metrics_timer.timeout.connect(self.gui_manager.update_metrics_label)
+
         ##result table
         container_widget = QWidget()
         container_widget.setLayout(Vlayout1)
         self.setCentralWidget(container_widget)
         self.setFixedWidth(570)
 
-        self.result_table = QTableWidget()
+        self.result_model = ResultTableModel(self)
+        self.result_table = QTableView()
+        self.result_table.setModel(self.result_model)
         Vlayout1.addWidget(self.result_table)
-        self.result_table.setColumnCount(4)
-        self.result_table.setHorizontalHeaderLabels([Constants.TABLE_COLOUM_IP , Constants.TABLE_COLOUM_MAC, Constants.TABLE_COLOUM_HOST, Constants.TABLE_COLOUM_PORT])
         self.result_table.setColumnWidth(0, 100)
         self.result_table.setColumnWidth(1, 100)
         self.result_table.setColumnWidth(2, 150)
         self.result_table.setColumnWidth(3, 200)
-        self.result_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.result_table.setColumnWidth(4, 300)
+        self.result_table.setEditTriggers(QTableView.NoEditTriggers)
+        # Fixed row heights keep scrolling cheap with hundreds of thousands of rows
+        self.result_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.result_table.verticalHeader().setDefaultSectionSize(20)
 
-        ##export button
+        ##history and export buttons
+        self.history_button = QPushButton(Constants.HISTORY_BUTTON, self)
+        self.history_button.setFixedWidth(120)
+        self.history_button.clicked.connect(self.show_history)
         self.export_button = QPushButton(Constants.EXPORT_DATA_BUTTON, self)
         self.export_button.setFixedWidth(120)
-        self.export_button.clicked.connect(lambda: self.export_data.trigger_export(self.result_table))
+        self.export_button.clicked.connect(lambda: self.export_data.trigger_export(self.result_model))
         Hlayout2.addStretch(1)
+        Hlayout2.addWidget(self.history_button)
         Hlayout2.addWidget(self.export_button)
         Vlayout1.addLayout(Hlayout2)
 
         #Hide all the optional inputs
         self.hide_all_optinoal_inputs()
+        self.gui_manager.UpdateUI()
+
+    def show_history(self):
+        '''Opens the scan history pane, or brings it to the front if it is already open.'''
+        if self.history_pane is None:
+            self.history_pane = HistoryPane()
+        self.history_pane.show()
+        self.history_pane.raise_()
 
     def hide_all_optinoal_inputs(self):
         '''
@@ -177,6 +249,8 @@ class InitGUI(QMainWindow):
         '''
         self.timeout_label.hide()
         self.timeout_input.hide()
+        self.timing_label.hide()
+        self.timing_combo.hide()
         self.ttl_label.hide()
         self.ttl_input.hide()
         self.interval_label.hide()
@@ -186,4 +260,9 @@ class InitGUI(QMainWindow):
         self.start_port_label.hide()
         self.start_port_input.hide()
         self.end_port_label.hide()
-        self.end_port_input.hide()
\ No newline at end of file
+        self.end_port_input.hide()
+        self.ports_label.hide()
+        self.ports_input.hide()
+        self.rate_label.hide()
+        self.rate_input.hide()
+        self.services_checkbox.hide()
\ No newline at end of file
@@ -0,0 +1,186 @@
+#Interval_Set.py
+import bisect
+import socket
+from . import Constants
+
+class IntervalSet:
+    '''
+    Set of IPv4 addresses stored as sorted, merged, inclusive (first, last) integer intervals.
+
+    Include and exclude lists of any size are compiled into one of these once, before the scan.
+    Membership is a binary search over the interval starts (O(log n)), and the complement or the
+    difference of two sets is a single linear sweep, so the excluded addresses are cut out of the
+    target range up front instead of being checked per probe.
+    '''
+    def __init__(self, intervals=()):
+        '''
+        Initializes the set.
+
+        Args:
+            intervals (iterable): (first, last) pairs of integer addresses, inclusive, in any order.
+                Overlapping and adjacent intervals are merged.
+        '''
+        self._firsts = []
+        self._lasts = []
+        for first, last in sorted(intervals):
+            if self._lasts and first <= self._lasts[-1] + 1:
+                self._lasts[-1] = max(self._lasts[-1], last)
+            else:
+                self._firsts.append(first)
+                self._lasts.append(last)
+        self._size = sum(last - first + 1 for first, last in zip(self._firsts, self._lasts))
+
+    @classmethod
+    def from_spec(cls, spec):
+        '''
+        Compiles a target specification into a set.
+
+        Args:
+            spec (str): Entries separated by commas, spaces or new lines. An entry is an address
+                (192.168.1.1), a block in CIDR notation (10.0.0.0/24), a range (10.0.0.1-10.0.0.50, or
+                10.0.0.1-50 for the last octet) or @path to a file of entries, one or more per line,
+                where # starts a comment.
+
+        Returns:
+            IntervalSet: The addresses covered by the entries.
+
+        Raises:
+            ValueError: If an entry is not valid or a file cannot be read.
+        '''
+        return cls(parse_spec(spec))
+
+    def intervals(self):
+        '''Returns the merged (first, last) integer intervals in ascending order.'''
+        return list(zip(self._firsts, self._lasts))
+
+    def union(self, other):
+        '''Returns the addresses that are in this set or in other.'''
+        return IntervalSet(self.intervals() + other.intervals())
+
+    def difference(self, other):
+        '''Returns the addresses of this set that are not in other, in one sweep over both sets.'''
+        return IntervalSet(self._intersect(self.intervals(), other.gaps()))
+
+    def gaps(self, first=0, last=0xFFFFFFFF):
+        '''
+        Yields the complement of the set between first and last, inclusive, as (first, last) intervals.
+
+        The gaps are computed from the neighbouring intervals as they are visited, so iterating the
+        complement of a set of 100k intervals costs one pass and no extra memory.
+        '''
+        start = bisect.bisect_left(self._lasts, first)
+        for interval_first, interval_last in zip(self._firsts[start:], self._lasts[start:]):
+            if interval_first > last:
+                break
+            if interval_first > first:
+                yield first, interval_first - 1
+            first = interval_last + 1
+        if first <= last:
+            yield first, last
+
+    def complement(self, first=0, last=0xFFFFFFFF):
+        '''Returns the addresses between first and last that are not in the set.'''
+        return IntervalSet(self.gaps(first, last))
+
+    def __contains__(self, ip):
+        '''Returns True if ip (a dotted-quad string or an integer) is in the set, in O(log n).'''
+        try:
+            value = ip if isinstance(ip, int) else ip_to_int(ip)
+        except OSError:
+            return False
+        index = bisect.bisect_right(self._firsts, value) - 1
+        return index >= 0 and value <= self._lasts[index]
+
+    def __len__(self):
+        '''Returns the number of addresses in the set.'''
+        return self._size
+
+    def __iter__(self):
+        '''Yields the (first, last) intervals in ascending order.'''
+        return zip(self._firsts, self._lasts)
+
+    def __repr__(self):
+        return f'IntervalSet({len(self._firsts)} intervals, {self._size} addresses)'
+
+    @staticmethod
+    def _intersect(intervals, others):
+        '''Yields the intersection of two ascending, merged interval sequences.'''
+        others = iter(others)
+        other = next(others, None)
+        for first, last in intervals:
+            while other is not None and other[1] < first:
+                other = next(others, None)
+            while other is not None and other[0] <= last:
+                yield max(first, other[0]), min(last, other[1])
+                if other[1] > last:
+                    break
+                other = next(others, None)
+
+def parse_spec(spec):
+    '''
+    Yields the (first, last) integer intervals of the entries of a target specification.
+
+    Args:
+        spec (str): See IntervalSet.from_spec.
+
+    Raises:
+        ValueError: If an entry is not valid or a file cannot be read.
+    '''
+    for entry in spec.replace(',', ' ').split():
+        if entry.startswith('@'):
+            yield from parse_spec_file(entry[1:])
+        else:
+            yield parse_entry(entry)
+
+def parse_spec_file(path):
+    '''Yields the intervals of the entries in a file, one or more per line, # starting a comment.'''
+    try:
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                entries = line.split('#', 1)[0].replace(',', ' ').split()
+                for entry in entries:
+                    yield parse_entry(entry)
+    except OSError as e:
+        raise ValueError(f'{Constants.MSG_INVALID_TARGET_FILE} ({path}: {e.strerror})')
+
+def parse_entry(entry):
+    '''Returns the (first, last) integer interval of one address, CIDR block or range entry.'''
+    try:
+        if '/' in entry:
+            address, prefix = entry.split('/', 1)
+            prefix = int(prefix)
+            if not 0 <= prefix <= 32:
+                raise ValueError(entry)
+            mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+            first = ip_to_int(address) & mask
+            return first, first | (~mask & 0xFFFFFFFF)
+        if '-' in entry:
+            first, last = entry.split('-', 1)
+            if '.' not in last:    # Short form of a range of the last octet, e.g., 10.0.0.1-50
+                last = first.rsplit('.', 1)[0] + '.' + last
+            first, last = ip_to_int(first), ip_to_int(last)
+            if first > last:
+                raise ValueError(entry)
+            return first, last
+        value = ip_to_int(entry)
+        return value, value
+    except (OSError, ValueError):
+        raise ValueError(f'{Constants.MSG_INVALID_TARGET_SPEC} ({entry})')
+
+def ip_to_int(ip):
+    '''
+    Returns a dotted-quad IPv4 address of four plain decimal octets as an integer.
+
+    Raises:
+        OSError: If ip is not one. inet_aton also accepts shorthands ('10.1'), octal ('10.0.0.010'
+            is 10.0.0.8) and hex ('0x10.0.0.1'), so only addresses that read back the same are accepted.
+    '''
+    ip = str(ip)
+    packed = socket.inet_aton(ip)
+    if socket.inet_ntoa(packed) != ip:
+        raise OSError(f'Not a dotted-quad IPv4 address: {ip}')
+    return int.from_bytes(packed, 'big')
+
+def int_to_ip(value):
+    '''Returns an integer IPv4 address in dotted-quad notation.'''
+    return socket.inet_ntoa(value.to_bytes(4, 'big'))
@@ -1,37 +1,157 @@
 # Logging_Config.py
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
 from . import Constants
 
-def setup_logging():
+# Listener of the running logging pipeline, stopped (and its queue flushed) at exit
+_listener = None
+
+def setup_logging(levels=None, json_format=False, console_level=logging.DEBUG, log_file=Constants.LOG_FILE_NAME):
     '''
     Sets up logging for the application.
 
-    - Creates a log file that rotates when it reaches 5MB, keeping up to 5 old versions.
-    - Logs are written to both the file and console.
-    - Logs include time, log level, and message.
+    - Log calls only put their records on a queue; a listener thread formats them and writes them
+      out, so the scan threads never wait for file I/O, rotation checks or formatting.
+    - Logs are written to a file that rotates when it reaches 5MB, keeping up to 5 old versions, and to the console.
+    - Logs include time, log level, logger and message, and the fields of structured events (see event).
+    - Every logger has its own level (Constants.LOG_LEVELS), so e.g. Scapy only reports warnings.
+
+    Args:
+        levels (dict): Levels by logger name (e.g., {'NetworkScanner.Packet_Engine': 'INFO'}) that
+            override Constants.LOG_LEVELS.
+        json_format (bool): Writes the log file as one JSON object per line instead of text.
+        console_level (int): Level of the messages also written to the console.
+        log_file (str): Path of the log file.
+
+    Returns:
+        QueueListener: The listener thread of the pipeline.
+
+    Raises:
+        ValueError: If a level is unknown.
     '''
-    # Log format: time - log level - message
-    log_format = '%(asctime)s - %(levelname)s - %(message)s'
-    # Log file path from Constants
-    log_file = Constants.LOG_FILE_NAME
+    global _listener
+    from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-    # Rotating file handler: 5MB per file, keeping 5 backups
-    handler = RotatingFileHandler(log_file, maxBytes=5*1024*1024, backupCount=5)
-    handler.setLevel(logging.DEBUG)    # Capture all logs at DEBUG level and above
+    class LocalQueueHandler(QueueHandler):
+        '''QueueHandler for a listener in the same process: records are queued as they are, and formatted by the listener.'''
+        def prepare(self, record):
+            return record
 
-    # Formatter for the log messages
-    formatter = logging.Formatter(log_format)
-    handler.setFormatter(formatter)
+    levels = dict(Constants.LOG_LEVELS, **(levels or {}))
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level.upper() if isinstance(level, str) else level)
 
-    # Root logger setup
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(handler)
+    text_formatter = EventFormatter(Constants.LOG_FORMAT)
+
+    # Rotating file handler: 5MB per file, keeping 5 backups
+    file_handler = RotatingFileHandler(log_file, maxBytes=Constants.LOG_FILE_MAX_BYTES, backupCount=Constants.LOG_FILE_BACKUPS)
+    file_handler.setFormatter(JsonFormatter() if json_format else text_formatter)
 
     # Console handler: logs to the console
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
-    console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(text_formatter)
+
+    if _listener is not None:
+        _listener.stop()
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+    # Root logger setup: its only handler puts the records on the queue
+    root_logger = logging.getLogger()
+    for handler in [handler for handler in root_logger.handlers if isinstance(handler, QueueHandler)]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(LocalQueueHandler(records))
+    return _listener
+
+@atexit.register
+def stop_logging():
+    '''Stops the listener thread once it has written every queued record.'''
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def event(name, **fields):
+    '''
+    Returns the extra argument of a log call that makes it a structured event, e.g.
+    logger.info('ARP scan completed.', extra=event('scan_completed', engine='arp', hosts=12)).
+    The text log appends the fields as key=value pairs, the JSON log writes them as they are.
+    '''
+    return {'event': name, 'fields': fields}
+
+class EventFormatter(logging.Formatter):
+    '''Text formatter that appends the name and the fields of structured events to the message.'''
+    def format(self, record):
+        text = super().format(record)
+        name = getattr(record, 'event', None)
+        if name is None:
+            return text
+        fields = ' '.join(f'{key}={value}' for key, value in getattr(record, 'fields', {}).items())
+        return f'{text} [{name}{" " + fields if fields else ""}]'
+
+class JsonFormatter(logging.Formatter):
+    '''Formatter that writes every record as one JSON object, with the fields of structured events.'''
+    def format(self, record):
+        document = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        name = getattr(record, 'event', None)
+        if name is not None:
+            document['event'] = name
+            document.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            document['exception'] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str)
+
+class RateLimitedLog:
+    '''
+    Logs the messages of one call site in a hot loop (e.g., a failing send) at most
+    Constants.LOG_RATE_BURST times per Constants.LOG_RATE_INTERVAL seconds. The messages dropped
+    in between are counted, and their number is appended to the next message that gets through.
+
+    The level of the logger is checked first, so a disabled call costs one method call, and the
+    message is only formatted (with %-style args) if it is logged.
+    '''
+    def __init__(self, logger, level=logging.DEBUG, burst=Constants.LOG_RATE_BURST, interval=Constants.LOG_RATE_INTERVAL):
+        '''
+        Args:
+            logger (Logger): The logger the messages are written to.
+            level (int): Level of the messages.
+            burst (int): Number of messages let through per interval.
+            interval (float): Length of an interval, in seconds.
+        '''
+        self.logger = logger
+        self.level = level
+        self.burst = burst
+        self.interval = interval
+        self._window_start = 0.0
+        self._logged = 0
+        self._suppressed = 0
+        self._lock = threading.Lock()
 
+    def log(self, message, *args):
+        '''Logs message % args, unless the call site is over its rate.'''
+        if not self.logger.isEnabledFor(self.level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= self.interval:
+                self._window_start = now
+                self._logged = 0
+            if self._logged >= self.burst:
+                self._suppressed += 1
+                return
+            self._logged += 1
+            suppressed, self._suppressed = self._suppressed, 0
+        if suppressed:
+            message = f'{message} ({suppressed} similar messages suppressed)'
+        self.logger.log(self.level, message, *args)
@@ -0,0 +1,368 @@
+#Packet_Engine.py
+import hashlib
+import os
+import queue
+import select
+import socket
+import threading
+import time
+import logging
+from .Logging_Config import RateLimitedLog
+from .Stop_Signal import on_stop, wait_for_stop, wakeup_sockets
+
+logger = logging.getLogger(__name__)
+# A failing send usually fails for every probe that follows (e.g., no route), so it is logged at a bounded rate
+send_failure_log = RateLimitedLog(logger)
+
+class PacketEngine:
+    '''
+    Packet engine that sends a stream of probes at a controlled rate and collects the replies
+    asynchronously over one shared receive window.
+
+    A scan of N targets therefore costs roughly (N / rate) + timeout seconds instead of N * timeout.
+
+    With a ProbeScheduler, every probe has a timeout of its own instead of the shared window: the
+    sender sends the probes that timed out again before any new one, also while the probe iterator
+    waits for work, and the stream ends once every probe has been answered or given up.
+
+    With a StopSignal as stop, a stop request wakes up the result loop, the receiver (blocked in
+    select) and the sender (in its pacing delay) at once, so the stream ends within milliseconds.
+    '''
+    # How often (in seconds) the receiver and the result loop wake up to check a stop function that is not a StopSignal
+    POLL_INTERVAL = 0.05
+    # Receive buffer size (in bytes) that absorbs reply bursts while the receiver thread is dissecting
+    RECEIVE_BUFFER = 8 * 1024 * 1024
+    # How far (in seconds) the sender may fall behind its pacing and catch up with a burst
+    MAX_PACING_LAG = 0.01
+
+    def __init__(self, socket_factory, rate, timeout, stop, scheduler=None):
+        '''
+        Initializes the packet engine.
+
+        Args:
+            socket_factory (function): Returns an open Scapy socket used to both send probes and receive replies.
+            rate (float or function): Maximum number of packets sent per second. None or 0 sends as fast as
+                possible. A function (e.g., RateController.rate) is called before every packet.
+            timeout (float or function): Time to keep listening after the last probe has been sent, in
+                seconds. A function (e.g., RttEstimator.timeout) is called each time the window is set.
+            stop (function): A function that returns True if the scanning process should be stopped,
+                preferably a StopSignal.
+            scheduler (ProbeScheduler): Tracks the probes, which must be registered with it as they are
+                built (see ProbeScheduler.sent), and retransmits the unanswered ones. The probes share
+                one receive window of timeout seconds after the last one if None.
+        '''
+        self.socket_factory = socket_factory
+        self.rate = rate
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.sock = None
+
+        self.stop = stop
+
+    def run(self, probes, match):
+        '''
+        Sends all probes and returns the matched replies once the receive window has closed.
+
+        Returns:
+            list: Every non-None value returned by match, in arrival order.
+        '''
+        return list(self.stream(probes, match))
+
+    def stream(self, probes, match):
+        '''
+        Sends probes from a sender thread while a receiver thread dissects the replies.
+
+        Args:
+            probes (iterable): Packets to send, optionally interleaved with WindowMarker objects.
+                Consumed lazily, so it may be a generator.
+            match (function): Called with every received packet, returns a result or None to ignore the packet.
+
+        Yields:
+            object: Every non-None value returned by match, as soon as the reply arrives, and every
+                WindowMarker once the receive window of the probes sent before it has closed (with a
+                scheduler, once they have been answered or given up).
+        '''
+        sock = self.sock = self.socket_factory()
+        self._enlarge_receive_buffer(sock)
+        results = queue.Queue()
+        markers = queue.Queue()
+        sender_done = threading.Event()
+        window_closed = threading.Event()
+        # The socket is closed by the last of this loop and the sender to let go of it
+        owner = SharedSocket(sock, users=2)
+
+        sender = threading.Thread(target=self._send_loop, args=(owner, probes, markers, sender_done, window_closed), daemon=True)
+        receiver = threading.Thread(target=self._receive_loop, args=(sock, match, results, window_closed), daemon=True)
+        receiver.start()
+        sender.start()
+        # A stop request wakes the result loop up from its wait for the next reply
+        unregister = on_stop(self.stop, lambda: results.put(STOP_WAKEUP))
+
+        try:
+            window_deadline = None
+            pending_marker = None
+            while True:
+                if self.stop():
+                    break
+
+                if window_deadline is None and sender_done.is_set():
+                    # The last probe is on the wire: start the shared receive window. With a scheduler, every probe has had its own
+                    window_deadline = time.monotonic() + (self._timeout() if self.scheduler is None else 0)
+                if window_deadline is not None and time.monotonic() >= window_deadline:
+                    break
+
+                # Markers are handed out in send order, so only the oldest one is checked
+                if pending_marker is None and not markers.empty():
+                    pending_marker = markers.get_nowait()
+                if pending_marker is not None and self._marker_due(pending_marker[0]):
+                    yield pending_marker[1]
+                    pending_marker = None
+                    continue
+
+                try:
+                    result = results.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if result is not STOP_WAKEUP:
+                    yield result
+        finally:
+            unregister()
+            window_closed.set()
+            receiver.join()
+            # A sender blocked in send (e.g., on a full socket buffer) is not waited for: it closes the socket itself once it returns
+            sender.join(self.POLL_INTERVAL)
+            owner.release()
+
+        # Hand out the replies that arrived while the window was closing, then the remaining markers
+        while not results.empty():
+            result = results.get_nowait()
+            if result is not STOP_WAKEUP:
+                yield result
+        if pending_marker is not None:
+            yield pending_marker[1]
+        while not markers.empty():
+            yield markers.get_nowait()[1]
+
+    def send(self, packet):
+        '''
+        Sends one packet right away on the engine socket, outside of the paced probe stream.
+
+        Intended for match functions that answer replies (e.g., with a TCP RST) without waiting for them.
+        '''
+        try:
+            self.sock.send(packet)
+        except OSError as e:
+            send_failure_log.log('Sending packet failed: %s', e)
+
+    def _timeout(self):
+        '''Returns the current length of the receive window, in seconds.'''
+        return self.timeout() if callable(self.timeout) else self.timeout
+
+    def _marker_due(self, due):
+        '''Returns True if a marker can be handed out: due is the end of its window, or its segment of the scheduler.'''
+        return self.scheduler.complete(due) if self.scheduler is not None else time.monotonic() >= due
+
+    def _enlarge_receive_buffer(self, sock):
+        '''Raises the kernel receive buffer of sock, so that replies are not dropped at high rates.'''
+        ins = getattr(sock, 'ins', None)
+        if ins is None:
+            return
+        try:
+            ins.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.RECEIVE_BUFFER)
+        except OSError as e:
+            logger.debug(f'Could not enlarge the receive buffer: {e}')
+
+    def _send_loop(self, owner, probes, markers, sender_done, window_closed):
+        '''
+        Sends the probes, pacing them so that no more than rate packets leave per second.
+
+        The pacing delay is taken before the next probe is pulled from the iterator, so a probe
+        generator runs right before its packet is sent and may record the send time. With a
+        scheduler, the probes due for retransmission are sent first, and once the iterator is
+        exhausted the loop keeps sending them until no probe is outstanding. While the iterator
+        waits for work (e.g., a HostPipeline for the next discovered host), a service thread
+        expires the timeouts and sends the retransmissions in place of this loop.
+        '''
+        sock = owner.sock
+        scheduler = self.scheduler
+        next_send = time.monotonic()
+        pulling_since = None    # Time the loop started waiting in the probe iterator, None while it is not
+        lock = threading.Lock()
+
+        def send(packet):
+            '''Sends packet, and moves the next send time on by one packet at the current rate.'''
+            nonlocal next_send
+            try:
+                sock.send(packet)
+            except OSError as e:
+                # A single unreachable target (e.g., a broadcast address) must not end the scan
+                send_failure_log.log('Sending probe failed: %s', e)
+            rate = self.rate() if callable(self.rate) else self.rate
+            if rate:
+                next_send += 1 / rate
+
+        def service_loop():
+            '''Runs on the service thread: keeps the scheduler going while the send loop has waited in the iterator for more than a tick.'''
+            nonlocal next_send
+            while not (wait_for_stop(self.stop, scheduler.tick) or sender_done.is_set() or window_closed.is_set()):
+                with lock:
+                    now = time.monotonic()
+                    if pulling_since is None or now - pulling_since < scheduler.tick:
+                        continue
+                    next_send = max(next_send, now - self.MAX_PACING_LAG)
+                    while next_send <= now:
+                        packet = scheduler.retransmission()
+                        if packet is None:
+                            break
+                        send(packet)
+
+        service = None
+        if scheduler is not None:
+            service = threading.Thread(target=service_loop, daemon=True)
+            service.start()
+        try:
+            probes = iter(probes)
+            while not (self.stop() or window_closed.is_set()):
+                # A probe iterator that waited for work (e.g., for the next discovered host) does not earn a burst
+                now = time.monotonic()
+                next_send = max(next_send, now - self.MAX_PACING_LAG)
+                delay = next_send - now
+                if delay > 0 and wait_for_stop(self.stop, delay):
+                    break
+
+                packet = scheduler.retransmission() if scheduler is not None else None
+                if packet is None and probes is not None:
+                    pulling_since = time.monotonic()
+                    packet = next(probes, None)
+                    with lock:
+                        pulling_since = None
+                    if packet is None:
+                        probes = None
+                        if scheduler is not None:
+                            scheduler.finish_sending()
+                if packet is None:
+                    if scheduler is None or scheduler.idle():
+                        break
+                    # Wait for the next timeout of the last probes
+                    if wait_for_stop(self.stop, scheduler.tick):
+                        break
+                    next_send = time.monotonic()
+                    continue
+
+                if isinstance(packet, WindowMarker):
+                    if scheduler is not None:
+                        markers.put((scheduler.mark(), packet))
+                    else:
+                        timeout = self._timeout() if packet.timeout is None else packet.timeout
+                        markers.put((time.monotonic() + timeout, packet))
+                    continue
+
+                send(packet)
+        except OSError as e:
+            if not window_closed.is_set():
+                logger.error(f'Sending probes failed: {e}')
+        finally:
+            sender_done.set()
+            if service is not None:
+                # It sends on the socket, so it is done before the socket is let go of
+                service.join()
+            owner.release()
+
+    def _receive_loop(self, sock, match, results, window_closed):
+        '''Drains the socket until the receive window is closed or the scan is stopped, queuing every matched reply.'''
+        wakeup = wakeup_sockets(self.stop)
+        while not (window_closed.is_set() or self.stop()):
+            readable, _, _ = select.select([sock] + wakeup, [], [], self.POLL_INTERVAL)
+            if sock not in readable:
+                continue
+
+            packet = sock.recv()
+            if packet is None:
+                continue
+
+            result = match(packet)
+            if result is not None:
+                results.put(result)
+
+
+class SharedSocket:
+    '''Socket used by several threads, closed once every one of them has released it.'''
+    __slots__ = ('sock', '_users', '_lock')
+
+    def __init__(self, sock, users):
+        self.sock = sock
+        self._users = users
+        self._lock = threading.Lock()
+
+    def release(self):
+        '''Lets go of the socket, closing it if this was its last user.'''
+        with self._lock:
+            self._users -= 1
+            last = self._users == 0
+        if last:
+            self.sock.close()
+
+# Put on the result queue of a stream by a stop request, to wake its result loop up
+STOP_WAKEUP = object()
+
+class WindowMarker:
+    '''
+    Placeholder that can be put between the probes passed to PacketEngine.stream.
+
+    It is not sent. Instead, the engine yields it back once the receive window of every probe
+    sent before it has closed, which tells the caller that e.g. all probes of a host are complete.
+    The window lasts timeout seconds, or the timeout of the engine if it is None. With a scheduler,
+    it closes once every probe sent before it has been answered or given up, and timeout is not used.
+    '''
+    __slots__ = ('value', 'timeout')
+
+    def __init__(self, value, timeout=None):
+        self.value = value
+        self.timeout = timeout
+
+def route_iface(ip_range):
+    '''
+    Returns the interface that routes to the first address of ip_range (a TargetRange), as sr()/srp() would select it.
+    '''
+    from scapy.all import conf
+    from scapy.interfaces import resolve_iface
+
+    if len(ip_range) == 0:
+        return resolve_iface(conf.iface)
+    return resolve_iface(conf.route.route(ip_range[0])[0])
+
+def l2_socket_factory(ip_range):
+    '''Returns a socket factory for layer 2 probes (e.g., ARP) towards ip_range.'''
+    iface = route_iface(ip_range)
+    return lambda: iface.l2socket()(iface=iface)
+
+def l3_socket_factory(ip_range):
+    '''
+    Returns a socket factory for layer 3 probes (e.g., ICMP, TCP) towards ip_range.
+
+    The socket is bound to the routing interface, so that replies to probes sent over it
+    (including the loopback interface) are received on the same socket.
+    '''
+    iface = route_iface(ip_range)
+    return lambda: iface.l3socket()(iface=iface)
+
+def new_secret():
+    '''Returns a random per-scan key for probe_cookie.'''
+    return os.urandom(16)
+
+def probe_cookie(secret, *fields):
+    '''
+    Computes a keyed 32-bit hash of the probe fields (e.g., destination IP and port).
+
+    The cookie is carried in a header field of the probe and echoed back by the target, so that
+    replies can be validated without keeping a table of outstanding probes.
+
+    Args:
+        secret (bytes): Per-scan key from new_secret.
+        fields: Values identifying the probe.
+
+    Returns:
+        int: The cookie as an unsigned 32-bit integer.
+    '''
+    data = '/'.join(map(str, fields)).encode()
+    return int.from_bytes(hashlib.blake2b(data, key=secret, digest_size=4).digest(), 'big')
@@ -1,30 +1,59 @@
 #Ping_Sweeper.py
 from scapy.all import sr, IP, ICMP, conf
-import socket
 from . import Constants
+from .Packet_Engine import PacketEngine, new_secret, probe_cookie
+from .Raw_Socket import RawIcmpSocket, build_icmp_echo, parse_icmp_echo_reply
+from .Rtt_Estimator import RttEstimator
+from .Probe_Scheduler import ProbeScheduler
+from .Rate_Controller import RateController
+from .Scan_Metrics import ProbeMetrics, shared_metrics
+from .Logging_Config import event
+from .Stop_Signal import on_stop
+import itertools
+import queue
+import socket
+import threading
 import logging
 
+logger = logging.getLogger(__name__)
+
 class PingSweeper:
     '''
     Ping Sweeper class for network discovery using ICMP echo requests.
     '''
-    def __init__(self, timeout, ttl, interval, packet_size, ip_range, stop):
+    # How often (in seconds) the classic sweep wakes up from sr() to check a stop function that is not a StopSignal
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, timeout, ttl, interval, packet_size, ip_range, stop, rate=float(Constants.DEFAULT_RATE), rtt=None, rate_controller=None, metrics=None,
+                 retries=Constants.PROBE_RETRIES):
         '''
         Initializes the Ping Sweeper.
 
         Args:
-            timeout (float): Maximum time to wait for a response, in seconds.
+            timeout (float): Maximum time to wait for a response, in seconds. Caps the adaptive timeouts.
             ttl (int): Time to live for packets.
             interval (float): Interval between packet sends, in seconds.
             packet_size (int): Size of the payload in ICMP packets.
-            ip_range (list): The range of IP addresses to scan.
+            ip_range (TargetRange): The IP addresses to scan.
             stop (function): A function that returns True if the scanning process should be stopped.
+            rate (float): Number of echo requests sent per second by the fast sweep.
+            rtt (RttEstimator): Estimator that is fed with the RTT of every reply and sets the time to
+                wait for replies. A new one with the default template, capped at timeout, if None.
+            rate_controller (RateController): Adapts the send rate of the fast sweep to the measured loss. Shared by the
+                engines of a scan. A fixed rate of rate packets per second if None.
+            metrics (MetricsRegistry): Registry the probe counters and RTTs are written into. shared_metrics if None.
+            retries (int): Maximum number of times an unanswered echo request of the fast sweep is sent again (see ProbeScheduler).
         '''
         self.timeout = timeout
         self.ttl = ttl
         self.interval = interval
         self.packet_size = packet_size
         self.ip_range = ip_range
+        self.rate = rate
+        self.rtt = rtt or RttEstimator(max_timeout=timeout)
+        self.rate_controller = rate_controller or RateController(max_rate=rate, min_rate=rate, rtt=self.rtt)
+        self.metrics = metrics or shared_metrics
+        self.retries = retries
 
         self.stop = stop
 
@@ -35,36 +64,165 @@ class PingSweeper:
         Returns:
             list: A list of dictionaries, each containing information about a detected host.
         '''
+        return list(self.ping_sweeper_stream())
+
+    def ping_sweeper_stream(self):
+        '''
+        Executes a ping sweep over the specified IP range, yielding hosts as they answer.
+
+        Yields:
+            dict: Information about a detected host.
+        '''
         conf.verb = 0    # Suppress Scapy output to stdout
-        host_list = []
+        probe_metrics = ProbeMetrics(self.metrics, engine='ping')
 
-        for ip in self.ip_range:
-            if self.stop():    # Check if the scan should be stopped
+        targets = iter(self.ip_range)
+        while True:
+            chunk = list(itertools.islice(targets, Constants.PING_SWEEP_CHUNK_SIZE))
+            if not chunk or self.stop():    # Check if the scan should be stopped
                 break
 
-            # Construct and send an ICMP echo request packet
-            icmp_packet = IP(dst=ip) / ICMP() / ('X' * self.packet_size)
-            answered, unanswered = sr(icmp_packet, timeout=self.timeout, inter=self.interval, verbose=False)
+            # Construct and send an ICMP echo request packet to every address of the chunk
+            icmp_packet = IP(dst=chunk) / ICMP() / ('X' * self.packet_size)
+            exchange = self._send_receive(icmp_packet)
+            if exchange is None:
+                break    # Stopped while waiting for the replies of the chunk
+            answered, unanswered = exchange
+            probe_metrics.sent.inc(len(chunk))
+            probe_metrics.replies.inc(len(answered))
+            probe_metrics.timeouts.inc(len(unanswered))
                 
-            for unanswered, received in answered:
+            for sent, received in answered:
                 if self.stop():
                     break
+                self.rtt.observe(received.src, received.time - sent.sent_time)
+                probe_metrics.rtt.observe(received.time - sent.sent_time)
                 
-                ip_address = received.src
-                try:
-                    # Attempt to resolve hostname
-                    hostname = socket.gethostbyaddr(ip_address)[0]
-                except socket.herror:
-                    hostname = Constants.UNKNOWN_HOST    # Use placeholder if resolution fails
-
-                # Compile device info and add to list
+                # Compile device info and hand it out
                 device_info = {
                     Constants.TABLE_COLOUM_IP: received.src,
                     Constants.TABLE_COLOUM_MAC: '',    # MAC address is not available here
-                    Constants.TABLE_COLOUM_HOST: hostname,
+                    Constants.TABLE_COLOUM_HOST: Constants.UNKNOWN_HOST,    # Resolved later by the DNS enrichment stage
                     Constants.TABLE_COLOUM_PORT: []    # Ports are not scanned here
                 }
-                host_list.append(device_info)
+                yield device_info
+
+        logger.info('Ping sweep completed.', extra=event('scan_completed', engine='ping'))
+
+    def _send_receive(self, packets):
+        '''
+        Runs sr() on the packets on a helper thread, so that a stop request does not wait for its timeout.
+
+        Returns:
+            tuple: The answered and unanswered packets, or None if the scan was stopped first. The
+                interrupted sr() then runs to its timeout in the background, and its replies are dropped.
+        '''
+        outcome = queue.Queue()
+
+        def exchange():
+            try:
+                outcome.put(sr(packets, timeout=self.rtt.timeout(), inter=self.interval, verbose=False))
+            except Exception as e:
+                outcome.put(e)
+
+        threading.Thread(target=exchange, daemon=True).start()
+        unregister = on_stop(self.stop, lambda: outcome.put(None))
+        try:
+            while True:
+                try:
+                    result = outcome.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    if self.stop():
+                        return None
+                    continue
+                if isinstance(result, Exception):
+                    raise result
+                return result
+        finally:
+            unregister()
+
+    def fast_ping_sweeper(self):
+        '''
+        Executes a stateless ping sweep over the specified IP range.
+
+        Returns:
+            list: A list of dictionaries, each containing information about a detected host.
+        '''
+        return list(self.fast_ping_sweeper_stream())
+
+    def fast_ping_sweeper_stream(self):
+        '''
+        Executes a stateless ping sweep over the specified IP range, yielding hosts as they answer.
+
+        A sender thread pushes echo requests at the configured rate while a receiver thread drains
+        the replies from a kernel raw ICMP socket, bypassing Scapy. Each request carries a keyed
+        cookie of its destination in the ICMP id/sequence fields, so replies are validated without
+        a table lookup and the sweep takes roughly (targets / rate) + timeout seconds. The timeout
+        adapts to the RTTs measured so far.
+        Unanswered requests are sent again, where requests are being lost (see ProbeScheduler).
+
+        Yields:
+            dict: Information about a detected host.
+        '''
+        logger.info('Fast ping sweep started.', extra=event('scan_started', engine='ping-fast'))
+
+        secret = new_secret()
+        payload = b'X' * self.packet_size
+        seen = set()
+        probe_metrics = ProbeMetrics(self.metrics, engine='ping-fast')
+        scheduler = ProbeScheduler(timeout=self.rtt.timeout, retries=self.retries, rate_controller=self.rate_controller, metrics=probe_metrics)
+
+        def echo_requests():
+            '''Builds the echo requests lazily, with the cookie split over the id and sequence fields.'''
+            for ip in self.ip_range:
+                cookie = probe_cookie(secret, ip)
+                packet = build_icmp_echo(socket.inet_aton(ip), cookie >> 16, cookie & 0xFFFF, payload, ttl=self.ttl)
+                scheduler.sent(ip, packet)
+                self.rate_controller.sent(ip)
+                probe_metrics.sent.inc()
+                yield packet
+
+        def match(packet):
+            '''Returns the source address of valid echo replies, None for anything else.'''
+            fields = parse_icmp_echo_reply(packet)
+            if fields is None:
+                return None
+
+            ip_address, ident, seq = fields
+            cookie = probe_cookie(secret, ip_address)
+            if (ident, seq) != (cookie >> 16, cookie & 0xFFFF):
+                return None
+            if ip_address in seen:
+                probe_metrics.duplicates.inc()
+                return None
+            seen.add(ip_address)
+
+            probe_metrics.replies.inc()
+            answer = scheduler.answered(ip_address)
+            # The reply to a request sent again may answer any of its copies, so only the others give an RTT (Karn's algorithm)
+            if answer is not None and not answer[0]:
+                rtt = answer[1]
+                self.rtt.observe(ip_address, rtt)
+                self.rate_controller.replied(ip_address, rtt)
+                probe_metrics.rtt.observe(rtt)
+            return ip_address
+
+        # Let the kernel drop the ICMP messages that are not echo replies from the scanned range
+        first_ip, last_ip = self.ip_range.bounds() or (None, None)
+
+        engine = PacketEngine(socket_factory=lambda: RawIcmpSocket(first_ip=first_ip, last_ip=last_ip), rate=self.rate_controller.rate, timeout=self.rtt.timeout, stop=self.stop, scheduler=scheduler)
+        for ip_address in engine.stream(echo_requests(), match):
+            if self.stop():
+                break
+
+            # Compile device info and hand it out
+            device_info = {
+                Constants.TABLE_COLOUM_IP: ip_address,
+                Constants.TABLE_COLOUM_MAC: '',    # MAC address is not available here
+                Constants.TABLE_COLOUM_HOST: Constants.UNKNOWN_HOST,    # Resolved later by the DNS enrichment stage
+                Constants.TABLE_COLOUM_PORT: []    # Ports are not scanned here
+            }
+            yield device_info
 
-        logging.info('Ping sweep completed.')
-        return host_list
\ No newline at end of file
+        probe_metrics.finish()
+        logger.info('Fast ping sweep completed.', extra=event('scan_completed', engine='ping-fast', sent=probe_metrics.sent.value, replies=probe_metrics.replies.value))
\ No newline at end of file
@@ -0,0 +1,44 @@
+#Port_Frequency.py
+'''
+Bundled port-frequency tables: ports in the approximate order of how often they are found open
+on scanned hosts, most frequent first. They order the probes of a port scan (so the likely
+services are found early) and define the "top:N" port specifications (see PortSpec).
+
+Ports that are not listed rank after every listed port: first the rest of the well-known ports
+(1-1023), then the registered and dynamic ones, each in ascending order.
+'''
+
+TCP_PORT_FREQUENCY = (
+    80, 23, 443, 21, 22, 25, 3389, 110, 445, 139, 143, 53, 135, 3306, 8080, 1723, 111, 995, 993, 5900,
+    1025, 587, 8888, 199, 1720, 465, 548, 113, 81, 6001, 10000, 514, 5060, 179, 1026, 2000, 8443, 8000, 32768, 554,
+    26, 1433, 49152, 2001, 515, 8008, 49154, 1027, 5666, 646, 5000, 5631, 631, 49153, 8081, 2049, 88, 79, 5800, 106,
+    2121, 1110, 49155, 6000, 513, 990, 5357, 427, 49156, 543, 544, 5101, 144, 7, 389, 8009, 3128, 444, 9999, 5009,
+    7070, 5190, 3000, 5432, 1900, 3986, 13, 1029, 9, 5051, 6646, 49157, 1028, 873, 1755, 2717, 4899, 9100, 119, 37,
+    1000, 3001, 5001, 82, 10010, 1030, 9090, 2107, 1024, 2103, 6004, 1801, 5050, 19, 8031, 1041, 255, 2967, 1049, 1048,
+    1053, 3703, 1056, 1065, 1064, 1054, 17, 808, 3689, 1031, 1044, 1071, 5901, 100, 9102, 8010, 2869, 1039, 5120, 4001,
+    9000, 2105, 636, 1038, 2601, 1, 7000, 1066, 1069, 625, 311, 280, 254, 4000, 1761, 5003, 2002, 2005, 1998, 1032,
+    1050, 6112, 3690, 1521, 2161, 6002, 1080, 2401, 4045, 902, 7937, 787, 1058, 2383, 32771, 1033, 1040, 1059, 50000, 5555,
+    10001, 1494, 593, 2301, 3, 3268, 7938, 1234, 1022, 1074, 8002, 1036, 1035, 9001, 1037, 464, 497, 1935, 6666, 161,
+    6543, 1352, 3269, 6379, 27017, 9200, 11211, 5984, 9042, 7001, 8161, 61616, 5672, 15672, 1883, 8883, 2375, 2376, 6443, 10250,
+    2379, 2380, 8086, 9092, 2181, 8500, 8200, 4369, 25565, 27015, 3478, 5061, 5222, 5269, 6667, 6697, 1194, 1701, 500, 4500,
+    8291, 8728, 8729, 10443, 4443, 8843, 9443, 7443, 8880, 8088, 8089, 8181, 8282, 8383, 8484, 8585, 8686, 8787, 8989, 9080,
+    9091, 9095, 9300, 9418, 9600, 9876, 9981, 9998, 10080, 10243, 12345, 16992, 16993, 20000, 30000, 31337, 37777, 44818, 47808, 502,
+    102, 20001, 1911, 4840, 2404, 789, 1962, 18245, 5007, 5006,
+)
+
+UDP_PORT_FREQUENCY = (
+    631, 161, 137, 123, 138, 1434, 445, 135, 67, 53, 139, 500, 68, 520, 1900, 4500, 514, 49152, 162, 69,
+    5353, 111, 49154, 1701, 998, 996, 997, 999, 3283, 49153, 1812, 136, 2222, 2049, 3278, 5060, 1025, 1813, 1645, 1646,
+    11211, 1194, 3478, 5355, 427, 47808, 623, 177, 1719, 19,
+)
+
+# Port -> position in the tables above
+TCP_PORT_RANKS = {port: rank for rank, port in enumerate(TCP_PORT_FREQUENCY)}
+UDP_PORT_RANKS = {port: rank for rank, port in enumerate(UDP_PORT_FREQUENCY)}
+
+def frequency_key(ranks, port):
+    '''Returns the sort key of port for one of the *_PORT_RANKS tables: its position if listed, else after every listed port.'''
+    rank = ranks.get(port)
+    if rank is not None:
+        return rank, port
+    return len(ranks) + (0 if port < 1024 else 1), port
@@ -1,25 +1,54 @@
 #Port_Scanner.py
-from scapy.all import sr, IP, TCP, conf
+from scapy.all import conf
+import random
+import socket
 from . import Constants
+from .Packet_Engine import PacketEngine, WindowMarker, new_secret, probe_cookie
+from .Rtt_Estimator import RttEstimator
+from .Probe_Scheduler import ProbeScheduler
+from .Rate_Controller import RateController
+from .Scan_Metrics import ProbeMetrics, shared_metrics
+from .Logging_Config import event
+from .Raw_Socket import RawTcpSocket, build_tcp_packet, parse_tcp_packet, TCP_SYN, TCP_RST, TCP_ACK
 import logging
 
+logger = logging.getLogger(__name__)
+
 class PortScanner:
     '''
     Port Scanner class for scanning TCP ports of active hosts.
     '''
-    def __init__(self, start_port, end_port, active_hosts, stop):
+    def __init__(self, start_port, end_port, active_hosts, stop, rate=float(Constants.DEFAULT_RATE), rtt=None, rate_controller=None, ports=None, metrics=None,
+                 retries=Constants.PROBE_RETRIES):
         '''
         Initializes the Port Scanner.
 
         Args:
             start_port (int): The starting port number for the scan.
             end_port (int): The ending port number for the scan.
-            active_hosts (list): A list of active hosts to scan.
+            active_hosts (iterable): The active hosts to scan. Consumed lazily, so hosts may still be
+                discovered while the first ones are probed (see HostPipeline).
             stop (function): A function that returns True if the scanning process should be stopped.
+            rate (float): Number of SYN probes sent per second.
+            rtt (RttEstimator): Estimator that sets the time to wait for the replies of each host and is
+                fed with the RTT of every SYN-ACK and RST. Share the one of the discovery stage, so that
+                its replies seed the timeouts. A new one with the default template if None.
+            rate_controller (RateController): Adapts the send rate to the measured loss. Shared by the
+                engines of a scan. A fixed rate of rate packets per second if None.
+            ports (function): Returns the ports to probe on a host, given its IP address, or None for
+                the whole range from start_port to end_port (e.g., see DeltaScan). The range if None.
+            metrics (MetricsRegistry): Registry the probe counters and RTTs are written into. shared_metrics if None.
+            retries (int): Maximum number of times an unanswered SYN probe is sent again (see ProbeScheduler).
         '''
         self.start_port = start_port
         self.end_port = end_port
         self.active_hosts = active_hosts
+        self.rate = rate
+        self.rtt = rtt or RttEstimator()
+        self.rate_controller = rate_controller or RateController(max_rate=rate, min_rate=rate, rtt=self.rtt)
+        self.ports = ports
+        self.metrics = metrics or shared_metrics
+        self.retries = retries
 
         self.stop = stop
 
@@ -30,41 +59,126 @@ class PortScanner:
         Returns:
             list: A list of dictionaries, each containing information about a host and its open ports.
         '''
+        return [host_info for host_info in self.port_scanner_stream() if not host_info.get(Constants.KEY_PARTIAL)]
+
+    def port_scanner_stream(self):
+        '''
+        Scans the specified range of ports for each active host, yielding each host once all of its
+        ports have been probed.
+
+        Ports are probed most frequently open first (see PortSpec), so a host that has more than
+        Constants.PORT_EARLY_REPORT_PORTS ports to probe is also yielded early, once those first ports
+        are done and if some of them are open: as a copy with Constants.KEY_PARTIAL set to True and the
+        open ports found so far. The complete dictionary of the host, yielded later, replaces it.
+
+        All (host, port) SYN probes are sent as one paced stream. The sequence number of every probe
+        is a keyed cookie of its destination, so a SYN-ACK is validated by its acknowledgment number
+        alone. Open ports are closed with a fire-and-forget RST. Every probe waits for the adaptive
+        timeout of the RTT estimate of its host, and is sent again where probes are being lost
+        (filtered ports never answer, see ProbeScheduler). Each host is complete once every one of its
+        probes has been answered or given up.
+
+        Yields:
+            dict: Information about a host and its open ports, or an early copy of it (see above).
+        '''
         conf.verb = 0    # Suppress Scapy output to stdout
-        open_ports_info = []
-
-        for host_info in self.active_hosts:
-            if self.stop():    # Check if the scan should be stopped
-                break
-
-            ip = host_info[Constants.TABLE_COLOUM_IP]
-            open_ports = []
-
-            for port in range(self.start_port, self.end_port + 1):
-                if self.stop():
-                    break
-                
-                # Send a TCP SYN packet to each port
-                tcp_packet = IP(dst=ip) / TCP(dport=port, flags='S')
-                answered, _ = sr(tcp_packet, timeout=1, verbose=False)
-
-                for _, received in answered:
-                    # Check if the port responded with SYN-ACK
-                    if received.haslayer(TCP) and received[TCP].flags & 0x12:
-                        open_ports.append(port)
-
-                        # Send a RST to close the connection
-                        rst_packet = IP(dst=ip) / TCP(dport=port, flags='R')
-                        sr(rst_packet, timeout=1, verbose=False)
-
-            # Compile host and port information
-            host_info_dict = {
-                Constants.TABLE_COLOUM_IP: ip,
-                Constants.TABLE_COLOUM_MAC: host_info.get(Constants.TABLE_COLOUM_MAC),
-                Constants.TABLE_COLOUM_HOST: host_info.get(Constants.TABLE_COLOUM_HOST),
-                Constants.TABLE_COLOUM_PORT: open_ports
-            }
-            open_ports_info.append(host_info_dict)
-
-        logging.info('Port scan completed.')
-        return open_ports_info
+
+        secret = new_secret()
+        source_port = random.randint(32768, 60999)
+        hosts = {}    # ip -> host info of the hosts being probed
+        open_ports = {}    # ip -> open ports found so far
+        probe_metrics = ProbeMetrics(self.metrics, engine='port')
+        early_ports = Constants.PORT_EARLY_REPORT_PORTS
+        scheduler = ProbeScheduler(timeout=self.rtt.timeout, retries=self.retries, rate_controller=self.rate_controller, metrics=probe_metrics)
+
+        def syn_probes():
+            '''
+            Builds the SYN probes lazily, host by host, each host followed by a window marker. The
+            marker of the early report of a host follows its first early_ports ports.
+            '''
+            for host_info in self.active_hosts:
+                ip = host_info[Constants.TABLE_COLOUM_IP]
+                hosts[ip] = host_info
+                open_ports[ip] = set()
+
+                # The source address is looked up once per host, then packed into every probe
+                source_ip = socket.inet_aton(conf.route.route(ip)[1])
+                destination_ip = socket.inet_aton(ip)
+                ports = self.host_ports(ip)
+                early_report = len(ports) > early_ports
+                for count, port in enumerate(ports, 1):
+                    cookie = probe_cookie(secret, ip, port)
+                    packet = build_tcp_packet(source_ip, destination_ip, source_port, port, cookie, TCP_SYN)
+                    scheduler.sent((ip, port), packet)
+                    self.rate_controller.sent(ip)
+                    probe_metrics.sent.inc()
+                    yield packet
+                    if early_report and count == early_ports:
+                        yield WindowMarker((ip, True))
+                yield WindowMarker((ip, False))
+
+        def match(packet):
+            '''
+            Returns (ip, port) for valid SYN-ACKs and answers them with a RST, None for anything else.
+            The RSTs of closed ports are only used as RTT samples.
+            '''
+            fields = parse_tcp_packet(packet)
+            if fields is None:
+                return None
+
+            ip, port, destination_port, seq, ack, flags = fields
+            if destination_port != source_port or ip not in open_ports:
+                return None
+            # Check that the port responded to one of our probes
+            if not flags & TCP_ACK or ack != (probe_cookie(secret, ip, port) + 1) & 0xFFFFFFFF:
+                return None
+            answer = scheduler.answered((ip, port))
+            if answer is None:
+                # A late reply: a SYN-ACK retransmitted by the host, the second reply to a probe and its
+                # retransmission, or a reply to a probe that was given up
+                probe_metrics.duplicates.inc()
+            else:
+                probe_metrics.replies.inc()
+                # The reply to a probe sent again may answer any of its copies, so only the others give an RTT (Karn's algorithm)
+                retries, rtt = answer
+                if not retries:
+                    self.rtt.observe(ip, rtt)
+                    self.rate_controller.replied(ip, rtt)
+                    probe_metrics.rtt.observe(rtt)
+            # Only a SYN-ACK means the port is open
+            if not flags & TCP_SYN:
+                return None
+
+            # Send a RST to close the connection, without waiting for an answer
+            engine.send(build_tcp_packet(packet[16:20], packet[12:16], source_port, port, ack, TCP_RST))
+            return ip, port
+
+        engine = PacketEngine(socket_factory=lambda: RawTcpSocket(destination_port=source_port), rate=self.rate_controller.rate, timeout=self.rtt.timeout, stop=self.stop, scheduler=scheduler)
+        for item in engine.stream(syn_probes(), match):
+            if not isinstance(item, WindowMarker):
+                ip, port = item
+                if ip in open_ports:
+                    open_ports[ip].add(port)
+                continue
+
+            ip, partial = item.value
+            if partial:
+                # The first ports of this host are done: report the ones found open so far
+                if open_ports[ip]:
+                    yield dict(hosts[ip], **{Constants.TABLE_COLOUM_PORT: sorted(open_ports[ip]), Constants.KEY_PARTIAL: True})
+                continue
+
+            # Every probe of this host has had its full receive window
+            host_info = hosts.pop(ip)
+
+            # The host dictionary of the discovery stage is completed in place instead of being copied
+            host_info[Constants.TABLE_COLOUM_PORT] = sorted(open_ports.pop(ip))
+            yield host_info
+
+        probe_metrics.finish()
+        logger.info('Port scan completed.', extra=event('scan_completed', engine='port', sent=probe_metrics.sent.value, replies=probe_metrics.replies.value))
+
+    def host_ports(self, ip):
+        '''Returns the ports to probe on ip.'''
+        ports = self.ports(ip) if self.ports is not None else None
+        return range(self.start_port, self.end_port + 1) if ports is None else ports
@@ -0,0 +1,120 @@
+#Port_Spec.py
+from array import array
+import itertools
+import re
+from . import Constants
+from .Port_Frequency import TCP_PORT_FREQUENCY, UDP_PORT_FREQUENCY, TCP_PORT_RANKS, UDP_PORT_RANKS, frequency_key
+
+class PortSpec:
+    '''
+    Compiled set of ports to scan, e.g. from '22,80,443,8000-8100,top:1000,u:53'.
+
+    The TCP and UDP ports are deduplicated and stored as array('H') in probe order: by the bundled
+    port-frequency tables (see Port_Frequency), most likely open first, so a scan finds the useful
+    services early. Membership is a lookup in a 65536-bit bitmap.
+    '''
+    def __init__(self, tcp=(), udp=(), text=''):
+        '''
+        Initializes the set.
+
+        Args:
+            tcp (iterable): TCP port numbers, in any order, with or without duplicates.
+            udp (iterable): UDP port numbers.
+            text (str): The specification the set was compiled from, for display.
+        '''
+        self.tcp = array('H', sorted(set(tcp), key=lambda port: frequency_key(TCP_PORT_RANKS, port)))
+        self.udp = array('H', sorted(set(udp), key=lambda port: frequency_key(UDP_PORT_RANKS, port)))
+        self.text = text
+        self._bitmap = bytearray(8192)
+        for port in self.tcp:
+            self._bitmap[port >> 3] |= 1 << (port & 7)
+
+    @classmethod
+    def from_spec(cls, spec):
+        '''
+        Compiles a port specification.
+
+        Args:
+            spec (str): Entries separated by commas or spaces. An entry is a port (22), a range
+                (8000-8100) or the N most frequently open ports (top:1000). Entries are TCP ports,
+                or UDP ports with a u: prefix (u:53, u:top:20); t: marks TCP explicitly.
+
+        Returns:
+            PortSpec: The compiled set.
+
+        Raises:
+            ValueError: If an entry is malformed or a port is not between 1 and 65535.
+        '''
+        tcp, udp = [], []
+        entries = [entry for entry in re.split(r'[,\s]+', spec.strip().lower()) if entry]
+        if not entries:
+            raise ValueError(Constants.MSG_INVALID_PORT_SPEC.format(entry=spec))
+        for entry in entries:
+            ports, frequency = tcp, TCP_PORT_FREQUENCY
+            body = entry
+            if body.startswith('u:'):
+                ports, frequency, body = udp, UDP_PORT_FREQUENCY, body[2:]
+            elif body.startswith('t:'):
+                body = body[2:]
+            try:
+                if body.startswith('top:'):
+                    count = int(body[4:])
+                    if not 1 <= count <= 65535:
+                        raise ValueError(body)
+                    ports.extend(top_ports(frequency, count))
+                elif '-' in body:
+                    first, last = (int(port) for port in body.split('-', 1))
+                    if not 1 <= first <= last <= 65535:
+                        raise ValueError(body)
+                    ports.extend(range(first, last + 1))
+                else:
+                    port = int(body)
+                    if not 1 <= port <= 65535:
+                        raise ValueError(body)
+                    ports.append(port)
+            except ValueError:
+                raise ValueError(Constants.MSG_INVALID_PORT_SPEC.format(entry=entry))
+        return cls(tcp, udp, text=spec.strip())
+
+    @classmethod
+    def from_range(cls, start_port, end_port):
+        '''Returns the set of the TCP ports from start_port to end_port (inclusive).'''
+        return cls(range(start_port, end_port + 1), text=f'{start_port}-{end_port}')
+
+    def bounds(self):
+        '''Returns the lowest and the highest TCP port, or (None, None) if there is none.'''
+        if not self.tcp:
+            return None, None
+        return min(self.tcp), max(self.tcp)
+
+    def split(self, shards):
+        '''
+        Splits the TCP ports into up to shards sets by dealing them out in probe order, so that every
+        part starts with its share of the most frequently open ports.
+        '''
+        shards = max(1, min(shards, len(self.tcp)))
+        return [PortSpec(self.tcp[index::shards], text=f'{self.text} ({index + 1}/{shards})') for index in range(shards)]
+
+    def __len__(self):
+        '''Returns the number of TCP ports.'''
+        return len(self.tcp)
+
+    def __iter__(self):
+        '''Iterates over the TCP ports in probe order.'''
+        return iter(self.tcp)
+
+    def __contains__(self, port):
+        '''Returns True if port is one of the TCP ports.'''
+        return 0 < port < 65536 and bool(self._bitmap[port >> 3] & (1 << (port & 7)))
+
+    def __str__(self):
+        return self.text
+
+def top_ports(frequency, count):
+    '''
+    Returns the count most frequently open ports of a frequency table (see Port_Frequency). Past
+    the end of the table, the remaining well-known ports follow, then the others, in ascending order.
+    '''
+    listed = set(frequency)
+    unlisted = (port for port in itertools.chain(range(1, 1024), range(1024, 65536)) if port not in listed)
+    return list(itertools.islice(itertools.chain(frequency, unlisted), count))
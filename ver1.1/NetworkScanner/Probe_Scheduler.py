@@ -0,0 +1,223 @@
+#Probe_Scheduler.py
+import collections
+import math
+import threading
+import time
+from . import Constants
+from .Timer_Wheel import TimerWheel
+
+class ProbeScheduler:
+    '''
+    Tracks the probes of a PacketEngine stream until they are answered, and retransmits the
+    unanswered ones, so that a lost probe or reply does not drop its target from the results.
+
+    Probes are registered right before they are sent (sent), and their timeouts are kept in a
+    TimerWheel, so tens of thousands of probes in flight cost O(1) each to track and to expire.
+    A reply completes its probe (answered); a reply to a probe that is no longer outstanding
+    (e.g., the second reply to a probe and its retransmission) is told apart as late. A probe that
+    times out is queued for retransmission, which the sender of the engine sends before any new
+    probe, with its timeout multiplied by backoff, until it has been sent again retries times.
+
+    Retransmissions take send slots, so they are only spent where probes are actually lost: up to
+    retries times once loss is evident (a retransmitted probe was answered, or the rate controller
+    estimates loss) and as long as they pay off (PROBE_RETRY_MIN_YIELD of them are answered; not
+    e.g. in a sparse network, or towards filtered ports), otherwise once, without backoff, for one
+    unanswered probe in PROBE_RETRY_SAMPLE while new probes are still being sent, to find out.
+    Once the last new probe is sent, the timeouts of the outstanding probes are shortened to the
+    current RTT estimates, as the shared receive window used to be. A scan without loss therefore
+    takes as long as without retransmissions.
+
+    Completion is counted per segment of the probe stream (the probes between two WindowMarker
+    objects), so that the engine hands a marker out as soon as the probes before it have completed.
+    '''
+    def __init__(self, timeout, retries=Constants.PROBE_RETRIES, backoff=Constants.PROBE_BACKOFF, rate_controller=None, metrics=None):
+        '''
+        Initializes the scheduler.
+
+        Args:
+            timeout (float or function): Time to wait for the reply to a probe, in seconds, before it is
+                multiplied by the backoff. A function (e.g., RttEstimator.timeout) is called with the
+                target IP address every time a probe is sent, so retransmissions follow the estimates.
+            retries (int): Maximum number of times an unanswered probe is sent again. 0 never retransmits.
+            backoff (float): Factor the timeout of a probe is multiplied by for every retransmission.
+            rate_controller (RateController): Told about every retransmission, and about the
+                retransmitted probes that are answered. Its drop estimate makes loss evident.
+            metrics (ProbeMetrics): Metrics of the engine, whose retries counter counts the retransmissions.
+        '''
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_controller = rate_controller
+        self.metrics = metrics
+
+        self._wheel = TimerWheel()
+        self.tick = self._wheel.tick
+        self._probes = {}    # key -> outstanding Probe
+        self._due = collections.deque()    # Timed-out probes waiting to be sent again
+        self._segment = 0    # Segment of the probes being sent
+        self._outstanding = {}    # segment -> number of its outstanding probes
+        self._sending = True    # False once no new probes follow
+        self._expired = 0
+        self._retransmitted = 0
+        self._recovered = 0
+        self._lock = threading.Lock()
+
+    def sent(self, key, packet):
+        '''
+        Records a new probe that is being sent now.
+
+        Args:
+            key (str or tuple): Identifies the probe in answered: the target IP address, or a tuple
+                that starts with it (e.g., (ip, port)).
+            packet (object): The probe, sent again as is if it is retransmitted.
+        '''
+        probe = Probe(key, packet)
+        timeout = self._timeout(probe.ip)
+        with self._lock:
+            previous = self._probes.pop(key, None)
+            if previous is not None:    # The same probe again (e.g., a target listed twice) restarts it
+                self._wheel.cancel(previous.timer)
+                self._complete(previous)
+            probe.segment = self._segment
+            probe.sent_at = time.monotonic()
+            probe.timer = self._wheel.schedule(probe.sent_at + timeout, probe)
+            self._probes[key] = probe
+            self._outstanding[self._segment] = self._outstanding.get(self._segment, 0) + 1
+
+    def answered(self, key):
+        '''
+        Completes the probe identified by key, once its reply has arrived.
+
+        Returns:
+            tuple: (number of retransmissions, time since the last one was sent or the probe itself, in
+                seconds), or None if the probe is not outstanding: already answered, given up or unknown.
+                The time is only a round-trip time if the probe was not retransmitted (Karn's algorithm).
+        '''
+        now = time.monotonic()
+        with self._lock:
+            probe = self._probes.pop(key, None)
+            if probe is None:
+                return None
+            self._wheel.cancel(probe.timer)
+            self._complete(probe)
+            if probe.retries:
+                self._recovered += 1
+        if probe.retries and self.rate_controller is not None:
+            self.rate_controller.recovered(probe.ip)
+        return probe.retries, now - probe.sent_at
+
+    def retransmission(self):
+        '''
+        Expires the timeouts that have passed, and returns the packet of the next probe to send again.
+
+        Called by the sender of the engine before every new probe, and while it waits for the last ones or for the probe iterator.
+
+        Returns:
+            object: The packet, which must be sent right away, or None if no probe is due.
+        '''
+        now = time.monotonic()
+        with self._lock:
+            for probe in self._wheel.expire(now):
+                if probe.retries < self._allowed_retries():
+                    self._due.append(probe)
+                else:
+                    del self._probes[probe.key]
+                    self._complete(probe)
+
+            while self._due:
+                probe = self._due.popleft()
+                if self._probes.get(probe.key) is probe:    # Not answered meanwhile
+                    break
+            else:
+                return None
+            probe.retries += 1
+            self._retransmitted += 1
+            probe.sent_at = now
+            probe.timer = self._wheel.schedule(now + self._timeout(probe.ip) * self._backoff(probe), probe)
+
+        if self.metrics is not None:
+            self.metrics.retries.inc()
+        if self.rate_controller is not None:
+            # Not counted as sent: mostly sent to silent addresses, retransmissions would dilute the reply ratio the controller watches
+            self.rate_controller.retransmitted(probe.ip)
+        return probe.packet
+
+    def mark(self):
+        '''Ends the current segment of the probe stream (at a WindowMarker), and returns it for complete.'''
+        with self._lock:
+            segment = self._segment
+            self._segment += 1
+            if self._outstanding.get(segment) == 0:
+                del self._outstanding[segment]
+            return segment
+
+    def complete(self, segment):
+        '''Returns True once every probe of segment has been answered or given up.'''
+        return not self._outstanding.get(segment)
+
+    def finish_sending(self):
+        '''Records that no new probes follow, only retransmissions, and shortens the timeouts of the outstanding probes to the current estimates.'''
+        with self._lock:
+            self._sending = False
+            if not callable(self.timeout):
+                return
+            for probe in self._probes.values():
+                if probe.timer.cancelled:    # Due for retransmission
+                    continue
+                deadline = probe.sent_at + self._timeout(probe.ip) * self._backoff(probe)
+                if math.ceil(deadline / self.tick) < probe.timer.tick:
+                    self._wheel.cancel(probe.timer)
+                    probe.timer = self._wheel.schedule(deadline, probe)
+
+    def idle(self):
+        '''Returns True if no probe is outstanding.'''
+        return not self._probes
+
+    def stats(self):
+        '''Returns the number of outstanding probes, of probes waiting to be sent again, of retransmissions and of answered ones as a dictionary.'''
+        return {'outstanding': len(self._probes), 'due': len(self._due), 'retransmitted': self._retransmitted, 'recovered': self._recovered}
+
+    def _timeout(self, ip):
+        '''Returns the time to wait for the reply of a probe to ip, before the backoff.'''
+        return self.timeout(ip) if callable(self.timeout) else self.timeout
+
+    def _backoff(self, probe):
+        '''Returns the factor the timeout of probe is multiplied by, for its number of retransmissions.'''
+        return self.backoff ** probe.retries if self._loss_evident() else 1
+
+    def _loss_evident(self):
+        '''Returns True once a retransmission has been answered or the rate controller estimates loss.'''
+        return bool(self._recovered) or (self.rate_controller is not None and self.rate_controller.drop_estimate() >= Constants.PROBE_RETRY_MIN_LOSS)
+
+    def _allowed_retries(self):
+        '''Returns the number of retransmissions a timed-out probe may have. Runs under the lock.'''
+        if not self.retries:
+            return 0
+        paying_off = self._retransmitted < Constants.PROBE_RETRY_MIN_SAMPLES or self._recovered >= Constants.PROBE_RETRY_MIN_YIELD * self._retransmitted
+        if paying_off and self._loss_evident():
+            return self.retries
+        # Loss is not evident (or retransmissions do not pay off) yet: sample them, while they are interleaved with new probes
+        self._expired += 1
+        return 1 if self._sending and self._expired % Constants.PROBE_RETRY_SAMPLE == 0 else 0
+
+    def _complete(self, probe):
+        '''Counts probe out of its segment. Runs under the lock.'''
+        remaining = self._outstanding[probe.segment] - 1
+        if remaining or probe.segment == self._segment:
+            self._outstanding[probe.segment] = remaining
+        else:
+            del self._outstanding[probe.segment]
+
+
+class Probe:
+    '''An outstanding probe of a ProbeScheduler.'''
+    __slots__ = ('key', 'ip', 'packet', 'segment', 'sent_at', 'retries', 'timer')
+
+    def __init__(self, key, packet):
+        self.key = key
+        self.ip = key[0] if isinstance(key, tuple) else key
+        self.packet = packet
+        self.segment = None
+        self.sent_at = None
+        self.retries = 0
+        self.timer = None
@@ -3,6 +3,8 @@ from .Scan_Thread import ScanThread
 from .UserInput_Handler import UserInputHandler
 import logging
 
+logger = logging.getLogger(__name__)
+
 class ProcessManager:
     '''
     Manages the scanning process, including starting, aborting, and handling the completion
@@ -19,18 +21,21 @@ class ProcessManager:
         Initiates a scan based on user inputs collected from the GUI.
         Validates inputs and configures the scan thread for execution.
         '''
-        logging.info('Starting scan.')
+        logger.info('Starting scan.')
         user_inputs = self.gui_manager.collect_inputs()
 
         try:
             Current_ScanType = self.init_gui.scan_type_combo.currentText()
             self.UserInputHandler_instance = UserInputHandler(**user_inputs)
             validated_inputs = self.UserInputHandler_instance.validate_all()
-            self.scan_thread = ScanThread(Current_ScanType=Current_ScanType,**validated_inputs)
+            self.scan_thread = ScanThread(Current_ScanType=Current_ScanType, timing=self.init_gui.timing_combo.currentText(), delta=self.init_gui.delta_checkbox.isChecked(),
+                                          detect_services=self.init_gui.services_checkbox.isChecked(), **validated_inputs)
+            # The results of a delta scan are the changes, shown (and exported) with their Change and Details columns
+            self.init_gui.result_model.set_delta(self.scan_thread.delta)
             self.setup_scan_thread()
 
         except ValueError as e:
-            logging.warning(f'Validation error during scan setup: {e}')
+            logger.warning(f'Validation error during scan setup: {e}')
             self.gui_manager.handle_error(str(e))
 
         except Exception as e:
@@ -49,24 +54,26 @@ class ProcessManager:
     def abort_scan(self):
         '''
         Aborts the currently running scan if possible.
-        Sets a flag to signal the scan thread to stop execution.
+        Signals the scan thread to stop and returns at once, without waiting for it on the GUI thread:
+        the thread publishes the results found so far, and its finished signal then calls end_scan.
         '''
-        logging.info('Scan aborted by user.')
+        logger.info('Scan aborted by user.')
         if self.scan_thread and self.scan_thread.isRunning():
             self.scan_abort_flag = True
             self.scan_thread.stop()
-            self.scan_thread.wait()
+            self.gui_manager.on_scan_aborting()
 
     def end_scan(self):
         '''
         Handles the cleanup and UI updates upon scan completion or abortion.
         Resets flags and updates the GUI to reflect the end of scanning.
         '''
+        self.gui_manager.stop_metrics_updates()
         if self.scan_thread.error:
             pass
         elif self.scan_abort_flag:
             self.gui_manager.on_scan_aborted()
         else:
-            self.gui_manager.on_scan_completed()
+            self.gui_manager.on_scan_completed(self.scan_thread.delta_summary)
         
         self.scan_abort_flag = False
@@ -0,0 +1,228 @@
+#Rate_Controller.py
+import math
+import socket
+import threading
+import time
+from . import Constants
+from .Logging_Config import event
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RateController:
+    '''
+    Congestion-aware send rate controller shared by the packet engines of a scan (AIMD).
+
+    The rate starts at max_rate and only backs off on measured loss. Probes are grouped into
+    evaluation windows of at least RATE_EPOCH seconds and RATE_MIN_SAMPLES probes (fewer at low
+    rates, so that a window never needs much more than RATE_EPOCH to fill). Once the replies of a
+    window are due, its reply ratio is compared with the smoothed ratio of the previous windows,
+    globally and per subnet:
+    - A ratio that falls by more than the loss threshold counts as loss and multiplies the rate by
+      the decrease factor (globally, or only for the subnets that lost replies).
+    - Otherwise the rate grows back by a fixed step per window, up to max_rate.
+    A reply that only arrives for a retransmitted probe (see recovered) proves that the first probe
+    was lost, so it counts as loss as well.
+
+    Engines that send at the same time (e.g., the host discovery and the SYN engine of a port scan)
+    each have a controller of their own, so that their reply ratios are not mixed, under a shared
+    RateBudget that caps their combined rate.
+    '''
+    def __init__(self, max_rate, min_rate=Constants.RATE_MIN, rtt=None, subnet_prefix=Constants.RTT_SUBNET_PREFIX, budget=None):
+        '''
+        Initializes the controller.
+
+        Args:
+            max_rate (float): Rate the controller starts at and never exceeds, in packets per second (e.g., the rate entered by the user).
+            min_rate (float): Rate the controller never backs off below. Equal to max_rate for a fixed rate.
+            rtt (RttEstimator): Tells how long to wait for the replies of a window. Windows are
+                evaluated one RATE_EPOCH after they end if None.
+            subnet_prefix (int): Prefix length of the subnets that back off separately.
+            budget (RateBudget): Combined rate shared with the controllers of the other engines of the scan. None if the engine sends alone.
+        '''
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rtt = rtt
+        self.subnet_mask = (0xFFFFFFFF << (32 - subnet_prefix)) & 0xFFFFFFFF
+        self.budget = budget
+
+        self._rate = max_rate
+        self._subnet_rates = {}    # subnet -> rate, only for the subnets that backed off
+        self._baseline = None    # Smoothed reply ratio of all subnets
+        self._subnet_baselines = {}    # subnet -> smoothed reply ratio
+        self._drop = 0.0
+        self._current_subnet = None
+
+        self._windows = []    # [start, end, {subnet: [sent, replied]}], oldest first; the last one is open
+        self._retransmitted = 0
+        self._recovered = 0
+        self._lock = threading.Lock()
+
+    def rate(self):
+        '''Returns the current send rate for the subnet being probed, in packets per second.'''
+        rate = min(self._rate, self._subnet_rates.get(self._current_subnet, self._rate))
+        return rate if self.budget is None else min(rate, self.budget.share(self))
+
+    def drop_estimate(self):
+        '''Returns the smoothed fraction of probes (or replies) estimated to be lost, between 0 and 1.'''
+        return self._drop
+
+    def stats(self):
+        '''Returns the current rate, drop estimate and number of backed-off subnets as a dictionary.'''
+        return {'rate': self.rate(), 'drop_estimate': self._drop, 'subnets_backed_off': len(self._subnet_rates)}
+
+    def sent(self, ip):
+        '''Records a probe to ip that is being sent now.'''
+        now = time.monotonic()
+        subnet = self._subnet(ip)
+        with self._lock:
+            self._current_subnet = subnet
+            if not self._windows or self._window_full(self._windows[-1], now):
+                if self._windows:
+                    self._windows[-1][1] = now
+                self._windows.append([now, None, {}])
+            self._windows[-1][2].setdefault(subnet, [0, 0])[0] += 1
+            self._evaluate_due_windows(now)
+        if self.budget is not None:
+            self.budget.sent(self, now)
+
+    def replied(self, ip, rtt):
+        '''Records a reply from ip to a probe sent rtt seconds ago.'''
+        sent_at = time.monotonic() - rtt
+        subnet = self._subnet(ip)
+        with self._lock:
+            for window in reversed(self._windows):
+                if window[0] <= sent_at:
+                    counts = window[2].get(subnet)
+                    if counts is not None:
+                        counts[1] += 1
+                    return
+
+    def retransmitted(self, ip):
+        '''Records that the probe to ip is resent because it was not answered.'''
+        with self._lock:
+            self._retransmitted += 1
+        if self.budget is not None:
+            self.budget.sent(self)
+
+    def recovered(self, ip):
+        '''Records that a retransmitted probe to ip was answered, i.e., that the first probe was lost.'''
+        with self._lock:
+            self._recovered += 1
+
+    def _subnet(self, ip):
+        '''Returns the network address of the subnet of ip, as an integer.'''
+        return int.from_bytes(socket.inet_aton(ip), 'big') & self.subnet_mask
+
+    def _window_full(self, window, now):
+        '''Returns True if the open window is long enough and holds enough probes to be evaluated.'''
+        samples = min(Constants.RATE_MIN_SAMPLES, self._rate * Constants.RATE_EPOCH)
+        return now - window[0] >= Constants.RATE_EPOCH and sum(sent for sent, _ in window[2].values()) >= samples
+
+    def _evaluate_due_windows(self, now):
+        '''Evaluates every closed window whose replies are due. Runs under the lock.'''
+        wait = self.rtt.timeout() if self.rtt is not None else Constants.RATE_EPOCH
+        while len(self._windows) > 1 and self._windows[0][1] + wait <= now:
+            self._evaluate(self._windows.pop(0)[2])
+
+    def _evaluate(self, counts):
+        '''Adjusts the global and per-subnet rates with the reply counts of one window.'''
+        sent = sum(subnet_sent for subnet_sent, _ in counts.values())
+        replied = sum(subnet_replied for _, subnet_replied in counts.values())
+        loss, self._baseline = self._compare(sent, replied, self._baseline)
+
+        # Replies that only came back for a resent probe are loss the ratios cannot see
+        if self._retransmitted >= Constants.RATE_MIN_SAMPLES:
+            loss = max(loss, self._recovered / self._retransmitted)
+            self._retransmitted = self._recovered = 0
+
+        self._drop += Constants.RATE_DROP_GAIN * (loss - self._drop)
+        backed_off = loss > Constants.RATE_LOSS_THRESHOLD
+        if backed_off:
+            self._rate = max(self.min_rate, self._rate * Constants.RATE_DECREASE)
+            logger.debug(f'Rate controller: {loss:.0%} loss, backing off to {self._rate:.0f} packets/s.',
+                         extra=event('rate_backoff', loss=round(loss, 3), rate=round(self._rate)))
+        else:
+            self._rate = self._increase(self._rate)
+
+        for subnet, (subnet_sent, subnet_replied) in counts.items():
+            if subnet_sent < Constants.RATE_MIN_SAMPLES:
+                continue
+            subnet_loss, self._subnet_baselines[subnet] = self._compare(subnet_sent, subnet_replied, self._subnet_baselines.get(subnet))
+            subnet_rate = self._subnet_rates.get(subnet)
+            if subnet_loss > Constants.RATE_LOSS_THRESHOLD:
+                if backed_off and subnet_rate is None:
+                    continue    # The decrease of the global rate already covers this subnet
+                self._subnet_rates[subnet] = max(self.min_rate, min(subnet_rate or self._rate, self._rate) * Constants.RATE_DECREASE)
+            elif subnet_rate is not None:
+                subnet_rate = self._increase(subnet_rate)
+                if subnet_rate >= self._rate:
+                    del self._subnet_rates[subnet]
+                else:
+                    self._subnet_rates[subnet] = subnet_rate
+
+    def _compare(self, sent, replied, baseline):
+        '''
+        Returns (loss, new baseline): the relative fall of the reply ratio below the smoothed baseline,
+        and the baseline updated with the ratio.
+
+        A fall counts only if the missing replies also exceed three standard deviations of the
+        expected count, so the random spread of small windows is not taken for loss. Lossy ratios
+        move the baseline slowly, so that sustained loss keeps being detected while a lasting change
+        of host density is still learned.
+        '''
+        ratio = replied / sent
+        if baseline is None:
+            return 0.0, ratio
+        expected = baseline * sent
+        missing = expected - replied
+        fall = missing / expected if expected else 0.0
+        loss = fall if missing > 3 * math.sqrt(expected) else 0.0
+        gain = Constants.RATE_BASELINE_GAIN if fall <= Constants.RATE_LOSS_THRESHOLD else Constants.RATE_BASELINE_GAIN / 4
+        return loss, baseline + gain * (ratio - baseline)
+
+    def _increase(self, rate):
+        '''Returns rate after one window without loss.'''
+        return min(rate + self.max_rate * Constants.RATE_INCREASE, self.max_rate)
+
+
+class RateBudget:
+    '''
+    Send rate shared by the RateController objects of engines that send at the same time.
+
+    The rate every engine actually sent at is measured over windows of RATE_EPOCH seconds. An
+    engine may send at what the others that are sending leave of the budget (an equal share for one
+    that only just started), and at least at an equal share with them. So an engine that waits for
+    work (e.g., the SYN engine for the first hosts) does not hold on to its share, and the combined
+    rate stays within the budget.
+    '''
+    def __init__(self, rate):
+        '''
+        Initializes the budget.
+
+        Args:
+            rate (float): Combined rate of the engines, in packets per second (e.g., the rate entered by the user).
+        '''
+        self.rate = rate
+        self._window_start = time.monotonic()
+        self._sent = {}    # controller -> packets sent in the current window
+        self._rates = {}    # controller -> rate measured over the previous window
+        self._lock = threading.Lock()
+
+    def share(self, controller):
+        '''Returns the rate the engine of controller may send at, in packets per second.'''
+        with self._lock:
+            others = [member for member in self._rates.keys() | self._sent.keys() if member is not controller]
+            equal = self.rate / (len(others) + 1)
+            return max(equal, self.rate - sum(self._rates.get(member, equal) for member in others))
+
+    def sent(self, controller, now=None):
+        '''Records a packet that the engine of controller is sending now.'''
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            elapsed = now - self._window_start
+            if elapsed >= Constants.RATE_EPOCH:
+                self._rates = {member: sent / elapsed for member, sent in self._sent.items()}
+                self._sent = {}
+                self._window_start = now
+            self._sent[controller] = self._sent.get(controller, 0) + 1
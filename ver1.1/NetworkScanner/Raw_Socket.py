@@ -0,0 +1,205 @@
+#Raw_Socket.py
+import ctypes
+import socket
+import struct
+from .Interval_Set import ip_to_int
+import logging
+
+logger = logging.getLogger(__name__)
+
+# TCP flag bits
+TCP_SYN = 0x02
+TCP_RST = 0x04
+TCP_ACK = 0x10
+
+# ICMP message types
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# Socket option that attaches a classic BPF program to a socket (Linux)
+SO_ATTACH_FILTER = 26
+# Classic BPF opcodes used by the receive filters
+BPF_LD_W_ABS = 0x20
+BPF_LDX_B_MSH = 0xB1
+BPF_LD_H_IND = 0x48
+BPF_LD_B_IND = 0x50
+BPF_JEQ_K = 0x15
+BPF_JGT_K = 0x25
+BPF_JGE_K = 0x35
+BPF_RET_K = 0x06
+
+class RawTcpSocket:
+    '''
+    Kernel raw socket pair that sends and receives pre-built TCP/IP packets as bytes.
+
+    Building and dissecting packets with Scapy costs hundreds of microseconds each, which caps a
+    SYN scan at a few thousand probes per second. This socket has the same send/recv/fileno/close
+    interface as a Scapy socket, so it can be used by PacketEngine, but it skips Scapy entirely.
+    '''
+    PROTOCOL = socket.IPPROTO_TCP
+
+    def __init__(self, destination_port=None):
+        '''
+        Opens the sending (IP_HDRINCL) and receiving (all inbound packets of PROTOCOL) raw sockets.
+
+        Args:
+            destination_port (int): If set, the kernel only queues TCP packets sent to this port
+                (i.e., the source port of our probes), so that the receiver is not woken up for
+                unrelated traffic or for the replies of other scans (e.g., other shards).
+        '''
+        self.outs = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+        self.ins = socket.socket(socket.AF_INET, socket.SOCK_RAW, self.PROTOCOL)
+        if destination_port is not None:
+            attach_filter(self.ins, [
+                (BPF_LDX_B_MSH, 0, 0, 0),    # x = IP header length
+                (BPF_LD_H_IND, 0, 0, 2),    # a = TCP destination port
+                (BPF_JEQ_K, 0, 1, destination_port),
+                (BPF_RET_K, 0, 0, 0xFFFF),    # Accept
+                (BPF_RET_K, 0, 0, 0)    # Drop
+            ])
+
+    def send(self, packet):
+        '''Sends a packet built by build_tcp_packet (or build_icmp_echo).'''
+        return self.outs.sendto(packet, (socket.inet_ntoa(packet[16:20]), 0))
+
+    def recv(self, x=65535):
+        '''Returns the next inbound packet as bytes, starting at the IP header.'''
+        return self.ins.recv(x)
+
+    def fileno(self):
+        return self.ins.fileno()
+
+    def close(self):
+        self.ins.close()
+        self.outs.close()
+
+class RawIcmpSocket(RawTcpSocket):
+    '''
+    Kernel raw socket pair that sends and receives pre-built ICMP/IP packets as bytes.
+
+    Unlike a Scapy layer 3 socket, the receiving socket only sees ICMP, so the replies of a ping
+    sweep are not delayed behind the dissection of unrelated traffic (e.g., a concurrent SYN scan).
+    '''
+    PROTOCOL = socket.IPPROTO_ICMP
+
+    def __init__(self, first_ip=None, last_ip=None):
+        '''
+        Opens the sending and receiving raw sockets.
+
+        Args:
+            first_ip (str): If set with last_ip, the kernel only queues echo replies whose source
+                address lies between first_ip and last_ip, i.e., in the scanned range.
+            last_ip (str): Last address of the scanned range.
+        '''
+        super().__init__()
+        if first_ip is not None and last_ip is not None:
+            attach_filter(self.ins, [
+                (BPF_LD_W_ABS, 0, 0, 12),    # a = source address
+                (BPF_JGE_K, 0, 5, ip_to_int(first_ip)),
+                (BPF_JGT_K, 4, 0, ip_to_int(last_ip)),
+                (BPF_LDX_B_MSH, 0, 0, 0),    # x = IP header length
+                (BPF_LD_B_IND, 0, 0, 0),    # a = ICMP type
+                (BPF_JEQ_K, 0, 1, ICMP_ECHO_REPLY),
+                (BPF_RET_K, 0, 0, 0xFFFF),    # Accept
+                (BPF_RET_K, 0, 0, 0)    # Drop
+            ])
+
+def attach_filter(sock, instructions):
+    '''
+    Attaches a classic BPF program to sock, so that the kernel drops unwanted packets before
+    they are queued. Without kernel support (e.g., not on Linux), every packet is still queued
+    and left to the match function of the scanner.
+
+    Args:
+        sock (socket.socket): Receiving raw socket. Offsets in the program start at the IP header.
+        instructions (list): (code, jt, jf, k) tuples.
+    '''
+    program = ctypes.create_string_buffer(b''.join(struct.pack('HBBI', *instruction) for instruction in instructions))
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, struct.pack('HL', len(instructions), ctypes.addressof(program)))
+    except OSError as e:
+        logger.debug(f'Could not attach the receive filter: {e}')
+
+def checksum(data):
+    '''Returns the Internet checksum (RFC 1071) of data.'''
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def build_tcp_packet(src, dst, sport, dport, seq, flags, ack=0, ttl=64, window=1024):
+    '''
+    Builds an IPv4/TCP packet without options or payload.
+
+    Args:
+        src (bytes): Packed source IPv4 address.
+        dst (bytes): Packed destination IPv4 address.
+        sport (int): Source port.
+        dport (int): Destination port.
+        seq (int): Sequence number.
+        flags (int): TCP flag bits (e.g., TCP_SYN).
+        ack (int): Acknowledgment number.
+        ttl (int): IP time to live.
+        window (int): Advertised window size.
+
+    Returns:
+        bytes: The packet, starting at the IP header. The kernel fills in the IP checksum.
+    '''
+    tcp_header = struct.pack('!HHIIBBHHH', sport, dport, seq, ack, 5 << 4, flags, window, 0, 0)
+    pseudo_header = src + dst + struct.pack('!BBH', 0, socket.IPPROTO_TCP, len(tcp_header))
+    tcp_header = tcp_header[:16] + struct.pack('!H', checksum(pseudo_header + tcp_header)) + tcp_header[18:]
+    ip_header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(tcp_header), 0, 0, ttl, socket.IPPROTO_TCP, 0, src, dst)
+    return ip_header + tcp_header
+
+def parse_tcp_packet(packet):
+    '''
+    Extracts the fields needed to validate a reply from an IPv4/TCP packet.
+
+    Returns:
+        tuple: (src, sport, dport, seq, ack, flags) with src as a dotted-quad string,
+            or None if the packet is not a complete IPv4/TCP packet.
+    '''
+    if len(packet) < 20 or packet[0] >> 4 != 4 or packet[9] != socket.IPPROTO_TCP:
+        return None
+    ihl = (packet[0] & 0x0F) * 4
+    if len(packet) < ihl + 14:
+        return None
+    sport, dport, seq, ack, flags = struct.unpack_from('!HHIIxB', packet, ihl)
+    return socket.inet_ntoa(packet[12:16]), sport, dport, seq, ack, flags
+
+def build_icmp_echo(dst, ident, seq, payload, ttl=64):
+    '''
+    Builds an IPv4/ICMP echo request.
+
+    Args:
+        dst (bytes): Packed destination IPv4 address.
+        ident (int): ICMP identifier.
+        seq (int): ICMP sequence number.
+        payload (bytes): Echo data.
+        ttl (int): IP time to live.
+
+    Returns:
+        bytes: The packet, starting at the IP header. The kernel fills in the source address and the IP checksum.
+    '''
+    icmp_message = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq) + payload
+    icmp_message = icmp_message[:2] + struct.pack('!H', checksum(icmp_message)) + icmp_message[4:]
+    ip_header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(icmp_message), 0, 0, ttl, socket.IPPROTO_ICMP, 0, bytes(4), dst)
+    return ip_header + icmp_message
+
+def parse_icmp_echo_reply(packet):
+    '''
+    Extracts the fields needed to validate an echo reply from an IPv4/ICMP packet.
+
+    Returns:
+        tuple: (src, ident, seq) with src as a dotted-quad string,
+            or None if the packet is not a complete IPv4/ICMP echo reply.
+    '''
+    if len(packet) < 20 or packet[0] >> 4 != 4 or packet[9] != socket.IPPROTO_ICMP:
+        return None
+    ihl = (packet[0] & 0x0F) * 4
+    if len(packet) < ihl + 8 or packet[ihl] != ICMP_ECHO_REPLY:
+        return None
+    ident, seq = struct.unpack_from('!HH', packet, ihl + 4)
+    return socket.inet_ntoa(packet[12:16]), ident, seq
\ No newline at end of file
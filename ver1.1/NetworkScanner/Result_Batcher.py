@@ -0,0 +1,91 @@
+#Result_Batcher.py
+import logging
+import threading
+import time
+from . import Constants
+
+logger = logging.getLogger(__name__)
+
+class ResultBatcher:
+    '''
+    Coalesces host records streamed by a scanner into batches.
+
+    A batch is handed to the callback when it holds max_records records or when its oldest record
+    has waited max_delay seconds, whichever comes first. The callback runs on a flusher thread of
+    its own, so a slow consumer (e.g., the DNS enrichment stage) never blocks the scanner. An
+    exception raised by the callback does not stop the flusher: later batches are still handed
+    out, and close re-raises the first one.
+    '''
+    def __init__(self, callback, max_records=Constants.BATCH_MAX_RECORDS, max_delay=Constants.BATCH_MAX_DELAY):
+        '''
+        Initializes the batcher and starts its flusher thread.
+
+        Args:
+            callback (function): Called with each batch (a list of host records).
+            max_records (int): Number of records that triggers a flush.
+            max_delay (float): Maximum time a record waits before it is flushed, in seconds.
+        '''
+        self.callback = callback
+        self.max_records = max_records
+        self.max_delay = max_delay
+
+        self._batch = []
+        self._first_added = None
+        self._closed = False
+        self._error = None    # First exception raised by the callback, re-raised by close
+        self._condition = threading.Condition()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def add(self, record):
+        '''Adds a record to the current batch.'''
+        with self._condition:
+            if not self._batch:
+                self._first_added = time.monotonic()
+            self._batch.append(record)
+            if len(self._batch) >= self.max_records or len(self._batch) == 1:
+                self._condition.notify()
+
+    def close(self):
+        '''
+        Flushes the remaining records and waits until the callback has handled every batch.
+
+        Raises:
+            Exception: The first exception raised by the callback, if any. It is raised once; closing again returns normally.
+        '''
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._flusher.join()
+
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _flush_loop(self):
+        '''Runs on the flusher thread: waits for a full or overdue batch and hands it to the callback.'''
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._batch) >= self.max_records:
+                        break
+                    if self._batch:
+                        remaining = self._first_added + self.max_delay - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+
+                batch, self._batch = self._batch, []
+                closed = self._closed
+
+            if batch:
+                try:
+                    self.callback(batch)
+                except Exception as e:
+                    logger.error(f'Handling a batch of {len(batch)} results failed: {e}')
+                    if self._error is None:
+                        self._error = e
+            if closed:
+                return
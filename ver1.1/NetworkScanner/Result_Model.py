@@ -0,0 +1,204 @@
+#Result_Model.py
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from array import array
+import socket
+import sys
+from . import Constants
+
+class ResultTableModel(QAbstractTableModel):
+    '''
+    Table model that holds scan results in compact column arrays and renders cells on demand.
+
+    IPv4 addresses are packed into 32-bit integers, MAC addresses into 6 bytes, host names are
+    interned, port lists are stored as arrays of 16-bit integers and detected services as tuples.
+    Rows are appended in batches with a single beginInsertRows/endInsertRows pair, so views stay
+    responsive with 500k+ rows. The early copy of a host (marked with Constants.KEY_PARTIAL) is
+    shown right away and its row is updated in place by the complete dictionary of the host.
+
+    The results of a delta scan (see set_delta) are shown with the change of every host and its
+    details as extra columns, so added, removed and changed hosts can be told apart.
+    '''
+    HEADERS = [Constants.TABLE_COLOUM_IP, Constants.TABLE_COLOUM_MAC, Constants.TABLE_COLOUM_HOST, Constants.TABLE_COLOUM_PORT, Constants.TABLE_COLOUM_SERVICE]
+    # Columns of the differences reported by a delta scan
+    DELTA_HEADERS = [Constants.TABLE_COLOUM_CHANGE] + HEADERS + [Constants.TABLE_COLOUM_DETAILS]
+    NO_MAC = bytes(6)    # All-zero MAC address stands for "not available"
+    NO_PORTS = array('H')    # Shared by every row without open ports
+    NO_SERVICES = ()    # Shared by every row without identified services
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.headers = self.HEADERS    # Columns shown, in order
+        self._reset_columns()
+
+    def _reset_columns(self):
+        '''Creates empty column arrays.'''
+        self._ips = array('I')
+        self._macs = bytearray()
+        self._hostnames = []
+        self._ports = []
+        self._services = []
+        self._changes = []    # Change and details of every row, only filled in for a delta scan
+        self._details = []
+        self._partial_rows = {}    # packed IP address -> row of the hosts shown from an early copy
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ips)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.cell_text(index.row(), index.column())
+
+    def append_hosts(self, host_list):
+        '''
+        Appends a batch of host dictionaries as new rows with one bulk insert. Hosts that replace the
+        early copy of a host update its row instead.
+
+        Args:
+            host_list (list): Host dictionaries, as produced by the scanners.
+        '''
+        new_hosts = []
+        for host_info in host_list:
+            ip = int.from_bytes(socket.inet_aton(host_info.get(Constants.TABLE_COLOUM_IP)), 'big')
+            row = self._partial_rows.get(ip) if host_info.get(Constants.KEY_PARTIAL) else self._partial_rows.pop(ip, None)
+            if row is None:
+                if host_info.get(Constants.KEY_PARTIAL):
+                    self._partial_rows[ip] = len(self._ips) + len(new_hosts)
+                new_hosts.append((ip, host_info))
+            elif row >= len(self._ips):
+                # The early copy is in this batch too
+                new_hosts[row - len(self._ips)] = (ip, host_info)
+            else:
+                self._set_row(row, host_info)
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.headers) - 1))
+        if not new_hosts:
+            return
+
+        first_row = len(self._ips)
+        self.beginInsertRows(QModelIndex(), first_row, first_row + len(new_hosts) - 1)
+        for ip, host_info in new_hosts:
+            self._ips.append(ip)
+            mac = host_info.get(Constants.TABLE_COLOUM_MAC)
+            self._macs += bytes.fromhex(mac.replace(':', '')) if mac else self.NO_MAC
+            self._hostnames.append(sys.intern(host_info.get(Constants.TABLE_COLOUM_HOST) or ''))
+            ports = host_info.get(Constants.TABLE_COLOUM_PORT)
+            self._ports.append(array('H', ports) if ports else self.NO_PORTS)
+            services = host_info.get(Constants.TABLE_COLOUM_SERVICE)
+            self._services.append(tuple(services) if services else self.NO_SERVICES)
+            if self.headers is self.DELTA_HEADERS:
+                self._changes.append(sys.intern(host_info.get(Constants.TABLE_COLOUM_CHANGE) or ''))
+                self._details.append(host_info.get(Constants.TABLE_COLOUM_DETAILS) or '')
+        self.endInsertRows()
+
+    def _set_row(self, row, host_info):
+        '''Replaces the MAC address, host name, ports, services (and change) of a row with those of a host dictionary.'''
+        mac = host_info.get(Constants.TABLE_COLOUM_MAC)
+        self._macs[row * 6:row * 6 + 6] = bytes.fromhex(mac.replace(':', '')) if mac else self.NO_MAC
+        self._hostnames[row] = sys.intern(host_info.get(Constants.TABLE_COLOUM_HOST) or '')
+        ports = host_info.get(Constants.TABLE_COLOUM_PORT)
+        self._ports[row] = array('H', ports) if ports else self.NO_PORTS
+        services = host_info.get(Constants.TABLE_COLOUM_SERVICE)
+        self._services[row] = tuple(services) if services else self.NO_SERVICES
+        if self.headers is self.DELTA_HEADERS:
+            self._changes[row] = sys.intern(host_info.get(Constants.TABLE_COLOUM_CHANGE) or '')
+            self._details[row] = host_info.get(Constants.TABLE_COLOUM_DETAILS) or ''
+
+    def clear(self):
+        '''Removes every row.'''
+        self.beginResetModel()
+        self._reset_columns()
+        self.endResetModel()
+
+    def set_delta(self, delta):
+        '''Removes every row, and shows the columns of a delta scan (DELTA_HEADERS) if delta is True, else HEADERS.'''
+        self.beginResetModel()
+        self.headers = self.DELTA_HEADERS if delta else self.HEADERS
+        self._reset_columns()
+        self.endResetModel()
+
+    def ip(self, row):
+        '''Returns the IP address of a row as a dotted-quad string.'''
+        return socket.inet_ntoa(self._ips[row].to_bytes(4, 'big'))
+
+    def mac(self, row):
+        '''Returns the MAC address of a row as a colon-separated string, or '' if it is not available.'''
+        mac = self._macs[row * 6:row * 6 + 6]
+        return '' if mac == self.NO_MAC else ':'.join(f'{byte:02x}' for byte in mac)
+
+    def hostname(self, row):
+        '''Returns the host name of a row.'''
+        return self._hostnames[row]
+
+    def ports(self, row):
+        '''Returns the open ports of a row as a list of integers.'''
+        return self._ports[row].tolist()
+
+    def services(self, row):
+        '''Returns the identified services of a row as a list of descriptions (e.g., '22/ssh SSH-2.0-OpenSSH_9.6').'''
+        return list(self._services[row])
+
+    def cell_text(self, row, column):
+        '''Renders the text of a cell.'''
+        header = self.headers[column]
+        if header == Constants.TABLE_COLOUM_IP:
+            return self.ip(row)
+        if header == Constants.TABLE_COLOUM_MAC:
+            return self.mac(row)
+        if header == Constants.TABLE_COLOUM_HOST:
+            return self.hostname(row)
+        if header == Constants.TABLE_COLOUM_PORT:
+            return ', '.join(map(str, self._ports[row]))
+        if header == Constants.TABLE_COLOUM_SERVICE:
+            return '; '.join(self._services[row])
+        if header == Constants.TABLE_COLOUM_CHANGE:
+            return self._changes[row]
+        if header == Constants.TABLE_COLOUM_DETAILS:
+            return self._details[row]
+        return None
+
+    def host_info(self, row):
+        '''Returns a row as a host dictionary, in the shape produced by the scanners.'''
+        host_info = {
+            Constants.TABLE_COLOUM_IP: self.ip(row),
+            Constants.TABLE_COLOUM_MAC: self.mac(row),
+            Constants.TABLE_COLOUM_HOST: self.hostname(row),
+            Constants.TABLE_COLOUM_PORT: self.ports(row),
+            Constants.TABLE_COLOUM_SERVICE: self.services(row)
+        }
+        if self.headers is self.DELTA_HEADERS:
+            host_info[Constants.TABLE_COLOUM_CHANGE] = self._changes[row]
+            host_info[Constants.TABLE_COLOUM_DETAILS] = self._details[row]
+        return host_info
+
+    def hosts(self):
+        '''
+        Returns an iterator over the current rows as host dictionaries.
+
+        It reads a snapshot of the column arrays: rows appended later are not included and clear()
+        does not affect it, so it can be consumed by another thread (e.g., an export worker).
+        '''
+        ips, macs, hostnames, ports, services = self._ips, self._macs, self._hostnames, self._ports, self._services
+        changes, details = (self._changes, self._details) if self.headers is self.DELTA_HEADERS else (None, None)
+        return (self._snapshot_host_info(ips, macs, hostnames, ports, services, changes, details, row) for row in range(len(ips)))
+
+    def _snapshot_host_info(self, ips, macs, hostnames, ports, services, changes, details, row):
+        mac = bytes(macs[row * 6:row * 6 + 6])
+        host_info = {
+            Constants.TABLE_COLOUM_IP: socket.inet_ntoa(ips[row].to_bytes(4, 'big')),
+            Constants.TABLE_COLOUM_MAC: '' if mac == self.NO_MAC else ':'.join(f'{byte:02x}' for byte in mac),
+            Constants.TABLE_COLOUM_HOST: hostnames[row],
+            Constants.TABLE_COLOUM_PORT: ports[row].tolist(),
+            Constants.TABLE_COLOUM_SERVICE: list(services[row])
+        }
+        if changes is not None:
+            host_info[Constants.TABLE_COLOUM_CHANGE] = changes[row]
+            host_info[Constants.TABLE_COLOUM_DETAILS] = details[row]
+        return host_info
@@ -0,0 +1,241 @@
+#Result_Writers.py
+import csv
+import json
+import os
+from . import Constants
+
+HEADERS = [Constants.TABLE_COLOUM_IP, Constants.TABLE_COLOUM_MAC, Constants.TABLE_COLOUM_HOST, Constants.TABLE_COLOUM_PORT]
+# Columns of a scan with service detection
+SERVICE_HEADERS = HEADERS + [Constants.TABLE_COLOUM_SERVICE]
+# Columns of the differences reported by a delta scan
+DELTA_HEADERS = [Constants.TABLE_COLOUM_CHANGE] + HEADERS + [Constants.TABLE_COLOUM_DETAILS]
+
+def cell_text(host_info, header):
+    '''Renders one entry of a host dictionary as text, with port lists separated by commas and services by semicolons.'''
+    value = host_info.get(header)
+    if isinstance(value, list):
+        return ('; ' if header == Constants.TABLE_COLOUM_SERVICE else ', ').join(map(str, value))
+    return value or ''
+
+def csv_cell(host_info, header):
+    '''Renders one entry of a host dictionary for CSV, with port lists as JSON arrays (e.g., [22, 80]) that parse back into lists.'''
+    value = host_info.get(header)
+    if isinstance(value, list):
+        return json.dumps(value)
+    return value or ''
+
+class NdjsonWriter:
+    '''Writes host dictionaries as newline-delimited JSON, one object per host.'''
+    def __init__(self, file, headers=HEADERS, close_file=False):
+        self.file = file
+        self.close_file = close_file
+
+    def write_batch(self, host_list):
+        '''Writes a batch of host dictionaries and flushes them to the file.'''
+        for host_info in host_list:
+            self.file.write(json.dumps(host_info, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if self.close_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+class CsvWriter:
+    '''Writes host dictionaries as CSV rows, preceded by a header row.'''
+    def __init__(self, file, headers=HEADERS, close_file=False):
+        self.file = file
+        self.headers = headers
+        self.close_file = close_file
+        self.writer = csv.writer(file)
+        self.writer.writerow(headers)
+
+    def write_batch(self, host_list):
+        '''Writes a batch of host dictionaries and flushes them to the file.'''
+        for host_info in host_list:
+            self.writer.writerow([csv_cell(host_info, header) for header in self.headers])
+        self.file.flush()
+
+    def close(self):
+        if self.close_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+class TableWriter:
+    '''Writes host dictionaries as a fixed-width text table, for reading in a terminal.'''
+    # Width of every column but the last one
+    WIDTHS = {Constants.TABLE_COLOUM_CHANGE: 8, Constants.TABLE_COLOUM_IP: 16, Constants.TABLE_COLOUM_MAC: 18,
+              Constants.TABLE_COLOUM_HOST: 40, Constants.TABLE_COLOUM_PORT: 24, Constants.TABLE_COLOUM_SERVICE: 48}
+    # Width of the columns not in WIDTHS
+    DEFAULT_WIDTH = 24
+
+    def __init__(self, file, headers=HEADERS, close_file=False):
+        self.file = file
+        self.headers = headers
+        self.close_file = close_file
+        self._write_row(headers)
+
+    def write_batch(self, host_list):
+        '''Writes a batch of host dictionaries and flushes them to the file.'''
+        for host_info in host_list:
+            self._write_row([cell_text(host_info, header) for header in self.headers])
+        self.file.flush()
+
+    def close(self):
+        if self.close_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def _write_row(self, row):
+        cells = [f'{cell:<{self.WIDTHS.get(header, self.DEFAULT_WIDTH)}}' for cell, header in zip(row[:-1], self.headers)]
+        self.file.write(' '.join(cells + [row[-1]]).rstrip() + '\n')
+
+class ColumnarWriter:
+    '''
+    Writes host dictionaries to an Apache Arrow IPC or Parquet file, one record batch (row group)
+    per batch of hosts. Ports are stored as lists of 16-bit integers, services as lists of strings,
+    every other column as strings.
+
+    Needs the optional pyarrow package; it is imported only when a columnar file is written.
+    '''
+    LIST_COLUMNS = (Constants.TABLE_COLOUM_PORT, Constants.TABLE_COLOUM_SERVICE)
+
+    def __init__(self, path, headers=HEADERS, format='parquet'):
+        '''
+        Args:
+            path (str): Path of the file to write.
+            headers (list): Columns to write, in order.
+            format (str): 'parquet' or 'arrow'.
+
+        Raises:
+            ValueError: If pyarrow is not installed.
+        '''
+        try:
+            import pyarrow
+        except ImportError:
+            raise ValueError(Constants.MSG_EXPORT_NEEDS_PYARROW)
+        self.pyarrow = pyarrow
+        self.headers = headers
+        types = {Constants.TABLE_COLOUM_PORT: pyarrow.list_(pyarrow.uint16()), Constants.TABLE_COLOUM_SERVICE: pyarrow.list_(pyarrow.string())}
+        self.schema = pyarrow.schema([(header, types.get(header, pyarrow.string())) for header in headers])
+        if format == 'parquet':
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            import pyarrow.ipc
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write_batch(self, host_list):
+        '''Writes a batch of host dictionaries as one record batch.'''
+        if not host_list:
+            return
+        columns = [[host_info.get(header) or [] if header in self.LIST_COLUMNS else cell_text(host_info, header) for host_info in host_list]
+                   for header in self.headers]
+        self.writer.write_batch(self.pyarrow.record_batch(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+def columnar_available():
+    '''Returns True if pyarrow is installed, so the Parquet and Arrow formats can be written.'''
+    import importlib.util
+    return importlib.util.find_spec('pyarrow') is not None
+
+# Output formats of the command-line interface
+WRITERS = {
+    'ndjson': NdjsonWriter,
+    'csv': CsvWriter,
+    'table': TableWriter,
+}
+
+# File formats of exports, by file name extension
+EXPORT_FORMATS = {
+    '.csv': 'csv',
+    '.csv.gz': 'csv.gz',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.ndjson.gz': 'ndjson.gz',
+    '.jsonl.gz': 'ndjson.gz',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+}
+
+def export_format(path):
+    '''
+    Returns the export format of a file name (e.g., 'csv.gz' for results.csv.gz).
+
+    Raises:
+        ValueError: If the extension is not one of EXPORT_FORMATS.
+    '''
+    name = os.path.basename(path).lower()
+    for extension in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if name.endswith(extension):
+            return EXPORT_FORMATS[extension]
+    raise ValueError(Constants.MSG_UNKNOWN_EXPORT_FORMAT.format(path=path))
+
+def open_writer(path, format=None, headers=HEADERS):
+    '''
+    Opens a writer that streams host dictionaries to a file; its close() closes the file.
+
+    Args:
+        path (str): Path of the file to write.
+        format (str): One of the values of EXPORT_FORMATS, or the table format. Taken from the extension of path if None.
+        headers (list): Columns to write, in order.
+
+    Raises:
+        ValueError: If the format is unknown, or needs pyarrow and it is not installed.
+    '''
+    format = format or export_format(path)
+    if format in ('parquet', 'arrow'):
+        return ColumnarWriter(path, headers, format)
+
+    name, compressed = format[:-3] if format.endswith('.gz') else format, format.endswith('.gz')
+    if name not in WRITERS:
+        raise ValueError(Constants.MSG_UNKNOWN_EXPORT_FORMAT.format(path=path))
+    if compressed:
+        import gzip
+        file = gzip.open(path, 'wt', encoding='utf-8', newline='')
+    else:
+        file = open(path, 'w', encoding='utf-8', newline='')
+    return WRITERS[name](file, headers=headers, close_file=True)
+
+def export_hosts(hosts, path, format=None, headers=HEADERS, total=None, progress=None, stop=None):
+    '''
+    Streams host dictionaries to a file in chunks, without holding them all in memory.
+
+    Args:
+        hosts (iterable): Host dictionaries, e.g. ResultTableModel.hosts().
+        path (str): Path of the file to write.
+        format (str): Export format, taken from the extension of path if None (see open_writer).
+        headers (list): Columns to write, in order.
+        total (int): Number of hosts, passed on to progress.
+        progress (function): Called with (hosts written, total) after every chunk.
+        stop (function): A function that returns True if the export should be stopped.
+
+    Returns:
+        int: The number of hosts written.
+    '''
+    writer = open_writer(path, format, headers)
+    written = 0
+    try:
+        chunk = []
+        for host_info in hosts:
+            chunk.append(host_info)
+            if len(chunk) == Constants.EXPORT_CHUNK_ROWS:
+                writer.write_batch(chunk)
+                written += len(chunk)
+                chunk = []
+                if progress is not None:
+                    progress(written, total)
+                if stop is not None and stop():
+                    return written
+        writer.write_batch(chunk)
+        written += len(chunk)
+        if progress is not None:
+            progress(written, total)
+    finally:
+        writer.close()
+    return written
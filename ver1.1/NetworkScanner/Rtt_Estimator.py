@@ -0,0 +1,92 @@
+#Rtt_Estimator.py
+import socket
+import threading
+from . import Constants
+
+class RttEstimator:
+    '''
+    Keeps smoothed round-trip time estimates per host, per subnet and globally, and derives probe
+    timeouts from them (Jacobson/Karels, as in RFC 6298).
+
+    One estimator is shared by the stages of a scan, so replies seen during discovery (ARP or ping)
+    seed the timeouts used by the port scan. A host without samples falls back to the estimate of
+    its subnet, then to the global estimate, then to the initial timeout of the timing template.
+    Every timeout is clamped between the floor and the ceiling of the template.
+    '''
+    ALPHA = 1 / 8    # Gain of the smoothed RTT
+    BETA = 1 / 4    # Gain of the RTT variation
+    K = 4    # Number of RTT variations added to the smoothed RTT
+
+    def __init__(self, template=Constants.DEFAULT_TIMING, min_timeout=None, max_timeout=None, subnet_prefix=Constants.RTT_SUBNET_PREFIX):
+        '''
+        Initializes the estimator.
+
+        Args:
+            template (str): Name of a timing template in Constants.TIMING_TEMPLATES.
+            min_timeout (float): Overrides the timeout floor of the template, in seconds.
+            max_timeout (float): Lowers the timeout ceiling of the template, in seconds (e.g., to the
+                timeout entered by the user).
+            subnet_prefix (int): Prefix length of the subnets that share an estimate.
+
+        Raises:
+            ValueError: If the template is unknown.
+        '''
+        if template not in Constants.TIMING_TEMPLATES:
+            raise ValueError(Constants.MSG_UNKNOWN_TIMING)
+        initial_timeout, template_min, template_max = Constants.TIMING_TEMPLATES[template]
+
+        self.max_timeout = template_max if max_timeout is None else min(max_timeout, template_max)
+        self.min_timeout = min(template_min if min_timeout is None else min_timeout, self.max_timeout)
+        self.initial_timeout = min(max(initial_timeout, self.min_timeout), self.max_timeout)
+        self.subnet_mask = (0xFFFFFFFF << (32 - subnet_prefix)) & 0xFFFFFFFF
+
+        self._hosts = {}    # ip -> [srtt, rttvar]
+        self._subnets = {}    # network address (int) -> [srtt, rttvar]
+        self._global = None
+        self._lock = threading.Lock()
+
+    def observe(self, ip, rtt):
+        '''
+        Feeds one RTT sample of ip into the host, subnet and global estimates.
+
+        Args:
+            ip (str): Address the reply came from.
+            rtt (float): Time between sending the probe and receiving its reply, in seconds.
+        '''
+        subnet = self._subnet(ip)
+        with self._lock:
+            self._hosts[ip] = self._update(self._hosts.get(ip), rtt)
+            self._subnets[subnet] = self._update(self._subnets.get(subnet), rtt)
+            self._global = self._update(self._global, rtt)
+
+    def timeout(self, ip=None):
+        '''
+        Returns the time to wait for a reply from ip, or for any reply if ip is None, in seconds.
+        '''
+        estimate = None
+        if ip is not None:
+            estimate = self._hosts.get(ip) or self._subnets.get(self._subnet(ip))
+        estimate = estimate or self._global
+        if estimate is None:
+            return self.initial_timeout
+
+        srtt, rttvar = estimate
+        return min(max(srtt + self.K * rttvar, self.min_timeout), self.max_timeout)
+
+    def srtt(self, ip=None):
+        '''Returns the smoothed RTT of ip (or the global one if ip is None), None without samples.'''
+        estimate = self._global if ip is None else self._hosts.get(ip)
+        return None if estimate is None else estimate[0]
+
+    def _subnet(self, ip):
+        '''Returns the network address of the subnet of ip, as an integer.'''
+        return int.from_bytes(socket.inet_aton(ip), 'big') & self.subnet_mask
+
+    def _update(self, estimate, rtt):
+        '''Returns the [srtt, rttvar] estimate updated with one sample.'''
+        if estimate is None:
+            return [rtt, rtt / 2]
+        srtt, rttvar = estimate
+        rttvar = (1 - self.BETA) * rttvar + self.BETA * abs(srtt - rtt)
+        srtt = (1 - self.ALPHA) * srtt + self.ALPHA * rtt
+        return [srtt, rttvar]
@@ -0,0 +1,235 @@
+#Scan_History.py
+import sqlite3
+import threading
+import time
+from . import Constants
+from .Interval_Set import IntervalSet, ip_to_int, int_to_ip
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id INTEGER PRIMARY KEY,
+    scan_type TEXT NOT NULL,
+    targets TEXT NOT NULL,
+    start_port INTEGER,
+    end_port INTEGER,
+    started REAL NOT NULL,
+    finished REAL,
+    status TEXT NOT NULL,
+    hosts INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS observations (
+    scan_id INTEGER NOT NULL REFERENCES scans (scan_id),
+    seen REAL NOT NULL,
+    ip INTEGER NOT NULL,
+    mac TEXT,
+    host TEXT,
+    port INTEGER
+);
+CREATE INDEX IF NOT EXISTS observations_ip ON observations (ip, seen);
+CREATE INDEX IF NOT EXISTS observations_mac ON observations (mac) WHERE mac IS NOT NULL;
+CREATE INDEX IF NOT EXISTS observations_port ON observations (port, seen) WHERE port IS NOT NULL;
+CREATE INDEX IF NOT EXISTS observations_scan ON observations (scan_id);
+'''
+
+class ScanHistory:
+    '''
+    Persistent store of every scan and of what it observed, in a local SQLite database.
+
+    The scans table holds one row per scan (type, targets, port range, timing, status). The
+    observations table holds one row per open port of a detected host, or a single row with a NULL
+    port for a host without open ports. IP addresses are stored as integers; ip, mac, port and
+    scan_id are indexed, so history queries stay fast with millions of observations.
+
+    The database runs in WAL mode, so the GUI can query it while a scan is writing to it, and the
+    results are written in one transaction per batch of the scan pipeline (see ResultBatcher).
+    '''
+    def __init__(self, path=Constants.HISTORY_DB_FILE):
+        '''
+        Opens (and if needed creates) the database.
+
+        Args:
+            path (str): Path of the database file.
+
+        Raises:
+            sqlite3.Error: If the database cannot be opened.
+        '''
+        self.path = path
+        # Used by the scan thread and by the flusher thread of its ResultBatcher, one at a time
+        self._connection = sqlite3.connect(path, timeout=Constants.HISTORY_BUSY_TIMEOUT, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(SCHEMA)
+
+    def begin_scan(self, scan_type, ip_range, start_port=None, end_port=None):
+        '''
+        Records the start of a scan.
+
+        Args:
+            scan_type (str): One of the Constants.SCAN_TYPE_* values.
+            ip_range (TargetRange): The scanned addresses.
+            start_port (int): First scanned port, None for host discovery scans.
+            end_port (int): Last scanned port.
+
+        Returns:
+            int: The id of the scan, for add_hosts and finish_scan.
+        '''
+        targets = ','.join(f'{int_to_ip(first)}-{int_to_ip(last)}' for first, last in ip_range.blocks)
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                'INSERT INTO scans (scan_type, targets, start_port, end_port, started, status) VALUES (?, ?, ?, ?, ?, ?)',
+                (scan_type, targets, start_port, end_port, time.time(), Constants.HISTORY_STATUS_RUNNING))
+        return cursor.lastrowid
+
+    def add_hosts(self, scan_id, host_list):
+        '''Records a batch of host dictionaries found by a scan, in one transaction.'''
+        seen = time.time()
+        rows = []
+        for host_info in host_list:
+            ip = ip_to_int(host_info[Constants.TABLE_COLOUM_IP])
+            mac = host_info.get(Constants.TABLE_COLOUM_MAC) or None
+            host = host_info.get(Constants.TABLE_COLOUM_HOST)
+            host = None if host in (None, '', Constants.UNKNOWN_HOST) else host
+            ports = host_info.get(Constants.TABLE_COLOUM_PORT) or [None]
+            rows.extend((scan_id, seen, ip, mac, host, port) for port in ports)
+
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT INTO observations (scan_id, seen, ip, mac, host, port) VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._connection.execute('UPDATE scans SET hosts = hosts + ? WHERE scan_id = ?', (len(host_list), scan_id))
+
+    def finish_scan(self, scan_id, status=Constants.HISTORY_STATUS_COMPLETED):
+        '''Records the end of a scan and its status (one of the Constants.HISTORY_STATUS_* values).'''
+        with self._lock, self._connection:
+            self._connection.execute('UPDATE scans SET finished = ?, status = ? WHERE scan_id = ?', (time.time(), status, scan_id))
+
+    def query(self, ip=None, mac=None, port=None, days=None, scan_id=None, limit=Constants.HISTORY_QUERY_LIMIT):
+        '''
+        Returns the hosts observed with the given properties, e.g. query(port=3389, days=30) for
+        the hosts that had port 3389 open in the last 30 days.
+
+        Args:
+            ip (str): Only this IP address.
+            mac (str): Only this MAC address.
+            port (int): Only hosts with this port open. Only this port is listed for them.
+            days (float): Only observations of the last days days.
+            scan_id (int): Only observations of this scan.
+            limit (int): Maximum number of hosts returned.
+
+        Returns:
+            list: A host dictionary for every matching host, in ascending IP order, with the
+                open ports observed and the time it was last seen (Constants.TABLE_COLOUM_LAST_SEEN).
+        '''
+        conditions, parameters = [], []
+        if ip:
+            conditions.append('ip = ?')
+            parameters.append(ip_to_int(ip))
+        if mac:
+            conditions.append('mac = ?')
+            parameters.append(mac.lower())
+        if port is not None:
+            conditions.append('port = ?')
+            parameters.append(int(port))
+        if days is not None:
+            conditions.append('seen >= ?')
+            parameters.append(time.time() - days * 86400)
+        if scan_id is not None:
+            conditions.append('scan_id = ?')
+            parameters.append(scan_id)
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+
+        with self._lock:
+            rows = self._connection.execute(
+                f'SELECT ip, MAX(mac), MAX(host), GROUP_CONCAT(DISTINCT port), MAX(seen) FROM observations {where} '
+                'GROUP BY ip ORDER BY ip LIMIT ?', parameters + [limit]).fetchall()
+
+        return [{
+            Constants.TABLE_COLOUM_IP: int_to_ip(ip),
+            Constants.TABLE_COLOUM_MAC: mac or '',
+            Constants.TABLE_COLOUM_HOST: host or Constants.UNKNOWN_HOST,
+            Constants.TABLE_COLOUM_PORT: sorted(int(port) for port in ports.split(',')) if ports else [],
+            Constants.TABLE_COLOUM_LAST_SEEN: seen
+        } for ip, mac, host, ports, seen in rows]
+
+    def latest_hosts(self, days=None, scan_types=None):
+        '''
+        Returns every host as it was seen by the most recent finished scan that found it.
+
+        Args:
+            days (float): Only hosts seen in the last days days.
+            scan_types (list): Only scans of these types (Constants.SCAN_TYPE_* values). Any type if None.
+
+        Returns:
+            dict: IP address -> host dictionary with the open ports found by that scan.
+        '''
+        conditions, parameters = ['s.status != ?'], [Constants.HISTORY_STATUS_RUNNING]
+        if days is not None:
+            conditions.append('o.seen >= ?')
+            parameters.append(time.time() - days * 86400)
+        if scan_types is not None:
+            conditions.append(f's.scan_type IN ({", ".join("?" * len(scan_types))})')
+            parameters.extend(scan_types)
+
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT o.ip, o.mac, o.host, o.port FROM observations o JOIN '
+                f'(SELECT o.ip, MAX(o.scan_id) AS scan_id FROM observations o JOIN scans s USING (scan_id) WHERE {" AND ".join(conditions)} GROUP BY o.ip) latest '
+                'ON o.ip = latest.ip AND o.scan_id = latest.scan_id', parameters).fetchall()
+
+        hosts = {}
+        for ip, mac, host, port in rows:
+            host_info = hosts.get(ip)
+            if host_info is None:
+                host_info = hosts[ip] = {
+                    Constants.TABLE_COLOUM_IP: int_to_ip(ip),
+                    Constants.TABLE_COLOUM_MAC: mac or '',
+                    Constants.TABLE_COLOUM_HOST: host or Constants.UNKNOWN_HOST,
+                    Constants.TABLE_COLOUM_PORT: []
+                }
+            if port is not None:
+                host_info[Constants.TABLE_COLOUM_PORT].append(port)
+        for host_info in hosts.values():
+            host_info[Constants.TABLE_COLOUM_PORT].sort()
+        return {host_info[Constants.TABLE_COLOUM_IP]: host_info for host_info in hosts.values()}
+
+    def count_scans(self, scan_types=None, ip_range=None):
+        '''
+        Returns the number of completed scans. Aborted and failed scans are not counted.
+
+        Args:
+            scan_types (list): Only scans of these types (Constants.SCAN_TYPE_* values). Any type if None.
+            ip_range (TargetRange): Only scans whose targets covered every address of ip_range. Any targets if None.
+        '''
+        query, parameters = 'SELECT targets FROM scans WHERE status = ?', [Constants.HISTORY_STATUS_COMPLETED]
+        if scan_types is not None:
+            query += f' AND scan_type IN ({", ".join("?" * len(scan_types))})'
+            parameters.extend(scan_types)
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        if ip_range is None:
+            return len(rows)
+        addresses = IntervalSet(ip_range.blocks)
+        return sum(1 for targets, in rows if not len(addresses.difference(IntervalSet.from_spec(targets))))
+
+    def scans(self, limit=Constants.HISTORY_QUERY_LIMIT):
+        '''Returns the most recent scans, newest first, as dictionaries keyed by the columns of the scans table.'''
+        with self._lock:
+            cursor = self._connection.execute('SELECT * FROM scans ORDER BY scan_id DESC LIMIT ?', (limit,))
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        '''Closes the database.'''
+        with self._lock:
+            self._connection.close()
+
+def open_history(path=Constants.HISTORY_DB_FILE):
+    '''Returns a ScanHistory for path, or None (after logging why) if the database cannot be opened.'''
+    try:
+        return ScanHistory(path)
+    except sqlite3.Error as e:
+        logger.warning(f'Scan history disabled, could not open {path}: {e}')
+        return None
@@ -0,0 +1,253 @@
+#Scan_Metrics.py
+from bisect import bisect_left
+from contextlib import contextmanager
+import json
+import threading
+import time
+from . import Constants
+
+# Descriptions of the metrics, for the Prometheus text format
+HELP = {
+    Constants.METRIC_PROBES_SENT: 'Probes sent.',
+    Constants.METRIC_REPLIES: 'Probes answered.',
+    Constants.METRIC_DUPLICATES: 'Replies to probes that were already answered.',
+    Constants.METRIC_RETRIES: 'Probes sent again after their timeout.',
+    Constants.METRIC_TIMEOUTS: 'Probes that got no answer.',
+    Constants.METRIC_RTT: 'Round-trip time of the answered probes, in seconds.',
+    Constants.METRIC_PHASE_DURATION: 'Duration of the phases of a scan, in seconds.',
+    Constants.METRIC_DNS_LOOKUPS: 'Reverse DNS lookups started.',
+    Constants.METRIC_DNS_CACHE_HITS: 'Host names answered from the DNS cache.',
+    Constants.METRIC_DNS_FAILURES: 'Host names left unresolved (no PTR record, or past the deadline).',
+    Constants.METRIC_RESULT_BATCHES: 'Batches of results handed out.',
+    Constants.METRIC_RESULT_HOSTS: 'Hosts handed out.',
+}
+
+class Counter:
+    '''
+    A count that only goes up.
+
+    Updates are not locked: every metric is written by one thread at a time (e.g., the sender or
+    the receiver of an engine), so an increment costs one attribute update on the hot path.
+    '''
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        '''Adds amount to the count.'''
+        self.value += amount
+
+class Histogram:
+    '''
+    Distribution of observed values over fixed buckets, with their count and sum.
+
+    Like Counter, updates are not locked; an observation is a binary search over the bucket bounds.
+    '''
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        '''
+        Args:
+            bounds (tuple): Ascending upper bounds of the buckets. Larger values fall into an extra last bucket.
+        '''
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        '''Records one value.'''
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        '''Records the duration of the with block, in seconds.'''
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def quantile(self, q):
+        '''Returns an estimate of the q quantile (0 to 1), interpolated within its bucket, or 0 if nothing was observed.'''
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+class ProbeMetrics:
+    '''The probe counters and the RTT histogram of one engine in a registry, looked up once per scan.'''
+    __slots__ = ('sent', 'replies', 'duplicates', 'retries', 'timeouts', 'rtt', '_sent_before', '_replies_before')
+
+    def __init__(self, registry, engine):
+        '''
+        Args:
+            registry (MetricsRegistry): The registry the metrics are written into.
+            engine (str): Value of the engine label, e.g. 'arp'.
+        '''
+        self.sent = registry.counter(Constants.METRIC_PROBES_SENT, engine=engine)
+        self.replies = registry.counter(Constants.METRIC_REPLIES, engine=engine)
+        self.duplicates = registry.counter(Constants.METRIC_DUPLICATES, engine=engine)
+        self.retries = registry.counter(Constants.METRIC_RETRIES, engine=engine)
+        self.timeouts = registry.counter(Constants.METRIC_TIMEOUTS, engine=engine)
+        self.rtt = registry.histogram(Constants.METRIC_RTT, buckets=Constants.METRIC_RTT_BUCKETS, engine=engine)
+        self._sent_before = self.sent.value
+        self._replies_before = self.replies.value
+
+    def finish(self):
+        '''Counts the probes sent since these metrics were looked up and never answered as timed out.'''
+        unanswered = (self.sent.value - self._sent_before) - (self.replies.value - self._replies_before)
+        self.timeouts.inc(max(0, unanswered))
+        self._sent_before = self.sent.value
+        self._replies_before = self.replies.value
+
+class MetricsRegistry:
+    '''
+    Counters and histograms of a scan, identified by their name and labels.
+
+    The engines, the enrichment stages and the GUI look their metrics up once (counter, histogram)
+    and then update them directly, so the hot path does not touch the registry. The registry can
+    be read at any time (the GUI shows a summary while the scan runs), merged with the snapshot of
+    another process (the shards of a ShardPool), and dumped as JSON or in the Prometheus text format.
+    '''
+    def __init__(self):
+        self._counters = {}    # (name, labels) -> Counter
+        self._histograms = {}    # (name, labels) -> Histogram
+        self._lock = threading.Lock()    # Guards the creation of metrics, not their updates
+
+    def counter(self, name, **labels):
+        '''Returns the counter of name with the given labels, created at 0 if needed.'''
+        key = (name, tuple(sorted(labels.items())))
+        counter = self._counters.get(key)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(key, Counter())
+        return counter
+
+    def histogram(self, name, buckets=Constants.METRIC_DURATION_BUCKETS, **labels):
+        '''Returns the histogram of name with the given labels, created empty with buckets if needed.'''
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def reset(self):
+        '''Zeroes every metric, e.g. at the start of a scan. Metrics looked up before keep working.'''
+        with self._lock:
+            for counter in list(self._counters.values()):
+                counter.value = 0
+            for histogram in list(self._histograms.values()):
+                histogram.counts = [0] * len(histogram.counts)
+                histogram.sum = 0.0
+                histogram.count = 0
+
+    def total(self, name):
+        '''Returns the sum of the counters of name over all their labels.'''
+        return sum(counter.value for (counter_name, _), counter in list(self._counters.items()) if counter_name == name)
+
+    def quantile(self, name, q):
+        '''Returns an estimate of the q quantile of the histograms of name, merged over all their labels.'''
+        merged = None
+        for (histogram_name, _), histogram in list(self._histograms.items()):
+            if histogram_name != name:
+                continue
+            if merged is None:
+                merged = Histogram(histogram.bounds)
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.count += histogram.count
+        return merged.quantile(q) if merged is not None else 0.0
+
+    def snapshot(self):
+        '''
+        Returns the values of every metric as plain data, which can be pickled (see merge).
+
+        Returns:
+            dict: 'counters' is a list of (name, labels, value), 'histograms' a list of
+                (name, labels, bounds, counts, sum, count); labels are tuples of (label, value) pairs.
+        '''
+        return {
+            'counters': [(name, labels, counter.value) for (name, labels), counter in list(self._counters.items())],
+            'histograms': [(name, labels, histogram.bounds, list(histogram.counts), histogram.sum, histogram.count)
+                           for (name, labels), histogram in list(self._histograms.items())],
+        }
+
+    def merge(self, snapshot):
+        '''Adds the values of a snapshot, e.g. of the registry of a worker process, to this registry.'''
+        for name, labels, value in snapshot['counters']:
+            self.counter(name, **dict(labels)).inc(value)
+        for name, labels, bounds, counts, total, count in snapshot['histograms']:
+            histogram = self.histogram(name, buckets=bounds, **dict(labels))
+            histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+            histogram.sum += total
+            histogram.count += count
+
+    def to_json(self):
+        '''Returns the metrics as a JSON document, with cumulative buckets and p50/p90/p99 estimates for the histograms.'''
+        document = {}
+        for name, labels, value in sorted(self.snapshot()['counters']):
+            document.setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        for name, labels, bounds, counts, total, count in sorted(self.snapshot()['histograms']):
+            histogram = self._histograms[name, labels]
+            document.setdefault(name, []).append({
+                'labels': dict(labels), 'count': count, 'sum': total,
+                'buckets': dict(zip([str(bound) for bound in bounds] + ['+Inf'], cumulative(counts))),
+                'p50': histogram.quantile(0.5), 'p90': histogram.quantile(0.9), 'p99': histogram.quantile(0.99),
+            })
+        return json.dumps(document, indent=2)
+
+    def to_prometheus(self):
+        '''Returns the metrics in the Prometheus text exposition format.'''
+        lines = []
+        snapshot = self.snapshot()
+        for kind, metrics in (('counter', sorted(snapshot['counters'])), ('histogram', sorted(snapshot['histograms']))):
+            described = set()
+            for name, labels, *values in metrics:
+                full_name = Constants.METRICS_PREFIX + name
+                if name not in described:
+                    described.add(name)
+                    lines.append(f'# HELP {full_name} {HELP.get(name, name)}')
+                    lines.append(f'# TYPE {full_name} {kind}')
+                if kind == 'counter':
+                    lines.append(f'{full_name}{label_text(labels)} {values[0]}')
+                    continue
+                bounds, counts, total, count = values
+                for bound, running in zip([str(bound) for bound in bounds] + ['+Inf'], cumulative(counts)):
+                    lines.append(f'{full_name}_bucket{label_text(labels + (("le", bound),))} {running}')
+                lines.append(f'{full_name}_sum{label_text(labels)} {total}')
+                lines.append(f'{full_name}_count{label_text(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        '''Writes the metrics to path: in the Prometheus text format for a .prom or .txt file, as JSON otherwise.'''
+        text = self.to_prometheus() if path.lower().endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+def cumulative(counts):
+    '''Returns the running totals of the bucket counts.'''
+    totals, running = [], 0
+    for count in counts:
+        running += count
+        totals.append(running)
+    return totals
+
+def label_text(labels):
+    '''Renders (label, value) pairs as a Prometheus label set, e.g. {engine="arp"}.'''
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{label}="{value}"' for label, value in labels) + '}'
+
+# Registry of the scan running in this process, read by the GUI and dumped at scan end
+shared_metrics = MetricsRegistry()
@@ -0,0 +1,263 @@
+#Scan_Runner.py
+from .Result_Batcher import ResultBatcher
+from .Rtt_Estimator import RttEstimator
+from .Rate_Controller import RateController, RateBudget
+from .Port_Spec import PortSpec
+from .Scan_Metrics import shared_metrics
+from .Logging_Config import event
+from . import Constants
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class ScanRunner:
+    '''
+    Runs a scan of the given type and streams its results.
+
+    It has no GUI dependencies, so it is shared by ScanThread and the command-line interface.
+    Scanner modules are imported only when their scan type is run, so Scapy is loaded only if a
+    raw-packet engine is actually selected.
+    '''
+    def __init__(self, Current_ScanType, ip_range, timeout, ttl, interval, packet_size, start_port, end_port, rate, stop,
+                 timing=Constants.DEFAULT_TIMING, min_timeout=None, adaptive_rate=True, workers=1, randomize=False, seed=None,
+                 ports=None, delta=False, rtt=None, rate_controller=None, port_spec=None, metrics=None, retries=Constants.PROBE_RETRIES):
+        '''
+        Initializes the scan runner with parameters for the scan.
+
+        Args:
+            Current_ScanType (str): One of the Constants.SCAN_TYPE_* values.
+            stop (function): A function that returns True if the scanning process should be stopped.
+            timing (str): Timing template of the adaptive timeouts (see Constants.TIMING_TEMPLATES).
+            min_timeout (float): Overrides the timeout floor of the timing template, in seconds.
+            adaptive_rate (bool): Backs the send rate off below rate when probes are lost, instead of
+                sending at a fixed rate.
+            workers (int): Number of worker processes the scan is split across (see ShardPool). 1 scans in this process.
+            randomize (bool): Probes the targets in a pseudorandom order instead of ascending, so that
+                consecutive probes are spread over the whole range.
+            seed (int): Seed of the randomized order, for a reproducible scan. A random seed if None.
+            ports (function): Returns the ports to probe on a host, given its IP address, or None for all
+                the ports of port_spec. The ports of port_spec on every host if None.
+            delta (bool): Rescans with the previous results in the history as a prior, and hands out the
+                differences instead of the hosts (see DeltaScan). Needs a history in run.
+            rtt (RttEstimator): RTT estimates to start from, shared with another runner of the same scan
+                (e.g., the phases of a delta scan). New ones from the timing template if None.
+            rate_controller (RateController): Send rate controller shared with another runner of the same scan. A new one if None.
+                The host discovery of a port scan has a controller of its own, under the same RateBudget.
+            port_spec (PortSpec): The ports to scan, probed in their frequency order. The range from start_port to end_port if None.
+            metrics (MetricsRegistry): Registry the engines and the stages of the scan write their metrics into. shared_metrics if None.
+            retries (int): Maximum number of times the ARP, fast ping and port scans send an unanswered probe again (see ProbeScheduler).
+            The remaining arguments are the validated inputs returned by UserInputHandler.validate_all.
+        '''
+        self.Current_ScanType = Current_ScanType
+        self.ip_range = ip_range.shuffled(seed) if randomize else ip_range
+        self.timeout = timeout
+        self.ttl = ttl
+        self.interval = interval
+        self.packet_size = packet_size
+        self.start_port = start_port
+        self.end_port = end_port
+        self.rate = rate
+        self.timing = timing
+        self.min_timeout = min_timeout
+        self.adaptive_rate = adaptive_rate
+        self.workers = workers
+        self.ports = ports
+        self.delta = delta
+        self.delta_scan = None    # Set by run for a delta scan
+        self.delta_summary = None    # Set by run for a delta scan: number of added, removed and changed hosts
+        self.rtt = rtt
+        self.rate_controller = rate_controller    # Set by scan_stream if None, shared by the packet engines of the scan
+        self.metrics = metrics or shared_metrics
+        self.retries = retries
+
+        self.port_spec = port_spec
+        if port_spec is None and start_port is not None:
+            self.port_spec = PortSpec.from_range(start_port, end_port)
+
+        self.stop = stop
+
+    def host_ports(self, ip):
+        '''Returns the ports to probe on ip, in probe order.'''
+        ports = self.ports(ip) if self.ports is not None else None
+        return self.port_spec if ports is None else ports
+
+    def scan_stream(self):
+        '''
+        Starts the scan.
+
+        Returns:
+            generator: Yields a dictionary for every detected host, as soon as it is found.
+
+        Raises:
+            ValueError: If the scan type or the timing template is unknown.
+        '''
+        if self.workers > 1:
+            from .Shard_Pool import ShardPool
+            return ShardPool(runner_args=self.runner_args(), workers=self.workers, stop=self.stop, metrics=self.metrics).scan_stream()
+
+        # RTT estimates shared by the stages of the scan, capped at the timeout entered by the user
+        if self.rtt is None:
+            self.rtt = RttEstimator(template=self.timing, min_timeout=self.min_timeout, max_timeout=self.timeout)
+        if self.rate_controller is None:
+            self.rate_controller = RateController(max_rate=self.rate, min_rate=Constants.RATE_MIN if self.adaptive_rate else self.rate, rtt=self.rtt)
+        rtt, rate_controller = self.rtt, self.rate_controller
+
+        # Perform ARP scan
+        if self.Current_ScanType == Constants.SCAN_TYPE_ARP:
+            from .Arp_Scanner import ArpScanner
+            ARP_ScannerInstance = ArpScanner(ip_range=self.ip_range, stop=self.stop, rate=self.rate, rtt=rtt, rate_controller=rate_controller, metrics=self.metrics, retries=self.retries)
+            return ARP_ScannerInstance.arp_scanner_stream()
+
+        # Perform Ping sweep
+        if self.Current_ScanType == Constants.SCAN_TYPE_PING:
+            from .Ping_Sweeper import PingSweeper
+            PING_SweeperInstance = PingSweeper(timeout=self.timeout, ttl=self.ttl, interval=self.interval, packet_size=self.packet_size, ip_range=self.ip_range, stop=self.stop, rtt=rtt, metrics=self.metrics)
+            return PING_SweeperInstance.ping_sweeper_stream()
+
+        # Perform fast (stateless) Ping sweep
+        if self.Current_ScanType == Constants.SCAN_TYPE_PING_FAST:
+            from .Ping_Sweeper import PingSweeper
+            PING_SweeperInstance = PingSweeper(timeout=self.timeout, ttl=self.ttl, interval=self.interval, packet_size=self.packet_size, ip_range=self.ip_range, stop=self.stop, rate=self.rate, rtt=rtt, rate_controller=rate_controller, metrics=self.metrics, retries=self.retries)
+            return PING_SweeperInstance.fast_ping_sweeper_stream()
+
+        # Perform Port scan, probing the ports of every host as soon as the ping sweep has found it
+        if self.Current_ScanType == Constants.SCAN_TYPE_PORT:
+            from .Ping_Sweeper import PingSweeper
+            from .Port_Scanner import PortScanner
+            from .Host_Pipeline import HostPipeline
+
+            # Both engines send at the same time: each adapts to its own replies, within the rate entered by the user together
+            if rate_controller.budget is None:
+                rate_controller.budget = RateBudget(self.rate)
+            discovery_controller = RateController(max_rate=self.rate, min_rate=rate_controller.min_rate, rtt=rtt, budget=rate_controller.budget)
+
+            def discover(stop):
+                PING_SweeperInstance = PingSweeper(timeout=self.timeout, ttl=self.ttl, interval=self.interval, packet_size=self.packet_size, ip_range=self.ip_range, stop=stop, rate=self.rate, rtt=rtt, rate_controller=discovery_controller, metrics=self.metrics, retries=self.retries)
+                return PING_SweeperInstance.fast_ping_sweeper_stream()
+            active_hosts = HostPipeline(discover=discover, stop=self.stop)
+
+            PORT_ScannerInstance = PortScanner(start_port=self.start_port, end_port=self.end_port, active_hosts=active_hosts, stop=self.stop, rate=self.rate, rtt=rtt, rate_controller=rate_controller, ports=self.host_ports, metrics=self.metrics, retries=self.retries)
+            return PORT_ScannerInstance.port_scanner_stream()
+
+        # Perform unprivileged Port scan with TCP connect()
+        if self.Current_ScanType == Constants.SCAN_TYPE_CONNECT:
+            from .Connect_Scanner import ConnectScanner
+            CONNECT_ScannerInstance = ConnectScanner(start_port=self.start_port, end_port=self.end_port, ip_range=self.ip_range, stop=self.stop, ports=self.host_ports, metrics=self.metrics)
+            return CONNECT_ScannerInstance.connect_scanner_stream()
+
+        raise ValueError(Constants.MSG_UNKNOWN_SCAN_TYPE)
+
+    def runner_args(self):
+        '''Returns the keyword arguments that recreate this runner in a single process, without stop.'''
+        return {
+            Constants.KEY_CURRENT_SCAN_TYPE: self.Current_ScanType,
+            Constants.KEY_IP_RANGE: self.ip_range,
+            Constants.KEY_TIMEOUT: self.timeout,
+            Constants.KEY_TTL: self.ttl,
+            Constants.KEY_INTERVAL: self.interval,
+            Constants.KEY_PACKET_SIZE: self.packet_size,
+            Constants.KEY_START_PORT: self.start_port,
+            Constants.KEY_END_PORT: self.end_port,
+            Constants.KEY_PORT_SPEC: self.port_spec,
+            Constants.KEY_RATE: self.rate,
+            'timing': self.timing,
+            'min_timeout': self.min_timeout,
+            'adaptive_rate': self.adaptive_rate,
+            'retries': self.retries
+        }
+
+    def run(self, callback, resolver=None, history=None, detector=None, metrics_file=None):
+        '''
+        Runs the scan to completion, handing the results to callback in coalesced batches.
+
+        Args:
+            callback (function): Called with each batch of host dictionaries, on a thread of its own. A
+                SYN port scan also hands out early copies of hosts, marked with Constants.KEY_PARTIAL,
+                that the complete dictionary of the same host replaces in a later batch (see PortScanner).
+            resolver (DnsResolver): Resolves the host names of every batch before it is handed out.
+                None leaves them unresolved.
+            history (ScanHistory): Records the scan, and every batch in one transaction. None keeps no history.
+                A delta scan reads its prior from it, and hands the differences to callback in one batch at the end.
+            detector (ServiceDetector): Identifies the services of the open ports of every batch before it is
+                handed out. None does not probe them.
+            metrics_file (str): The metrics of the scan are written to this file at scan end, in the
+                Prometheus text format for a .prom or .txt file, as JSON otherwise (see MetricsRegistry.dump).
+                None does not write them.
+
+        Raises:
+            ValueError: If a delta scan is run without a history.
+        '''
+        # Metrics are per scan
+        self.metrics.reset()
+        phase_duration = lambda phase: self.metrics.histogram(Constants.METRIC_PHASE_DURATION, phase=phase)
+        batches = self.metrics.counter(Constants.METRIC_RESULT_BATCHES)
+        hosts = self.metrics.counter(Constants.METRIC_RESULT_HOSTS)
+        scan_started = time.perf_counter()
+
+        if self.port_spec is not None and self.port_spec.udp:
+            logger.warning(f'UDP ports are not scanned, no scan type probes UDP: {", ".join(map(str, self.port_spec.udp))}')
+
+        delta_scan = None
+        if self.delta:
+            if history is None:
+                raise ValueError(Constants.MSG_DELTA_NEEDS_HISTORY)
+            from .Delta_Scan import DeltaScan
+            # The prior is read before this scan is recorded
+            delta_scan = self.delta_scan = DeltaScan(runner_args=self.runner_args(), history=history, stop=self.stop, metrics=self.metrics)
+
+        scan_id = None
+        if history is not None:
+            scan_id = history.begin_scan(self.Current_ScanType, self.ip_range, self.start_port, self.end_port)
+
+        found = []
+        def handle_batch(batch):
+            # Early copies of hosts are only shown: their services, history and delta are those of the complete ones
+            complete = [host_info for host_info in batch if not host_info.get(Constants.KEY_PARTIAL)]
+            batches.inc()
+            hosts.inc(len(complete))
+            if resolver is not None:
+                with phase_duration('dns').time():
+                    resolver.resolve_hosts(batch, stop=self.stop)
+            if detector is not None:
+                with phase_duration('services').time():
+                    detector.detect_hosts(complete, stop=self.stop)
+            if history is not None:
+                with phase_duration('history').time():
+                    history.add_hosts(scan_id, complete)
+            if delta_scan is not None:
+                found.extend(complete)
+            else:
+                with phase_duration('callback').time():
+                    callback(batch)
+
+        status = Constants.HISTORY_STATUS_FAILED
+        batcher = ResultBatcher(callback=handle_batch)
+        try:
+            for host_info in (delta_scan.scan_stream() if delta_scan is not None else self.scan_stream()):
+                batcher.add(host_info)
+            # A batch that could not be handled (e.g., a history write error) fails the scan
+            batcher.close()
+            status = Constants.HISTORY_STATUS_ABORTED if self.stop() else Constants.HISTORY_STATUS_COMPLETED
+        finally:
+            batcher.close()
+            if history is not None:
+                history.finish_scan(scan_id, status)
+            if self.rate_controller is not None:
+                stats = self.rate_controller.stats()
+                logger.info(f'Send rate at scan end: {stats["rate"]:.0f} packets/s, drop estimate {stats["drop_estimate"]:.1%}.',
+                            extra=event('send_rate', rate=round(stats['rate']), drop_estimate=round(stats['drop_estimate'], 4)))
+            phase_duration('scan').observe(time.perf_counter() - scan_started)
+            if metrics_file is not None:
+                try:
+                    self.metrics.dump(metrics_file)
+                except OSError as e:
+                    logger.warning(f'Could not write the metrics to {metrics_file}: {e}')
+
+        if delta_scan is not None:
+            changes = delta_scan.diff(found, complete=status == Constants.HISTORY_STATUS_COMPLETED)
+            self.delta_summary = {change: sum(1 for host_info in changes if host_info[Constants.TABLE_COLOUM_CHANGE] == change)
+                                  for change in (Constants.DELTA_ADDED, Constants.DELTA_REMOVED, Constants.DELTA_CHANGED)}
+            logger.info(f'Delta scan: {self.delta_summary}, {delta_scan.stats()}.', extra=event('delta_summary', **self.delta_summary))
+            if changes:
+                callback(changes)
@@ -1,18 +1,24 @@
 #Scan_Thread.py
 from PyQt5.QtCore import QThread, pyqtSignal
-from NetworkScanner.Arp_Scanner import ArpScanner
-from NetworkScanner.Ping_Sweeper import PingSweeper
-from NetworkScanner.Port_Scanner import PortScanner
-from . import Constants
+import sqlite3
+from NetworkScanner.Scan_Runner import ScanRunner
+from NetworkScanner.Dns_Resolver import shared_resolver
+from NetworkScanner.Service_Detector import shared_detector
+from NetworkScanner.Scan_History import open_history
+from NetworkScanner.Stop_Signal import StopSignal
+from NetworkScanner import Constants
+import logging
+
+logger = logging.getLogger(__name__)
 
 class ScanThread(QThread):
     '''A QThread subclass designed to perform network scans in a separate thread to prevent GUI freezing.'''
 
     # Signals to communicate with the main thread
-    result_signal = pyqtSignal(object)    # Emit scan results
+    result_signal = pyqtSignal(object)    # Emit batches of scan results as they arrive
     error_signal = pyqtSignal(str)        # Emit error messages
 
-    def __init__(self, Current_ScanType, ip_range, timeout, ttl, interval, packet_size, start_port, end_port):
+    def __init__(self, Current_ScanType, ip_range, timeout, ttl, interval, packet_size, start_port, end_port, rate, port_spec=None, timing=Constants.DEFAULT_TIMING, delta=False, detect_services=False):
         '''Initializes the scan thread with parameters for the scan.'''
         super(ScanThread, self).__init__()
         # Scan parameters
@@ -24,42 +30,35 @@ class ScanThread(QThread):
         self.packet_size = packet_size
         self.start_port = start_port
         self.end_port = end_port
+        self.rate = rate
+        self.port_spec = port_spec
+        self.timing = timing
+        self.delta = delta
+        self.detect_services = detect_services
+        # Number of added, removed and changed hosts, set at the end of a delta scan
+        self.delta_summary = None
 
-        # Flag to indicate when the thread should stop
-        self.stop_thread_flag = False
+        # Set when the thread should stop; wakes up the scan stages blocked on the network at once
+        self.stop_signal = StopSignal()
         # Flag to indicate if an error occurred during the scan
         self.error = False
 
     def run(self):
         '''Performs the network scan based on the initialized parameters.'''
         try:
-            # Lambda function to check if the thread has been asked to stop
-            stop_arg = lambda: self.stop_thread_flag
-
-            scan_result = None
-
-            # Perform ARP scan
-            if self.Current_ScanType == Constants.SCAN_TYPE_ARP:
-                ARP_ScannerInstance = ArpScanner(ip_range=self.ip_range, stop=stop_arg)
-                scan_result = ARP_ScannerInstance.arp_scanner()
-
-            # Perform Ping sweep
-            elif self.Current_ScanType == Constants.SCAN_TYPE_PING:        
-                PING_SweeperInstance = PingSweeper(timeout=self.timeout, ttl=self.ttl, interval=self.interval, packet_size=self.packet_size, ip_range=self.ip_range, stop=stop_arg)
-                scan_result = PING_SweeperInstance.ping_sweeper()
-
-            # Perform Port scan
-            elif self.Current_ScanType == Constants.SCAN_TYPE_PORT:
-                PING_SweeperInstance = PingSweeper(timeout=self.timeout, ttl=self.ttl, interval=self.interval, packet_size=self.packet_size, ip_range=self.ip_range, stop=stop_arg)
-                active_hosts = PING_SweeperInstance.ping_sweeper()
-
-                PORT_ScannerInstance = PortScanner(start_port=self.start_port, end_port=self.end_port, active_hosts=active_hosts, stop=stop_arg)
-                scan_result = PORT_ScannerInstance.port_scanner()
-            
-            # If scan_result is not None, emit the results
-            if scan_result is not None:
-                self.result_signal.emit(scan_result)
-                print(scan_result)
+            ScanRunnerInstance = ScanRunner(Current_ScanType=self.Current_ScanType, ip_range=self.ip_range, timeout=self.timeout, ttl=self.ttl, interval=self.interval,
+                                            packet_size=self.packet_size, start_port=self.start_port, end_port=self.end_port, rate=self.rate, stop=self.stop_signal,
+                                            port_spec=self.port_spec, timing=self.timing, delta=self.delta)
+            # Emit the results in coalesced batches as they arrive, with their host names (and services) resolved, and record them in the history.
+            # The metrics of the scan are shown live by the GUI and written to a file at scan end
+            history = open_history()
+            try:
+                ScanRunnerInstance.run(callback=self.result_signal.emit, resolver=shared_resolver, history=history,
+                                          detector=shared_detector if self.detect_services else None, metrics_file=Constants.METRICS_FILE)
+            finally:
+                if history is not None:
+                    history.close()
+            self.delta_summary = ScanRunnerInstance.delta_summary
 
         except ValueError as e:
             # Emit error signal and set error flag
@@ -67,6 +66,19 @@ class ScanThread(QThread):
             self.error = True
             return
 
+        except PermissionError as e:
+            logger.error(f'Scan failed, missing privileges: {e}')
+            self.error_signal.emit(Constants.MSG_SCAN_NEEDS_PRIVILEGES)
+            self.error = True
+            return
+
+        except (OSError, sqlite3.Error) as e:
+            # E.g., a socket that cannot be opened, or a history database that cannot be written
+            logger.error(f'Scan failed: {e}')
+            self.error_signal.emit(Constants.MSG_SCAN_FAILED.format(error=e))
+            self.error = True
+            return
+
     def stop(self):
-        '''Sets the flag to stop the running thread.'''
-        self.stop_thread_flag = True
\ No newline at end of file
+        '''Asks the running thread to stop. Returns at once; the thread publishes the results found so far and finishes shortly after.'''
+        self.stop_signal.set()
\ No newline at end of file
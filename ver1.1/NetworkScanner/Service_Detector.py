@@ -0,0 +1,250 @@
+#Service_Detector.py
+from collections import OrderedDict
+import asyncio
+import ssl
+import threading
+import time
+from . import Constants
+from .Stop_Signal import on_stop
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ServiceDetector:
+    '''
+    Identifies the services listening on open ports, as an optional enrichment stage after a port scan.
+
+    Each open port gets a new TCP connection on an asyncio event loop: a banner sent by the server
+    first is read (SSH, SMTP, FTP, ...), otherwise an HTTP HEAD request is sent, and if that gets
+    no HTTP answer, a TLS handshake (ClientHello) is tried, followed by HEAD over TLS. Ports that
+    usually speak TLS (Constants.SERVICE_TLS_PORTS) try TLS first.
+
+    Connections are bounded globally and per host, every read has a strict deadline, and so does
+    the whole detection of a port. Results are memoized per (ip, port) with a TTL, so rescans do
+    not probe the services they already identified.
+    '''
+    # Request sent to servers that stay silent after the connection
+    HTTP_HEAD = 'HEAD / HTTP/1.0\r\nHost: {host}\r\nUser-Agent: NetworkScanner\r\nConnection: close\r\n\r\n'
+    SMTP_EHLO = b'EHLO networkscanner\r\n'
+    # Bytes read from a banner or a response
+    READ_SIZE = 1024
+
+    def __init__(self, max_connections=Constants.SERVICE_MAX_CONNECTIONS, max_host_connections=Constants.SERVICE_MAX_HOST_CONNECTIONS,
+                 connect_timeout=Constants.SERVICE_CONNECT_TIMEOUT, banner_wait=Constants.SERVICE_BANNER_WAIT,
+                 read_timeout=Constants.SERVICE_READ_TIMEOUT, deadline=Constants.SERVICE_DEADLINE,
+                 positive_ttl=Constants.SERVICE_POSITIVE_TTL, negative_ttl=Constants.SERVICE_NEGATIVE_TTL, cache_size=Constants.SERVICE_CACHE_SIZE):
+        '''
+        Initializes the detector.
+
+        Args:
+            max_connections (int): Maximum number of ports probed at the same time.
+            max_host_connections (int): Maximum number of ports of a single host probed at the same time.
+            connect_timeout (float): Time to wait for each connection (and TLS handshake), in seconds.
+            banner_wait (float): Time to wait for a banner sent by the server first, in seconds.
+            read_timeout (float): Time to wait for the answer to a probe, in seconds.
+            deadline (float): Time after which the detection of a port is abandoned, in seconds.
+            positive_ttl (float): Time an identified service stays memoized, in seconds.
+            negative_ttl (float): Time a port whose service was not identified stays memoized, in seconds.
+            cache_size (int): Maximum number of memoized (ip, port) pairs. The least recently used are evicted first.
+        '''
+        self.max_connections = max_connections
+        self.max_host_connections = max_host_connections
+        self.connect_timeout = connect_timeout
+        self.banner_wait = banner_wait
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()    # (ip, port) -> (service or None, expiry time)
+        self._lock = threading.Lock()
+
+    def detect(self, pairs, stop=None):
+        '''
+        Identifies the services of the given open ports.
+
+        Args:
+            pairs (iterable): (ip, port) pairs of open ports.
+            stop (function): A function that returns True if the detection should be stopped.
+
+        Returns:
+            dict: Maps every pair to a description such as '22/ssh SSH-2.0-OpenSSH_9.6', or to None
+                if the service could not be identified before the deadline.
+        '''
+        services = {}
+        missing = []
+        with self._lock:
+            now = time.monotonic()
+            for pair in pairs:
+                cached = self._cache.get(pair)
+                if cached is not None and cached[1] > now:
+                    self._cache.move_to_end(pair)
+                    services[pair] = cached[0]
+                elif pair not in services:
+                    services[pair] = None
+                    missing.append(pair)
+
+        if missing:
+            loop = asyncio.new_event_loop()
+            try:
+                found = loop.run_until_complete(self._detect_all(missing, stop))
+            finally:
+                loop.close()
+            services.update(found)
+
+            with self._lock:
+                now = time.monotonic()
+                for pair, service in found.items():
+                    self._cache[pair] = (service, now + (self.positive_ttl if service else self.negative_ttl))
+                    self._cache.move_to_end(pair)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return services
+
+    def detect_hosts(self, host_list, stop=None):
+        '''
+        Fills in the services (Constants.TABLE_COLOUM_SERVICE) of every host dictionary in host_list,
+        one entry per identified open port, in port order.
+
+        Returns:
+            list: host_list, updated in place.
+        '''
+        pairs = [(host_info[Constants.TABLE_COLOUM_IP], port) for host_info in host_list for port in host_info.get(Constants.TABLE_COLOUM_PORT) or ()]
+        services = self.detect(pairs, stop) if pairs else {}
+        for host_info in host_list:
+            ip = host_info[Constants.TABLE_COLOUM_IP]
+            host_info[Constants.TABLE_COLOUM_SERVICE] = [services[ip, port] for port in host_info.get(Constants.TABLE_COLOUM_PORT) or ()
+                                                        if services.get((ip, port))]
+        return host_list
+
+    def clear(self):
+        '''Empties the memo.'''
+        with self._lock:
+            self._cache.clear()
+
+    async def _detect_all(self, pairs, stop):
+        '''Probes every pair with the global and per-host caps, and returns {pair: service or None} for the pairs that were probed.'''
+        found = {}
+        connections = asyncio.Semaphore(self.max_connections)
+        host_semaphores = {}
+
+        async def detect_one(ip, port):
+            semaphore = host_semaphores.get(ip)
+            if semaphore is None:
+                semaphore = host_semaphores[ip] = asyncio.Semaphore(self.max_host_connections)
+            async with semaphore, connections:    # A port waiting for its host holds no global slot
+                if stop is not None and stop():
+                    return
+                try:
+                    found[ip, port] = await asyncio.wait_for(self._identify(ip, port), self.deadline)
+                except asyncio.TimeoutError:
+                    found[ip, port] = None
+
+        # A stop request cancels the probes in flight; the ports they were identifying are left out
+        loop = asyncio.get_running_loop()
+        probes = asyncio.gather(*(detect_one(ip, port) for ip, port in pairs))
+        unregister = on_stop(stop, lambda: loop.call_soon_threadsafe(probes.cancel))
+        try:
+            await probes
+        except asyncio.CancelledError:
+            pass
+        finally:
+            unregister()
+        logger.debug(f'Services of {len(found)} ports probed, {sum(1 for service in found.values() if service)} identified.')
+        return found
+
+    async def _identify(self, ip, port):
+        '''Runs the probes of one port in turn, and returns the first description found, or None.'''
+        probes = [self._plain_probe, self._tls_probe]
+        if port in Constants.SERVICE_TLS_PORTS:
+            probes.reverse()
+        for probe in probes:
+            try:
+                service = await probe(ip, port)
+            except (OSError, ssl.SSLError, asyncio.TimeoutError, EOFError):
+                service = None
+            if service:
+                return f'{port}/{service}'
+        return None
+
+    async def _plain_probe(self, ip, port):
+        '''Reads the banner of a server that speaks first, else sends an HTTP HEAD request.'''
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), self.connect_timeout)
+        try:
+            banner = await self._read(reader, self.banner_wait)
+            if banner:
+                return await self._classify_banner(banner, reader, writer)
+            return await self._http_probe(ip, reader, writer, 'http')
+        finally:
+            await self._close(writer)
+
+    async def _tls_probe(self, ip, port):
+        '''Sends a TLS ClientHello and, if the handshake succeeds, an HTTP HEAD request over TLS.'''
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE    # Only the protocol is identified, the certificate is not trusted
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port, ssl=context, server_hostname=None,
+                                                                        ssl_handshake_timeout=self.connect_timeout),
+                                                self.connect_timeout * 2)
+        try:
+            version = writer.get_extra_info('ssl_object').version()
+            https = await self._http_probe(ip, reader, writer, 'https')
+            return f'{https} ({version})' if https else f'tls {version}'
+        finally:
+            await self._close(writer)
+
+    async def _http_probe(self, ip, reader, writer, name):
+        '''Sends HEAD / and returns '<name> <status> <server>' for an HTTP answer, else None.'''
+        writer.write(self.HTTP_HEAD.format(host=ip).encode())
+        await writer.drain()
+        response = await self._read(reader, self.read_timeout)
+        if not response.startswith(b'HTTP/'):
+            return None
+
+        lines = response.decode('latin-1').split('\r\n')
+        status = lines[0].split(' ', 1)[1] if ' ' in lines[0] else ''
+        server = next((line.split(':', 1)[1].strip() for line in lines[1:] if line.lower().startswith('server:')), '')
+        return ' '.join(part for part in (name, printable(status), printable(server)) if part)
+
+    async def _classify_banner(self, banner, reader, writer):
+        '''Names the service of a banner sent by the server first.'''
+        first_line = printable(banner.split(b'\n', 1)[0].decode('latin-1'))
+        if banner.startswith(b'SSH-'):
+            return f'ssh {first_line}'
+        if banner.startswith(b'220'):
+            # SMTP and FTP both greet with 220; only an SMTP server accepts EHLO
+            writer.write(self.SMTP_EHLO)
+            await writer.drain()
+            answer = await self._read(reader, self.read_timeout)
+            name = 'smtp' if answer.startswith(b'250') else 'ftp' if b'FTP' in banner.upper() else 'banner'
+            return f'{name} {first_line}'
+        if banner.startswith(b'+OK'):
+            return f'pop3 {first_line}'
+        if banner.startswith(b'* OK'):
+            return f'imap {first_line}'
+        return f'banner {first_line}'
+
+    async def _read(self, reader, timeout):
+        '''Returns what the server sends within timeout (up to READ_SIZE bytes), b'' if it sends nothing.'''
+        try:
+            return await asyncio.wait_for(reader.read(self.READ_SIZE), timeout)
+        except asyncio.TimeoutError:
+            return b''
+
+    async def _close(self, writer):
+        '''Closes a connection without waiting longer than the read timeout for the peer.'''
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), self.read_timeout)
+        except (OSError, ssl.SSLError, asyncio.TimeoutError):
+            pass
+
+def printable(text):
+    '''Returns text with control characters dropped, stripped and cut to Constants.SERVICE_BANNER_LENGTH characters.'''
+    text = ''.join(character for character in text if character.isprintable()).strip()
+    return text[:Constants.SERVICE_BANNER_LENGTH]
+
+# Detector shared by all scans, so that its memo survives from one scan to the next
+shared_detector = ServiceDetector()
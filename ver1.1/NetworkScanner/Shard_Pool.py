@@ -0,0 +1,200 @@
+#Shard_Pool.py
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from .Result_Batcher import ResultBatcher
+from .Host_Record import HostRecord
+from .Scan_Metrics import shared_metrics
+from .Logging_Config import event
+from .Stop_Signal import StopSignal, on_stop
+from . import Constants
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ShardPool:
+    '''
+    Runs one scan as several shards in worker processes, so that packet building and dissection
+    are spread over CPU cores instead of sharing one interpreter lock.
+
+    The target range is split into contiguous slices (of the shuffled order for a randomized scan), and for connect scans of fewer targets
+    than workers, the ports are split as well. SYN port scans are only split by target: every shard discovers the hosts of its
+    slice with a ping sweep, which shards of the same slice would repeat. Every worker runs its shard with a ScanRunner of its
+    own (and therefore its own sockets, RTT estimates and rate controller, at its share of the rate)
+    and streams batches of results back over a multiprocessing queue. The parent merges them,
+    joining the port lists of hosts whose ports were split across shards. A stop request is
+    propagated to every worker through a shared event. The metrics of every shard are added to
+    the registry of the parent when the shard ends.
+    '''
+    # How often (in seconds) the parent wakes up to check the stop callback and the workers
+    POLL_INTERVAL = 0.05
+    # Time (in seconds) a worker is given to say goodbye after the end of the scan before it is terminated
+    JOIN_TIMEOUT = 5
+
+    def __init__(self, runner_args, workers, stop, metrics=None):
+        '''
+        Initializes the pool.
+
+        Args:
+            runner_args (dict): Keyword arguments of the ScanRunner of the whole scan, without stop.
+            workers (int): Maximum number of worker processes.
+            stop (function): A function that returns True if the scanning process should be stopped.
+            metrics (MetricsRegistry): Registry the metrics of every shard are added to when it ends. shared_metrics if None.
+        '''
+        self.runner_args = runner_args
+        self.workers = workers
+        self.metrics = metrics or shared_metrics
+
+        self.stop = stop
+
+    def shards(self):
+        '''
+        Partitions the scan into the keyword arguments of one ScanRunner per worker.
+
+        Returns:
+            list: A dictionary of ScanRunner keyword arguments for every shard.
+        '''
+        args = self.runner_args
+        ip_range = args[Constants.KEY_IP_RANGE]
+        target_shards = max(1, min(self.workers, len(ip_range)))
+
+        # Ports are dealt out in probe order, so every shard starts with its share of the most frequently open ones
+        port_spec = args.get(Constants.KEY_PORT_SPEC)
+        port_specs = [port_spec]
+        if port_spec is not None and args[Constants.KEY_CURRENT_SCAN_TYPE] != Constants.SCAN_TYPE_PORT:
+            port_specs = port_spec.split(self.workers // target_shards)
+
+        rate = args[Constants.KEY_RATE] / (target_shards * len(port_specs))
+        shards = []
+        for index in range(target_shards):
+            for part in port_specs:
+                start_port, end_port = part.bounds() if part is not None else (args[Constants.KEY_START_PORT], args[Constants.KEY_END_PORT])
+                shards.append(dict(args, **{Constants.KEY_IP_RANGE: ip_range.shard(index, target_shards), Constants.KEY_START_PORT: start_port,
+                                            Constants.KEY_END_PORT: end_port, Constants.KEY_PORT_SPEC: part, Constants.KEY_RATE: rate}))
+        return shards
+
+    def scan_stream(self):
+        '''
+        Starts a worker process for every shard and merges their results.
+
+        Yields:
+            dict: Information about a detected host, as soon as every shard that scans it has reported it.
+
+        Raises:
+            Exception: The first error raised by a worker, once every worker has stopped.
+        '''
+        shards = self.shards()
+        port_shards = len({id(shard[Constants.KEY_PORT_SPEC]) for shard in shards})    # Shared by the shards of every target slice
+        logger.info(f'Scan split into {len(shards)} shards.', extra=event('scan_split', shards=len(shards), workers=self.workers))
+
+        # Spawned rather than forked, so that workers do not inherit the threads of the GUI
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        abort = context.Event()
+        processes = [context.Process(target=run_shard, args=(index, shard, results, abort), daemon=True) for index, shard in enumerate(shards)]
+        for process in processes:
+            process.start()
+        # A StopSignal reaches the workers at once, any other stop function at the next poll
+        unregister = on_stop(self.stop, abort.set)
+
+        partial_hosts = {}    # ip -> merged HostRecord, for hosts whose ports are split across shards
+        reports = {}    # ip -> number of shards that have reported the host
+        running = set(range(len(processes)))
+        errors = []
+        try:
+            while running:
+                if self.stop():
+                    abort.set()
+
+                try:
+                    kind, index, payload = results.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    # A worker that crashed (e.g., was killed) never says goodbye, so it is not waited for
+                    for index in [index for index in running if processes[index].exitcode]:
+                        logger.error(f'Scan shard {index} exited with code {processes[index].exitcode}.')
+                        running.discard(index)
+                    continue
+
+                if kind == 'hosts':
+                    for host_info in payload:
+                        if port_shards == 1:
+                            yield host_info
+                            continue
+                        ip = host_info[Constants.TABLE_COLOUM_IP]
+                        merged = merge_host(partial_hosts.get(ip), host_info)
+                        reports[ip] = reports.get(ip, 0) + 1
+                        if reports[ip] < port_shards:
+                            partial_hosts[ip] = merged
+                        else:
+                            partial_hosts.pop(ip, None)
+                            del reports[ip]
+                            yield merged.to_host_info()
+                elif kind == 'metrics':
+                    self.metrics.merge(payload)
+                elif kind == 'error':
+                    errors.append(payload)
+                    abort.set()
+                elif kind == 'done':
+                    running.discard(index)
+
+            # Hosts that were not reported by every port shard (e.g., after a stop request)
+            yield from (record.to_host_info() for record in partial_hosts.values())
+        finally:
+            unregister()
+            abort.set()
+            # Keep draining the queue until the workers have said goodbye, so that none blocks on a full pipe.
+            # A worker that has said goodbye has sent everything, so it is not waited for while it exits
+            deadline = time.monotonic() + self.JOIN_TIMEOUT
+            while any(processes[index].is_alive() for index in running) and time.monotonic() < deadline:
+                try:
+                    kind, index, payload = results.get(timeout=self.POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                if kind == 'metrics':
+                    self.metrics.merge(payload)
+                elif kind == 'done':
+                    running.discard(index)
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+            results.close()
+
+        if errors:
+            raise errors[0]
+
+def run_shard(index, runner_args, results, abort):
+    '''
+    Runs one shard in a worker process and puts its results into the results queue.
+
+    Messages are (kind, index, payload) tuples: ('hosts', index, list of host dictionaries),
+    ('error', index, exception), ('metrics', index, snapshot of the metrics of the shard) and,
+    last, ('done', index, None).
+    '''
+    from .Scan_Runner import ScanRunner
+
+    # Ctrl-C reaches the whole process group; the parent decides how to stop and sets abort
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The engines of the shard wait on a StopSignal, which a helper thread sets once abort is
+    stop = StopSignal()
+    threading.Thread(target=lambda: abort.wait() and stop.set(), daemon=True).start()
+    try:
+        runner = ScanRunner(stop=stop, **runner_args)
+        batcher = ResultBatcher(callback=lambda batch: results.put(('hosts', index, batch)))
+        try:
+            for host_info in runner.scan_stream():
+                batcher.add(host_info)
+        finally:
+            batcher.close()
+    except Exception as e:
+        results.put(('error', index, e))
+    finally:
+        results.put(('metrics', index, shared_metrics.snapshot()))
+        results.put(('done', index, None))
+
+def merge_host(record, other):
+    '''Returns the HostRecord of record with the open ports of other, a host dictionary of the same host from another port shard, added to it.'''
+    other = HostRecord.from_host_info(other)
+    return other if record is None else record | other
@@ -0,0 +1,122 @@
+#Stop_Signal.py
+import socket
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StopSignal:
+    '''
+    Stop request shared by every stage of a scan, which wakes up the stages blocked in a receive
+    window, a pacing delay or an event loop as soon as it is set, instead of at their next poll.
+
+    It is callable like the stop functions the scanners take (stop() returns True once it is set),
+    so it can be passed wherever one is expected. Blocked stages wait on it in one of three ways:
+    wait (a threading event), fileno (a socket that becomes readable, for select) or add_callback
+    (e.g., to cancel an asyncio task from another thread).
+    '''
+    def __init__(self, parent=None):
+        '''
+        Args:
+            parent (function): Stop function this signal follows: a parent StopSignal sets it at once,
+                any other function is only checked by stop() and is_set.
+        '''
+        self.parent = parent
+        self._event = threading.Event()
+        # Reentrant, as set may run in a signal handler that interrupted add_callback on the same thread
+        self._lock = threading.RLock()
+        self._callbacks = []
+        self._reader, self._writer = socket.socketpair()
+        self._reader.setblocking(False)
+        self._writer.setblocking(False)
+        if isinstance(parent, StopSignal):
+            parent.add_callback(self.set)
+
+    def __call__(self):
+        '''Returns True once the stop has been requested.'''
+        if self._event.is_set():
+            return True
+        if self.parent is not None and self.parent():
+            self.set()
+            return True
+        return False
+
+    is_set = __call__
+
+    def set(self):
+        '''Requests the stop: sets the event, makes the wakeup socket readable and runs the callbacks, on this thread.'''
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        try:
+            self._writer.send(b'\0')
+        except OSError:
+            pass    # Closed, or already readable
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                # E.g., the event loop of a stage finished meanwhile
+                logger.debug(f'Stop callback failed: {e}')
+
+    def wait(self, timeout=None):
+        '''Waits until the stop is requested or timeout seconds have passed, and returns True if it was requested.'''
+        return self._event.wait(timeout) or self()
+
+    def fileno(self):
+        '''Returns a file descriptor that becomes readable (and stays so) once the stop is requested, for select.'''
+        return self._reader.fileno()
+
+    def add_callback(self, callback):
+        '''
+        Calls callback once the stop is requested, on the thread that requests it, or right away if it already was.
+
+        Returns:
+            function: Unregisters the callback, e.g. once the stage it wakes up has ended.
+        '''
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def close(self):
+        '''Closes the wakeup socket.'''
+        self._reader.close()
+        self._writer.close()
+
+    def _remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+def wait_for_stop(stop, timeout):
+    '''
+    Waits timeout seconds, or less if stop is a StopSignal that is set meanwhile.
+
+    Returns:
+        bool: True if the stop has been requested.
+    '''
+    if isinstance(stop, StopSignal):
+        return stop.wait(timeout)
+    time.sleep(timeout)
+    return stop()
+
+def on_stop(stop, callback):
+    '''
+    Calls callback once stop, if it is a StopSignal, is set. Other stop functions have to be polled.
+
+    Returns:
+        function: Unregisters the callback.
+    '''
+    if isinstance(stop, StopSignal):
+        return stop.add_callback(callback)
+    return lambda: None
+
+def wakeup_sockets(stop):
+    '''Returns the objects to add to a select call so that it returns once stop is requested: [stop] for a StopSignal, [] otherwise.'''
+    return [stop] if isinstance(stop, StopSignal) else []
@@ -0,0 +1,194 @@
+#Target_Range.py
+import bisect
+import ipaddress
+import random
+from .Interval_Set import IntervalSet, ip_to_int, int_to_ip
+
+class TargetRange:
+    '''
+    Lazy, constant-memory sequence of IPv4 target addresses.
+
+    The addresses are described by sorted blocks of (first, last) integers and are generated on
+    demand, so a /8 costs the same memory as a single host. A range supports len(), indexing,
+    slicing and membership tests, and can be split into shards for worker processes.
+
+    A shuffled range visits the same addresses in a pseudorandom order: a seeded Feistel network
+    permutes the index space, and cycle-walking keeps it a bijection on [0, len). Consecutive
+    probes are therefore spread over the whole range instead of hammering one subnet at a time,
+    and the order is reproducible for a given seed.
+    '''
+    FEISTEL_ROUNDS = 4
+
+    def __init__(self, blocks, seed=None, start=0, stop=None):
+        '''
+        Initializes the range.
+
+        Args:
+            blocks (list): Sorted, non-overlapping (first, last) pairs of integer addresses, inclusive.
+            seed (int): Seed of the pseudorandom order. None keeps the ascending order.
+            start (int): First index of the slice of the (possibly shuffled) index space.
+            stop (int): End index of the slice, None for the end of the range.
+        '''
+        self.blocks = [(first, last) for first, last in blocks]
+        self.seed = seed
+
+        # Index of the first address of every block
+        self._offsets = []
+        total = 0
+        for first, last in self.blocks:
+            self._offsets.append(total)
+            total += last - first + 1
+        self._total = total
+
+        self.start = max(0, min(start, total))
+        self.stop = total if stop is None else max(self.start, min(stop, total))
+        self._init_permutation()
+
+    @classmethod
+    def from_addresses(cls, start_ip, end_ip, seed=None):
+        '''Returns the range of every address from start_ip to end_ip, inclusive.'''
+        return cls([(ip_to_int(start_ip), ip_to_int(end_ip))], seed=seed)
+
+    @classmethod
+    def from_networks(cls, networks, seed=None):
+        '''Returns the range of every address in the given blocks in CIDR notation (e.g., '192.168.1.0/28').'''
+        networks = [ipaddress.ip_network(network, strict=False) for network in networks]
+        return cls.from_interval_set(IntervalSet((int(network.network_address), int(network.broadcast_address)) for network in networks), seed=seed)
+
+    @classmethod
+    def from_interval_set(cls, interval_set, seed=None):
+        '''Returns the range of every address in an IntervalSet (e.g., the include list minus the exclude list).'''
+        return cls(interval_set.intervals(), seed=seed)
+
+    def shuffled(self, seed=None):
+        '''Returns the whole range in a pseudorandom order, reproducible for the same seed. A random seed if None.'''
+        return TargetRange(self.blocks, seed=random.getrandbits(64) if seed is None else seed)
+
+    def shard(self, index, count):
+        '''Returns the index-th of count nearly equal, disjoint slices that together cover the range.'''
+        length = len(self)
+        return self[length * index // count:length * (index + 1) // count]
+
+    def networks(self):
+        '''Returns the blocks in CIDR notation that cover the addresses of this slice (of every address for a shuffled one).'''
+        first, last = self.bounds(as_int=True)
+        networks = []
+        for block_first, block_last in self.blocks:
+            block_first, block_last = max(block_first, first), min(block_last, last)
+            if block_first <= block_last:
+                networks += [str(network) for network in ipaddress.summarize_address_range(ipaddress.IPv4Address(block_first), ipaddress.IPv4Address(block_last))]
+        return networks
+
+    def bounds(self, as_int=False):
+        '''
+        Returns the lowest and highest address of the range as (first, last), None if it is empty.
+
+        A shuffled slice is spread over the whole range, so the bounds of the whole range are returned.
+        '''
+        if len(self) == 0:
+            return None
+        if self.seed is None:
+            first, last = self._address(self.start), self._address(self.stop - 1)
+        else:
+            first, last = self.blocks[0][0], self.blocks[-1][1]
+        return (first, last) if as_int else (int_to_ip(first), int_to_ip(last))
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        if self.seed is None:
+            # Ascending order: walk the blocks directly, without a lookup per address
+            position = self.start
+            block = bisect.bisect_right(self._offsets, position) - 1
+            while position < self.stop and block < len(self.blocks):
+                first, last = self.blocks[block]
+                address = first + position - self._offsets[block]
+                end = min(last, address + self.stop - position - 1)
+                for value in range(address, end + 1):
+                    yield int_to_ip(value)
+                position += end - address + 1
+                block += 1
+        else:
+            for position in range(self.start, self.stop):
+                yield int_to_ip(self._address(self._permute(position)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError('TargetRange slices do not support steps.')
+            return TargetRange(self.blocks, seed=self.seed, start=self.start + start, stop=self.start + max(start, stop))
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('TargetRange index out of range.')
+        position = self.start + index
+        if self.seed is not None:
+            position = self._permute(position)
+        return int_to_ip(self._address(position))
+
+    def __contains__(self, ip):
+        '''Returns True if ip is one of the addresses of this slice, in O(log blocks).'''
+        try:
+            value = ip_to_int(ip)
+        except OSError:
+            return False
+        block = bisect.bisect_right(self.blocks, (value, 0xFFFFFFFF)) - 1
+        if block < 0 or value > self.blocks[block][1]:
+            return False
+        position = self._offsets[block] + value - self.blocks[block][0]
+        if self.seed is not None:
+            position = self._unpermute(position)
+        return self.start <= position < self.stop
+
+    def __repr__(self):
+        bounds = self.bounds()
+        span = f'{bounds[0]}-{bounds[1]}' if bounds else 'empty'
+        order = 'ascending' if self.seed is None else f'shuffled, seed={self.seed}'
+        return f'TargetRange({span}, {len(self)} addresses, {order})'
+
+    def _address(self, position):
+        '''Returns the integer address at a position of the unshuffled index space.'''
+        block = bisect.bisect_right(self._offsets, position) - 1
+        return self.blocks[block][0] + position - self._offsets[block]
+
+    def _init_permutation(self):
+        '''Derives the Feistel parameters: the smallest even-width domain that holds every index, and the round keys.'''
+        if self.seed is None:
+            return
+        self._half_bits = max(1, ((self._total - 1).bit_length() + 1) // 2)
+        self._half_mask = (1 << self._half_bits) - 1
+        generator = random.Random(self.seed)
+        self._keys = [generator.getrandbits(32) for _ in range(self.FEISTEL_ROUNDS)]
+
+    def _round(self, value, key):
+        '''Feistel round function: a cheap integer hash of one half, keyed by key.'''
+        value = (value * 0x9E3779B1 + key) & 0xFFFFFFFF
+        value ^= value >> 15
+        value = (value * 0x2C1B3C6D) & 0xFFFFFFFF
+        value ^= value >> 12
+        return value & self._half_mask
+
+    def _permute(self, position):
+        '''Maps an index to its shuffled index. Cycle-walks until the result falls inside the range.'''
+        bits, mask = self._half_bits, self._half_mask
+        while True:
+            left, right = position >> bits, position & mask
+            for key in self._keys:
+                left, right = right, left ^ self._round(right, key)
+            position = (left << bits) | right
+            if position < self._total:
+                return position
+
+    def _unpermute(self, position):
+        '''Inverse of _permute.'''
+        bits, mask = self._half_bits, self._half_mask
+        while True:
+            left, right = position >> bits, position & mask
+            for key in reversed(self._keys):
+                left, right = right ^ self._round(left, key), left
+            position = (left << bits) | right
+            if position < self._total:
+                return position
@@ -0,0 +1,137 @@
+#Timer_Wheel.py
+import math
+import time
+from . import Constants
+
+class TimerWheel:
+    '''
+    Hierarchical timer wheel (Varghese and Lauck): scheduling, cancelling and expiring a timer cost
+    O(1), however many timers are pending.
+
+    Time is divided into ticks. Level 0 has one slot per tick for the next slots ticks, level 1 one
+    slot per slots ticks for the next slots**2 ticks, and so on. A timer is put into the slot of the
+    lowest level its deadline fits in. Whenever level 0 has gone round, the next slot of level 1 is
+    cascaded, i.e. its timers are spread over the slots of level 0 (and likewise up the levels), so
+    every timer is moved at most levels - 1 times. Timers expire at tick granularity, never early.
+
+    Not thread-safe: the owner serializes the calls (e.g., see ProbeScheduler).
+    '''
+    def __init__(self, tick=Constants.TIMER_WHEEL_TICK, slots=Constants.TIMER_WHEEL_SLOTS, levels=Constants.TIMER_WHEEL_LEVELS):
+        '''
+        Initializes an empty wheel, starting at the current time.
+
+        Args:
+            tick (float): Length of a tick, in seconds.
+            slots (int): Number of slots per level, a power of two.
+            levels (int): Number of levels. Deadlines beyond tick * slots**levels seconds are cascaded until they fit.
+
+        Raises:
+            ValueError: If slots is not a power of two.
+        '''
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError('The number of slots of a timer wheel must be a power of two.')
+        self.tick = tick
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._span = slots ** levels    # Ticks covered by all the levels
+        self._wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._current = math.floor(time.monotonic() / tick)    # Next tick to expire
+        self._count = 0
+
+    def __len__(self):
+        '''Returns the number of pending timers.'''
+        return self._count
+
+    def schedule(self, deadline, item):
+        '''
+        Schedules item to be returned by expire once deadline has passed.
+
+        Args:
+            deadline (float): time.monotonic() value after which the timer expires.
+            item (object): Returned by expire.
+
+        Returns:
+            Timer: The timer, for cancel.
+        '''
+        timer = Timer(math.ceil(deadline / self.tick), item)
+        self._insert(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer):
+        '''Cancels a pending timer. Cancelled timers are dropped from their slot when it is reached.'''
+        if not timer.cancelled:
+            timer.cancelled = True
+            self._count -= 1
+
+    def expire(self, now=None):
+        '''
+        Expires the timers whose deadline has passed.
+
+        Args:
+            now (float): Current time.monotonic() value. Read if None.
+
+        Returns:
+            list: The items of the expired timers, in deadline order (at tick granularity).
+        '''
+        target = math.floor((time.monotonic() if now is None else now) / self.tick)
+        expired = []
+        while self._current <= target:
+            if not self._count:
+                # Nothing is pending, so the ticks up to now hold nothing to expire or cascade
+                self._current = target + 1
+                break
+            index = self._current & self._mask
+            if index == 0:
+                self._cascade(1)
+            slot = self._wheels[0][index]
+            if slot:
+                self._wheels[0][index] = []
+                for timer in slot:
+                    if timer.cancelled:
+                        continue
+                    if timer.tick > self._current:
+                        self._insert(timer)    # Parked beyond the span of a single level
+                    else:
+                        timer.cancelled = True
+                        self._count -= 1
+                        expired.append(timer.item)
+            self._current += 1
+        return expired
+
+    def _insert(self, timer):
+        '''Puts timer into the slot of the lowest level its deadline fits in.'''
+        ticks = max(timer.tick, self._current)
+        delta = ticks - self._current
+        if delta >= self._span:
+            # Beyond the last level: parked in its farthest slot, and cascaded again from there
+            ticks = self._current + self._span - 1
+            delta = self._span - 1
+        level = 0
+        while delta >> (self._bits * (level + 1)):
+            level += 1
+        self._wheels[level][(ticks >> (self._bits * level)) & self._mask].append(timer)
+
+    def _cascade(self, level):
+        '''Spreads the timers of the current slot of level over the lower levels, cascading the higher levels first when they go round as well.'''
+        if level >= len(self._wheels):
+            return
+        index = (self._current >> (self._bits * level)) & self._mask
+        if index == 0:
+            self._cascade(level + 1)
+        slot = self._wheels[level][index]
+        if slot:
+            self._wheels[level][index] = []
+            for timer in slot:
+                if not timer.cancelled:
+                    self._insert(timer)
+
+
+class Timer:
+    '''A timer of a TimerWheel: the tick it expires at, and the item it returns.'''
+    __slots__ = ('tick', 'item', 'cancelled')
+
+    def __init__(self, tick, item):
+        self.tick = tick
+        self.item = item
+        self.cancelled = False
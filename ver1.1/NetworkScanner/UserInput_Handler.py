@@ -1,6 +1,9 @@
 #UserInput_Handler.py
 import ipaddress
 from . import Constants
+from .Interval_Set import IntervalSet
+from .Target_Range import TargetRange
+from .Port_Spec import PortSpec
 
 class UserInputHandler():
 	'''
@@ -22,6 +25,10 @@ class UserInputHandler():
 		self.packet_size=kwargs.get(Constants.KEY_PACKET_SIZE)
 		self.start_port=kwargs.get(Constants.KEY_START_PORT)
 		self.end_port=kwargs.get(Constants.KEY_END_PORT)
+		self.rate=kwargs.get(Constants.KEY_RATE)
+		self.include=kwargs.get(Constants.KEY_INCLUDE) or ''
+		self.exclude=kwargs.get(Constants.KEY_EXCLUDE) or ''
+		self.ports=kwargs.get(Constants.KEY_PORTS) or ''
 	
 	def validate_all(self):
 		'''
@@ -29,14 +36,18 @@ class UserInputHandler():
         :return: Dictionary of validated scan parameters.
         :raises ValueError: If any input validation fails.
 		'''
-		validated_ip_addr = self.ip_addr_validator()
-		validated_prefix = self.prefix_validator()
-		validated_network_addr = self.network_addr_validator()
+		# The start/end range is optional when an include list names the targets
+		if self.start_ip or not self.include.strip():
+			validated_ip_addr = self.ip_addr_validator()
+			validated_prefix = self.prefix_validator()
+			validated_network_addr = self.network_addr_validator()
 		validated_timeout = self.timeout_validator()
 		validated_ttl = self.ttl_validator()
 		validated_interval = self.interval_validator()
 		validated_packet_size = self.packet_size_validator()
-		validated_start_port, validated_end_port = self.port_num_validator()
+		validated_port_spec = self.port_spec_validator()
+		validated_start_port, validated_end_port = validated_port_spec.bounds() if validated_port_spec else (None, None)
+		validated_rate = self.rate_validator()
 		ip_range = self.setup_ip_range()
 
 		return {
@@ -46,7 +57,9 @@ class UserInputHandler():
 			Constants.KEY_INTERVAL: validated_interval,
 			Constants.KEY_PACKET_SIZE: validated_packet_size,
 			Constants.KEY_START_PORT: validated_start_port,
-			Constants.KEY_END_PORT: validated_end_port
+			Constants.KEY_END_PORT: validated_end_port,
+			Constants.KEY_PORT_SPEC: validated_port_spec,
+			Constants.KEY_RATE: validated_rate
 		}
 
 	def ip_addr_validator(self):
@@ -167,7 +180,7 @@ class UserInputHandler():
         :return: Tuple of validated start and end port numbers.
         :raises ValueError: If port numbers are not between 1 and 65535, or end port is less than start port.
 		'''
-		if self.Current_ScanType != Constants.SCAN_TYPE_PORT:
+		if self.Current_ScanType not in (Constants.SCAN_TYPE_PORT, Constants.SCAN_TYPE_CONNECT):
 			return None, None
 
 		try:
@@ -186,16 +199,67 @@ class UserInputHandler():
 		
 		return validated_start_port, validated_end_port
 
-	def setup_ip_range(self):
+	def port_spec_validator(self):
 		'''
-		Generates an IP range based on validated start and end IP addresses.
-        :return: List of IP addresses within the range.
+        Compiles the ports to scan: the port specification if one was entered, else the start-end range.
+        :return: PortSpec of the ports to scan, or None for scan types without ports.
+        :raises ValueError: If the specification or the port numbers are invalid.
 		'''
-		validated_start_ip, validated_end_ip = self.ip_addr_validator()
+		if self.Current_ScanType not in (Constants.SCAN_TYPE_PORT, Constants.SCAN_TYPE_CONNECT):
+			return None
+
+		if self.ports.strip():
+			validated_port_spec = PortSpec.from_spec(self.ports)
+			if len(validated_port_spec) == 0:
+				raise ValueError(Constants.MSG_NO_TCP_PORTS)
+			return validated_port_spec
+		validated_start_port, validated_end_port = self.port_num_validator()
+		return PortSpec.from_range(validated_start_port, validated_end_port)
 
-		start_ip = ipaddress.ip_address(validated_start_ip)
-		end_ip = ipaddress.ip_address(validated_end_ip)
+	def rate_validator(self):
+		'''
+        Validates the send rate used by the packet engine.
+        :return: Validated rate in packets per second as a float.
+        :raises ValueError: If the rate is not between 1 and 100000 packets per second.
+		'''
+		try:
+			validated_rate = float(self.rate)
+			if not (1 <= validated_rate <= 100000):
+				raise ValueError(Constants.MSG_RATE_RANGE)
+		except ValueError:
+			raise ValueError(Constants.MSG_RATE_RANGE2)
+
+		return validated_rate
+
+	def target_spec_validator(self):
+		'''
+		Compiles the include and exclude specifications into sorted, merged interval sets.
+        Entries are addresses, CIDR blocks, ranges (10.0.0.1-10.0.0.50) or @file, separated by commas or spaces.
+        :return: Tuple of the include and exclude IntervalSets.
+        :raises ValueError: If an entry is invalid or a file cannot be read.
+		'''
+		validated_include = IntervalSet.from_spec(self.include)
+		validated_exclude = IntervalSet.from_spec(self.exclude)
+
+		return validated_include, validated_exclude
+
+	def setup_ip_range(self):
+		'''
+		Generates an IP range based on validated start and end IP addresses,
+        plus the include list and minus the exclude list.
+        :return: TargetRange of the IP addresses within the range, generated lazily.
+        :raises ValueError: If every address is excluded.
+		'''
+		validated_include, validated_exclude = self.target_spec_validator()
+		if self.start_ip:
+			validated_start_ip, validated_end_ip = self.ip_addr_validator()
+			if validated_start_ip.version != 4:
+				raise ValueError(Constants.MSG_INVALID_IP_FORMAT)
+			validated_include = validated_include.union(IntervalSet([(int(validated_start_ip), int(validated_end_ip))]))
 
-		ip_range = [str(ip) for ip in ipaddress.summarize_address_range(start_ip, end_ip)]
+		# Excluded addresses are cut out here, so they cost nothing per probe
+		ip_range = TargetRange.from_interval_set(validated_include.difference(validated_exclude))
+		if len(ip_range) == 0:
+			raise ValueError(Constants.MSG_NO_TARGETS)
     
 		return ip_range
\ No newline at end of file
@@ -1,9 +1,187 @@
-from .module1 import MyClass, utility_function
+#__main__.py
+'''
+Headless command-line interface: python -m NetworkScanner
 
-def main():
-	obj = MyClass("Alice")
-	print(obj.greet())
-	print("Utility function output:", utility_function(10))
+Inputs are validated by UserInputHandler, exactly as in the GUI, and results are streamed to
+stdout as they are found. PyQt5 is never imported, and Scapy only when a raw-packet scan type is run.
+'''
+import argparse
+import logging
+import signal
+import sys
+import threading
+from . import Constants
+from .UserInput_Handler import UserInputHandler
+from .Stop_Signal import StopSignal
+from .Result_Writers import WRITERS, HEADERS, SERVICE_HEADERS, DELTA_HEADERS, open_writer
+from .Port_Frequency import TCP_PORT_FREQUENCY
 
-if __name__ == "__main__":
-	main()
+# Command-line names of the scan types
+SCAN_TYPES = {
+    'arp': Constants.SCAN_TYPE_ARP,
+    'ping': Constants.SCAN_TYPE_PING,
+    'ping-fast': Constants.SCAN_TYPE_PING_FAST,
+    'port': Constants.SCAN_TYPE_PORT,
+    'connect': Constants.SCAN_TYPE_CONNECT,
+}
+
+def parse_args(argv=None):
+    '''Parses the command-line arguments.'''
+    parser = argparse.ArgumentParser(prog='python -m NetworkScanner', description='Scan a network range without the GUI.')
+    parser.add_argument('start_ip', nargs='?', default='',
+                        help='Start IP (e.g., 192.168.1.0). Enter only the start IP to scan a single IP. Optional with --include.')
+    parser.add_argument('end_ip', nargs='?', default='', help='End IP (e.g., 192.168.1.10).')
+    parser.add_argument('-t', '--scan-type', choices=SCAN_TYPES, default='arp', help='Scan type (default: arp).')
+    parser.add_argument('-p', '--prefix', default='24', help='Subnet prefix containing both IPs (default: 24).')
+    parser.add_argument('--timeout', default=Constants.DEFAULT_TIMEOUT, help='Maximum time in seconds to wait for replies.')
+    parser.add_argument('--ttl', default=Constants.DEFAULT_TTL, help='TTL of ping packets.')
+    parser.add_argument('--interval', default=Constants.DEFAULT_INTERVAL, help='Interval in seconds between ping packets.')
+    parser.add_argument('--packet-size', default=Constants.DEFAULT_PACKET_SIZE, help='Payload size in bytes of ping packets.')
+    parser.add_argument('--include', action='append', default=[], metavar='SPEC',
+                        help='Also scan these addresses, CIDR blocks, ranges (10.0.0.1-10.0.0.50) or @file entries, comma-separated. Repeatable.')
+    parser.add_argument('--exclude', action='append', default=[], metavar='SPEC',
+                        help='Never probe these addresses, CIDR blocks, ranges or @file entries, comma-separated. Repeatable.')
+    parser.add_argument('--start-port', default='', help='Start port number for port scans.')
+    parser.add_argument('--end-port', default='', help='End port number for port scans.')
+    parser.add_argument('--ports', default='', metavar='SPEC',
+                        help='Ports to scan instead of --start-port/--end-port: ports, ranges and the N most frequently open '
+                             'ports, comma-separated (e.g., 22,80,443,8000-8100,top:100). Probed most likely first. The bundled '
+                             f'table ranks {len(TCP_PORT_FREQUENCY)} TCP ports: past that, top:N adds the other well-known ports, '
+                             'then the rest, by port number.')
+    parser.add_argument('--rate', default=Constants.DEFAULT_RATE, help='Packets sent per second by the ARP, fast ping and port scans.')
+    parser.add_argument('--fixed-rate', action='store_true', help='Always send at --rate instead of backing off when probes are lost.')
+    parser.add_argument('-T', '--timing', choices=Constants.TIMING_TEMPLATES, default=Constants.DEFAULT_TIMING,
+                        help='Timing template of the adaptive timeouts, from paranoid to insane (default: normal).')
+    parser.add_argument('--min-timeout', type=float, default=None, help='Overrides the timeout floor of the timing template, in seconds.')
+    parser.add_argument('--retries', type=int, default=Constants.PROBE_RETRIES,
+                        help=f'Maximum number of times the ARP, fast ping and port scans send an unanswered probe again, '
+                             f'once probes are being lost (default: {Constants.PROBE_RETRIES}). 0 disables retransmissions.')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='Number of worker processes the targets (and ports) are split across (default: 1).')
+    parser.add_argument('--randomize', action='store_true', help='Probe the targets in a pseudorandom order instead of ascending.')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the randomized order, to repeat a scan in the same order.')
+    parser.add_argument('-f', '--format', choices=WRITERS, default='table', help='Output format (default: table).')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='Write the results to FILE instead of stdout, in the format of its extension: .csv, .ndjson, .jsonl '
+                             '(optionally with .gz), .parquet or .arrow (these two need pyarrow).')
+    parser.add_argument('--no-dns', action='store_true', help='Do not resolve host names.')
+    parser.add_argument('--history-db', default=Constants.HISTORY_DB_FILE, help=f'Scan history database (default: {Constants.HISTORY_DB_FILE}).')
+    parser.add_argument('--no-history', action='store_true', help='Do not record the scan in the history database.')
+    parser.add_argument('--delta', action='store_true',
+                        help='Rescan with the previous results in the history as a prior, and write only the added, removed and changed hosts.')
+    parser.add_argument('--services', action='store_true',
+                        help='Identify the services listening on the open ports (banners, HTTP and TLS) of port and connect scans.')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='Write the metrics of the scan (probes, replies, timeouts, RTT and phase durations) to FILE at scan end: '
+                             'in the Prometheus text format for a .prom or .txt file, as JSON otherwise.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Write the application log (and debug messages to stderr).')
+    parser.add_argument('--log-level', action='append', default=[], metavar='LOGGER=LEVEL',
+                        help='Level of a logger of the application log, e.g. NetworkScanner.Packet_Engine=INFO or scapy=DEBUG '
+                             '(root for the root logger). Repeatable, implies -v.')
+    parser.add_argument('--log-json', action='store_true', help='Write the application log as one JSON object per line. Implies -v.')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.workers < 1:
+        print('error: --workers must be at least 1.', file=sys.stderr)
+        return 2
+    if args.retries < 0:
+        print('error: --retries must be at least 0.', file=sys.stderr)
+        return 2
+    if args.delta and args.no_history:
+        print(f'error: {Constants.MSG_DELTA_NEEDS_HISTORY}', file=sys.stderr)
+        return 2
+
+    if args.verbose or args.log_level or args.log_json:
+        from .Logging_Config import setup_logging
+        try:
+            levels = {}
+            for entry in args.log_level:
+                name, separator, level = entry.partition('=')
+                if not separator:
+                    raise ValueError(f'--log-level must be LOGGER=LEVEL: {entry}')
+                levels['' if name == 'root' else name] = level
+            setup_logging(levels=levels, json_format=args.log_json)
+        except ValueError as e:
+            print(f'error: {e}', file=sys.stderr)
+            return 2
+    else:
+        logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+
+    user_inputs = {
+        Constants.KEY_CURRENT_SCAN_TYPE: SCAN_TYPES[args.scan_type],
+        Constants.KEY_START_IP: args.start_ip,
+        Constants.KEY_END_IP: args.end_ip,
+        Constants.KEY_PREFIX: args.prefix,
+        Constants.KEY_TIMEOUT: args.timeout,
+        Constants.KEY_TTL: args.ttl,
+        Constants.KEY_INTERVAL: args.interval,
+        Constants.KEY_PACKET_SIZE: args.packet_size,
+        Constants.KEY_START_PORT: args.start_port,
+        Constants.KEY_END_PORT: args.end_port,
+        Constants.KEY_PORTS: args.ports,
+        Constants.KEY_RATE: args.rate,
+        Constants.KEY_INCLUDE: ','.join(args.include),
+        Constants.KEY_EXCLUDE: ','.join(args.exclude),
+    }
+    try:
+        validated_inputs = UserInputHandler(**user_inputs).validate_all()
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+
+    # The first Ctrl-C stops the scan gracefully (results found so far are still written), the second one aborts
+    stop_signal = StopSignal()
+    def request_stop(signum, frame):
+        # Set from another thread: the handler may have interrupted the main thread inside a lock the stop callbacks take
+        threading.Thread(target=stop_signal.set, daemon=True).start()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGINT, request_stop)
+
+    from .Scan_Runner import ScanRunner
+    resolver = None
+    if not args.no_dns:
+        from .Dns_Resolver import shared_resolver as resolver
+
+    history = None
+    if not args.no_history:
+        from .Scan_History import open_history
+        history = open_history(args.history_db)
+
+    detector = None
+    headers = HEADERS
+    if args.services:
+        from .Service_Detector import shared_detector as detector
+        headers = SERVICE_HEADERS
+    if args.delta:
+        headers = DELTA_HEADERS[:1] + headers + DELTA_HEADERS[-1:]
+    try:
+        writer = open_writer(args.output, headers=headers) if args.output else WRITERS[args.format](sys.stdout, headers=headers)
+    except (OSError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        if history is not None:
+            history.close()
+        return 2
+    runner = ScanRunner(Current_ScanType=SCAN_TYPES[args.scan_type], stop=stop_signal,
+                        timing=args.timing, min_timeout=args.min_timeout, adaptive_rate=not args.fixed_rate,
+                        workers=args.workers, randomize=args.randomize or args.seed is not None, seed=args.seed, delta=args.delta, retries=args.retries,
+                        **validated_inputs)
+    try:
+        # Files and the terminal only get the complete hosts, not the early copies a SYN port scan also hands out
+        runner.run(callback=lambda batch: writer.write_batch([host_info for host_info in batch if not host_info.get(Constants.KEY_PARTIAL)]), resolver=resolver, history=history, detector=detector, metrics_file=args.metrics)
+    except PermissionError:
+        print('error: this scan type needs raw-socket privileges (run as root, or use --scan-type connect).', file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+    finally:
+        writer.close()
+        if history is not None:
+            history.close()
+
+    return 130 if stop_signal() else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
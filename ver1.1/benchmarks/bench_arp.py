@@ -0,0 +1,93 @@
+#bench_arp.py
+'''
+Benchmarks ArpScanner against a responder running in a local network namespace.
+
+A veth pair connects the host to the namespace, and every simulated host is an extra
+address on the namespace side of the pair, so the kernel answers the ARP requests.
+
+With --adaptive, the rate controller may back off from --rate when replies are lost (e.g., when
+the namespace cannot keep up). bench_retries.py drops replies on purpose, to measure loss.
+
+Requires root and iproute2. Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_arp.py --prefix 22 --hosts 200 --rate 2000
+    python benchmarks/bench_arp.py --prefix 20 --hosts 1000 --rate 20000 --adaptive
+'''
+import argparse
+import ipaddress
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NAMESPACE = 'nsbench'
+HOST_IFACE = 'bench0'
+PEER_IFACE = 'bench1'
+
+def ip(*args, namespace=None, stdin=None):
+    '''Runs an iproute2 command, optionally inside the benchmark namespace.'''
+    command = ['ip'] + (['-n', namespace] if namespace else []) + list(args)
+    subprocess.run(command, input=stdin, check=True, text=True)
+
+def setup_responder(network, hosts):
+    '''Creates the namespace and spreads the responding addresses evenly over the network.'''
+    ip('netns', 'add', NAMESPACE)
+    ip('link', 'add', HOST_IFACE, 'type', 'veth', 'peer', 'name', PEER_IFACE)
+    ip('link', 'set', PEER_IFACE, 'netns', NAMESPACE)
+    ip('addr', 'add', f'{network[1]}/{network.prefixlen}', 'dev', HOST_IFACE)
+    ip('link', 'set', HOST_IFACE, 'up')
+    ip('link', 'set', PEER_IFACE, 'up', namespace=NAMESPACE)
+
+    step = max(1, (network.num_addresses - 3) // hosts)
+    responders = [network[2 + i * step] for i in range(hosts)]
+    batch = ''.join(f'addr add {address}/{network.prefixlen} dev {PEER_IFACE}\n' for address in responders)
+    ip('-batch', '-', namespace=NAMESPACE, stdin=batch)
+    return responders
+
+def teardown_responder():
+    '''Removes the namespace and the veth pair.'''
+    subprocess.run(['ip', 'link', 'del', HOST_IFACE], stderr=subprocess.DEVNULL)
+    subprocess.run(['ip', 'netns', 'del', NAMESPACE], stderr=subprocess.DEVNULL)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ARP engine against a network namespace responder.')
+    parser.add_argument('--network', default='10.77.0.0', help='Network address of the simulated subnet.')
+    parser.add_argument('--prefix', type=int, default=22, help='Prefix length of the simulated subnet.')
+    parser.add_argument('--hosts', type=int, default=200, help='Number of responding hosts.')
+    parser.add_argument('--rate', type=float, default=2000, help='ARP requests sent per second.')
+    parser.add_argument('--adaptive', action='store_true', help='Let the rate controller back off from --rate on loss.')
+    args = parser.parse_args()
+
+    network = ipaddress.ip_network(f'{args.network}/{args.prefix}', strict=False)
+    teardown_responder()
+    try:
+        responders = setup_responder(network, args.hosts)
+
+        from scapy.all import conf
+        from NetworkScanner.Arp_Scanner import ArpScanner
+        from NetworkScanner.Rate_Controller import RateController
+        from NetworkScanner.Rtt_Estimator import RttEstimator
+        from NetworkScanner.Target_Range import TargetRange
+        conf.route.resync()    # Pick up the route to the veth pair
+
+        rtt = RttEstimator()
+        rate_controller = RateController(max_rate=args.rate, min_rate=1 if args.adaptive else args.rate, rtt=rtt)
+        scanner = ArpScanner(ip_range=TargetRange.from_networks([str(network)]), stop=lambda: False, rate=args.rate, rtt=rtt, rate_controller=rate_controller)
+        started = time.monotonic()
+        host_list = scanner.arp_scanner()
+        elapsed = time.monotonic() - started
+    finally:
+        teardown_responder()
+
+    print(f'targets:     {network.num_addresses}')
+    print(f'responders:  {len(responders)}')
+    print(f'found:       {len(host_list)}')
+    print(f'wall time:   {elapsed:.2f} s')
+    print(f'targets/sec: {network.num_addresses / elapsed:.0f}')
+    print(f'hosts/sec:   {len(host_list) / elapsed:.1f}')
+    print(f'final rate:  {rate_controller.rate():.0f} packets/s')
+    print(f'drop est.:   {rate_controller.drop_estimate():.1%}')
+
+if __name__ == '__main__':
+    main()
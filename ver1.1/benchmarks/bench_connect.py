@@ -0,0 +1,72 @@
+#bench_connect.py
+'''
+Benchmarks ConnectScanner against a farm of local listeners on 127.0.0.0/8.
+
+Every address of 127.0.0.0/8 is local, so closed ports are refused right away and the listening
+ports are accepted by a server process running in the background. Needs no privileges.
+
+Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_connect.py --hosts 64 --ports 1-1024 --listeners 22,80,443
+'''
+import argparse
+import asyncio
+import ipaddress
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIRST_HOST = ipaddress.ip_address('127.10.0.1')
+
+def run_listener_farm(hosts, ports, ready):
+    '''Accepts and immediately closes connections on every (host, port) of the farm.'''
+    async def handle(reader, writer):
+        writer.close()
+
+    async def serve():
+        for i in range(hosts):
+            for port in ports:
+                await asyncio.start_server(handle, str(FIRST_HOST + i), port, backlog=1024)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the connect scanner against local listeners.')
+    parser.add_argument('--hosts', type=int, default=64, help='Number of scanned addresses.')
+    parser.add_argument('--ports', default='1-1024', help='Scanned port range (start-end).')
+    parser.add_argument('--listeners', default='22,80,443', help='Comma-separated listening ports on every host.')
+    args = parser.parse_args()
+
+    from NetworkScanner import Constants
+    from NetworkScanner.Connect_Scanner import ConnectScanner
+    from NetworkScanner.Target_Range import TargetRange
+
+    start_port, end_port = (int(port) for port in args.ports.split('-'))
+    listeners = [int(port) for port in args.listeners.split(',')]
+
+    ready = multiprocessing.Event()
+    farm = multiprocessing.Process(target=run_listener_farm, args=(args.hosts, listeners, ready), daemon=True)
+    farm.start()
+    ready.wait()
+
+    ip_range = TargetRange.from_addresses(FIRST_HOST, FIRST_HOST + args.hosts - 1)
+    scanner = ConnectScanner(start_port=start_port, end_port=end_port, ip_range=ip_range, stop=lambda: False)
+    started = time.monotonic()
+    host_list = scanner.connect_scanner()
+    elapsed = time.monotonic() - started
+    farm.terminate()
+
+    attempts = args.hosts * (end_port - start_port + 1)
+    open_ports = sum(len(host[Constants.TABLE_COLOUM_PORT]) for host in host_list)
+    print(f'attempts:     {attempts}')
+    print(f'hosts found:  {len(host_list)}')
+    print(f'open ports:   {open_ports}')
+    print(f'wall time:    {elapsed:.2f} s')
+    print(f'attempts/sec: {attempts / elapsed:.0f}')
+
+if __name__ == '__main__':
+    main()
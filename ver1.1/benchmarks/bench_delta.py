@@ -0,0 +1,107 @@
+#bench_delta.py
+'''
+Compares a full port scan with a delta rescan of the same network namespace responders.
+
+The responders are set up as in bench_arp.py, and a listener in the namespace accepts connections
+on --listeners on every responder address. A full scan is recorded in a temporary history
+database, one listener port is then closed, and a delta scan is run with that history as its prior.
+
+Requires root and iproute2. Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_delta.py --prefix 22 --hosts 100 --ports 1-1024 --rate 20000
+'''
+import argparse
+import ipaddress
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_arp import NAMESPACE, setup_responder, teardown_responder
+
+LISTENER = '''
+import socket, sys, time
+sockets = []
+for port in map(int, sys.argv[1].split(',')):
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('0.0.0.0', port))
+    sock.listen(1024)
+    sockets.append(sock)
+time.sleep(3600)
+'''
+
+def start_listeners(ports):
+    '''Starts a process in the namespace that listens on ports on every address.'''
+    listener = subprocess.Popen(['ip', 'netns', 'exec', NAMESPACE, sys.executable, '-c', LISTENER, ','.join(map(str, ports))])
+    time.sleep(0.5)
+    return listener
+
+def run_scan(args, network, history, delta):
+    '''Runs one port scan of the network and returns (wall time, host dictionaries handed out, runner).'''
+    from NetworkScanner import Constants
+    from NetworkScanner.Scan_Runner import ScanRunner
+    from NetworkScanner.Target_Range import TargetRange
+
+    start_port, end_port = (int(port) for port in args.ports.split('-'))
+    runner = ScanRunner(Current_ScanType=Constants.SCAN_TYPE_PORT, ip_range=TargetRange.from_networks([str(network)]), timeout=2,
+                        ttl=64, interval=0, packet_size=32, start_port=start_port, end_port=end_port, rate=args.rate,
+                        stop=lambda: False, delta=delta)
+    host_list = []
+    started = time.monotonic()
+    runner.run(callback=host_list.extend, history=history)
+    return time.monotonic() - started, host_list, runner
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a full port scan with a delta rescan.')
+    parser.add_argument('--network', default='10.77.0.0', help='Network address of the simulated subnet.')
+    parser.add_argument('--prefix', type=int, default=22, help='Prefix length of the simulated subnet.')
+    parser.add_argument('--hosts', type=int, default=100, help='Number of responding hosts.')
+    parser.add_argument('--ports', default='1-1024', help='Scanned port range (start-end).')
+    parser.add_argument('--listeners', default='22,80,443', help='Comma-separated listening ports on every host.')
+    parser.add_argument('--rate', type=float, default=20000, help='Probes sent per second.')
+    args = parser.parse_args()
+
+    network = ipaddress.ip_network(f'{args.network}/{args.prefix}', strict=False)
+    listeners = [int(port) for port in args.listeners.split(',')]
+    start_port, end_port = (int(port) for port in args.ports.split('-'))
+    path = os.path.join(tempfile.mkdtemp(), 'history.db')
+
+    teardown_responder()
+    listener = None
+    try:
+        setup_responder(network, args.hosts)
+        listener = start_listeners(listeners)
+
+        from scapy.all import conf
+        from NetworkScanner.Scan_History import ScanHistory
+        conf.route.resync()    # Pick up the route to the veth pair
+
+        history = ScanHistory(path)
+        full_time, full_hosts, _ = run_scan(args, network, history, delta=False)
+
+        # Close one of the listening ports, so that the delta scan has something to report
+        listener.terminate()
+        listener.wait()
+        listener = start_listeners(listeners[1:])
+
+        delta_time, changes, runner = run_scan(args, network, history, delta=True)
+        history.close()
+    finally:
+        if listener is not None:
+            listener.terminate()
+        teardown_responder()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    full_probes = network.num_addresses + len(full_hosts) * (end_port - start_port + 1)
+    print(f'full scan:   {full_time:6.2f} s, {len(full_hosts)} hosts, ~{full_probes} probes')
+    stats = runner.delta_scan.stats()
+    print(f'delta scan:  {delta_time:6.2f} s, {stats["addresses"]} addresses, ~{stats["addresses"] + stats["port_probes"]} probes, {runner.delta_summary}')
+    print(f'changed:     {sum(1 for host_info in changes if host_info["Details"])} hosts with details such as {changes[0]["Details"] if changes else "-"}')
+    print(f'speed-up:    {full_time / delta_time:.1f}x')
+
+if __name__ == '__main__':
+    main()
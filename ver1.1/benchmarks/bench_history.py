@@ -0,0 +1,82 @@
+#bench_history.py
+'''
+Benchmarks the scan history store with millions of observations.
+
+Fills a temporary database with synthetic scans (batches of hosts with a few open ports each,
+written the way ScanRunner writes them), then times typical history queries.
+
+Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_history.py --scans 20 --hosts 50000
+'''
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMMON_PORTS = [22, 25, 53, 80, 110, 143, 443, 445, 3306, 3389, 5432, 8080]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scan history store.')
+    parser.add_argument('--scans', type=int, default=20, help='Number of synthetic scans.')
+    parser.add_argument('--hosts', type=int, default=50000, help='Number of hosts found by every scan.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs of every query (the fastest one is kept).')
+    args = parser.parse_args()
+
+    from NetworkScanner import Constants
+    from NetworkScanner.Scan_History import ScanHistory
+    from NetworkScanner.Target_Range import TargetRange
+
+    generator = random.Random(1)
+    ip_range = TargetRange.from_addresses('10.0.0.0', '10.3.255.255')
+    path = os.path.join(tempfile.mkdtemp(), 'history.db')
+    history = ScanHistory(path)
+    try:
+        observations = 0
+        started = time.perf_counter()
+        for _ in range(args.scans):
+            scan_id = history.begin_scan(Constants.SCAN_TYPE_PORT, ip_range, 1, 65535)
+            batch = []
+            for index in range(args.hosts):
+                ports = sorted(generator.sample(COMMON_PORTS, generator.randrange(4)))
+                batch.append({
+                    Constants.TABLE_COLOUM_IP: ip_range[index],
+                    Constants.TABLE_COLOUM_MAC: '02:00:%02x:%02x:%02x:%02x' % tuple(index.to_bytes(4, 'big')),
+                    Constants.TABLE_COLOUM_HOST: Constants.UNKNOWN_HOST,
+                    Constants.TABLE_COLOUM_PORT: ports
+                })
+                observations += max(1, len(ports))
+                if len(batch) == Constants.BATCH_MAX_RECORDS:
+                    history.add_hosts(scan_id, batch)
+                    batch = []
+            history.add_hosts(scan_id, batch)
+            history.finish_scan(scan_id)
+        elapsed = time.perf_counter() - started
+        print(f'observations:   {observations}')
+        print(f'insert time:    {elapsed:.1f} s ({observations / elapsed:.0f} rows/s)')
+        print(f'database size:  {os.path.getsize(path) / 2**20:.0f} MB')
+
+        queries = {
+            'port 3389, last 30 days': dict(port=3389, days=30),
+            'one ip': dict(ip=ip_range[12345]),
+            'one mac': dict(mac='02:00:00:00:30:39'),
+            'one scan, port 22': dict(scan_id=1, port=22),
+        }
+        for name, query in queries.items():
+            best = float('inf')
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                host_list = history.query(**query)
+                best = min(best, time.perf_counter() - started)
+            print(f'{name + ":":<26}{best * 1000:8.1f} ms ({len(host_list)} hosts)')
+    finally:
+        history.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+if __name__ == '__main__':
+    main()
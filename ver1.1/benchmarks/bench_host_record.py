@@ -0,0 +1,71 @@
+#bench_host_record.py
+'''
+Measures the memory used per host by host dictionaries and by HostRecord.
+
+Builds --hosts synthetic hosts (a MAC address and 0-3 common open ports each, unresolved host
+names) in both shapes and reports the bytes allocated per host with tracemalloc, and the time
+of a union of every record with a second scan of the same hosts.
+
+Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_host_record.py --hosts 1000000
+'''
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMMON_PORTS = [22, 25, 53, 80, 110, 143, 443, 445, 3306, 3389, 5432, 8080]
+
+def host_dicts(count, seed):
+    '''Yields count synthetic host dictionaries, as produced by the scanners.'''
+    from NetworkScanner import Constants
+    from NetworkScanner.Interval_Set import int_to_ip
+
+    generator = random.Random(seed)
+    first = 10 << 24
+    for index in range(count):
+        yield {
+            Constants.TABLE_COLOUM_IP: int_to_ip(first + index),
+            Constants.TABLE_COLOUM_MAC: '02:00:%02x:%02x:%02x:%02x' % tuple(index.to_bytes(4, 'big')),
+            Constants.TABLE_COLOUM_HOST: Constants.UNKNOWN_HOST,
+            Constants.TABLE_COLOUM_PORT: sorted(generator.sample(COMMON_PORTS, generator.randrange(4)))
+        }
+
+def measure(build):
+    '''Returns (result of build(), bytes it allocated and still holds).'''
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, used
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the memory used per host by host dictionaries and HostRecord.')
+    parser.add_argument('--hosts', type=int, default=1000000, help='Number of hosts.')
+    args = parser.parse_args()
+
+    from NetworkScanner.Host_Record import HostRecord
+
+    dicts, dict_bytes = measure(lambda: list(host_dicts(args.hosts, seed=1)))
+    del dicts
+    records, record_bytes = measure(lambda: [HostRecord.from_host_info(host_info) for host_info in host_dicts(args.hosts, seed=1)])
+
+    print(f'hosts:           {args.hosts}')
+    print(f'host dicts:      {dict_bytes / args.hosts:6.0f} bytes/host ({dict_bytes / 2**20:.0f} MB)')
+    print(f'HostRecord:      {record_bytes / args.hosts:6.0f} bytes/host ({record_bytes / 2**20:.0f} MB)')
+    print(f'saving:          {dict_bytes / record_bytes:.1f}x')
+
+    others = [HostRecord.from_host_info(host_info) for host_info in host_dicts(args.hosts, seed=2)]
+    started = time.perf_counter()
+    merged = [record | other for record, other in zip(records, others)]
+    elapsed = time.perf_counter() - started
+    print(f'union:           {elapsed * 1e9 / args.hosts:6.0f} ns/host ({sum(len(record.ports) for record in merged)} open ports)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#bench_logging.py
+'''
+Measures the overhead of the application log on the scan threads.
+
+The first part times one debug message of a hot loop: with debug messages disabled, through the
+queue-based pipeline of Logging_Config (the time of the call, and the time the listener thread
+then takes to write everything out), through the file and console handlers called synchronously
+as before the pipeline, and through a RateLimitedLog.
+
+With --scan (root and iproute2 needed), the second part runs a fast ping sweep of a /16 with and
+without -v, and compares the wall times: debug logging must not noticeably change the scan time.
+The /16 is routed to a local network namespace (set up with the names of bench_arp.py) whose
+kernel answers for every address of it, so the sweep is not slowed down by ARP resolution.
+
+The log files are written to a temporary directory. Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_logging.py --messages 200000
+    python benchmarks/bench_logging.py --scan --rate 50000
+'''
+import argparse
+import ipaddress
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_arp import NAMESPACE, HOST_IFACE, PEER_IFACE, ip, teardown_responder
+
+# Point-to-point network of the veth pair, through which the scanned network is routed
+TRANSIT_HOST = '10.76.0.1/30'
+TRANSIT_PEER = '10.76.0.2/30'
+
+def setup_routed_responder(network):
+    '''Creates the namespace, routes network to it, and makes its kernel answer for every address of network.'''
+    ip('netns', 'add', NAMESPACE)
+    ip('link', 'add', HOST_IFACE, 'type', 'veth', 'peer', 'name', PEER_IFACE)
+    ip('link', 'set', PEER_IFACE, 'netns', NAMESPACE)
+    ip('addr', 'add', TRANSIT_HOST, 'dev', HOST_IFACE)
+    ip('link', 'set', HOST_IFACE, 'up')
+    ip('addr', 'add', TRANSIT_PEER, 'dev', PEER_IFACE, namespace=NAMESPACE)
+    ip('link', 'set', PEER_IFACE, 'up', namespace=NAMESPACE)
+    ip('link', 'set', 'lo', 'up', namespace=NAMESPACE)
+    ip('route', 'add', 'local', str(network), 'dev', 'lo', namespace=NAMESPACE)
+    ip('route', 'add', str(network), 'via', TRANSIT_PEER.split('/')[0])
+
+def per_message(log, count):
+    '''Returns the time of one call of log, in nanoseconds, over count calls.'''
+    started = time.perf_counter()
+    for index in range(count):
+        log('Sending probe failed: %s', index)
+    return (time.perf_counter() - started) * 1e9 / count
+
+def synchronous_handlers(log_file):
+    '''Sets up the root logger as it was before the queue pipeline: every handler runs in the calling thread.'''
+    from logging.handlers import RotatingFileHandler
+    from NetworkScanner import Constants
+
+    formatter = logging.Formatter(Constants.LOG_FORMAT)
+    root_logger = logging.getLogger()
+    for handler in (RotatingFileHandler(log_file, maxBytes=Constants.LOG_FILE_MAX_BYTES, backupCount=Constants.LOG_FILE_BACKUPS),
+                    logging.StreamHandler()):
+        handler.setFormatter(formatter)
+        root_logger.addHandler(handler)
+    return root_logger.handlers[-2:]
+
+def micro(count, directory):
+    '''Prints the time of one debug message in every logging setup.'''
+    from NetworkScanner.Logging_Config import RateLimitedLog, setup_logging, stop_logging
+
+    logger = logging.getLogger('NetworkScanner.bench')
+    root_logger = logging.getLogger()
+
+    logger.setLevel(logging.INFO)
+    disabled = per_message(logger.debug, count)
+
+    logger.setLevel(logging.DEBUG)
+    handlers = synchronous_handlers(os.path.join(directory, 'synchronous.log'))
+    synchronous = per_message(logger.debug, count)
+    for handler in handlers:
+        root_logger.removeHandler(handler)
+        handler.close()
+
+    setup_logging(log_file=os.path.join(directory, 'queue.log'))
+    logger.setLevel(logging.DEBUG)
+    queued = per_message(logger.debug, count)
+    started = time.perf_counter()
+    stop_logging()
+    drained = (time.perf_counter() - started) * 1e9 / count
+
+    setup_logging(log_file=os.path.join(directory, 'limited.log'))
+    logger.setLevel(logging.DEBUG)
+    limited = per_message(RateLimitedLog(logger).log, count)
+    stop_logging()
+
+    print(f'disabled:            {disabled:8.0f} ns per message')
+    print(f'synchronous:         {synchronous:8.0f} ns per message (file and console handlers in the calling thread)')
+    print(f'queued:              {queued:8.0f} ns per message in the calling thread, '
+          f'{drained:.0f} ns more in the listener once the loop ended')
+    print(f'rate-limited:        {limited:8.0f} ns per message (burst of the RateLimitedLog, the rest dropped)')
+
+def scan(args, directory, verbose):
+    '''Runs a fast ping sweep of the responder network through the CLI, in directory, and returns its wall time.'''
+    network = ipaddress.ip_network(args.network)
+    command = [sys.executable, '-m', 'NetworkScanner', '-t', 'ping-fast', str(network[0]), str(network[-1]),
+               '-p', str(network.prefixlen), '--rate', str(args.rate), '--timeout', '1', '--no-dns', '--no-history', '-f', 'ndjson']
+    if verbose:
+        command.append('-v')
+    environment = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=directory, env=environment, check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return time.perf_counter() - started, len(completed.stdout.splitlines())
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the overhead of the application log.')
+    parser.add_argument('--messages', type=int, default=200000, help='Number of debug messages timed per setup.')
+    parser.add_argument('--scan', action='store_true', help='Also compare a /16 fast ping sweep with and without -v (needs root).')
+    parser.add_argument('--network', default='10.77.0.0/16', help='Network swept, every address of which responds.')
+    parser.add_argument('--rate', type=int, default=50000, help='Packets sent per second by the sweep.')
+    parser.add_argument('--runs', type=int, default=3, help='Scans per setup; the fastest one is kept.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        stderr = sys.stderr
+        sys.stderr = open(os.devnull, 'w')    # The console handlers write to stderr
+        try:
+            micro(args.messages, directory)
+        finally:
+            sys.stderr.close()
+            sys.stderr = stderr
+
+        if not args.scan:
+            return
+
+        teardown_responder()
+        try:
+            setup_routed_responder(ipaddress.ip_network(args.network))
+            times = {}
+            for verbose in (False, True):
+                runs = [scan(args, directory, verbose) for _ in range(args.runs)]
+                times[verbose] = min(wall_time for wall_time, _ in runs)
+                print(f'/{ipaddress.ip_network(args.network).prefixlen} sweep {"with" if verbose else "without"} -v: '
+                      f'{times[verbose]:6.2f} s, {runs[0][1]} hosts found')
+        finally:
+            teardown_responder()
+        print(f'overhead of debug logging: {times[True] / times[False] - 1:+.1%}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#bench_metrics.py
+'''
+Measures the cost of the metrics updates on the hot path of the engines.
+
+Reports the time of a counter increment and of an RTT observation, next to the time of the rest
+of the per-probe work of the fast ping sweep (building the echo request and recording it in the
+probe scheduler and the rate controller), so the overhead of the metrics is seen in proportion.
+
+Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_metrics.py --probes 1000000
+'''
+import argparse
+import itertools
+import os
+import random
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def per_call(function, count):
+    '''Returns the time of one call of function, in nanoseconds, over count calls.'''
+    started = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - started) * 1e9 / count
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cost of the metrics updates on the hot path.')
+    parser.add_argument('--probes', type=int, default=1000000, help='Number of updates measured.')
+    args = parser.parse_args()
+
+    from NetworkScanner.Interval_Set import int_to_ip
+    from NetworkScanner.Packet_Engine import new_secret, probe_cookie
+    from NetworkScanner.Probe_Scheduler import ProbeScheduler
+    from NetworkScanner.Rate_Controller import RateController
+    from NetworkScanner.Raw_Socket import build_icmp_echo
+    from NetworkScanner.Scan_Metrics import MetricsRegistry, ProbeMetrics
+
+    probe_metrics = ProbeMetrics(MetricsRegistry(), engine='bench')
+    rtts = [random.expovariate(1000) for _ in range(1024)]
+    rtt_iter = itertools.cycle(rtts)
+
+    empty = per_call(lambda: None, args.probes)
+    increment = per_call(probe_metrics.sent.inc, args.probes) - empty
+    observe = per_call(lambda: probe_metrics.rtt.observe(next(rtt_iter)), args.probes) - per_call(lambda: next(rtt_iter), args.probes)
+
+    secret = new_secret()
+    scheduler = ProbeScheduler(timeout=1.0)
+    rate_controller = RateController(max_rate=1e9)
+    addresses = iter(range(10 << 24, (10 << 24) + args.probes))
+
+    def probe():
+        ip = int_to_ip(next(addresses))
+        cookie = probe_cookie(secret, ip)
+        packet = build_icmp_echo(socket.inet_aton(ip), cookie >> 16, cookie & 0xFFFF, b'X' * 32, ttl=64)
+        scheduler.sent(ip, packet)
+        rate_controller.sent(ip)
+        return packet
+    probe_work = per_call(probe, args.probes) - empty
+
+    print(f'counter increment:  {increment:6.0f} ns')
+    print(f'RTT observation:    {observe:6.0f} ns')
+    print(f'probe work:         {probe_work:6.0f} ns (fast ping request without metrics)')
+    print(f'overhead per probe: {(2 * increment + observe) / probe_work:.1%} (sent and reply counted, RTT observed)')
+
+if __name__ == '__main__':
+    main()
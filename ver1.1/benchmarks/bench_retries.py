@@ -0,0 +1,110 @@
+#bench_retries.py
+'''
+Measures what the retransmissions of the ProbeScheduler gain on a lossy network, and what they cost.
+
+A network is routed to a local network namespace (set up as in bench_logging.py), where the
+kernel does not answer pings: a responder process answers the echo requests to --density of the
+addresses instead, and drops --loss percent of them (every value of the comma-separated list in
+turn). A fast ping sweep of the network is then run with retransmissions disabled and with
+--retries, and the hosts found, the wall time and the probes sent again are compared.
+
+Without loss, both sweeps must find every responder in about the same time. With loss, the sweep
+with retransmissions must find more of them, where the one without loses loss percent of them.
+
+Requires root and iproute2. Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_retries.py --prefix 20 --density 0.25 --loss 0,5,20 --rate 5000
+'''
+import argparse
+import ipaddress
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_arp import NAMESPACE, teardown_responder
+from bench_logging import setup_routed_responder
+
+def responds(address, density):
+    '''Returns True if the responder answers for address (an integer), for a pseudorandom density of the addresses.'''
+    return (address * 2654435761) % 2**32 < density * 2**32
+
+def respond(network, density, loss):
+    '''Answers the echo requests to the responding addresses of network, dropping loss percent of them. Runs in the namespace until killed.'''
+    network = ipaddress.ip_network(network)
+    first, last = int(network.network_address), int(network.broadcast_address)
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+    while True:
+        packet = bytearray(receiver.recv(65535))
+        ihl = (packet[0] & 0x0F) * 4
+        if len(packet) < ihl + 8 or packet[ihl] != 8:    # Echo requests only
+            continue
+        destination = int.from_bytes(packet[16:20], 'big')
+        if not first <= destination <= last or not responds(destination, density) or random.random() * 100 < loss:
+            continue
+        # Turn the request into its reply: swap the addresses, and adjust the ICMP checksum for the type
+        packet[12:16], packet[16:20] = packet[16:20], packet[12:16]
+        packet[ihl] = 0
+        checksum = int.from_bytes(packet[ihl + 2:ihl + 4], 'big') + 0x0800
+        packet[ihl + 2:ihl + 4] = ((checksum & 0xFFFF) + (checksum >> 16)).to_bytes(2, 'big')
+        sender.sendto(packet, (socket.inet_ntoa(packet[16:20]), 0))
+
+def sweep(network, rate, timeout, retries):
+    '''Runs a fast ping sweep of network, and returns (hosts found, wall time, probes sent again).'''
+    from NetworkScanner import Constants
+    from NetworkScanner.Scan_Metrics import shared_metrics
+    from NetworkScanner.Scan_Runner import ScanRunner
+    from NetworkScanner.Target_Range import TargetRange
+
+    runner = ScanRunner(Current_ScanType=Constants.SCAN_TYPE_PING_FAST, ip_range=TargetRange.from_networks([network]), timeout=timeout, ttl=64,
+                        interval=0, packet_size=32, start_port=None, end_port=None, rate=rate, stop=lambda: False, retries=retries)
+    host_list = []
+    started = time.perf_counter()
+    runner.run(callback=host_list.extend)
+    return len(host_list), time.perf_counter() - started, shared_metrics.total(Constants.METRIC_RETRIES)
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the retransmissions of the fast ping sweep on a lossy network.')
+    parser.add_argument('--network', default='10.77.0.0', help='Network address of the scanned network.')
+    parser.add_argument('--prefix', type=int, default=20, help='Prefix length of the scanned network.')
+    parser.add_argument('--density', type=float, default=0.25, help='Share of the addresses that respond.')
+    parser.add_argument('--loss', default='0,5,20', help='Comma-separated percentages of echo requests dropped by the responder.')
+    parser.add_argument('--rate', type=float, default=5000, help='Probes sent per second.')
+    parser.add_argument('--timeout', type=float, default=1, help='Maximum probe timeout, in seconds.')
+    parser.add_argument('--retries', type=int, default=2, help='Retransmissions of the second sweep.')
+    parser.add_argument('--responder', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.responder:
+        network, density, loss = args.responder
+        respond(network, float(density), float(loss))
+        return
+
+    import NetworkScanner.Ping_Sweeper    # Imported here, so that the first sweep does not time it
+    network = ipaddress.ip_network(f'{args.network}/{args.prefix}', strict=False)
+    responders = sum(responds(int(address), args.density) for address in network)
+    teardown_responder()
+    try:
+        setup_routed_responder(network)
+        subprocess.run(['ip', 'netns', 'exec', NAMESPACE, 'sysctl', '-qw', 'net.ipv4.icmp_echo_ignore_all=1'], check=True)
+        for loss in map(float, args.loss.split(',')):
+            responder = subprocess.Popen(['ip', 'netns', 'exec', NAMESPACE, sys.executable, os.path.abspath(__file__),
+                                          '--responder', str(network), str(args.density), str(loss)])
+            try:
+                time.sleep(0.5)    # Until the responder listens
+                for retries in (0, args.retries):
+                    found, wall_time, retransmitted = sweep(str(network), args.rate, args.timeout, retries)
+                    print(f'loss {loss:4.1f}%  retries {retries}  {found:6}/{responders:<6} hosts ({found / responders:6.1%})  '
+                          f'wall {wall_time:6.2f} s  {retransmitted:6} probes sent again', flush=True)
+            finally:
+                responder.kill()
+                responder.wait()
+    finally:
+        teardown_responder()
+
+if __name__ == '__main__':
+    main()
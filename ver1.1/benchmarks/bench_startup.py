@@ -0,0 +1,58 @@
+#bench_startup.py
+'''
+Checks the startup-time budget of the command-line interface with python -X importtime.
+
+The CLI must never import PyQt5, must import Scapy only for raw-packet scan types, and its
+imports must stay within IMPORT_BUDGET_MS. Exits with status 1 if any check fails.
+
+Run from the ver1.1 directory:
+    python benchmarks/bench_startup.py
+'''
+import os
+import re
+import subprocess
+import sys
+
+# Total import time allowed for a CLI run that does not need Scapy (ms)
+IMPORT_BUDGET_MS = 150
+# Runs are repeated and the fastest one is kept, to filter out noise
+REPEAT = 5
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+COMMANDS = {
+    'help': ['--help'],
+    'connect scan': ['127.0.0.1', '-t', 'connect', '--start-port', '1', '--end-port', '1', '--no-dns', '-f', 'ndjson'],
+}
+
+def measure(arguments):
+    '''Runs the CLI once and returns (total import time in ms, set of imported top-level packages).'''
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-m', 'NetworkScanner'] + arguments,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    total_us = 0
+    packages = set()
+    for match in IMPORTTIME_LINE.finditer(result.stderr):
+        cumulative_us, indent, module = int(match.group(2)), match.group(3), match.group(4)
+        packages.add(module.split('.')[0])
+        if len(indent) == 1:    # Top-level imports include the time of their children
+            total_us += cumulative_us
+    return total_us / 1000, packages
+
+def main():
+    failed = False
+    for name, arguments in COMMANDS.items():
+        runs = [measure(arguments) for _ in range(REPEAT)]
+        import_ms = min(total for total, _ in runs)
+        packages = runs[0][1]
+
+        forbidden = {'PyQt5', 'scapy'} & packages
+        ok = import_ms <= IMPORT_BUDGET_MS and not forbidden
+        failed |= not ok
+        print(f'{name:<14} imports: {import_ms:6.1f} ms (budget {IMPORT_BUDGET_MS} ms)'
+              f'  forbidden modules: {", ".join(sorted(forbidden)) or "none"}  {"OK" if ok else "FAIL"}')
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
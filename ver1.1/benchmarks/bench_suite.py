@@ -0,0 +1,186 @@
+#bench_suite.py
+'''
+Benchmarks every scan engine against a simulated network, and saves the results as JSON.
+
+For every --prefixes size, a subnet is simulated in a local network namespace as in bench_arp.py:
+--density of its addresses respond (ARP and ICMP are answered by the kernel of the namespace),
+and a listener accepts connections on --listeners on every responder (the other ports are refused).
+The replies are not shaped: bench_retries.py measures the scans on a lossy network.
+
+Every engine is then run in a fresh process on every subnet, which reports the probes sent, the
+hosts found, the wall time, the CPU time and the peak RSS. The probes are counted by the rate
+controller of the engines that have one (ARP, fast ping, port), and are the targets (times the
+ports) for the others.
+
+The results are written to --output, with the parameters, the commit and the platform, so that
+runs can be compared across versions: --baseline prints the change of every measurement from an
+earlier results file.
+
+Requires root and iproute2. Run from the ver1.1 directory, e.g.:
+    python benchmarks/bench_suite.py --prefixes 24,22 --density 0.1 --ports 1-100
+    python benchmarks/bench_suite.py --output after.json --baseline before.json
+'''
+import argparse
+import ipaddress
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_arp import setup_responder, teardown_responder
+from bench_delta import start_listeners
+
+ENGINES = ('arp', 'ping', 'ping-fast', 'port', 'connect')
+# Engines whose probes are not counted by a rate controller
+UNCOUNTED_ENGINES = ('ping', 'connect')
+# Measurements compared with --baseline, and whether a higher value is better
+COMPARED = (('probes_per_sec', True), ('hosts_per_sec', True), ('wall_time', False), ('cpu_time', False), ('peak_rss_mb', False))
+
+def run_engine(spec):
+    '''Runs one engine in this process, as described by spec, and returns its measurements.'''
+    from NetworkScanner.__main__ import SCAN_TYPES
+    from NetworkScanner.Port_Spec import PortSpec
+    from NetworkScanner.Rate_Controller import RateController
+    from NetworkScanner.Rtt_Estimator import RttEstimator
+    from NetworkScanner.Scan_Runner import ScanRunner
+    from NetworkScanner.Target_Range import TargetRange
+
+    class CountingRateController(RateController):
+        '''RateController that counts the probes it is told about.'''
+        probes = 0
+
+        def sent(self, ip):
+            self.probes += 1
+            super().sent(ip)
+
+    ip_range = TargetRange.from_networks([spec['network']])
+    port_spec = PortSpec.from_spec(spec['ports'])
+    start_port, end_port = port_spec.bounds()
+    rtt = RttEstimator(max_timeout=spec['timeout'])
+    rate_controller = CountingRateController(max_rate=spec['rate'], rtt=rtt)
+    runner = ScanRunner(Current_ScanType=SCAN_TYPES[spec['engine']], ip_range=ip_range, timeout=spec['timeout'], ttl=64, interval=0,
+                        packet_size=32, start_port=start_port, end_port=end_port, rate=spec['rate'], stop=lambda: False,
+                        rtt=rtt, rate_controller=rate_controller, port_spec=port_spec)
+    host_list = []
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    runner.run(callback=host_list.extend)
+    wall_time = time.perf_counter() - started
+    cpu_time = time.process_time() - cpu_started
+
+    probes = rate_controller.probes
+    if spec['engine'] in UNCOUNTED_ENGINES:
+        probes = len(ip_range) * (len(port_spec) if spec['engine'] == 'connect' else 1)
+    return {
+        'found': len(host_list),
+        'open_ports': sum(len(host_info.get('Open Port Number') or ()) for host_info in host_list),
+        'probes': probes,
+        'wall_time': wall_time,
+        'cpu_time': cpu_time,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'probes_per_sec': probes / wall_time,
+        'hosts_per_sec': len(host_list) / wall_time,
+    }
+
+def measure(spec):
+    '''Runs one engine in a fresh process, so that its peak RSS is its own, and returns its measurements.'''
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+                               check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+def commit():
+    '''Returns the current git commit of the tree, or None outside of a git checkout.'''
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], check=True, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    '''Prints the change of every measurement from the results in baseline_path, for the cases run in both.'''
+    with open(baseline_path) as file:
+        baseline = {(result['engine'], result['prefix']): result for result in json.load(file)['results']}
+    print(f'\nchange from {baseline_path}:')
+    for result in results:
+        before = baseline.get((result['engine'], result['prefix']))
+        if before is None:
+            continue
+        changes = []
+        for key, higher_is_better in COMPARED:
+            if before[key]:
+                change = result[key] / before[key] - 1
+                worse = change < -0.1 if higher_is_better else change > 0.1
+                changes.append(f'{key} {change:+.0%}{" (worse)" if worse else ""}')
+        print(f'{result["engine"]:10} /{result["prefix"]:<3} ' + ', '.join(changes))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every scan engine against a simulated network.')
+    parser.add_argument('--engines', default='arp,ping-fast,port,connect',
+                        help=f'Comma-separated engines to run, among {",".join(ENGINES)} (default: all but the slow ping).')
+    parser.add_argument('--network', default='10.77.0.0', help='Network address of the simulated subnets.')
+    parser.add_argument('--prefixes', default='24,22', help='Comma-separated prefix lengths of the simulated subnets.')
+    parser.add_argument('--density', type=float, default=0.1, help='Share of the addresses that respond.')
+    parser.add_argument('--ports', default='1-100', help='Port specification of the port and connect scans.')
+    parser.add_argument('--listeners', default='22,80,443', help='Comma-separated listening ports on every responder.')
+    parser.add_argument('--rate', type=float, default=20000, help='Probes sent per second by the rate-controlled engines.')
+    parser.add_argument('--timeout', type=float, default=1, help='Maximum probe timeout, in seconds.')
+    parser.add_argument('--output', default='bench_suite.json', help='Results file (default: bench_suite.json).')
+    parser.add_argument('--baseline', help='Earlier results file to compare the results with.')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_engine(json.loads(args.child))))
+        return
+
+    engines = args.engines.split(',')
+    for engine in engines:
+        if engine not in ENGINES:
+            parser.error(f'unknown engine: {engine}')
+    listeners = [int(port) for port in args.listeners.split(',')]
+
+    results = []
+    for prefix in map(int, args.prefixes.split(',')):
+        network = ipaddress.ip_network(f'{args.network}/{prefix}', strict=False)
+        hosts = max(1, round(args.density * (network.num_addresses - 3)))
+        teardown_responder()
+        listener = None
+        try:
+            setup_responder(network, hosts)
+            listener = start_listeners(listeners)
+            for engine in engines:
+                spec = {'engine': engine, 'network': str(network), 'ports': args.ports, 'rate': args.rate, 'timeout': args.timeout}
+                result = {'engine': engine, 'prefix': prefix, 'targets': network.num_addresses, 'responders': hosts}
+                result.update(measure(spec))
+                results.append(result)
+                print(f'{engine:10} /{prefix:<3} {result["found"]:6}/{hosts:<6} hosts  {result["probes"]:8} probes  '
+                      f'{result["probes_per_sec"]:9.0f} probes/s  {result["hosts_per_sec"]:8.1f} hosts/s  '
+                      f'wall {result["wall_time"]:6.2f} s  cpu {result["cpu_time"]:6.2f} s  rss {result["peak_rss_mb"]:5.0f} MB', flush=True)
+        finally:
+            if listener is not None:
+                listener.terminate()
+            teardown_responder()
+
+    report = {
+        'commit': commit(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline', 'child')},
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'results written to {args.output}')
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == '__main__':
+    main()
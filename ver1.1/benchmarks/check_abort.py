@@ -0,0 +1,152 @@
+#check_abort.py
+'''
+Checks that an abort ends every scan engine within ABORT_BUDGET_MS, and that the results found
+before it are still handed out.
+
+Two networks are routed to a local network namespace (set up as in bench_logging.py): the kernel
+of the namespace answers for every address of the responding one, and silently drops the packets
+to the silent one. Every engine is run through ScanRunner, with a history in a temporary directory
+as in the GUI, and stopped with a StopSignal:
+
+- on the silent network, while it waits in its receive window (or for its connections), which
+  used to last up to the full timeout;
+- on the responding network, halfway through the scan, where the hosts found so far must be
+  handed out. The DNS stage is included, except for the connect scan: it finds thousands of hosts
+  per second, and with an unreachable name server they pile up behind the DNS deadline during the
+  scan, so the time to record that backlog in the history would be measured instead of the abort.
+
+The GUI is then checked offscreen (if PyQt5 is installed): ProcessManager.abort_scan must return
+at once, and the scan thread must finish within the budget.
+
+Exits with status 1 if a check fails. Requires root and iproute2. Run from the ver1.1 directory:
+    python benchmarks/check_abort.py
+'''
+import argparse
+import ipaddress
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_arp import ip, teardown_responder
+from bench_logging import TRANSIT_PEER, setup_routed_responder
+
+# Time allowed from the stop request to the end of the scan (ms)
+ABORT_BUDGET_MS = 100
+# Time allowed for ProcessManager.abort_scan to return on the GUI thread (ms)
+GUI_CALL_BUDGET_MS = 10
+
+RESPONDING = '10.77.0.0/16'
+SILENT = '10.78.0.0/16'
+
+# (name, scan type, network, ports, rate, workers, seconds before the abort, DNS stage, whether hosts must have been found)
+CASES = (
+    ('arp window', 'arp', '10.78.0.0/28', None, 1000, 1, 0.5, True, False),
+    ('ping window', 'ping', '10.78.0.0/28', None, 1000, 1, 0.5, True, False),
+    ('ping-fast window', 'ping-fast', '10.78.0.0/28', None, 1000, 1, 0.5, True, False),
+    ('port window', 'port', '10.78.0.0/28', '1-100', 1000, 1, 0.5, True, False),
+    ('connect in flight', 'connect', '10.78.0.0/28', '1-100', 1000, 1, 0.5, True, False),
+    ('ping-fast partial', 'ping-fast', RESPONDING, None, 5000, 1, 1.0, True, True),
+    ('port partial', 'port', RESPONDING, '22,80', 5000, 1, 1.0, True, True),
+    ('connect partial', 'connect', RESPONDING, '22,80', 5000, 1, 1.0, False, True),
+    ('ping-fast 2 shards', 'ping-fast', RESPONDING, None, 5000, 2, 3.0, True, True),
+)
+
+def run_case(case, directory):
+    '''Runs one case and returns (abort latency in ms, number of hosts handed out).'''
+    from NetworkScanner.__main__ import SCAN_TYPES
+    from NetworkScanner.Dns_Resolver import DnsResolver
+    from NetworkScanner.Port_Spec import PortSpec
+    from NetworkScanner.Scan_History import open_history
+    from NetworkScanner.Scan_Runner import ScanRunner
+    from NetworkScanner.Stop_Signal import StopSignal
+    from NetworkScanner.Target_Range import TargetRange
+
+    name, scan_type, network, ports, rate, workers, abort_after, dns, _ = case
+    port_spec = PortSpec.from_spec(ports) if ports else None
+    start_port, end_port = port_spec.bounds() if port_spec else (None, None)
+    stop = StopSignal()
+    runner = ScanRunner(Current_ScanType=SCAN_TYPES[scan_type], ip_range=TargetRange.from_networks([network]), timeout=5, ttl=64,
+                        interval=0, packet_size=32, start_port=start_port, end_port=end_port, rate=rate, stop=stop,
+                        workers=workers, port_spec=port_spec)
+    history = open_history(os.path.join(directory, f'{name}.db'))
+    hosts = []
+    scan = threading.Thread(target=runner.run, kwargs={'callback': hosts.extend, 'resolver': DnsResolver() if dns else None, 'history': history})
+    scan.start()
+    time.sleep(abort_after)
+    started = time.perf_counter()
+    stop.set()
+    scan.join()
+    latency = (time.perf_counter() - started) * 1000
+    history.close()
+    return latency, len(hosts)
+
+def check_gui(directory):
+    '''Aborts a connect scan of the silent network from the GUI, and returns (abort_scan call time, abort latency) in ms.'''
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from NetworkScanner import Constants
+    from NetworkScanner.Init_GUI import InitGUI
+
+    os.chdir(directory)    # The GUI writes its history and metrics to the working directory
+    app = QApplication.instance() or QApplication(sys.argv)
+    gui = InitGUI()
+    gui.scan_type_combo.setCurrentText(Constants.SCAN_TYPE_CONNECT)
+    gui.start_ip_input.setText('10.78.0.0')
+    gui.end_ip_input.setText('10.78.0.15')
+    gui.prefix_input.setText('16')
+    gui.ports_input.setText('1-100')
+    gui.process_manager.start_scan()
+
+    def process_events(seconds, until=lambda: False):
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline and not until():
+            app.processEvents()
+            time.sleep(0.001)
+
+    process_events(0.5)
+    started = time.perf_counter()
+    gui.process_manager.abort_scan()
+    call = (time.perf_counter() - started) * 1000
+    process_events(5, until=lambda: gui.status_label.text() == Constants.SCAN_ABORTED)
+    latency = (time.perf_counter() - started) * 1000
+    return call, latency
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the abort latency of every scan engine.')
+    parser.add_argument('--no-gui', action='store_true', help='Skip the check of the GUI.')
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        teardown_responder()
+        try:
+            setup_routed_responder(ipaddress.ip_network(RESPONDING))
+            ip('route', 'add', SILENT, 'via', TRANSIT_PEER.split('/')[0])    # Not forwarded by the namespace
+
+            for case in CASES:
+                latency, found = run_case(case, directory)
+                passed = latency <= ABORT_BUDGET_MS and (found > 0 or not case[-1])
+                failures += not passed
+                print(f'{"ok  " if passed else "FAIL"} {case[0]:20} aborted in {latency:6.1f} ms, {found} hosts handed out')
+
+            if not args.no_gui:
+                try:
+                    call, latency = check_gui(directory)
+                except ImportError:
+                    print('skip GUI           PyQt5 is not installed')
+                else:
+                    passed = call <= GUI_CALL_BUDGET_MS and latency <= ABORT_BUDGET_MS
+                    failures += not passed
+                    print(f'{"ok  " if passed else "FAIL"} {"GUI abort":20} abort_scan returned in {call:.1f} ms, scan aborted in {latency:.1f} ms')
+        finally:
+            os.chdir(os.path.dirname(os.path.abspath(__file__)))
+            teardown_responder()
+
+    print(f'abort budget: {ABORT_BUDGET_MS} ms')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,6 @@
+#conftest.py
+import os
+import sys
+
+# The tests import the NetworkScanner package from the ver1.1 directory, wherever pytest is run from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,113 @@
+#test_connect_scanner.py
+import asyncio
+import socket
+import threading
+import time
+from NetworkScanner.Connect_Scanner import ConnectScanner
+from NetworkScanner.Target_Range import TargetRange
+from NetworkScanner.Scan_Metrics import MetricsRegistry
+from NetworkScanner.Stop_Signal import StopSignal
+from NetworkScanner import Constants
+
+class MockedProbes(ConnectScanner):
+    '''ConnectScanner whose connection attempts take delay seconds, and report the ports in open_ports open.'''
+    def __init__(self, delay=0.01, open_ports=(), **kwargs):
+        super().__init__(stop=lambda: False, metrics=MetricsRegistry(), **kwargs)
+        self.delay = delay
+        self.open_ports = set(open_ports)
+        self.tried = []
+        self.in_flight = {}
+        self.peak = 0
+        self.host_peak = 0
+
+    async def _probe(self, ip, port):
+        self.tried.append((ip, port))
+        self.in_flight[ip] = self.in_flight.get(ip, 0) + 1
+        self.peak = max(self.peak, sum(self.in_flight.values()))
+        self.host_peak = max(self.host_peak, self.in_flight[ip])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight[ip] -= 1
+        return port in self.open_ports
+
+def test_many_hosts_reach_the_global_limit():
+    scanner = MockedProbes(start_port=1, end_port=200, ip_range=TargetRange.from_addresses('10.0.0.1', '10.0.0.8'),
+                           max_connections=64, max_host_connections=16, open_ports={22, 80})
+    hosts = scanner.connect_scanner()
+    assert scanner.peak == 64
+    assert scanner.host_peak == 16
+    assert sorted(scanner.tried) == sorted((f'10.0.0.{host}', port) for host in range(1, 9) for port in range(1, 201))
+    assert sorted(host_info[Constants.TABLE_COLOUM_IP] for host_info in hosts) == [f'10.0.0.{host}' for host in range(1, 9)]
+    assert all(host_info[Constants.TABLE_COLOUM_PORT] == [22, 80] for host_info in hosts)
+
+def test_a_single_host_reaches_its_own_limit():
+    scanner = MockedProbes(start_port=1, end_port=400, ip_range=TargetRange.from_addresses('10.0.0.1', '10.0.0.1'),
+                           max_connections=64, max_host_connections=16)
+    started = time.monotonic()
+    hosts = scanner.connect_scanner()
+    assert scanner.peak == scanner.host_peak == 16
+    assert len(scanner.tried) == 400
+    assert [host_info[Constants.TABLE_COLOUM_PORT] for host_info in hosts] == [[]]
+    # 25 rounds of 16 attempts of 10 ms each
+    assert time.monotonic() - started < 2
+
+def test_hosts_are_handed_out_in_range_order():
+    scanner = MockedProbes(start_port=1, end_port=20, ip_range=TargetRange.from_addresses('10.0.0.1', '10.0.0.20'),
+                           max_connections=16, max_host_connections=16, open_ports={1})
+    assert [host_info[Constants.TABLE_COLOUM_IP] for host_info in scanner.connect_scanner_stream()] == [f'10.0.0.{host}' for host in range(1, 21)]
+
+def test_local_ports():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    open_port = listener.getsockname()[1]
+    closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    closed.bind(('127.0.0.1', 0))
+    closed_port = closed.getsockname()[1]
+    try:
+        scanner = ConnectScanner(start_port=None, end_port=None, ip_range=TargetRange.from_addresses('127.0.0.1', '127.0.0.1'),
+                                 stop=lambda: False, ports=lambda ip: [open_port, closed_port], metrics=MetricsRegistry())
+        assert [host_info[Constants.TABLE_COLOUM_PORT] for host_info in scanner.connect_scanner()] == [[open_port]]
+    finally:
+        listener.close()
+        closed.close()
+
+def test_stop_cancels_the_connections_in_flight():
+    open_listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    open_listener.bind(('127.0.0.1', 0))
+    open_listener.listen()
+    open_port = open_listener.getsockname()[1]
+    # A listener whose accept queue is full drops the SYNs of new connections, as a filtered port would
+    full_listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    full_listener.bind(('127.0.0.1', 0))
+    full_listener.listen(0)
+    full_port = full_listener.getsockname()[1]
+    queued = []
+    for _ in range(4):
+        client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client.setblocking(False)
+        client.connect_ex(('127.0.0.1', full_port))
+        queued.append(client)
+    time.sleep(0.05)
+
+    stop = StopSignal()
+    scanner = ConnectScanner(start_port=None, end_port=None, ip_range=TargetRange.from_addresses('127.0.0.1', '127.0.0.1'),
+                             stop=stop, timeout=5, ports=lambda ip: [open_port, full_port], metrics=MetricsRegistry())
+    stopped_at = []
+    def abort():
+        stopped_at.append(time.monotonic())
+        stop.set()
+    timer = threading.Timer(0.3, abort)
+    timer.start()
+    try:
+        hosts = scanner.connect_scanner()
+        ended_at = time.monotonic()
+    finally:
+        timer.join()
+        stop.close()
+        for sock in [open_listener, full_listener] + queued:
+            sock.close()
+    assert ended_at - stopped_at[0] < 0.1
+    # The host answered on its open port before the stop, so it is handed out
+    assert [host_info[Constants.TABLE_COLOUM_PORT] for host_info in hosts] == [[open_port]]
@@ -0,0 +1,89 @@
+#test_delta_scan.py
+import pytest
+from NetworkScanner.Delta_Scan import DeltaScan
+from NetworkScanner.Scan_History import ScanHistory
+from NetworkScanner.Target_Range import TargetRange
+from NetworkScanner.Port_Spec import PortSpec
+from NetworkScanner import Constants
+
+RANGE = TargetRange.from_networks(['10.0.0.0/28'])
+PORTS = PortSpec.from_range(1, 8)
+ROTATIONS = 4
+
+def host(ip, ports=(), mac=''):
+    return {Constants.TABLE_COLOUM_IP: ip, Constants.TABLE_COLOUM_MAC: mac, Constants.TABLE_COLOUM_HOST: Constants.UNKNOWN_HOST, Constants.TABLE_COLOUM_PORT: list(ports)}
+
+@pytest.fixture
+def history(tmp_path):
+    history = ScanHistory(str(tmp_path / 'history.db'))
+    yield history
+    history.close()
+
+def record_scan(history, hosts, status=Constants.HISTORY_STATUS_COMPLETED, ip_range=RANGE, scan_type=Constants.SCAN_TYPE_CONNECT):
+    scan_id = history.begin_scan(scan_type, ip_range, 1, 8)
+    history.add_hosts(scan_id, hosts)
+    history.finish_scan(scan_id, status)
+
+def delta_scan(history, scan_type=Constants.SCAN_TYPE_CONNECT):
+    runner_args = {Constants.KEY_CURRENT_SCAN_TYPE: scan_type, Constants.KEY_IP_RANGE: RANGE, Constants.KEY_PORT_SPEC: PORTS}
+    return DeltaScan(runner_args=runner_args, history=history, stop=lambda: False, rotations=ROTATIONS)
+
+def test_first_run_scans_everything(history):
+    scan = delta_scan(history)
+    assert len(scan.live) == 0
+    assert list(scan.sample) == list(RANGE)
+    assert scan.ports('10.0.0.1') is None
+
+def test_rotations_cover_the_range_and_the_ports(history):
+    known = host('10.0.0.1', [2])
+    samples, port_slices = [], []
+    for rotation in range(ROTATIONS):
+        record_scan(history, [known])
+        scan = delta_scan(history)
+        assert scan.rotation == (rotation + 1) % ROTATIONS
+        assert list(scan.live) == ['10.0.0.1']
+        samples.append(list(scan.sample))
+        # A known host gets its open port and the slice of the rotation
+        port_slices.append(list(scan.port_slice))
+        assert sorted(scan.ports('10.0.0.1')) == sorted({2} | set(scan.port_slice))
+        assert scan.ports('10.0.0.9') is None
+
+    # Every other address is sampled exactly once every ROTATIONS runs, and so is every port of the known hosts
+    sampled = [ip for sample in samples for ip in sample]
+    assert sorted(sampled) == sorted(ip for ip in RANGE if ip != '10.0.0.1')
+    assert sorted(port for ports in port_slices for port in ports) == sorted(PORTS.tcp)
+
+def test_only_completed_scans_of_the_range_move_the_rotation(history):
+    record_scan(history, [host('10.0.0.1', [2])])
+    assert delta_scan(history).rotation == 1
+    # An aborted or failed run may not have probed its slice: the next run probes it again
+    record_scan(history, [], status=Constants.HISTORY_STATUS_ABORTED)
+    record_scan(history, [], status=Constants.HISTORY_STATUS_FAILED)
+    record_scan(history, [], status=Constants.HISTORY_STATUS_RUNNING)
+    # Neither do scans that did not cover the range, nor host discovery scans, for a port scan
+    record_scan(history, [], ip_range=TargetRange.from_networks(['10.0.0.0/30']))
+    record_scan(history, [], scan_type=Constants.SCAN_TYPE_PING_FAST)
+    assert delta_scan(history).rotation == 1
+    record_scan(history, [], ip_range=TargetRange.from_networks(['10.0.0.0/24']))
+    assert delta_scan(history).rotation == 2
+
+def test_diff(history):
+    record_scan(history, [host('10.0.0.1', [2, 3], mac='00:11:22:33:44:55'), host('10.0.0.2', [1]), host('10.0.0.3', [4])])
+    scan = delta_scan(history)
+    found = [host('10.0.0.1', [3, 5], mac='00:11:22:33:44:66'), host('10.0.0.3', [4]), host('10.0.0.4', [8])]
+
+    changes = {host_info[Constants.TABLE_COLOUM_IP]: (host_info[Constants.TABLE_COLOUM_CHANGE], host_info[Constants.TABLE_COLOUM_DETAILS])
+               for host_info in scan.diff(found)}
+    assert changes == {
+        '10.0.0.1': (Constants.DELTA_CHANGED, 'MAC 00:11:22:33:44:55 -> 00:11:22:33:44:66 +5 -2'),
+        '10.0.0.2': (Constants.DELTA_REMOVED, ''),
+        '10.0.0.4': (Constants.DELTA_ADDED, ''),
+    }
+    # The changes are sorted by address
+    assert [host_info[Constants.TABLE_COLOUM_IP] for host_info in scan.diff(found)] == ['10.0.0.1', '10.0.0.2', '10.0.0.4']
+
+def test_diff_of_a_stopped_run_reports_no_removed_hosts(history):
+    record_scan(history, [host('10.0.0.1', [2]), host('10.0.0.2', [1])])
+    scan = delta_scan(history)
+    changes = scan.diff([host('10.0.0.1', [2])], complete=False)
+    assert changes == []
@@ -0,0 +1,132 @@
+#test_dns_resolver.py
+import socket
+import threading
+import time
+import pytest
+from NetworkScanner.Dns_Resolver import DnsResolver
+from NetworkScanner.Scan_Metrics import MetricsRegistry
+from NetworkScanner.Stop_Signal import StopSignal
+from NetworkScanner import Constants
+
+class FakeDns:
+    '''Stands in for socket.gethostbyaddr: names the addresses in names, fails for the others, and blocks on the ones in stuck.'''
+    def __init__(self, names=None, stuck=(), delay=0):
+        self.names = names or {}
+        self.stuck = set(stuck)
+        self.delay = delay
+        self.release = threading.Event()
+        self.lookups = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def gethostbyaddr(self, ip):
+        with self._lock:
+            self.lookups.append(ip)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            if ip in self.stuck:
+                self.release.wait(10)
+            time.sleep(self.delay)
+            if ip not in self.names:
+                raise socket.herror(1, 'Unknown host')
+            return self.names[ip], [], [ip]
+        finally:
+            with self._lock:
+                self.running -= 1
+
+@pytest.fixture
+def dns(monkeypatch):
+    dns = FakeDns()
+    monkeypatch.setattr(socket, 'gethostbyaddr', dns.gethostbyaddr)
+    yield dns
+    # Lookups stuck in the fake resolver would keep the thread pool from shutting down
+    dns.release.set()
+
+def test_answers_are_cached(dns):
+    dns.names = {'10.0.0.1': 'gateway.lan'}
+    metrics = MetricsRegistry()
+    resolver = DnsResolver(metrics=metrics)
+    assert resolver.resolve(['10.0.0.1', '10.0.0.2']) == {'10.0.0.1': 'gateway.lan', '10.0.0.2': Constants.UNKNOWN_HOST}
+    # Failures are cached too
+    assert resolver.resolve(['10.0.0.1', '10.0.0.2']) == {'10.0.0.1': 'gateway.lan', '10.0.0.2': Constants.UNKNOWN_HOST}
+    assert sorted(dns.lookups) == ['10.0.0.1', '10.0.0.2']
+    assert metrics.total(Constants.METRIC_DNS_LOOKUPS) == 2
+    assert metrics.total(Constants.METRIC_DNS_CACHE_HITS) == 2
+    assert metrics.total(Constants.METRIC_DNS_FAILURES) == 1
+
+def test_cached_answers_expire_after_their_ttl(dns):
+    dns.names = {'10.0.0.1': 'gateway.lan'}
+    resolver = DnsResolver(positive_ttl=60, negative_ttl=0.05, metrics=MetricsRegistry())
+    resolver.resolve(['10.0.0.1', '10.0.0.2'])
+    time.sleep(0.1)
+    dns.names['10.0.0.2'] = 'printer.lan'
+    # The failure has expired, the name has not
+    assert resolver.resolve(['10.0.0.1', '10.0.0.2']) == {'10.0.0.1': 'gateway.lan', '10.0.0.2': 'printer.lan'}
+    assert sorted(dns.lookups) == ['10.0.0.1', '10.0.0.2', '10.0.0.2']
+
+def test_least_recently_used_answers_are_evicted(dns):
+    resolver = DnsResolver(cache_size=2, metrics=MetricsRegistry())
+    resolver.resolve(['10.0.0.1'])
+    resolver.resolve(['10.0.0.2'])
+    resolver.resolve(['10.0.0.1'])    # Now the most recently used
+    resolver.resolve(['10.0.0.3'])
+    resolver.resolve(['10.0.0.1', '10.0.0.2'])
+    assert dns.lookups == ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.2']
+
+def test_stuck_lookup_is_abandoned_at_its_deadline(dns):
+    dns.names = {'10.0.0.1': 'gateway.lan'}
+    dns.stuck = {'10.0.0.2'}
+    resolver = DnsResolver(deadline=0.2, metrics=MetricsRegistry())
+    started = time.monotonic()
+    assert resolver.resolve(['10.0.0.1', '10.0.0.2']) == {'10.0.0.1': 'gateway.lan', '10.0.0.2': Constants.UNKNOWN_HOST}
+    assert 0.2 <= time.monotonic() - started < 1
+
+def test_queued_lookups_get_their_own_deadline(dns):
+    # 20 lookups of 50 ms on 2 workers take 0.5 s, more than the deadline, but none runs for longer than it
+    dns.names = {f'10.0.0.{host}': f'host{host}.lan' for host in range(1, 21)}
+    dns.delay = 0.05
+    resolver = DnsResolver(max_workers=2, max_pending=4, deadline=0.3, metrics=MetricsRegistry())
+    hostnames = resolver.resolve(dns.names)
+    assert hostnames == dns.names
+    assert dns.peak == 2
+
+def test_pending_lookups_are_bounded(dns, monkeypatch):
+    dns.delay = 0.01
+    resolver = DnsResolver(max_workers=4, max_pending=3, metrics=MetricsRegistry())
+    pending = []
+    submit = resolver._submit
+    def counting_submit(ip):
+        future = submit(ip)
+        pending.append(len(resolver._pending))
+        return future
+    monkeypatch.setattr(resolver, '_submit', counting_submit)
+    resolver.resolve([f'10.0.0.{host}' for host in range(1, 31)])
+    assert len(dns.lookups) == 30
+    assert max(pending) == 3
+
+def test_lookups_are_abandoned_when_every_worker_is_stuck(dns):
+    dns.stuck = {f'10.0.0.{host}' for host in range(1, 11)}
+    resolver = DnsResolver(max_workers=2, deadline=0.2, metrics=MetricsRegistry())
+    started = time.monotonic()
+    hostnames = resolver.resolve(sorted(dns.stuck))
+    assert set(hostnames.values()) == {Constants.UNKNOWN_HOST}
+    assert time.monotonic() - started < 1
+    assert len(dns.lookups) == 2
+
+def test_stop_ends_the_wait_at_once(dns):
+    dns.stuck = {'10.0.0.1'}
+    resolver = DnsResolver(deadline=5, metrics=MetricsRegistry())
+    stop = StopSignal()
+    threading.Timer(0.1, stop.set).start()
+    started = time.monotonic()
+    assert resolver.resolve(['10.0.0.1'], stop=stop) == {'10.0.0.1': Constants.UNKNOWN_HOST}
+    assert time.monotonic() - started < 0.5
+    stop.close()
+
+def test_resolve_hosts(dns):
+    dns.names = {'10.0.0.1': 'gateway.lan'}
+    host_list = [{Constants.TABLE_COLOUM_IP: '10.0.0.1', Constants.TABLE_COLOUM_HOST: ''}]
+    assert DnsResolver(metrics=MetricsRegistry()).resolve_hosts(host_list) is host_list
+    assert host_list[0][Constants.TABLE_COLOUM_HOST] == 'gateway.lan'
@@ -0,0 +1,76 @@
+#test_host_record.py
+import random
+import pytest
+from NetworkScanner.Host_Record import HostRecord, port_array, union_ports
+from NetworkScanner import Constants
+
+def record(ports, ip='10.0.0.1', mac='', hostname=''):
+    return HostRecord.from_host_info({Constants.TABLE_COLOUM_IP: ip, Constants.TABLE_COLOUM_MAC: mac,
+                                      Constants.TABLE_COLOUM_HOST: hostname, Constants.TABLE_COLOUM_PORT: list(ports)})
+
+def test_host_info_round_trip():
+    host_info = {Constants.TABLE_COLOUM_IP: '192.168.1.20', Constants.TABLE_COLOUM_MAC: '00:1a:2b:3c:4d:5e',
+                 Constants.TABLE_COLOUM_HOST: 'printer.lan', Constants.TABLE_COLOUM_PORT: [631, 80, 9100, 80]}
+    host = HostRecord.from_host_info(host_info)
+    assert host.ip == 0xC0A80114
+    assert host.mac == bytes.fromhex('001a2b3c4d5e')
+    assert host.to_host_info() == dict(host_info, **{Constants.TABLE_COLOUM_PORT: [80, 631, 9100]})
+
+def test_missing_fields():
+    host = HostRecord.from_host_info({Constants.TABLE_COLOUM_IP: '10.0.0.1'})
+    assert host.mac == HostRecord.NO_MAC
+    assert host.mac_text() == ''
+    assert host.hostname == ''
+    assert host.ports is HostRecord.NO_PORTS
+
+def test_set_operations():
+    first, second = record([22, 80, 443]), record([80, 8080])
+    assert (first | second).ports.tolist() == [22, 80, 443, 8080]
+    assert (first & second).ports.tolist() == [80]
+    assert (first - second).ports.tolist() == [22, 443]
+    assert (second - first).ports.tolist() == [8080]
+    # Records are not changed by the operations
+    assert first.ports.tolist() == [22, 80, 443]
+
+def test_set_operations_with_no_ports():
+    host, empty = record([22, 80]), record([])
+    assert (host | empty).ports is host.ports
+    assert (empty | host).ports is host.ports
+    assert (host & empty).ports is HostRecord.NO_PORTS
+    assert (host - empty) is host
+    assert (empty - host).ports is HostRecord.NO_PORTS
+
+@pytest.mark.parametrize('seed', range(10))
+def test_set_operations_match_python_sets(seed):
+    generator = random.Random(seed)
+    first_ports = {generator.randint(1, 200) for _ in range(generator.randint(0, 30))}
+    second_ports = {generator.randint(1, 200) for _ in range(generator.randint(0, 30))}
+    first, second = record(first_ports), record(second_ports)
+    assert (first | second).ports.tolist() == sorted(first_ports | second_ports)
+    assert (first & second).ports.tolist() == sorted(first_ports & second_ports)
+    assert (first - second).ports.tolist() == sorted(first_ports - second_ports)
+    for port in range(1, 201):
+        assert (port in first) == (port in first_ports)
+
+def test_union_fills_in_the_missing_mac_and_host_name():
+    found = record([22], mac='00:11:22:33:44:55')
+    resolved = record([80], hostname='server.lan')
+    merged = found | resolved
+    assert merged.mac_text() == '00:11:22:33:44:55'
+    assert merged.hostname == 'server.lan'
+    # The MAC address and host name of the left record win
+    assert (record([], mac='00:11:22:33:44:66') | found).mac_text() == '00:11:22:33:44:66'
+
+def test_port_sets_are_shared():
+    assert port_array([443, 22, 80]) is port_array((80, 22, 443, 22))
+    assert record([22, 80]).ports is record([80, 22]).ports
+    assert port_array(None) is HostRecord.NO_PORTS
+    ports = port_array([22])
+    assert union_ports(ports, port_array([22])) is ports
+
+def test_equality():
+    assert record([22], mac='00:11:22:33:44:55') == record([22], mac='00:11:22:33:44:55')
+    assert record([22]) != record([23])
+    assert record([22]) != record([22], ip='10.0.0.2')
+    with pytest.raises(TypeError):
+        hash(record([22]))
@@ -0,0 +1,84 @@
+#test_interval_set.py
+import random
+import pytest
+from NetworkScanner.Interval_Set import IntervalSet, ip_to_int
+
+def addresses(interval_set):
+    '''Returns the addresses of a set as a Python set of integers.'''
+    return {value for first, last in interval_set for value in range(first, last + 1)}
+
+def test_intervals_are_sorted_and_merged():
+    interval_set = IntervalSet([(20, 30), (1, 5), (6, 9), (25, 40), (50, 50)])
+    assert interval_set.intervals() == [(1, 9), (20, 40), (50, 50)]
+    assert len(interval_set) == 9 + 21 + 1
+
+def test_difference():
+    include = IntervalSet([(0, 9), (20, 29), (40, 49)])
+    exclude = IntervalSet([(5, 24), (29, 29), (35, 39), (45, 100)])
+    assert include.difference(exclude).intervals() == [(0, 4), (25, 28), (40, 44)]
+
+def test_difference_of_disjoint_and_covering_sets():
+    include = IntervalSet([(10, 19)])
+    assert include.difference(IntervalSet()).intervals() == [(10, 19)]
+    assert include.difference(IntervalSet([(0, 9), (20, 30)])).intervals() == [(10, 19)]
+    assert include.difference(IntervalSet([(0, 30)])).intervals() == []
+    assert IntervalSet().difference(include).intervals() == []
+
+def test_difference_at_the_ends_of_the_address_space():
+    include = IntervalSet([(0, 0xFFFFFFFF)])
+    exclude = IntervalSet([(0, 0), (0xFFFFFFFF, 0xFFFFFFFF)])
+    assert include.difference(exclude).intervals() == [(1, 0xFFFFFFFE)]
+    assert exclude.difference(include).intervals() == []
+
+@pytest.mark.parametrize('seed', range(20))
+def test_difference_matches_set_difference(seed):
+    generator = random.Random(seed)
+    def random_set():
+        intervals = []
+        for _ in range(generator.randint(0, 12)):
+            first = generator.randint(0, 300)
+            intervals.append((first, first + generator.randint(0, 30)))
+        return IntervalSet(intervals)
+
+    include, exclude = random_set(), random_set()
+    difference = include.difference(exclude)
+    assert addresses(difference) == addresses(include) - addresses(exclude)
+    assert len(difference) == len(addresses(difference))
+    # The result is merged: no two intervals overlap or touch
+    intervals = difference.intervals()
+    assert all(last + 1 < next_first for (_, last), (next_first, _) in zip(intervals, intervals[1:]))
+
+def test_complement():
+    interval_set = IntervalSet([(10, 19), (30, 39)])
+    assert interval_set.complement(0, 50).intervals() == [(0, 9), (20, 29), (40, 50)]
+    assert interval_set.complement(15, 35).intervals() == [(20, 29)]
+
+def test_from_spec():
+    interval_set = IntervalSet.from_spec('10.0.0.0/30, 10.0.1.5-7 192.168.0.1\n10.0.0.2')
+    assert interval_set.intervals() == [(ip_to_int('10.0.0.0'), ip_to_int('10.0.0.3')),
+                                        (ip_to_int('10.0.1.5'), ip_to_int('10.0.1.7')),
+                                        (ip_to_int('192.168.0.1'), ip_to_int('192.168.0.1'))]
+    assert '10.0.1.6' in interval_set
+    assert '10.0.1.8' not in interval_set
+
+def test_from_spec_file(tmp_path):
+    path = tmp_path / 'targets.txt'
+    path.write_text('# Lab\n10.0.0.1, 10.0.0.2  # two hosts\n\n10.0.2.0/31\n')
+    assert IntervalSet.from_spec(f'@{path}').intervals() == [(ip_to_int('10.0.0.1'), ip_to_int('10.0.0.2')),
+                                                             (ip_to_int('10.0.2.0'), ip_to_int('10.0.2.1'))]
+
+@pytest.mark.parametrize('spec', ['10.0.0', '10.0.0.300', '10.0.0.0/33', '10.0.0.9-10.0.0.1', 'host', '@/nonexistent/targets.txt',
+                                  '192.168.001.010', '0x10.0.0.1', '10.0.0.010-20', '10.0.0.1-020', '010.0.0.0/24'])
+def test_invalid_spec(spec):
+    with pytest.raises(ValueError):
+        IntervalSet.from_spec(spec)
+
+@pytest.mark.parametrize('ip', ['192.168.001.010', '0x10.0.0.1', '10.0.0.0x1', '10.1', '10.0.0.1 ', '1.2.3.4.5', ''])
+def test_ip_to_int_only_takes_decimal_octets(ip):
+    with pytest.raises(OSError):
+        ip_to_int(ip)
+
+def test_ip_to_int():
+    assert ip_to_int('0.0.0.0') == 0
+    assert ip_to_int('192.168.1.10') == 0xC0A8010A
+    assert ip_to_int('255.255.255.255') == 0xFFFFFFFF
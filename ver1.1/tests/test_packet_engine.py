@@ -0,0 +1,113 @@
+#test_packet_engine.py
+import socket
+import threading
+import time
+import pytest
+from NetworkScanner.Packet_Engine import PacketEngine, WindowMarker
+from NetworkScanner.Probe_Scheduler import ProbeScheduler
+from NetworkScanner.Stop_Signal import StopSignal
+
+# Time allowed from a stop request to the end of a stream (s)
+ABORT_BUDGET = 0.1
+
+class LoopbackSocket:
+    '''Stands in for a Scapy socket: records the packets sent, and echoes back the ones in answer.'''
+    def __init__(self, answer=()):
+        self.answer = set(answer)
+        self.sent = []
+        self._inner, self._outer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def send(self, packet):
+        self.sent.append((time.monotonic(), packet))
+        if packet in self.answer:
+            self._outer.send(packet)
+
+    def recv(self):
+        return self._inner.recv(1024)
+
+    def fileno(self):
+        return self._inner.fileno()
+
+    def close(self):
+        self._inner.close()
+        self._outer.close()
+
+def test_timeouts_expire_while_the_probe_iterator_waits():
+    sock = LoopbackSocket()
+    scheduler = ProbeScheduler(timeout=0.05, retries=1)
+    scheduler._recovered = 1    # Loss is evident, so every timed-out probe is sent again
+    engine = PacketEngine(socket_factory=lambda: sock, rate=0, timeout=0.05, stop=lambda: False, scheduler=scheduler)
+    resumed = threading.Event()
+
+    def slow_probes():
+        scheduler.sent('10.0.0.1', b'1')
+        yield b'1'
+        yield WindowMarker('10.0.0.1')
+        # E.g., a HostPipeline waiting for the next discovered host
+        time.sleep(1)
+        resumed.set()
+        scheduler.sent('10.0.0.2', b'2')
+        yield b'2'
+        yield WindowMarker('10.0.0.2')
+
+    markers = []
+    for item in engine.stream(slow_probes(), match=lambda packet: packet):
+        if isinstance(item, WindowMarker):
+            markers.append((item.value, resumed.is_set()))
+    # The first probe was sent again and given up, and its host completed, before the iterator resumed
+    assert markers == [('10.0.0.1', False), ('10.0.0.2', True)]
+    first = [sent_at for sent_at, packet in sock.sent if packet == b'1']
+    assert len(first) == 2
+    assert [packet for _, packet in sock.sent] == [b'1', b'1', b'2', b'2']
+
+def test_answered_probes_are_matched():
+    sock = LoopbackSocket(answer={b'1', b'2', b'3'})
+    scheduler = ProbeScheduler(timeout=5, retries=0)
+    engine = PacketEngine(socket_factory=lambda: sock, rate=0, timeout=5, stop=lambda: False, scheduler=scheduler)
+
+    def probes():
+        for index in range(1, 4):
+            scheduler.sent(str(index), str(index).encode())
+            yield str(index).encode()
+
+    def match(packet):
+        # Every probe is answered, and the stream ends with the last reply, but only some replies make a result
+        return packet if scheduler.answered(packet.decode()) is not None and packet != b'2' else None
+
+    assert sorted(engine.run(probes(), match)) == [b'1', b'3']
+    assert scheduler.idle()
+
+@pytest.mark.parametrize('retries', [None, 0, 2])
+def test_stop_ends_the_receive_window_at_once(retries):
+    sock = LoopbackSocket(answer={b'1'})
+    stop = StopSignal()
+    scheduler = ProbeScheduler(timeout=5, retries=retries) if retries is not None else None
+    engine = PacketEngine(socket_factory=lambda: sock, rate=0, timeout=5, stop=stop, scheduler=scheduler)
+
+    def probes():
+        for packet in (b'1', b'2'):
+            if scheduler is not None:
+                scheduler.sent(packet, packet)
+            yield packet
+        yield WindowMarker('last')
+
+    def match(packet):
+        if scheduler is not None:
+            scheduler.answered(packet)
+        return packet
+
+    stopped_at = []
+    def abort():
+        stopped_at.append(time.monotonic())
+        stop.set()
+    timer = threading.Timer(0.2, abort)
+    timer.start()
+    # The window (and the timeout of the unanswered probe) would last 5 s
+    items = list(engine.stream(probes(), match))
+    ended_at = time.monotonic()
+    timer.join()
+    stop.close()
+    assert ended_at - stopped_at[0] < ABORT_BUDGET
+    # The reply that arrived before the stop, and the marker, are still handed out
+    assert items[0] == b'1'
+    assert isinstance(items[-1], WindowMarker)
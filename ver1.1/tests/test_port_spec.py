@@ -0,0 +1,59 @@
+#test_port_spec.py
+import pytest
+from NetworkScanner.Port_Spec import PortSpec, top_ports
+from NetworkScanner.Port_Frequency import TCP_PORT_FREQUENCY, UDP_PORT_FREQUENCY
+
+def test_ports_and_ranges():
+    spec = PortSpec.from_spec('22,80, 8000-8002 443')
+    assert sorted(spec) == [22, 80, 443, 8000, 8001, 8002]
+    assert len(spec) == 6
+    assert spec.bounds() == (22, 8002)
+    assert spec.text == '22,80, 8000-8002 443'
+
+def test_ports_are_deduplicated_and_probed_most_frequent_first():
+    spec = PortSpec.from_spec('60000-60002,22,80,22,80,443')
+    # 80, 443 and 22 are ranked, in this order; the unlisted ports follow by port number
+    assert list(spec) == [80, 443, 22, 60000, 60001, 60002]
+
+def test_top_ports():
+    assert list(PortSpec.from_spec('top:5')) == list(TCP_PORT_FREQUENCY[:5])
+    assert list(PortSpec.from_spec('T:TOP:5')) == list(TCP_PORT_FREQUENCY[:5])
+    assert len(PortSpec.from_spec('top:1000')) == 1000
+
+def test_top_ports_past_the_table():
+    ranked = len(TCP_PORT_FREQUENCY)
+    ports = top_ports(TCP_PORT_FREQUENCY, ranked + 3)
+    assert ports[:ranked] == list(TCP_PORT_FREQUENCY)
+    # The unlisted well-known ports follow, in ascending order
+    unlisted = [port for port in range(1, 1024) if port not in TCP_PORT_FREQUENCY][:3]
+    assert ports[ranked:] == unlisted
+    assert len(top_ports(TCP_PORT_FREQUENCY, 65535)) == 65535
+
+def test_udp_entries():
+    spec = PortSpec.from_spec('22,u:53,u:top:3')
+    assert list(spec) == [22]
+    assert set(spec.udp) == {53} | set(UDP_PORT_FREQUENCY[:3])
+
+def test_membership():
+    spec = PortSpec.from_spec('1,22,8000-8100,65535')
+    assert all(port in spec for port in (1, 22, 8000, 8050, 8100, 65535))
+    assert not any(port in spec for port in (0, 2, 21, 7999, 8101, 65534, 65536, -1))
+
+def test_from_range():
+    spec = PortSpec.from_range(20, 25)
+    assert sorted(spec) == list(range(20, 26))
+    assert str(spec) == '20-25'
+
+def test_split_deals_out_the_ports():
+    spec = PortSpec.from_spec('top:10')
+    parts = spec.split(3)
+    assert [len(part) for part in parts] == [4, 3, 3]
+    assert sorted(port for part in parts for port in part) == sorted(spec)
+    # Every part starts with one of the most frequently open ports
+    assert [part.tcp[0] for part in parts] == list(TCP_PORT_FREQUENCY[:3])
+    assert len(PortSpec.from_spec('80,443').split(4)) == 2
+
+@pytest.mark.parametrize('spec', ['', ' , ', '0', '65536', '-1', '10-5', '1-65536', 'http', 'top:0', 'top:65536', 'top:', 'x:80', 'u:', '80;443'])
+def test_invalid_spec(spec):
+    with pytest.raises(ValueError):
+        PortSpec.from_spec(spec)
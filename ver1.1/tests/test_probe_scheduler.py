@@ -0,0 +1,97 @@
+#test_probe_scheduler.py
+import time
+from NetworkScanner.Probe_Scheduler import ProbeScheduler
+
+def test_segments_complete_once_their_probes_are_answered():
+    scheduler = ProbeScheduler(timeout=60, retries=0)
+    scheduler.sent(('10.0.0.1', 22), b'a')
+    scheduler.sent(('10.0.0.1', 80), b'b')
+    first = scheduler.mark()
+    scheduler.sent(('10.0.0.2', 22), b'c')
+    second = scheduler.mark()
+    assert not scheduler.complete(first)
+    assert not scheduler.complete(second)
+
+    assert scheduler.answered(('10.0.0.1', 22))[0] == 0
+    assert not scheduler.complete(first)
+    # A later segment completes on its own, before an earlier one
+    scheduler.answered(('10.0.0.2', 22))
+    assert scheduler.complete(second)
+    assert not scheduler.complete(first)
+    scheduler.answered(('10.0.0.1', 80))
+    assert scheduler.complete(first)
+    assert scheduler.idle()
+
+def test_empty_segment_is_complete():
+    scheduler = ProbeScheduler(timeout=60, retries=0)
+    scheduler.sent('10.0.0.1', b'a')
+    first = scheduler.mark()
+    empty = scheduler.mark()
+    assert scheduler.complete(empty)
+    assert not scheduler.complete(first)
+
+def test_the_current_segment_is_complete_only_once_marked():
+    scheduler = ProbeScheduler(timeout=60, retries=0)
+    scheduler.sent('10.0.0.1', b'a')
+    scheduler.answered('10.0.0.1')
+    # More probes may still join the segment until it is marked
+    scheduler.sent('10.0.0.2', b'b')
+    segment = scheduler.mark()
+    assert not scheduler.complete(segment)
+    scheduler.answered('10.0.0.2')
+    assert scheduler.complete(segment)
+
+def test_late_and_unknown_replies():
+    scheduler = ProbeScheduler(timeout=60, retries=0)
+    scheduler.sent('10.0.0.1', b'a')
+    segment = scheduler.mark()
+    assert scheduler.answered('10.0.0.9') is None
+    assert scheduler.answered('10.0.0.1') is not None
+    assert scheduler.answered('10.0.0.1') is None    # The second reply is late
+    assert scheduler.complete(segment)
+
+def test_probe_sent_again_moves_to_the_new_segment():
+    scheduler = ProbeScheduler(timeout=60, retries=0)
+    scheduler.sent('10.0.0.1', b'a')
+    first = scheduler.mark()
+    scheduler.sent('10.0.0.1', b'a')    # e.g., a target listed twice
+    second = scheduler.mark()
+    assert scheduler.complete(first)
+    assert not scheduler.complete(second)
+    scheduler.answered('10.0.0.1')
+    assert scheduler.complete(second)
+
+def test_given_up_probes_complete_their_segment():
+    scheduler = ProbeScheduler(timeout=0.01, retries=0)
+    scheduler.sent('10.0.0.1', b'a')
+    scheduler.sent('10.0.0.2', b'b')
+    first = scheduler.mark()
+    scheduler.sent('10.0.0.3', b'c')
+    second = scheduler.mark()
+    scheduler.answered('10.0.0.3')
+    assert scheduler.complete(second)
+    assert not scheduler.complete(first)
+
+    deadline = time.monotonic() + 5
+    while not scheduler.complete(first) and time.monotonic() < deadline:
+        assert scheduler.retransmission() is None    # retries=0 never sends a probe again
+        time.sleep(scheduler.tick)
+    assert scheduler.complete(first)
+    assert scheduler.idle()
+
+def test_retransmitted_probe_stays_in_its_segment():
+    scheduler = ProbeScheduler(timeout=0.01, retries=1)
+    scheduler._recovered = 1    # Loss is evident, so every timed-out probe is sent again
+    scheduler.sent('10.0.0.1', b'a')
+    segment = scheduler.mark()
+
+    deadline = time.monotonic() + 5
+    packet = None
+    while packet is None and time.monotonic() < deadline:
+        time.sleep(scheduler.tick)
+        packet = scheduler.retransmission()
+    assert packet == b'a'
+    assert not scheduler.complete(segment)
+    retries, _ = scheduler.answered('10.0.0.1')
+    assert retries == 1
+    assert scheduler.complete(segment)
@@ -0,0 +1,126 @@
+#test_rate_controller.py
+import pytest
+from NetworkScanner import Rate_Controller
+from NetworkScanner.Rate_Controller import RateController, RateBudget
+from NetworkScanner import Constants
+
+class Clock:
+    '''Stands in for the time module of Rate_Controller, so that windows end when the test says so.'''
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(Rate_Controller, 'time', clock)
+    return clock
+
+def window(controller, clock, replied, sent=200, ip='10.0.0.1'):
+    '''Sends one evaluation window of probes to ip, replied of them answered at once.'''
+    for index in range(sent):
+        controller.sent(ip)
+        if index < replied:
+            controller.replied(ip, 0)
+    clock.now += Constants.RATE_EPOCH
+
+def evaluate(controller, clock, windows, replied=100):
+    '''Sends windows more windows at the baseline reply ratio. A window is evaluated two windows after it was sent.'''
+    for _ in range(windows):
+        window(controller, clock, replied)
+
+def test_rate_starts_at_the_maximum_and_stays_there_without_loss(clock):
+    controller = RateController(max_rate=1000)
+    assert controller.rate() == 1000
+    evaluate(controller, clock, 10)
+    assert controller.rate() == 1000
+    assert controller.drop_estimate() == 0
+
+def test_loss_multiplies_the_rate_by_the_decrease_factor(clock):
+    controller = RateController(max_rate=1000)
+    evaluate(controller, clock, 4)
+    window(controller, clock, replied=0)
+    evaluate(controller, clock, 2)
+    # One decrease, not one for the scan and one more for its subnet
+    assert controller.rate() == 1000 * Constants.RATE_DECREASE
+    assert controller.drop_estimate() == pytest.approx(Constants.RATE_DROP_GAIN)
+
+def test_rate_grows_back_by_a_fixed_step_per_window(clock):
+    controller = RateController(max_rate=1000)
+    evaluate(controller, clock, 4)
+    window(controller, clock, replied=0)
+    evaluate(controller, clock, 2)
+    rates = []
+    for _ in range(3):
+        evaluate(controller, clock, 1)
+        rates.append(controller.rate())
+    step = 1000 * Constants.RATE_INCREASE
+    assert rates == pytest.approx([500 + step, 500 + 2 * step, 500 + 3 * step])
+    evaluate(controller, clock, 40)
+    assert controller.rate() == 1000
+
+def test_rate_never_backs_off_below_the_minimum(clock):
+    controller = RateController(max_rate=1000, min_rate=300)
+    evaluate(controller, clock, 4)
+    for _ in range(6):
+        window(controller, clock, replied=0)
+    assert controller.rate() == 300
+
+def test_fixed_rate_never_changes(clock):
+    controller = RateController(max_rate=1000, min_rate=1000)
+    evaluate(controller, clock, 4)
+    for _ in range(6):
+        window(controller, clock, replied=0)
+    assert controller.rate() == 1000
+
+def test_only_the_subnet_that_loses_replies_backs_off(clock):
+    controller = RateController(max_rate=1000)
+    def both_subnets(lossy_replied):
+        window(controller, clock, replied=1000, sent=2000, ip='10.0.0.1')
+        clock.now -= Constants.RATE_EPOCH    # Same window
+        window(controller, clock, replied=lossy_replied, sent=200, ip='10.0.1.1')
+    for _ in range(4):
+        both_subnets(100)
+    both_subnets(0)
+    both_subnets(100)
+    both_subnets(100)
+
+    assert controller.rate() == 1000 * Constants.RATE_DECREASE    # The last probe went to 10.0.1.1
+    controller.sent('10.0.0.2')
+    assert controller.rate() == 1000
+    assert controller.stats()['subnets_backed_off'] == 1
+
+def test_answered_retransmissions_count_as_loss(clock):
+    controller = RateController(max_rate=1000)
+    evaluate(controller, clock, 4)
+    # Half of the probes sent again were answered: the first copies were lost, which the reply ratio does not show
+    for index in range(Constants.RATE_MIN_SAMPLES):
+        controller.retransmitted('10.0.0.1')
+        if index % 2:
+            controller.recovered('10.0.0.1')
+    evaluate(controller, clock, 1)
+    assert controller.rate() == 1000 * Constants.RATE_DECREASE
+
+def test_budget_caps_the_combined_rate(clock):
+    budget = RateBudget(1000)
+    discovery, syn = RateController(max_rate=1000, budget=budget), RateController(max_rate=1000, budget=budget)
+    # Alone, an engine has the whole budget
+    assert discovery.rate() == 1000
+    # Discovery sends 800 packets/s and the SYN engine 200 packets/s over one window
+    for _ in range(80):
+        budget.sent(discovery)
+    for _ in range(20):
+        budget.sent(syn)
+    clock.now += Constants.RATE_EPOCH
+    budget.sent(discovery)
+    assert discovery.rate() == pytest.approx(800)
+    # An engine gets at least an equal share
+    assert syn.rate() == pytest.approx(500)
+    budget = RateBudget(1000)
+    first, second = RateController(max_rate=1000, budget=budget), RateController(max_rate=1000, budget=budget)
+    for _ in range(100):
+        budget.sent(first)
+    budget.sent(second)
+    assert second.rate() == 500
@@ -0,0 +1,58 @@
+#test_result_batcher.py
+import threading
+import pytest
+from NetworkScanner.Result_Batcher import ResultBatcher
+
+def test_batches_are_flushed_when_full_and_on_close():
+    batches = []
+    batcher = ResultBatcher(callback=batches.append, max_records=3, max_delay=60)
+    for record in range(7):
+        batcher.add(record)
+    batcher.close()
+    assert [record for batch in batches for record in batch] == list(range(7))
+
+def test_overdue_batch_is_flushed_before_close():
+    batches = []
+    batcher = ResultBatcher(callback=batches.append, max_records=100, max_delay=0.01)
+    batcher.add('10.0.0.1')
+    batcher._flusher.join(0.5)    # The flusher keeps running; this only waits long enough for the delay to pass
+    assert batches == [['10.0.0.1']]
+    batcher.close()
+
+def test_callback_error_is_raised_by_close_and_later_batches_are_delivered():
+    delivered = []
+    failed = threading.Event()
+    def callback(batch):
+        if not failed.is_set():
+            failed.set()
+            raise RuntimeError('history write failed')
+        delivered.extend(batch)
+
+    batcher = ResultBatcher(callback=callback, max_records=1, max_delay=60)
+    batcher.add(1)
+    assert failed.wait(5)
+    batcher.add(2)
+    batcher.add(3)
+    with pytest.raises(RuntimeError, match='history write failed'):
+        batcher.close()
+    assert delivered == [2, 3]
+    assert not batcher._flusher.is_alive()
+    batcher.close()    # The error is raised once
+
+def test_scan_with_an_unhandled_batch_is_recorded_as_failed(tmp_path):
+    from NetworkScanner.Scan_Runner import ScanRunner
+    from NetworkScanner.Scan_History import ScanHistory
+    from NetworkScanner.Target_Range import TargetRange
+    from NetworkScanner import Constants
+
+    runner = ScanRunner(Current_ScanType=Constants.SCAN_TYPE_CONNECT, ip_range=TargetRange.from_addresses('10.0.0.1', '10.0.0.2'),
+                        timeout=1, ttl=64, interval=0, packet_size=0, start_port=80, end_port=80, rate=100, stop=lambda: False)
+    runner.scan_stream = lambda: iter([{Constants.TABLE_COLOUM_IP: '10.0.0.1', Constants.TABLE_COLOUM_PORT: [80]}])
+    def callback(batch):
+        raise RuntimeError('GUI signal failed')
+
+    history = ScanHistory(str(tmp_path / 'history.db'))
+    with pytest.raises(RuntimeError):
+        runner.run(callback=callback, history=history)
+    assert history.scans()[0]['status'] == Constants.HISTORY_STATUS_FAILED
+    history.close()
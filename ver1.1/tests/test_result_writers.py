@@ -0,0 +1,106 @@
+#test_result_writers.py
+import csv
+import gzip
+import io
+import json
+import pytest
+from NetworkScanner import Constants
+from NetworkScanner import Result_Writers
+from NetworkScanner.Result_Writers import export_format, export_hosts, open_writer, TableWriter, SERVICE_HEADERS, DELTA_HEADERS
+
+def host(index, ports=(22, 80)):
+    return {Constants.TABLE_COLOUM_IP: f'10.0.{index // 256}.{index % 256}', Constants.TABLE_COLOUM_MAC: '',
+            Constants.TABLE_COLOUM_HOST: f'host{index}.lan', Constants.TABLE_COLOUM_PORT: list(ports)}
+
+@pytest.mark.parametrize('path, format', [
+    ('results.csv', 'csv'),
+    ('results.CSV.GZ', 'csv.gz'),
+    ('results.ndjson', 'ndjson'),
+    ('results.jsonl.gz', 'ndjson.gz'),
+    ('/tmp/scan.v2/results.parquet', 'parquet'),
+    ('results.arrow', 'arrow'),
+])
+def test_export_format(path, format):
+    assert export_format(path) == format
+
+@pytest.mark.parametrize('path', ['results.txt', 'results.gz', 'csv'])
+def test_unknown_export_format(path):
+    with pytest.raises(ValueError):
+        export_format(path)
+
+def test_csv_ports_parse_back(tmp_path):
+    path = tmp_path / 'results.csv'
+    writer = open_writer(str(path))
+    writer.write_batch([host(1), host(2, ports=[])])
+    writer.close()
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert [json.loads(row[Constants.TABLE_COLOUM_PORT]) if row[Constants.TABLE_COLOUM_PORT] else [] for row in rows] == [[22, 80], []]
+    assert rows[0][Constants.TABLE_COLOUM_HOST] == 'host1.lan'
+
+def test_gzip_ndjson_round_trip(tmp_path):
+    path = tmp_path / 'results.ndjson.gz'
+    hosts = [host(index) for index in range(3)]
+    writer = open_writer(str(path))
+    writer.write_batch(hosts)
+    writer.close()
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        assert [json.loads(line) for line in file] == hosts
+
+def test_explicit_format_overrides_extension(tmp_path):
+    path = tmp_path / 'results.out'
+    writer = open_writer(str(path), format='table')
+    writer.write_batch([host(1)])
+    writer.close()
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert lines[0].startswith(Constants.TABLE_COLOUM_IP)
+    assert lines[1].startswith('10.0.0.1') and lines[1].endswith('22, 80')
+
+def test_table_of_a_delta_scan_with_services():
+    headers = DELTA_HEADERS[:1] + SERVICE_HEADERS + DELTA_HEADERS[-1:]
+    file = io.StringIO()
+    writer = TableWriter(file, headers=headers)
+    writer.write_batch([dict(host(1), **{Constants.TABLE_COLOUM_CHANGE: 'added', Constants.TABLE_COLOUM_SERVICE: ['22/ssh', '80/http'],
+                                         Constants.TABLE_COLOUM_DETAILS: 'new host'})])
+    writer.close()
+    header_row, row = file.getvalue().splitlines()
+    assert header_row.startswith(Constants.TABLE_COLOUM_CHANGE) and header_row.endswith(Constants.TABLE_COLOUM_DETAILS)
+    assert row.startswith('added') and '22/ssh; 80/http' in row and row.endswith('new host')
+
+def test_unknown_format_raises(tmp_path):
+    with pytest.raises(ValueError):
+        open_writer(str(tmp_path / 'results.out'), format='xml')
+    assert not (tmp_path / 'results.out').exists()
+
+def test_columnar_without_pyarrow(tmp_path):
+    if Result_Writers.columnar_available():
+        pytest.skip('pyarrow is installed')
+    with pytest.raises(ValueError, match='pyarrow'):
+        open_writer(str(tmp_path / 'results.parquet'))
+
+def test_export_hosts_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(Constants, 'EXPORT_CHUNK_ROWS', 4)
+    path = tmp_path / 'results.ndjson'
+    progress = []
+    written = export_hosts((host(index) for index in range(10)), str(path), total=10, progress=lambda *args: progress.append(args))
+    assert written == 10
+    assert progress == [(4, 10), (8, 10), (10, 10)]
+    assert [json.loads(line)[Constants.TABLE_COLOUM_IP] for line in path.read_text(encoding='utf-8').splitlines()] == \
+           [host(index)[Constants.TABLE_COLOUM_IP] for index in range(10)]
+
+def test_export_hosts_stops_after_a_chunk(tmp_path, monkeypatch):
+    monkeypatch.setattr(Constants, 'EXPORT_CHUNK_ROWS', 4)
+    path = tmp_path / 'results.csv'
+    written = export_hosts((host(index) for index in range(10)), str(path), stop=lambda: True)
+    assert written == 4
+    with open(path, newline='', encoding='utf-8') as file:
+        assert len(list(csv.reader(file))) == 1 + 4    # Header row, then the first chunk; the file is closed
+
+def test_export_hosts_closes_the_file_on_error(tmp_path):
+    path = tmp_path / 'results.ndjson'
+    def hosts():
+        yield host(1)
+        raise RuntimeError('source failed')
+    with pytest.raises(RuntimeError):
+        export_hosts(hosts(), str(path))
+    assert path.read_text(encoding='utf-8') == ''
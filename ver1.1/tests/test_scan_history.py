@@ -0,0 +1,98 @@
+#test_scan_history.py
+import pytest
+from NetworkScanner.Scan_History import ScanHistory, open_history
+from NetworkScanner.Target_Range import TargetRange
+from NetworkScanner import Constants
+
+RANGE = TargetRange.from_addresses('10.0.0.1', '10.0.0.20')
+DAY = 86400
+
+def host(ip, ports=(), mac='', hostname=Constants.UNKNOWN_HOST):
+    return {Constants.TABLE_COLOUM_IP: ip, Constants.TABLE_COLOUM_MAC: mac, Constants.TABLE_COLOUM_HOST: hostname, Constants.TABLE_COLOUM_PORT: list(ports)}
+
+@pytest.fixture
+def history(tmp_path):
+    history = ScanHistory(str(tmp_path / 'history.db'))
+    yield history
+    history.close()
+
+def record_scan(history, hosts, status=Constants.HISTORY_STATUS_COMPLETED, scan_type=Constants.SCAN_TYPE_PORT, days_ago=0):
+    scan_id = history.begin_scan(scan_type, RANGE, 1, 1024)
+    history.add_hosts(scan_id, hosts)
+    if status != Constants.HISTORY_STATUS_RUNNING:
+        history.finish_scan(scan_id, status)
+    if days_ago:
+        # Backdate the observations of the scan
+        with history._connection:
+            history._connection.execute('UPDATE observations SET seen = seen - ? WHERE scan_id = ?', (days_ago * DAY, scan_id))
+    return scan_id
+
+def ips(host_list):
+    return [host_info[Constants.TABLE_COLOUM_IP] for host_info in host_list]
+
+def test_scans_are_recorded(history):
+    scan_id = history.begin_scan(Constants.SCAN_TYPE_PORT, RANGE, 1, 1024)
+    assert history.scans()[0]['status'] == Constants.HISTORY_STATUS_RUNNING
+    history.add_hosts(scan_id, [host('10.0.0.1', [22, 80])])
+    history.add_hosts(scan_id, [host('10.0.0.2'), host('10.0.0.3', [443])])
+    history.finish_scan(scan_id, Constants.HISTORY_STATUS_ABORTED)
+
+    scan = history.scans()[0]
+    assert scan['scan_id'] == scan_id
+    assert scan['scan_type'] == Constants.SCAN_TYPE_PORT
+    assert scan['targets'] == '10.0.0.1-10.0.0.20'
+    assert (scan['start_port'], scan['end_port']) == (1, 1024)
+    assert scan['status'] == Constants.HISTORY_STATUS_ABORTED
+    assert scan['hosts'] == 3
+    assert scan['finished'] >= scan['started']
+
+def test_query(history):
+    record_scan(history, [host('10.0.0.1', [22, 80], mac='00:11:22:33:44:55', hostname='gateway'), host('10.0.0.2', [3389])])
+    record_scan(history, [host('10.0.0.2', [22]), host('10.0.0.10')])
+
+    hosts = history.query()
+    # Every host once, in ascending IP order, with the ports of every scan
+    assert ips(hosts) == ['10.0.0.1', '10.0.0.2', '10.0.0.10']
+    assert hosts[0][Constants.TABLE_COLOUM_HOST] == 'gateway'
+    assert hosts[1][Constants.TABLE_COLOUM_PORT] == [22, 3389]
+    assert hosts[2][Constants.TABLE_COLOUM_PORT] == []
+    assert hosts[2][Constants.TABLE_COLOUM_HOST] == Constants.UNKNOWN_HOST
+
+    assert ips(history.query(ip='10.0.0.2')) == ['10.0.0.2']
+    assert ips(history.query(mac='00:11:22:33:44:55')) == ['10.0.0.1']
+    # Only the queried port is listed
+    assert [(host_info[Constants.TABLE_COLOUM_IP], host_info[Constants.TABLE_COLOUM_PORT]) for host_info in history.query(port=22)] == \
+        [('10.0.0.1', [22]), ('10.0.0.2', [22])]
+    assert ips(history.query(limit=2)) == ['10.0.0.1', '10.0.0.2']
+
+def test_query_port_in_the_last_days(history):
+    record_scan(history, [host('10.0.0.1', [3389]), host('10.0.0.2', [22])], days_ago=10)
+    record_scan(history, [host('10.0.0.3', [3389])], days_ago=45)
+    record_scan(history, [host('10.0.0.4', [3389, 80])])
+
+    assert ips(history.query(port=3389, days=30)) == ['10.0.0.1', '10.0.0.4']
+    assert ips(history.query(port=3389)) == ['10.0.0.1', '10.0.0.3', '10.0.0.4']
+    assert ips(history.query(days=5)) == ['10.0.0.4']
+
+def test_query_by_scan(history):
+    first = record_scan(history, [host('10.0.0.1')])
+    record_scan(history, [host('10.0.0.2')])
+    assert ips(history.query(scan_id=first)) == ['10.0.0.1']
+
+def test_latest_hosts(history):
+    record_scan(history, [host('10.0.0.1', [22, 80]), host('10.0.0.2', [443])], days_ago=40)
+    record_scan(history, [host('10.0.0.1', [22])])
+    record_scan(history, [host('10.0.0.1', [8080])], status=Constants.HISTORY_STATUS_RUNNING)
+    record_scan(history, [host('10.0.0.3')], scan_type=Constants.SCAN_TYPE_PING_FAST)
+
+    # Each host as found by the most recent finished scan that found it; a running scan is not finished
+    latest = history.latest_hosts()
+    assert sorted(latest) == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+    assert latest['10.0.0.1'][Constants.TABLE_COLOUM_PORT] == [22]
+    assert latest['10.0.0.2'][Constants.TABLE_COLOUM_PORT] == [443]
+
+    assert sorted(history.latest_hosts(days=30)) == ['10.0.0.1', '10.0.0.3']
+    assert sorted(history.latest_hosts(scan_types=[Constants.SCAN_TYPE_PORT])) == ['10.0.0.1', '10.0.0.2']
+
+def test_open_history_of_an_unusable_path(tmp_path):
+    assert open_history(str(tmp_path / 'missing' / 'history.db')) is None
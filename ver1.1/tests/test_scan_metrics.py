@@ -0,0 +1,103 @@
+#test_scan_metrics.py
+import json
+import pickle
+import pytest
+from NetworkScanner.Scan_Metrics import MetricsRegistry, Histogram, ProbeMetrics
+from NetworkScanner import Constants
+
+def registry_with_samples():
+    registry = MetricsRegistry()
+    registry.counter(Constants.METRIC_PROBES_SENT, engine='arp').inc(10)
+    registry.counter(Constants.METRIC_PROBES_SENT, engine='port').inc(5)
+    rtt = registry.histogram(Constants.METRIC_RTT, buckets=(0.01, 0.1), engine='arp')
+    for value in (0.005, 0.05, 0.05, 1.0):
+        rtt.observe(value)
+    return registry
+
+def test_metrics_are_identified_by_name_and_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter('probes', engine='arp', shard='1')
+    assert registry.counter('probes', shard='1', engine='arp') is counter
+    assert registry.counter('probes', engine='port') is not counter
+    counter.inc()
+    counter.inc(2)
+    registry.counter('probes', engine='port').inc()
+    assert registry.total('probes') == 4
+
+def test_reset_keeps_the_metrics_looked_up():
+    registry = registry_with_samples()
+    counter = registry.counter(Constants.METRIC_PROBES_SENT, engine='arp')
+    registry.reset()
+    assert registry.total(Constants.METRIC_PROBES_SENT) == 0
+    assert registry.quantile(Constants.METRIC_RTT, 0.5) == 0
+    counter.inc()
+    assert registry.total(Constants.METRIC_PROBES_SENT) == 1
+
+def test_histogram_quantiles():
+    histogram = Histogram((1, 2, 4))
+    assert histogram.quantile(0.5) == 0
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 0]
+    assert histogram.sum == pytest.approx(6.5)
+    # The median falls in the middle of the (1, 2] bucket
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(1) == pytest.approx(4)
+
+def test_snapshot_merges_into_another_registry():
+    shard = registry_with_samples()
+    parent = registry_with_samples()
+    parent.merge(pickle.loads(pickle.dumps(shard.snapshot())))
+    assert parent.counter(Constants.METRIC_PROBES_SENT, engine='arp').value == 20
+    histogram = parent.histogram(Constants.METRIC_RTT, buckets=(0.01, 0.1), engine='arp')
+    assert histogram.counts == [2, 4, 2]
+    assert histogram.count == 8
+    assert histogram.sum == pytest.approx(2 * 1.105)
+
+def test_json():
+    document = json.loads(registry_with_samples().to_json())
+    assert document[Constants.METRIC_PROBES_SENT] == [{'labels': {'engine': 'arp'}, 'value': 10}, {'labels': {'engine': 'port'}, 'value': 5}]
+    rtt, = document[Constants.METRIC_RTT]
+    assert rtt['labels'] == {'engine': 'arp'}
+    assert rtt['count'] == 4
+    assert rtt['sum'] == pytest.approx(1.105)
+    # Buckets are cumulative
+    assert rtt['buckets'] == {'0.01': 1, '0.1': 3, '+Inf': 4}
+    assert rtt['p50'] == pytest.approx(0.055)
+
+def test_prometheus():
+    text = registry_with_samples().to_prometheus()
+    sent = Constants.METRICS_PREFIX + Constants.METRIC_PROBES_SENT
+    rtt = Constants.METRICS_PREFIX + Constants.METRIC_RTT
+    assert text.splitlines() == [
+        f'# HELP {sent} Probes sent.',
+        f'# TYPE {sent} counter',
+        f'{sent}{{engine="arp"}} 10',
+        f'{sent}{{engine="port"}} 5',
+        f'# HELP {rtt} Round-trip time of the answered probes, in seconds.',
+        f'# TYPE {rtt} histogram',
+        f'{rtt}_bucket{{engine="arp",le="0.01"}} 1',
+        f'{rtt}_bucket{{engine="arp",le="0.1"}} 3',
+        f'{rtt}_bucket{{engine="arp",le="+Inf"}} 4',
+        f'{rtt}_sum{{engine="arp"}} {sum((0.005, 0.05, 0.05, 1.0))}',
+        f'{rtt}_count{{engine="arp"}} 4',
+    ]
+    assert text.endswith('\n')
+
+@pytest.mark.parametrize('filename, prometheus', [('metrics.prom', True), ('metrics.TXT', True), ('metrics.json', False)])
+def test_dump_format_follows_the_extension(tmp_path, filename, prometheus):
+    registry = registry_with_samples()
+    path = tmp_path / filename
+    registry.dump(str(path))
+    assert path.read_text(encoding='utf-8') == (registry.to_prometheus() if prometheus else registry.to_json())
+
+def test_probe_metrics_count_the_unanswered_probes_as_timeouts():
+    registry = MetricsRegistry()
+    registry.counter(Constants.METRIC_PROBES_SENT, engine='arp').inc(100)    # Sent by an earlier stream
+    probe_metrics = ProbeMetrics(registry, engine='arp')
+    probe_metrics.sent.inc(10)
+    probe_metrics.replies.inc(7)
+    probe_metrics.finish()
+    assert probe_metrics.timeouts.value == 3
+    probe_metrics.finish()
+    assert probe_metrics.timeouts.value == 3
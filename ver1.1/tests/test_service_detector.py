@@ -0,0 +1,139 @@
+#test_service_detector.py
+import asyncio
+import shutil
+import ssl
+import subprocess
+import threading
+import time
+import pytest
+from NetworkScanner.Service_Detector import ServiceDetector
+
+HOST = '127.0.0.1'
+DEADLINE = 2.0
+
+class MockedProbes(ServiceDetector):
+    '''ServiceDetector whose probes take delay seconds and identify every port, tracking how many run at once.'''
+    def __init__(self, delay=0.02, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.started = []
+        self.in_flight = {}
+        self.peak = 0
+        self.host_peak = 0
+
+    async def _identify(self, ip, port):
+        self.started.append((ip, port))
+        self.in_flight[ip] = self.in_flight.get(ip, 0) + 1
+        self.peak = max(self.peak, sum(self.in_flight.values()))
+        self.host_peak = max(self.host_peak, self.in_flight[ip])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight[ip] -= 1
+        return f'{port}/stub'
+
+def test_connection_caps():
+    detector = MockedProbes(max_connections=8, max_host_connections=2)
+    pairs = [(f'10.0.0.{host}', port) for host in range(1, 11) for port in range(1, 6)]
+    services = detector.detect(pairs)
+    assert services == {(ip, port): f'{port}/stub' for ip, port in pairs}
+    assert detector.peak == 8
+    assert detector.host_peak == 2
+
+def test_saturated_host_holds_no_global_slot():
+    # The ports of 10.0.0.1 come first; the ones waiting for their host must not keep 10.0.0.2 waiting
+    detector = MockedProbes(max_connections=2, max_host_connections=1)
+    detector.detect([('10.0.0.1', port) for port in range(1, 5)] + [('10.0.0.2', 1)])
+    assert detector.started[:2] == [('10.0.0.1', 1), ('10.0.0.2', 1)]
+
+def test_memoized_pairs_are_not_probed_again():
+    detector = MockedProbes()
+    first = detector.detect([(HOST, 22), (HOST, 80)])
+    detector.peak = 0
+    assert detector.detect([(HOST, 80), (HOST, 22)]) == first
+    assert detector.peak == 0
+
+def test_stop_leaves_the_remaining_ports_out():
+    detector = MockedProbes(delay=0.01, max_connections=1)
+    started = time.monotonic()
+    services = detector.detect([(HOST, port) for port in range(1, 101)], stop=lambda: time.monotonic() - started > 0.05)
+    assert 0 < sum(1 for service in services.values() if service) < 100
+    detector.clear()
+    assert detector.detect([(HOST, 1)], stop=lambda: True) == {(HOST, 1): None}
+
+# Stub services on 127.0.0.1: an SSH banner, an SMTP server, an HTTP server, an HTTPS server (with
+# a self-signed certificate made by openssl), a plain TLS server and a port that never answers
+
+async def ssh(reader, writer):
+    writer.write(b'SSH-2.0-OpenSSH_9.6 stub\r\n')
+    await reader.read(1024)
+    writer.close()
+
+async def smtp(reader, writer):
+    writer.write(b'220 mail.example ESMTP stub\r\n')
+    if (await reader.readline()).startswith(b'EHLO'):
+        writer.write(b'250-mail.example\r\n250 SIZE 10240000\r\n')
+    await reader.read(1024)
+    writer.close()
+
+async def http(reader, writer):
+    await reader.readuntil(b'\r\n\r\n')
+    writer.write(b'HTTP/1.0 200 OK\r\nServer: stub/1.0\r\nContent-Length: 0\r\n\r\n')
+    await writer.drain()
+    writer.close()
+
+async def silent(reader, writer):
+    await reader.read(1024)
+    writer.close()
+
+STUBS = (('ssh', ssh, False, 'ssh SSH-2.0-OpenSSH_9.6'), ('smtp', smtp, False, 'smtp 220'), ('http', http, False, 'http 200 OK stub/1.0'),
+         ('https', http, True, 'https 200 OK stub/1.0 (TLS'), ('tls', silent, True, 'tls TLS'), ('silent', silent, False, None))
+
+@pytest.fixture(scope='module')
+def stubs(tmp_path_factory):
+    '''Serves the stubs on an event loop of their own, and returns their ports by name.'''
+    if shutil.which('openssl') is None:
+        pytest.skip('needs the openssl command')
+    directory = tmp_path_factory.mktemp('certificate')
+    cert, key = str(directory / 'cert.pem'), str(directory / 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=localhost',
+                    '-keyout', key, '-out', cert], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+
+    ports, ready = {}, threading.Event()
+    loop = asyncio.new_event_loop()
+
+    async def serve():
+        for name, handler, tls, expected in STUBS:
+            server = await asyncio.start_server(handler, HOST, 0, ssl=context if tls else None)
+            ports[name] = server.sockets[0].getsockname()[1]
+        ready.set()
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(serve(), loop)
+    assert ready.wait(5)
+    yield ports
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+def test_stub_services(stubs):
+    detector = ServiceDetector(connect_timeout=0.5, banner_wait=0.3, read_timeout=0.5, deadline=DEADLINE)
+    pairs = [(HOST, port) for port in stubs.values()]
+
+    started = time.perf_counter()
+    services = detector.detect(pairs)
+    assert time.perf_counter() - started < DEADLINE + 1    # The silent port is given up at its deadline
+
+    for name, handler, tls, expected in STUBS:
+        port = stubs[name]
+        service = services[HOST, port]
+        if expected is None:
+            assert service is None, name
+        else:
+            assert service is not None and service.startswith(f'{port}/{expected}'), name
+
+    started = time.perf_counter()
+    assert detector.detect(pairs) == services
+    assert time.perf_counter() - started < 0.05    # Answered from the memo, without connecting
@@ -0,0 +1,74 @@
+#test_target_range.py
+import itertools
+import pytest
+from NetworkScanner.Target_Range import TargetRange
+from NetworkScanner.Interval_Set import ip_to_int
+
+# Single blocks of several sizes (including odd and non-power-of-two ones), and ranges of several blocks
+RANGES = [
+    [(ip_to_int('10.0.0.0'), ip_to_int('10.0.0.0'))],
+    [(ip_to_int('10.0.0.0'), ip_to_int('10.0.0.1'))],
+    [(ip_to_int('10.0.0.0'), ip_to_int('10.0.0.4'))],
+    [(ip_to_int('10.0.0.0'), ip_to_int('10.0.0.255'))],
+    [(ip_to_int('10.0.0.0'), ip_to_int('10.0.3.231'))],
+    [(ip_to_int('10.0.0.1'), ip_to_int('10.0.0.9')), (ip_to_int('10.0.1.0'), ip_to_int('10.0.1.99')), (ip_to_int('192.168.0.7'), ip_to_int('192.168.0.7'))],
+]
+
+@pytest.mark.parametrize('blocks', RANGES)
+@pytest.mark.parametrize('seed', [0, 1, 12345, 2 ** 63])
+def test_shuffled_order_is_a_permutation(blocks, seed):
+    ascending = list(TargetRange(blocks))
+    shuffled = TargetRange(blocks, seed=seed)
+    addresses = list(shuffled)
+    assert sorted(addresses, key=ip_to_int) == ascending
+    assert len(shuffled) == len(ascending)
+    # Indexing follows the same order as iteration
+    assert [shuffled[index] for index in range(len(shuffled))] == addresses
+
+@pytest.mark.parametrize('blocks', RANGES)
+def test_feistel_network_is_inverted(blocks):
+    shuffled = TargetRange(blocks, seed=7)
+    positions = [shuffled._permute(position) for position in range(len(shuffled))]
+    assert sorted(positions) == list(range(len(shuffled)))
+    assert [shuffled._unpermute(position) for position in positions] == list(range(len(shuffled)))
+
+def test_shuffled_order_depends_on_the_seed_only():
+    blocks = RANGES[3]
+    assert list(TargetRange(blocks, seed=42)) == list(TargetRange(blocks, seed=42))
+    assert list(TargetRange(blocks, seed=42)) != list(TargetRange(blocks, seed=43))
+    assert list(TargetRange(blocks, seed=42)) != list(TargetRange(blocks))
+
+@pytest.mark.parametrize('blocks', RANGES)
+@pytest.mark.parametrize('seed', [None, 3])
+@pytest.mark.parametrize('count', [1, 2, 3, 7, 16])
+def test_shards_are_disjoint_and_cover_the_range(blocks, seed, count):
+    target_range = TargetRange(blocks, seed=seed)
+    shards = [target_range.shard(index, count) for index in range(count)]
+    addresses = [list(shard) for shard in shards]
+
+    assert list(itertools.chain.from_iterable(addresses)) == list(target_range)
+    assert max(map(len, shards)) - min(map(len, shards)) <= 1
+    for index, shard in enumerate(shards):
+        for other, other_addresses in enumerate(addresses):
+            # Membership is per shard, even in a shuffled order
+            assert all((ip in shard) == (other == index) for ip in other_addresses)
+
+def test_membership():
+    target_range = TargetRange(RANGES[5], seed=9)
+    assert '10.0.0.1' in target_range
+    assert '10.0.1.99' in target_range
+    assert '192.168.0.7' in target_range
+    assert '10.0.0.0' not in target_range
+    assert '10.0.0.10' not in target_range
+    assert '192.168.0.8' not in target_range
+    assert 'not an address' not in target_range
+
+def test_slices():
+    target_range = TargetRange.from_addresses('10.0.0.0', '10.0.0.255')
+    assert list(target_range[10:13]) == ['10.0.0.10', '10.0.0.11', '10.0.0.12']
+    assert target_range[-1] == '10.0.0.255'
+    assert len(target_range[300:]) == 0
+    with pytest.raises(IndexError):
+        target_range[256]
+    with pytest.raises(ValueError):
+        target_range[::2]
@@ -0,0 +1,80 @@
+#test_timer_wheel.py
+import math
+import random
+import time
+import pytest
+from NetworkScanner.Timer_Wheel import TimerWheel
+
+TICK = 1 / 64    # Exact in binary, so deadlines and ticks compare without rounding errors
+
+def run_wheel(wheel, deadlines, steps, generator, cancelled=()):
+    '''
+    Advances the clock in random steps, expiring the wheel at every step, and checks that every
+    timer expires at the first step whose tick has reached its deadline: never early, never late.
+    Returns the deadlines in the order they expired.
+    '''
+    # Timers already overdue when they are scheduled all expire at the first tick of the wheel
+    first_tick = wheel._current
+    pending = {item: max(math.ceil(deadline / TICK), first_tick) for item, deadline in deadlines.items() if item not in cancelled}
+    now = min(deadlines.values()) - 3 * TICK
+    expired = []
+    for _ in range(steps):
+        now += generator.choice((0, TICK / 3, TICK, 2.5 * TICK, 7 * TICK, 40 * TICK))
+        items = wheel.expire(now)
+        for item in items:
+            assert deadlines[item] <= math.floor(now / TICK) * TICK    # Never early
+            assert pending.pop(item) <= math.floor(now / TICK)
+        # Every timer that is due has expired
+        assert all(tick > math.floor(now / TICK) for tick in pending.values())
+        # Within one call, in deadline order at tick granularity
+        ticks = [max(math.ceil(deadlines[item] / TICK), first_tick) for item in items]
+        assert ticks == sorted(ticks)
+        expired.extend(items)
+    return expired
+
+@pytest.mark.parametrize('seed', range(10))
+def test_timers_never_expire_early(seed):
+    generator = random.Random(seed)
+    # A small wheel (slots**levels = 64 ticks), so that timers are cascaded and parked beyond its span
+    wheel = TimerWheel(tick=TICK, slots=8, levels=2)
+    start = time.monotonic()
+    deadlines = {}
+    for item in range(500):
+        deadlines[item] = start + generator.uniform(-2, 300) * TICK
+        wheel.schedule(deadlines[item], item)
+    assert len(wheel) == 500
+
+    expired = run_wheel(wheel, deadlines, 2000, generator)
+    assert sorted(expired) == sorted(deadlines)
+    assert len(wheel) == 0
+
+def test_cancelled_timers_do_not_expire():
+    generator = random.Random(1)
+    wheel = TimerWheel(tick=TICK, slots=8, levels=2)
+    start = time.monotonic()
+    deadlines, timers = {}, {}
+    for item in range(200):
+        deadlines[item] = start + generator.uniform(0, 200) * TICK
+        timers[item] = wheel.schedule(deadlines[item], item)
+    cancelled = set(range(0, 200, 3))
+    for item in cancelled:
+        wheel.cancel(timers[item])
+        wheel.cancel(timers[item])    # Cancelling twice is harmless
+    assert len(wheel) == 200 - len(cancelled)
+
+    expired = run_wheel(wheel, deadlines, 1000, generator, cancelled)
+    assert set(expired) == set(deadlines) - cancelled
+    assert len(wheel) == 0
+
+def test_timer_expires_once_its_tick_is_reached():
+    wheel = TimerWheel(tick=TICK)
+    deadline = (math.floor(time.monotonic() / TICK) + 10) * TICK + TICK / 2
+    wheel.schedule(deadline, 'probe')
+    assert wheel.expire(deadline - TICK / 4) == []
+    assert wheel.expire(deadline) == []    # Still within the tick of the deadline
+    assert wheel.expire(math.ceil(deadline / TICK) * TICK) == ['probe']
+    assert wheel.expire(deadline + 100) == []
+
+def test_slots_must_be_a_power_of_two():
+    with pytest.raises(ValueError):
+        TimerWheel(slots=12)